@@ -0,0 +1,135 @@
+"""
+Index vault_items text search and timeline paging
+
+Revision ID: 20250425_vault_search_trgm
+Revises: 20250424_add_search_indexes
+Create Date: 2026-04-25
+
+This migration makes VaultSearchService queries index-backed on PostgreSQL:
+- search_vector becomes a generated tsvector column (replaces the trigger)
+- pg_trgm GIN indexes on title, summary and item_metadata::text for ILIKE
+  and fuzzy (%) matches
+- (user_id, <timeline column>, item_id) btree indexes for keyset pagination
+
+Adding the generated column rewrites vault_items. SQLite is left unchanged;
+the service falls back to ILIKE there.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20250425_vault_search_trgm'
+down_revision: Union[str, None] = '20250424_add_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMELINE_COLUMNS = ('event_time', 'record_time', 'semptify_entry_time', 'created_at')
+
+SEARCH_VECTOR_EXPRESSION = """
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(summary, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(item_type, '')), 'C')
+"""
+
+
+def upgrade() -> None:
+    """Add generated search vector, trigram and keyset indexes."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Replace the trigger-maintained vector with a generated column
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_vault_item_search_vector ON vault_items")
+    op.execute("DROP FUNCTION IF EXISTS update_vault_item_search_vector()")
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_search_vector")
+    op.execute("ALTER TABLE vault_items DROP COLUMN IF EXISTS search_vector")
+    op.execute(f"""
+        ALTER TABLE vault_items
+        ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED
+    """)
+    op.execute("""
+        CREATE INDEX idx_vault_items_search_vector
+        ON vault_items USING GIN (search_vector)
+    """)
+
+    # Trigram indexes serve ILIKE '%term%' as well as fuzzy % matches
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_title_trgm
+        ON vault_items USING GIN (title gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_summary_trgm
+        ON vault_items USING GIN (summary gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_metadata_trgm
+        ON vault_items USING GIN ((item_metadata::text) gin_trgm_ops)
+    """)
+
+    # Containment (@>) for deep_metadata_search
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_metadata_gin
+        ON vault_items USING GIN (item_metadata jsonb_path_ops)
+    """)
+
+    # Keyset pagination: WHERE user_id = ? AND (ts, item_id) < (?, ?) ORDER BY ts, item_id
+    for column in TIMELINE_COLUMNS:
+        op.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_vault_items_user_{column}_keyset
+            ON vault_items (user_id, {column}, item_id)
+        """)
+    # Superseded by the keyset indexes above
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_user_event_time")
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_user_record_time")
+
+    op.execute("ANALYZE vault_items")
+
+
+def downgrade() -> None:
+    """Restore the trigger-maintained search vector and timeline indexes."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_user_event_time
+        ON vault_items (user_id, event_time DESC)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vault_items_user_record_time
+        ON vault_items (user_id, record_time DESC)
+    """)
+    for column in TIMELINE_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS idx_vault_items_user_{column}_keyset")
+
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_metadata_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_summary_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_title_trgm")
+
+    op.execute("DROP INDEX IF EXISTS idx_vault_items_search_vector")
+    op.execute("ALTER TABLE vault_items DROP COLUMN IF EXISTS search_vector")
+    op.execute("ALTER TABLE vault_items ADD COLUMN search_vector tsvector")
+    op.execute(f"UPDATE vault_items SET search_vector = {SEARCH_VECTOR_EXPRESSION}")
+    op.execute("""
+        CREATE INDEX idx_vault_items_search_vector
+        ON vault_items USING GIN (search_vector)
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION update_vault_item_search_vector()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_EXPRESSION.replace('COALESCE(', 'COALESCE(NEW.')};
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER trigger_update_vault_item_search_vector
+        BEFORE INSERT OR UPDATE ON vault_items
+        FOR EACH ROW
+        EXECUTE FUNCTION update_vault_item_search_vector();
+    """)
+    # pg_trgm is left installed; other objects may depend on it
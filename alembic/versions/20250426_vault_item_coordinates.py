@@ -0,0 +1,96 @@
+"""
+Add indexed coordinates to vault_items
+
+Revision ID: 20250426_vault_item_coordinates
+Revises: 20250425_vault_search_trgm
+Create Date: 2026-04-26
+
+location_search used to load every geotagged item and filter in Python.
+This migration:
+- adds location_lat / location_lon, backfilled from location_data.gps
+- indexes (user_id, location_lat, location_lon) for bounding-box prefilters
+- on PostgreSQL, installs cube + earthdistance when available and adds a
+  GiST index on ll_to_earth(location_lat, location_lon)
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20250426_vault_item_coordinates'
+down_revision: Union[str, None] = '20250425_vault_search_trgm'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HAS_LOCATION = sa.text('location_lat IS NOT NULL')
+
+
+def upgrade() -> None:
+    """Add, backfill and index coordinate columns."""
+    bind = op.get_bind()
+
+    op.add_column('vault_items', sa.Column('location_lat', sa.Float(), nullable=True,
+                                           comment='Latitude from location_data.gps (degrees)'))
+    op.add_column('vault_items', sa.Column('location_lon', sa.Float(), nullable=True,
+                                           comment='Longitude from location_data.gps (degrees)'))
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE vault_items
+            SET location_lat = (location_data #>> '{gps,lat}')::double precision,
+                location_lon = (location_data #>> '{gps,lon}')::double precision
+            WHERE jsonb_typeof(location_data #> '{gps,lat}') = 'number'
+              AND jsonb_typeof(location_data #> '{gps,lon}') = 'number'
+              AND (location_data #>> '{gps,lat}')::double precision BETWEEN -90 AND 90
+              AND (location_data #>> '{gps,lon}')::double precision BETWEEN -180 AND 180
+        """)
+    else:
+        op.execute("""
+            UPDATE vault_items
+            SET location_lat = json_extract(location_data, '$.gps.lat'),
+                location_lon = json_extract(location_data, '$.gps.lon')
+            WHERE json_type(location_data, '$.gps.lat') IN ('integer', 'real')
+              AND json_type(location_data, '$.gps.lon') IN ('integer', 'real')
+              AND json_extract(location_data, '$.gps.lat') BETWEEN -90 AND 90
+              AND json_extract(location_data, '$.gps.lon') BETWEEN -180 AND 180
+        """)
+
+    op.create_index(
+        'idx_vault_items_user_location',
+        'vault_items',
+        ['user_id', 'location_lat', 'location_lon'],
+        postgresql_where=HAS_LOCATION,
+        sqlite_where=HAS_LOCATION,
+    )
+
+    if bind.dialect.name != 'postgresql':
+        return
+    available = bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'earthdistance'"
+    )).first()
+    if not available:
+        return
+    # Needs CREATE privilege on the database; the service falls back to
+    # plain Haversine SQL when the extension is missing
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS cube"))
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS earthdistance"))
+            bind.execute(sa.text("""
+                CREATE INDEX IF NOT EXISTS idx_vault_items_earth
+                ON vault_items USING GIST (ll_to_earth(location_lat, location_lon))
+                WHERE location_lat IS NOT NULL
+            """))
+    except sa.exc.DBAPIError:
+        pass
+
+
+def downgrade() -> None:
+    """Drop coordinate columns and their indexes."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_vault_items_earth")
+    op.drop_index('idx_vault_items_user_location', table_name='vault_items')
+    op.drop_column('vault_items', 'location_lon')
+    op.drop_column('vault_items', 'location_lat')
@@ -0,0 +1,96 @@
+"""
+Rebuild document search vectors in the background
+
+Revision ID: 20250427_document_vector_reindex
+Revises: 20250426_vault_item_coordinates
+Create Date: 2026-04-27
+
+The BEFORE INSERT OR UPDATE trigger on documents recomputed to_tsvector()
+over the whole extracted text inside every write, including writes that
+did not touch the text. It is replaced by a trigger that only clears
+search_vector when filename, document_type or extracted_text change;
+SearchVectorReindexer (app/core/postgres_fts.py) rebuilds cleared vectors
+in batches. A partial index keeps finding the stale rows cheap.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20250427_document_vector_reindex'
+down_revision: Union[str, None] = '20250426_vault_item_coordinates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Swap the rebuild-on-write trigger for a mark-stale trigger."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_document_search_vector ON documents")
+    op.execute("DROP FUNCTION IF EXISTS update_document_search_vector()")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mark_document_search_vector_stale()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT'
+               OR NEW.filename IS DISTINCT FROM OLD.filename
+               OR NEW.document_type IS DISTINCT FROM OLD.document_type
+               OR NEW.extracted_text IS DISTINCT FROM OLD.extracted_text THEN
+                NEW.search_vector := NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER trigger_mark_document_search_vector_stale
+        BEFORE INSERT OR UPDATE ON documents
+        FOR EACH ROW
+        EXECUTE FUNCTION mark_document_search_vector_stale();
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_documents_search_vector_stale
+        ON documents (id)
+        WHERE search_vector IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Restore rebuilding the vector inside every write."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS idx_documents_search_vector_stale")
+    op.execute("DROP TRIGGER IF EXISTS trigger_mark_document_search_vector_stale ON documents")
+    op.execute("DROP FUNCTION IF EXISTS mark_document_search_vector_stale()")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_document_search_vector()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', COALESCE(NEW.filename, '')), 'A') ||
+                setweight(to_tsvector('english', COALESCE(NEW.document_type, '')), 'B') ||
+                setweight(to_tsvector('english', COALESCE(NEW.extracted_text, '')), 'C');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER trigger_update_document_search_vector
+        BEFORE INSERT OR UPDATE ON documents
+        FOR EACH ROW
+        EXECUTE FUNCTION update_document_search_vector();
+    """)
+    op.execute("""
+        UPDATE documents
+        SET search_vector =
+            setweight(to_tsvector('english', COALESCE(filename, '')), 'A') ||
+            setweight(to_tsvector('english', COALESCE(document_type, '')), 'B') ||
+            setweight(to_tsvector('english', COALESCE(extracted_text, '')), 'C')
+        WHERE search_vector IS NULL
+    """)
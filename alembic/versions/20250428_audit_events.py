@@ -0,0 +1,102 @@
+"""
+Store audit events in one time-partitioned table
+
+Revision ID: 20250428_audit_events
+Revises: 20250427_document_vector_reindex
+Create Date: 2026-04-28
+
+app.core.audit wrote daily JSONL files that every query parsed in full,
+and app.core.audit_logger kept its last 10k events in a Python list. Both
+now write audit_events through AuditStore (app/core/audit_store.py).
+
+On PostgreSQL the table is range-partitioned by month on timestamp, with
+a DEFAULT partition so no insert can fail for a missing month. The store
+creates the current and next month's partitions at startup, and old
+months can be detached or dropped whole. Other databases get a plain
+table with the same indexes.
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20250428_audit_events'
+down_revision: Union[str, None] = '20250427_document_vector_reindex'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'idx_audit_events_user_time': ['user_id', 'timestamp'],
+    'idx_audit_events_resource_time': ['resource_id', 'timestamp'],
+    'idx_audit_events_action_time': ['action', 'timestamp'],
+    'idx_audit_events_time': ['timestamp'],
+}
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def upgrade() -> None:
+    """Create audit_events (partitioned by month on PostgreSQL)."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            CREATE TABLE audit_events (
+                id VARCHAR(40) NOT NULL,
+                timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+                action VARCHAR(64) NOT NULL,
+                operation VARCHAR(50),
+                user_id VARCHAR(64),
+                resource_type VARCHAR(50),
+                resource_id VARCHAR(100),
+                severity VARCHAR(20),
+                success BOOLEAN NOT NULL DEFAULT TRUE,
+                ip_address VARCHAR(64),
+                user_agent VARCHAR(500),
+                details JSON,
+                error_message TEXT,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """)
+        op.execute("CREATE TABLE audit_events_default PARTITION OF audit_events DEFAULT")
+        now = datetime.now(timezone.utc)
+        for offset in (0, 1):
+            start = _month_start(now.year, now.month + offset)
+            end = _month_start(now.year, now.month + offset + 1)
+            op.execute(
+                f"CREATE TABLE audit_events_{start:%Y_%m} PARTITION OF audit_events "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+    else:
+        op.create_table(
+            'audit_events',
+            sa.Column('id', sa.String(40), nullable=False),
+            sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('action', sa.String(64), nullable=False),
+            sa.Column('operation', sa.String(50), nullable=True),
+            sa.Column('user_id', sa.String(64), nullable=True),
+            sa.Column('resource_type', sa.String(50), nullable=True),
+            sa.Column('resource_id', sa.String(100), nullable=True),
+            sa.Column('severity', sa.String(20), nullable=True),
+            sa.Column('success', sa.Boolean(), nullable=False, server_default=sa.true()),
+            sa.Column('ip_address', sa.String(64), nullable=True),
+            sa.Column('user_agent', sa.String(500), nullable=True),
+            sa.Column('details', sa.JSON(), nullable=True),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id', 'timestamp'),
+        )
+
+    # On a partitioned table these cascade to every partition
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'audit_events', columns)
+
+
+def downgrade() -> None:
+    """Drop audit_events and all of its partitions."""
+    for name in INDEXES:
+        op.drop_index(name, table_name='audit_events')
+    op.drop_table('audit_events')
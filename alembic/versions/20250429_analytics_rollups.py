@@ -0,0 +1,41 @@
+"""
+Persist analytics rollups
+
+Revision ID: 20250429_analytics_rollups
+Revises: 20250428_audit_events
+Create Date: 2026-04-29
+
+AnalyticsEngine.aggregate_metrics scanned its last 10k raw events on
+every call. Events are now folded into minute, hour, day, week and month
+buckets as they are tracked (app/core/analytics_rollups.py), and the
+buckets are stored here, one row per bucket and worker.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20250429_analytics_rollups'
+down_revision: Union[str, None] = '20250428_audit_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create analytics_rollups."""
+    op.create_table(
+        'analytics_rollups',
+        sa.Column('resolution', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('worker_id', sa.String(40), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('resolution', 'bucket_start', 'worker_id'),
+    )
+
+
+def downgrade() -> None:
+    """Drop analytics_rollups."""
+    op.drop_table('analytics_rollups')
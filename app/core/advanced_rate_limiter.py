@@ -3,22 +3,55 @@ Advanced Rate Limiter - Intelligent API Throttling
 ===============================================
 
 Advanced rate limiting with multiple strategies, user tiers, and adaptive throttling.
+
+Every client key holds a fixed-size state, whatever its limit:
+- Sliding windows use a sliding-window counter: the previous and current
+  window counts, weighted by how far the current window has run
+- Token buckets use GCRA: a single "theoretical arrival time"
+- Violations use the same counter over one hour, so blocking needs no
+  timestamp lists either
+
+State is split across lock stripes by key, so requests for different
+clients rarely wait on each other. A key that has been idle for longer than
+any window it could still affect is dropped.
+
+With RATE_LIMIT_BACKEND=redis the same algorithms run as Lua scripts in
+Redis (REDIS_URL), which makes limits global across workers instead of per
+process. If Redis cannot be reached a worker falls back to its local state.
+
+Configuration:
+    RATE_LIMIT_BACKEND   local | redis (uses REDIS_URL; default: local)
 """
 
 import logging
+import math
 import time
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict, deque
+from collections import Counter
 import json
 import hashlib
 import threading
 
 logger = logging.getLogger(__name__)
 
+# Violations are counted over this window; this many blocks the client
+VIOLATION_WINDOW_SECONDS = 3600
+VIOLATION_THRESHOLD = 10
+# Block for this long per violation, up to BLOCK_MAX_SECONDS
+BLOCK_SECONDS_PER_VIOLATION = 30
+BLOCK_MAX_SECONDS = 300
+
+LOCK_STRIPES = 64
+# Each stripe drops its idle keys once per this fraction of the idle TTL
+SWEEP_FRACTION = 0.25
+GCRA_TOLERANCE = 1e-6  # seconds
+REDIS_KEY_PREFIX = "semptify:rl"
+
+
 class RateLimitStrategy(Enum):
     """Rate limiting strategies."""
     FIXED_WINDOW = "fixed_window"
@@ -26,6 +59,10 @@ class RateLimitStrategy(Enum):
     TOKEN_BUCKET = "token_bucket"
     LEAKY_BUCKET = "leaky_bucket"
 
+# Enum attribute lookups are slow enough to show up on the per-request path
+_TOKEN_BUCKET = RateLimitStrategy.TOKEN_BUCKET
+
+
 class UserTier(Enum):
     """User access tiers."""
     FREE = "free"
@@ -49,74 +86,421 @@ class RateLimitConfig:
             "strategy": self.strategy.value
         }
 
-@dataclass
 class RateLimitState:
-    """Rate limit state for a client."""
-    current_requests: int
-    window_start: float
-    last_request_time: float
-    tokens: float
-    last_refill_time: float
-    violations: int = 0
-    blocked_until: Optional[float] = None
+    """Rate limit state for a client key. Fixed size whatever the limit."""
+    __slots__ = (
+        "window_start", "prev_count", "curr_count", "tat",
+        "violation_start", "violation_prev", "violation_curr",
+        "blocked_until", "last_seen",
+    )
+    
+    def __init__(self, now: float = 0.0):
+        self.window_start = 0.0
+        self.prev_count = 0
+        self.curr_count = 0
+        self.tat = 0.0
+        self.violation_start = 0.0
+        self.violation_prev = 0
+        self.violation_curr = 0
+        self.blocked_until = 0.0
+        self.last_seen = now
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "current_requests": self.current_requests,
-            "window_start": self.window_start,
-            "last_request_time": self.last_request_time,
-            "tokens": self.tokens,
-            "last_refill_time": self.last_refill_time,
-            "violations": self.violations,
-            "blocked_until": self.blocked_until
-        }
+        return {name: getattr(self, name) for name in self.__slots__}
 
-class TokenBucketLimiter:
-    """Token bucket rate limiter."""
+@dataclass
+class RateLimitDecision:
+    """Outcome of one rate limit check."""
+    allowed: bool
+    blocked: bool = False
+    remaining: int = 0
+    retry_after: float = 0.0
+    reset_time: float = 0.0
+    violations: int = 0
+
+
+def _roll_window(start: float, prev: int, curr: int, now: float, window: float) -> Tuple[float, int, int]:
+    """Move a (start, prev, curr) counter onto the aligned window containing now."""
+    current = now - now % window
+    if current != start:
+        prev = curr if current - start < 2 * window else 0
+        curr = 0
+        start = current
+    return start, prev, curr
+
+
+def _weighted_count(start: float, prev: int, curr: int, now: float, window: float) -> float:
+    """Sliding-window estimate: the part of the previous window still in view plus the current one."""
+    return prev * (window - (now - start)) / window + curr
+
+
+def _sliding_window_check(state: RateLimitState, limit: int, window: float, now: float) -> Tuple[bool, int, float]:
+    """Sliding-window counter check. Returns (allowed, remaining, retry_after)."""
+    start = state.window_start
+    if not start <= now < start + window:
+        current = now - now % window
+        state.prev_count = state.curr_count if current - start < 2 * window else 0
+        state.curr_count = 0
+        state.window_start = start = current
+    prev, curr = state.prev_count, state.curr_count
+    elapsed = now - start
+    estimate = prev * (window - elapsed) / window + curr
     
-    def __init__(self, capacity: int, refill_rate: float):
-        self.capacity = capacity
-        self.refill_rate = refill_rate  # tokens per second
+    if estimate + 1 <= limit:
+        state.curr_count = curr + 1
+        return True, int(limit - estimate - 1), 0.0
     
-    def is_allowed(self, state: RateLimitState, current_time: float) -> Tuple[bool, float]:
-        """Check if request is allowed."""
-        # Refill tokens
-        time_passed = current_time - state.last_refill_time
-        state.tokens = min(self.capacity, state.tokens + time_passed * self.refill_rate)
-        state.last_refill_time = current_time
-        
-        if state.tokens >= 1:
-            state.tokens -= 1
-            return True, state.tokens
-        else:
-            return False, state.tokens
+    # Time until the estimate leaves room for one more request
+    if curr + 1 <= limit and prev > 0:
+        retry_after = window - elapsed - window * (limit - 1 - curr) / prev
+    else:
+        retry_after = (window - elapsed) + window * (1 - (limit - 1) / max(curr, 1))
+    return False, 0, retry_after
+
+
+def _gcra_check(state: RateLimitState, capacity: int, interval: float, now: float) -> Tuple[bool, int, float]:
+    """GCRA token bucket check. Returns (allowed, remaining, retry_after)."""
+    tat = state.tat
+    new_tat = (tat if tat > now else now) + interval
+    allow_at = new_tat - capacity * interval
+    
+    # The tolerance absorbs rounding in tat, which grows by one interval per request
+    if now < allow_at - GCRA_TOLERANCE:
+        return False, 0, allow_at - now
+    state.tat = new_tat
+    return True, max(0, int((now - allow_at) / interval)), 0.0
+
 
 class SlidingWindowLimiter:
-    """Sliding window rate limiter."""
+    """Sliding window rate limiter (sliding-window counter)."""
     
     def __init__(self, max_requests: int, window_seconds: int):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
     
-    def is_allowed(self, request_history: deque, current_time: float) -> Tuple[bool, deque]:
-        """Check if request is allowed."""
-        # Remove old requests outside the window
-        cutoff_time = current_time - self.window_seconds
-        
-        while request_history and request_history[0] < cutoff_time:
-            request_history.popleft()
-        
-        # Check if under limit
-        if len(request_history) < self.max_requests:
-            request_history.append(current_time)
-            return True, request_history
-        else:
-            return False, request_history
+    def is_allowed(self, state: RateLimitState, current_time: float) -> Tuple[bool, int, float]:
+        """Check if request is allowed. Returns (allowed, remaining, retry_after)."""
+        return _sliding_window_check(state, self.max_requests, self.window_seconds, current_time)
+
+class TokenBucketLimiter:
+    """Token bucket rate limiter (GCRA)."""
+    
+    def __init__(self, capacity: int, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+    
+    def is_allowed(self, state: RateLimitState, current_time: float) -> Tuple[bool, int, float]:
+        """Check if request is allowed. Returns (allowed, remaining, retry_after)."""
+        return _gcra_check(state, self.capacity, 1.0 / self.refill_rate, current_time)
+
+
+def _record_violation(state: RateLimitState, now: float) -> int:
+    """Count a violation and block the key once there are too many. Returns the count."""
+    state.violation_start, state.violation_prev, state.violation_curr = _roll_window(
+        state.violation_start, state.violation_prev, state.violation_curr, now, VIOLATION_WINDOW_SECONDS
+    )
+    state.violation_curr += 1
+    violations = int(_weighted_count(
+        state.violation_start, state.violation_prev, state.violation_curr, now, VIOLATION_WINDOW_SECONDS
+    ) + 0.5)
+    if violations >= VIOLATION_THRESHOLD:
+        state.blocked_until = now + min(BLOCK_MAX_SECONDS, violations * BLOCK_SECONDS_PER_VIOLATION)
+    return violations
+
+
+def _current_violations(state: RateLimitState, now: float) -> int:
+    start, prev, curr = _roll_window(
+        state.violation_start, state.violation_prev, state.violation_curr, now, VIOLATION_WINDOW_SECONDS
+    )
+    return int(_weighted_count(start, prev, curr, now, VIOLATION_WINDOW_SECONDS) + 0.5)
+
+
+class _Stripe:
+    """One lock and the client states that hash to it."""
+    __slots__ = ("lock", "states", "next_sweep")
+    
+    def __init__(self, next_sweep: float):
+        self.lock = threading.Lock()
+        self.states: Dict[str, RateLimitState] = {}
+        self.next_sweep = next_sweep
+
+
+class LocalRateLimitBackend:
+    """Per-process rate limit state, split across lock stripes."""
+    name = "local"
+    
+    def __init__(self, idle_ttl: float, stripes: int = LOCK_STRIPES, clock=time.time):
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._sweep_interval = idle_ttl * SWEEP_FRACTION
+        first_sweep = clock() + self._sweep_interval
+        self._stripes = [_Stripe(first_sweep) for _ in range(stripes)]
+        self._stripe_count = stripes
+    
+    def _stripe(self, client_key: str) -> _Stripe:
+        return self._stripes[hash(client_key) % self._stripe_count]
+    
+    def _sweep(self, stripe: _Stripe, now: float) -> None:
+        """Drop the stripe's idle keys (stripe lock held)."""
+        cutoff = now - self.idle_ttl
+        idle = [key for key, state in stripe.states.items() if state.last_seen < cutoff]
+        for key in idle:
+            del stripe.states[key]
+        stripe.next_sweep = now + self._sweep_interval
+    
+    def check(self, client_key: str, strategy: RateLimitStrategy, limit: int, window: int) -> RateLimitDecision:
+        now = self.clock()
+        stripe = self._stripes[hash(client_key) % self._stripe_count]
+        with stripe.lock:
+            if now >= stripe.next_sweep:
+                self._sweep(stripe, now)
+            state = stripe.states.get(client_key)
+            if state is None:
+                state = stripe.states[client_key] = RateLimitState(now)
+            state.last_seen = now
+            
+            if state.blocked_until > now:
+                return RateLimitDecision(
+                    allowed=False, blocked=True,
+                    retry_after=state.blocked_until - now,
+                    violations=_current_violations(state, now),
+                )
+            
+            if strategy is _TOKEN_BUCKET:
+                allowed, remaining, retry_after = _gcra_check(state, limit, window / limit, now)
+                reset_time = state.tat
+            else:
+                allowed, remaining, retry_after = _sliding_window_check(state, limit, window, now)
+                reset_time = state.window_start + window
+            
+            if allowed:
+                return RateLimitDecision(True, remaining=remaining, reset_time=reset_time)
+            return RateLimitDecision(
+                allowed=False, retry_after=retry_after, reset_time=reset_time,
+                violations=_record_violation(state, now),
+            )
+    
+    def get_state(self, client_key: str) -> Optional[RateLimitState]:
+        stripe = self._stripe(client_key)
+        with stripe.lock:
+            return stripe.states.get(client_key)
+    
+    def reset(self, client_key: str) -> None:
+        stripe = self._stripe(client_key)
+        with stripe.lock:
+            stripe.states.pop(client_key, None)
+    
+    def key_counts(self) -> Tuple[int, int]:
+        """Return (tracked keys, currently blocked keys)."""
+        now = self.clock()
+        tracked = blocked = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                tracked += len(stripe.states)
+                blocked += sum(1 for s in stripe.states.values() if s.blocked_until > now)
+        return tracked, blocked
+
+
+# Mirrors LocalRateLimitBackend.check on a Redis hash, atomically.
+# Time comes from the Redis server so every worker shares one clock.
+_REDIS_CHECK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local token_bucket = ARGV[1] == 'token_bucket'
+local limit = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local ttl_ms = tonumber(ARGV[4])
+local v_window = tonumber(ARGV[5])
+local v_threshold = tonumber(ARGV[6])
+local block_step = tonumber(ARGV[7])
+local block_max = tonumber(ARGV[8])
+local gcra_tolerance = tonumber(ARGV[9])
+
+local s = redis.call('HMGET', KEYS[1], 'ws', 'pc', 'cc', 'tat', 'vs', 'vp', 'vc', 'bu')
+local ws, pc, cc = tonumber(s[1]) or 0, tonumber(s[2]) or 0, tonumber(s[3]) or 0
+local tat = tonumber(s[4]) or 0
+local vs, vp, vc = tonumber(s[5]) or 0, tonumber(s[6]) or 0, tonumber(s[7]) or 0
+local bu = tonumber(s[8]) or 0
+
+local function roll(start, prev, curr, w)
+  local current = now - now % w
+  if current ~= start then
+    if current - start < 2 * w then prev = curr else prev = 0 end
+    curr = 0
+    start = current
+  end
+  return start, prev, curr
+end
+
+local function weighted(start, prev, curr, w)
+  return prev * (w - (now - start)) / w + curr
+end
+
+if bu > now then
+  local a, b, c = roll(vs, vp, vc, v_window)
+  return {0, 1, 0, tostring(bu - now), '0', math.floor(weighted(a, b, c, v_window) + 0.5)}
+end
+
+local allowed, remaining, retry_after, reset_time = 0, 0, 0, 0
+if token_bucket then
+  local interval = window / limit
+  local new_tat = math.max(tat, now) + interval
+  local allow_at = new_tat - limit * interval
+  if now < allow_at - gcra_tolerance then
+    retry_after = allow_at - now
+  else
+    tat = new_tat
+    allowed = 1
+    remaining = math.max(0, math.floor((now - allow_at) / interval))
+  end
+  reset_time = tat
+else
+  ws, pc, cc = roll(ws, pc, cc, window)
+  local estimate = weighted(ws, pc, cc, window)
+  if estimate + 1 <= limit then
+    cc = cc + 1
+    allowed = 1
+    remaining = math.floor(limit - estimate - 1)
+  else
+    local elapsed = now - ws
+    if cc + 1 <= limit and pc > 0 then
+      retry_after = window - elapsed - window * (limit - 1 - cc) / pc
+    else
+      retry_after = (window - elapsed) + window * (1 - (limit - 1) / math.max(cc, 1))
+    end
+  end
+  reset_time = ws + window
+end
+
+local violations = 0
+if allowed == 0 then
+  vs, vp, vc = roll(vs, vp, vc, v_window)
+  vc = vc + 1
+  violations = math.floor(weighted(vs, vp, vc, v_window) + 0.5)
+  if violations >= v_threshold then
+    bu = now + math.min(block_max, violations * block_step)
+  end
+end
+
+redis.call('HSET', KEYS[1], 'ws', tostring(ws), 'pc', pc, 'cc', cc, 'tat', tostring(tat),
+           'vs', tostring(vs), 'vp', vp, 'vc', vc, 'bu', tostring(bu))
+redis.call('PEXPIRE', KEYS[1], ttl_ms)
+return {allowed, 0, remaining, tostring(retry_after), tostring(reset_time), violations}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Rate limit state in Redis, shared by every worker.
+    
+    Each client key is one small hash updated by a Lua script, so a check is
+    a single atomic round trip. Keys expire after idle_ttl. When Redis fails
+    the check is answered from `fallback` (this worker's local state).
+    """
+    name = "redis"
+    
+    def __init__(self, redis_url: str = "", idle_ttl: float = VIOLATION_WINDOW_SECONDS,
+                 client: Any = None, fallback: Optional[LocalRateLimitBackend] = None,
+                 prefix: str = REDIS_KEY_PREFIX):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._redis = client
+        self._script = client.register_script(_REDIS_CHECK_SCRIPT)
+        self.idle_ttl = idle_ttl
+        self.prefix = prefix
+        self.fallback = fallback or LocalRateLimitBackend(idle_ttl)
+        self._failing = False
+    
+    def _key(self, client_key: str) -> str:
+        return f"{self.prefix}:{client_key}"
+    
+    def check(self, client_key: str, strategy: RateLimitStrategy, limit: int, window: int) -> RateLimitDecision:
+        try:
+            allowed, blocked, remaining, retry_after, reset_time, violations = self._script(
+                keys=[self._key(client_key)],
+                args=[
+                    strategy.value, limit, window, int(self.idle_ttl * 1000),
+                    VIOLATION_WINDOW_SECONDS, VIOLATION_THRESHOLD,
+                    BLOCK_SECONDS_PER_VIOLATION, BLOCK_MAX_SECONDS, GCRA_TOLERANCE,
+                ],
+            )
+        except Exception as e:
+            if not self._failing:
+                logger.warning("Redis rate limiting failed, using local limits: %s", e)
+                self._failing = True
+            return self.fallback.check(client_key, strategy, limit, window)
+        if self._failing:
+            logger.info("Redis rate limiting recovered")
+            self._failing = False
+        return RateLimitDecision(
+            allowed=bool(allowed), blocked=bool(blocked), remaining=int(remaining),
+            retry_after=float(retry_after), reset_time=float(reset_time), violations=int(violations),
+        )
+    
+    def get_state(self, client_key: str) -> Optional[RateLimitState]:
+        try:
+            fields = self._redis.hgetall(self._key(client_key))
+        except Exception:
+            return self.fallback.get_state(client_key)
+        if not fields:
+            return None
+        fields = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in fields.items()}
+        state = RateLimitState()
+        state.window_start = fields.get("ws", 0.0)
+        state.prev_count = int(fields.get("pc", 0))
+        state.curr_count = int(fields.get("cc", 0))
+        state.tat = fields.get("tat", 0.0)
+        state.violation_start = fields.get("vs", 0.0)
+        state.violation_prev = int(fields.get("vp", 0))
+        state.violation_curr = int(fields.get("vc", 0))
+        state.blocked_until = fields.get("bu", 0.0)
+        return state
+    
+    def reset(self, client_key: str) -> None:
+        self.fallback.reset(client_key)
+        try:
+            self._redis.delete(self._key(client_key))
+        except Exception as e:
+            logger.warning("Redis rate limit reset failed: %s", e)
+    
+    def key_counts(self) -> Tuple[int, int]:
+        # Counting Redis keys would mean a SCAN; report what this worker holds locally
+        return self.fallback.key_counts()
+
+
+class _ThreadCounters:
+    """Statistics counters kept per thread, so counting takes no lock at all."""
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._counters: list = []
+        self._lock = threading.Lock()
+    
+    def add(self, *names) -> None:
+        try:
+            counter = self._local.counter
+        except AttributeError:
+            counter = self._local.counter = Counter()
+            with self._lock:
+                self._counters.append(counter)
+        for name in names:
+            counter[name] += 1
+    
+    def totals(self) -> Counter:
+        total = Counter()
+        with self._lock:
+            counters = list(self._counters)
+        for counter in counters:
+            # A single C-level copy, safe while the owning thread keeps counting
+            total.update(dict(counter))
+        return total
+
 
 class AdvancedRateLimiter:
     """Advanced rate limiting system."""
     
-    def __init__(self):
+    def __init__(self, backend: Any = None, clock=time.time):
         # Rate limit configurations by tier and endpoint type
         self.tier_configs: Dict[UserTier, Dict[str, RateLimitConfig]] = {
             UserTier.FREE: {
@@ -149,31 +533,38 @@ class AdvancedRateLimiter:
             }
         }
         
-        # Client states
-        self.client_states: Dict[str, Dict[str, Any]] = defaultdict(dict)
-        self.sliding_windows: Dict[str, Dict[str, deque]] = defaultdict(lambda: defaultdict(deque))
-        
-        # Token bucket limiters
-        self.token_buckets: Dict[str, TokenBucketLimiter] = {}
+        # A key can be forgotten once nothing it holds can still matter
+        longest_window = max(c.window_seconds for tier in self.tier_configs.values() for c in tier.values())
+        self.idle_ttl = max(VIOLATION_WINDOW_SECONDS, BLOCK_MAX_SECONDS, 2 * longest_window)
         
-        # Violation tracking
-        self.violations: Dict[str, List[float]] = defaultdict(list)
+        # Client state lives in the backend (local stripes or Redis)
+        self.clock = clock
+        self.backend = backend or LocalRateLimitBackend(self.idle_ttl, clock=clock)
         
         # Adaptive throttling
         self.global_load_factor = 1.0
-        self.endpoint_load_factors: Dict[str, float] = defaultdict(lambda: 1.0)
-        
-        # Lock for thread safety
-        self.lock = threading.RLock()
+        self.endpoint_load_factors: Dict[str, float] = {}
+        self._limits = self._resolve_limits()
         
         # Statistics
-        self.stats = {
-            "total_requests": 0,
-            "allowed_requests": 0,
-            "blocked_requests": 0,
-            "violations_by_tier": defaultdict(int),
-            "violations_by_endpoint": defaultdict(int)
-        }
+        self._counters = _ThreadCounters()
+    
+    def _resolve_limits(self) -> Dict[UserTier, Dict[str, Tuple[RateLimitConfig, RateLimitStrategy, int, str]]]:
+        """(config, strategy, limit after load factors, tier name) per tier and endpoint type."""
+        limits = {}
+        for tier, configs in self.tier_configs.items():
+            limits[tier] = {}
+            for endpoint_type, config in configs.items():
+                effective_limit = max(1, int(config.requests_per_window *
+                                             self.global_load_factor *
+                                             self.endpoint_load_factors.get(endpoint_type, 1.0)))
+                if config.strategy == RateLimitStrategy.TOKEN_BUCKET:
+                    strategy = RateLimitStrategy.TOKEN_BUCKET
+                else:
+                    # Fixed and leaky windows are served by the sliding window
+                    strategy = RateLimitStrategy.SLIDING_WINDOW
+                limits[tier][endpoint_type] = (config, strategy, effective_limit, tier.value)
+        return limits
     
     def get_user_tier(self, user_id: str) -> UserTier:
         """Get user tier (simplified for demo)."""
@@ -206,252 +597,101 @@ class AdvancedRateLimiter:
     
     def is_allowed(self, user_id: str, ip_address: str, method: str, path: str) -> Tuple[bool, Dict[str, Any]]:
         """Check if request is allowed."""
-        with self.lock:
-            self.stats["total_requests"] += 1
-            
-            # Get user tier
-            tier = self.get_user_tier(user_id)
-            
-            # Classify endpoint
-            endpoint_type = self.classify_endpoint(method, path)
-            
-            # Get rate limit config
-            config = self.tier_configs[tier][endpoint_type]
-            
-            # Get client key
-            client_key = self.get_client_key(user_id, ip_address, endpoint_type)
-            
-            # Check if client is blocked
-            if self._is_client_blocked(client_key):
-                self.stats["blocked_requests"] += 1
-                return False, {
-                    "allowed": False,
-                    "reason": "client_blocked",
-                    "retry_after": self._get_block_duration(client_key),
-                    "tier": tier.value,
-                    "endpoint_type": endpoint_type
-                }
-            
-            # Apply rate limiting based on strategy
-            allowed, details = self._apply_rate_limit(
-                client_key, config, endpoint_type
-            )
-            
-            if allowed:
-                self.stats["allowed_requests"] += 1
-                return True, {
-                    "allowed": True,
-                    "tier": tier.value,
-                    "endpoint_type": endpoint_type,
-                    "remaining": details.get("remaining", 0),
-                    "reset_time": details.get("reset_time", 0)
-                }
-            else:
-                self.stats["blocked_requests"] += 1
-                self._record_violation(client_key, tier, endpoint_type)
-                
-                return False, {
-                    "allowed": False,
-                    "reason": "rate_limit_exceeded",
-                    "retry_after": details.get("retry_after", 60),
-                    "tier": tier.value,
-                    "endpoint_type": endpoint_type,
-                    "limit": config.requests_per_window,
-                    "window": config.window_seconds
-                }
-    
-    def _apply_rate_limit(self, client_key: str, config: RateLimitConfig, 
-                         endpoint_type: str) -> Tuple[bool, Dict[str, Any]]:
-        """Apply rate limiting based on strategy."""
-        current_time = time.time()
+        # Get user tier
+        tier = self.get_user_tier(user_id)
         
-        # Apply adaptive throttling
-        effective_limit = int(config.requests_per_window * 
-                              self.global_load_factor * 
-                              self.endpoint_load_factors[endpoint_type])
+        # Classify endpoint
+        endpoint_type = self.classify_endpoint(method, path)
         
-        if config.strategy == RateLimitStrategy.SLIDING_WINDOW:
-            return self._sliding_window_check(client_key, effective_limit, 
-                                             config.window_seconds, current_time)
-        elif config.strategy == RateLimitStrategy.TOKEN_BUCKET:
-            return self._token_bucket_check(client_key, effective_limit, 
-                                           config.window_seconds, current_time)
-        else:
-            # Default to sliding window
-            return self._sliding_window_check(client_key, effective_limit, 
-                                             config.window_seconds, current_time)
-    
-    def _sliding_window_check(self, client_key: str, max_requests: int, 
-                              window_seconds: int, current_time: float) -> Tuple[bool, Dict[str, Any]]:
-        """Sliding window rate limit check."""
-        if client_key not in self.sliding_windows:
-            self.sliding_windows[client_key] = defaultdict(deque)
+        # Get rate limit config, with adaptive throttling applied
+        config, strategy, effective_limit, tier_name = self._limits[tier][endpoint_type]
         
-        window = self.sliding_windows[client_key]["default"]
+        # Get client key
+        client_key = self.get_client_key(user_id, ip_address, endpoint_type)
         
-        # Remove old requests
-        cutoff_time = current_time - window_seconds
-        while window and window[0] < cutoff_time:
-            window.popleft()
+        decision = self.backend.check(client_key, strategy, effective_limit, config.window_seconds)
         
-        # Check if under limit
-        if len(window) < max_requests:
-            window.append(current_time)
-            return True, {
-                "remaining": max_requests - len(window),
-                "reset_time": current_time + window_seconds
-            }
-        else:
-            # Calculate retry after
-            oldest_request = window[0]
-            retry_after = int(oldest_request + window_seconds - current_time)
-            
+        if decision.blocked:
+            self._counters.add("blocked_requests")
             return False, {
-                "retry_after": max(retry_after, 1),
-                "window_start": oldest_request,
-                "current_count": len(window)
+                "allowed": False,
+                "reason": "client_blocked",
+                "retry_after": max(math.ceil(decision.retry_after), 1),
+                "tier": tier_name,
+                "endpoint_type": endpoint_type
             }
-    
-    def _token_bucket_check(self, client_key: str, capacity: int, 
-                           refill_time: int, current_time: float) -> Tuple[bool, Dict[str, Any]]:
-        """Token bucket rate limit check."""
-        # Get or create token bucket
-        bucket_key = f"bucket:{client_key}"
-        if bucket_key not in self.token_buckets:
-            refill_rate = capacity / refill_time
-            self.token_buckets[bucket_key] = TokenBucketLimiter(capacity, refill_rate)
-        
-        # Get or create state
-        if client_key not in self.client_states:
-            self.client_states[client_key]["token_bucket"] = RateLimitState(
-                current_requests=0,
-                window_start=current_time,
-                last_request_time=current_time,
-                tokens=capacity,
-                last_refill_time=current_time
-            )
-        
-        state = self.client_states[client_key]["token_bucket"]
-        bucket = self.token_buckets[bucket_key]
-        
-        allowed, remaining_tokens = bucket.is_allowed(state, current_time)
         
-        if allowed:
+        if decision.allowed:
+            self._counters.add("allowed_requests")
             return True, {
-                "remaining": int(remaining_tokens),
-                "reset_time": current_time + (capacity - remaining_tokens) / bucket.refill_rate
+                "allowed": True,
+                "tier": tier_name,
+                "endpoint_type": endpoint_type,
+                "remaining": decision.remaining,
+                "reset_time": decision.reset_time
             }
-        else:
-            retry_after = int((1 - remaining_tokens) / bucket.refill_rate)
-            return False, {
-                "retry_after": max(retry_after, 1),
-                "tokens_available": remaining_tokens
-            }
-    
-    def _is_client_blocked(self, client_key: str) -> bool:
-        """Check if client is temporarily blocked."""
-        if client_key not in self.client_states:
-            return False
-        
-        state = self.client_states[client_key].get("block_state")
-        if not state:
-            return False
         
-        current_time = time.time()
-        if state.blocked_until and current_time < state.blocked_until:
-            return True
-        
-        return False
-    
-    def _get_block_duration(self, client_key: str) -> int:
-        """Get remaining block duration."""
-        if client_key not in self.client_states:
-            return 0
-        
-        state = self.client_states[client_key].get("block_state")
-        if not state or not state.blocked_until:
-            return 0
-        
-        remaining = int(state.blocked_until - time.time())
-        return max(remaining, 1)
-    
-    def _record_violation(self, client_key: str, tier: UserTier, endpoint_type: str):
-        """Record rate limit violation."""
-        current_time = time.time()
-        
-        # Add to violations list
-        self.violations[client_key].append(current_time)
-        
-        # Keep only recent violations (last hour)
-        cutoff_time = current_time - 3600
-        self.violations[client_key] = [
-            v for v in self.violations[client_key] if v > cutoff_time
-        ]
-        
-        # Update statistics
-        self.stats["violations_by_tier"][tier.value] += 1
-        self.stats["violations_by_endpoint"][endpoint_type] += 1
-        
-        # Check if client should be blocked
-        if len(self.violations[client_key]) >= 10:  # 10 violations in last hour
-            block_duration = min(300, len(self.violations[client_key]) * 30)  # Up to 5 minutes
-            
-            if client_key not in self.client_states:
-                self.client_states[client_key] = {}
-            
-            self.client_states[client_key]["block_state"] = RateLimitState(
-                current_requests=0,
-                window_start=current_time,
-                last_request_time=current_time,
-                tokens=0,
-                last_refill_time=current_time,
-                violations=len(self.violations[client_key]),
-                blocked_until=current_time + block_duration
-            )
+        self._counters.add(
+            "blocked_requests",
+            ("tier", tier_name), ("endpoint", endpoint_type),
+        )
+        return False, {
+            "allowed": False,
+            "reason": "rate_limit_exceeded",
+            "retry_after": max(math.ceil(decision.retry_after), 1),
+            "tier": tier_name,
+            "endpoint_type": endpoint_type,
+            "limit": config.requests_per_window,
+            "window": config.window_seconds
+        }
     
-    def update_load_factors(self, global_load: float = None, 
+    def update_load_factors(self, global_load: float = None,
                           endpoint_loads: Dict[str, float] = None):
         """Update adaptive load factors."""
-        with self.lock:
-            if global_load is not None:
-                self.global_load_factor = max(0.1, min(2.0, global_load))
-            
-            if endpoint_loads:
-                for endpoint, load in endpoint_loads.items():
-                    self.endpoint_load_factors[endpoint] = max(0.1, min(2.0, load))
+        if global_load is not None:
+            self.global_load_factor = max(0.1, min(2.0, global_load))
+        
+        if endpoint_loads:
+            factors = dict(self.endpoint_load_factors)
+            for endpoint, load in endpoint_loads.items():
+                factors[endpoint] = max(0.1, min(2.0, load))
+            self.endpoint_load_factors = factors
+        
+        self._limits = self._resolve_limits()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get rate limiting statistics."""
-        with self.lock:
-            total = self.stats["total_requests"]
-            allowed = self.stats["allowed_requests"]
-            blocked = self.stats["blocked_requests"]
-            
-            return {
-                "total_requests": total,
-                "allowed_requests": allowed,
-                "blocked_requests": blocked,
-                "allow_rate": (allowed / total) if total > 0 else 0,
-                "block_rate": (blocked / total) if total > 0 else 0,
-                "violations_by_tier": dict(self.stats["violations_by_tier"]),
-                "violations_by_endpoint": dict(self.stats["violations_by_endpoint"]),
-                "active_clients": len(self.client_states),
-                "blocked_clients": len([
-                    key for key, states in self.client_states.items()
-                    if "block_state" in states and states["block_state"].blocked_until
-                ]),
-                "global_load_factor": self.global_load_factor,
-                "endpoint_load_factors": dict(self.endpoint_load_factors)
-            }
+        totals = self._counters.totals()
+        allowed = totals["allowed_requests"]
+        blocked = totals["blocked_requests"]
+        total = allowed + blocked
+        active_clients, blocked_clients = self.backend.key_counts()
+        
+        return {
+            "total_requests": total,
+            "allowed_requests": allowed,
+            "blocked_requests": blocked,
+            "allow_rate": (allowed / total) if total > 0 else 0,
+            "block_rate": (blocked / total) if total > 0 else 0,
+            "violations_by_tier": {k[1]: v for k, v in totals.items() if isinstance(k, tuple) and k[0] == "tier"},
+            "violations_by_endpoint": {k[1]: v for k, v in totals.items() if isinstance(k, tuple) and k[0] == "endpoint"},
+            "active_clients": active_clients,
+            "blocked_clients": blocked_clients,
+            "backend": self.backend.name,
+            "global_load_factor": self.global_load_factor,
+            "endpoint_load_factors": dict(self.endpoint_load_factors)
+        }
     
     def get_client_status(self, user_id: str, ip_address: str) -> Dict[str, Any]:
         """Get rate limit status for a client."""
         client_info = {}
+        now = self.clock()
         
         for endpoint_type in ["read", "write", "upload", "auth", "ai"]:
             client_key = self.get_client_key(user_id, ip_address, endpoint_type)
+            state = self.backend.get_state(client_key)
             
-            if client_key in self.client_states:
+            if state is not None:
                 tier = self.get_user_tier(user_id)
                 config = self.tier_configs[tier][endpoint_type]
                 
@@ -459,40 +699,50 @@ class AdvancedRateLimiter:
                     "tier": tier.value,
                     "limit": config.requests_per_window,
                     "window": config.window_seconds,
-                    "violations": len(self.violations.get(client_key, [])),
-                    "blocked": self._is_client_blocked(client_key)
+                    "violations": _current_violations(state, now),
+                    "blocked": state.blocked_until > now
                 }
         
         return client_info
     
     def reset_client(self, user_id: str, ip_address: str):
         """Reset rate limit state for a client."""
-        with self.lock:
-            for endpoint_type in ["read", "write", "upload", "auth", "ai"]:
-                client_key = self.get_client_key(user_id, ip_address, endpoint_type)
-                
-                if client_key in self.client_states:
-                    del self.client_states[client_key]
-                
-                if client_key in self.sliding_windows:
-                    del self.sliding_windows[client_key]
-                
-                if client_key in self.violations:
-                    del self.violations[client_key]
-                
-                bucket_key = f"bucket:{client_key}"
-                if bucket_key in self.token_buckets:
-                    del self.token_buckets[bucket_key]
+        for endpoint_type in ["read", "write", "upload", "auth", "ai"]:
+            self.backend.reset(self.get_client_key(user_id, ip_address, endpoint_type))
 
 # Global rate limiter instance
 _rate_limiter: Optional[AdvancedRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+def _create_rate_limiter() -> AdvancedRateLimiter:
+    """Build the limiter on the backend chosen by RATE_LIMIT_BACKEND."""
+    from app.core.config import get_settings
+    
+    limiter = AdvancedRateLimiter()
+    settings = get_settings()
+    backend = settings.rate_limit_backend.lower()
+    if backend == "redis":
+        if not settings.redis_url:
+            logger.warning("RATE_LIMIT_BACKEND=redis but REDIS_URL is not set; rate limits stay per-process")
+        else:
+            try:
+                limiter.backend = RedisRateLimitBackend(
+                    settings.redis_url, idle_ttl=limiter.idle_ttl, fallback=limiter.backend
+                )
+            except ImportError:
+                logger.warning("redis package not installed, rate limits stay per-process")
+    elif backend != "local":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND {backend!r}; rate limits stay per-process")
+    return limiter
 
 def get_advanced_rate_limiter() -> AdvancedRateLimiter:
     """Get the global advanced rate limiter instance."""
     global _rate_limiter
     
     if _rate_limiter is None:
-        _rate_limiter = AdvancedRateLimiter()
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = _create_rate_limiter()
     
     return _rate_limiter
 
@@ -507,7 +757,7 @@ def get_rate_limit_stats() -> Dict[str, Any]:
     limiter = get_advanced_rate_limiter()
     return limiter.get_stats()
 
-def update_rate_limit_load_factors(global_load: float = None, 
+def update_rate_limit_load_factors(global_load: float = None,
                                  endpoint_loads: Dict[str, float] = None):
     """Update adaptive load factors."""
     limiter = get_advanced_rate_limiter()
@@ -10,6 +10,11 @@ Comprehensive analytics system for tracking:
 - Error tracking
 
 Provides aggregation, reporting, and export capabilities.
+
+Aggregates are read from rollups that every tracked event updates
+(app.core.analytics_rollups), so reports cover the whole retained history
+rather than the last max_events raw events, which are kept only for
+inspection and export.
 """
 
 import logging
@@ -17,10 +22,12 @@ import json
 import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from collections import defaultdict
 from enum import Enum
 import hashlib
+from app.core.analytics_rollups import AnalyticsRollups
+from app.core.config import get_settings
 from app.core.id_gen import make_id
 
 logger = logging.getLogger(__name__)
@@ -106,6 +113,7 @@ class AggregatedMetrics:
     top_endpoints: List[Dict[str, Any]]
     feature_usage: Dict[str, int]
     document_metrics: Dict[str, int]
+    response_time_percentiles: Dict[str, float] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -119,18 +127,20 @@ class AggregatedMetrics:
             "error_rate": self.error_rate,
             "top_endpoints": self.top_endpoints,
             "feature_usage": self.feature_usage,
-            "document_metrics": self.document_metrics
+            "document_metrics": self.document_metrics,
+            "response_time_percentiles_ms": self.response_time_percentiles
         }
 
 
 class AnalyticsEngine:
     """Main analytics engine for tracking and aggregating metrics."""
     
-    def __init__(self, max_events: int = 10000):
+    def __init__(self, max_events: int = 10000, rollups: Optional[AnalyticsRollups] = None):
         self.max_events = max_events
         self.events: List[AnalyticsEvent] = []
         self.event_buffer: List[AnalyticsEvent] = []
         self.aggregated_data: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self.rollups = rollups or AnalyticsRollups(flush_interval=get_settings().analytics_rollup_flush_interval)
         self._lock = asyncio.Lock()
         
     def track_event(
@@ -160,6 +170,9 @@ class AnalyticsEngine:
             metadata=metadata or {}
         )
         
+        # Fold into the open rollup buckets
+        self.rollups.record(event)
+        
         # Add to buffer
         self.event_buffer.append(event)
         
@@ -243,10 +256,7 @@ class AnalyticsEngine:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None
     ) -> AggregatedMetrics:
-        """Aggregate metrics for a time period."""
-        # Ensure buffer is flushed
-        await self._flush_buffer()
-        
+        """Aggregate metrics for a time period from the rollup buckets (minute resolution)."""
         # Default time range
         end_time = end_time or datetime.now(timezone.utc)
         if period == TimePeriod.HOUR:
@@ -258,61 +268,34 @@ class AnalyticsEngine:
         elif period == TimePeriod.MONTH:
             start_time = start_time or (end_time - timedelta(days=30))
         
-        # Filter events in time range
-        filtered_events = [
-            e for e in self.events
-            if start_time <= e.timestamp <= end_time
-        ]
-        
-        # Calculate metrics
-        total_requests = len([e for e in filtered_events if e.event_type == AnalyticsEventType.API_REQUEST])
-        unique_users = len(set(e.user_id for e in filtered_events if e.user_id))
-        
-        # Response times
-        response_times = [e.duration_ms for e in filtered_events if e.duration_ms is not None]
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0.0
+        # Merge the rollup buckets covering the range
+        bucket = await self.rollups.read(start_time, end_time)
         
-        # Errors
-        error_events = [e for e in filtered_events if e.status_code and e.status_code >= 400]
-        error_count = len(error_events)
+        total_requests = bucket.requests
+        error_count = bucket.errors
         error_rate = error_count / total_requests if total_requests > 0 else 0.0
-        
-        # Top endpoints
-        endpoint_counts = defaultdict(int)
-        for e in filtered_events:
-            if e.endpoint:
-                endpoint_counts[e.endpoint] += 1
         top_endpoints = [
             {"endpoint": ep, "count": cnt}
-            for ep, cnt in sorted(endpoint_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            for ep, cnt in bucket.endpoints.most_common(10)
         ]
         
-        # Feature usage
-        feature_usage = defaultdict(int)
-        for e in filtered_events:
-            if e.event_type == AnalyticsEventType.FEATURE_USED:
-                feature = e.metadata.get("feature", "unknown")
-                feature_usage[feature] += 1
-        
-        # Document metrics
-        document_metrics = defaultdict(int)
-        for e in filtered_events:
-            if e.event_type in [AnalyticsEventType.DOCUMENT_UPLOAD, AnalyticsEventType.DOCUMENT_PROCESS]:
-                doc_type = e.metadata.get("doc_type", "unknown")
-                document_metrics[doc_type] += 1
-        
         return AggregatedMetrics(
             period=period.value,
             start_time=start_time,
             end_time=end_time,
             total_requests=total_requests,
-            unique_users=unique_users,
-            avg_response_time=avg_response_time,
+            unique_users=bucket.users.count(),
+            avg_response_time=bucket.latency.mean,
             error_count=error_count,
             error_rate=error_rate,
             top_endpoints=top_endpoints,
-            feature_usage=dict(feature_usage),
-            document_metrics=dict(document_metrics)
+            feature_usage=dict(bucket.features),
+            document_metrics=dict(bucket.documents),
+            response_time_percentiles={
+                "p50": bucket.latency.quantile(0.50),
+                "p95": bucket.latency.quantile(0.95),
+                "p99": bucket.latency.quantile(0.99),
+            }
         )
     
     def get_recent_events(
@@ -385,6 +368,7 @@ class AnalyticsEngine:
         all_events = self.events + self.event_buffer
         
         return {
+            "rollups": {"worker_id": self.rollups.worker_id, **self.rollups.stats},
             "total_events_stored": len(self.events),
             "buffered_events": len(self.event_buffer),
             "max_capacity": self.max_events,
@@ -410,6 +394,33 @@ def get_analytics_engine() -> AnalyticsEngine:
     return _analytics_engine
 
 
+async def start_analytics_rollups() -> None:
+    """Persist rollups every ANALYTICS_ROLLUP_FLUSH_INTERVAL seconds."""
+    global _rollup_task
+    if _rollup_task is None:
+        _rollup_task = asyncio.create_task(get_analytics_engine().rollups.run())
+
+
+async def stop_analytics_rollups() -> None:
+    """Stop the periodic flush and write the open buckets."""
+    global _rollup_task
+    if _rollup_task is not None:
+        _rollup_task.cancel()
+        try:
+            await _rollup_task
+        except asyncio.CancelledError:
+            pass
+        _rollup_task = None
+    if _analytics_engine is not None:
+        try:
+            await _analytics_engine.rollups.flush()
+        except Exception as e:
+            logger.warning("Final analytics rollup flush failed: %s", e)
+
+
+_rollup_task: Optional[asyncio.Task] = None
+
+
 # Convenience functions for tracking
 def track_api_request(*args, **kwargs) -> str:
     """Track an API request."""
@@ -0,0 +1,433 @@
+"""
+Analytics Rollups - incremental time-bucket aggregates
+======================================================
+
+Every tracked analytics event is counted, as it arrives, into the bucket
+for its minute. Before buckets are written, each minute's counts are
+merged into its minute, hour, day, week and month buckets. A bucket keeps:
+
+- counters: events, API requests, errors (status >= 400), events by type
+- top endpoints, feature usage and document types
+- a latency histogram with logarithmic bins (about 1% relative error)
+  for averages and percentiles
+- a HyperLogLog of user ids (about 1.6% error) for unique users
+
+All of these merge by addition (or register max), so a report over any
+range is the merge of the buckets that tile it: whole months, weeks,
+days and hours where they fit, minutes at the edges. A 30-day report
+reads about 200 buckets no matter how many events were tracked.
+
+Buckets are written to the analytics_rollups table every
+ANALYTICS_ROLLUP_FLUSH_INTERVAL seconds, one row per bucket and worker,
+and before every read. Minute buckets are kept for two days and hour
+buckets for 90 days; older reports use the day, week and month buckets.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import socket
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select
+
+from app.core.id_gen import make_id
+from app.core.utc import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Coarsest first: the planner tries them in this order
+RESOLUTIONS = ("month", "week", "day", "hour", "minute")
+RETENTION = {"minute": timedelta(days=2), "hour": timedelta(days=90)}
+PRUNE_INTERVAL = timedelta(hours=1)
+# Closed buckets stay in memory this long so a late event cannot start a fresh row
+EVICT_GRACE = timedelta(minutes=1)
+MAX_KEYS = 500
+OTHER = "(other)"
+
+API_REQUEST = "api_request"
+FEATURE_USED = "feature_used"
+DOCUMENT_EVENTS = ("document_upload", "document_process")
+
+
+def bucket_start(resolution: str, ts: datetime) -> datetime:
+    """Start of the bucket at this resolution that contains ts (UTC)."""
+    ts = ts.astimezone(timezone.utc)
+    if resolution == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+def bucket_end(resolution: str, start: datetime) -> datetime:
+    if resolution == "minute":
+        return start + timedelta(minutes=1)
+    if resolution == "hour":
+        return start + timedelta(hours=1)
+    if resolution == "day":
+        return start + timedelta(days=1)
+    if resolution == "week":
+        return start + timedelta(weeks=1)
+    if resolution == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+def plan_buckets(start: datetime, end: datetime, now: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+    """
+    The buckets that tile [start, end), coarsest first at each step.
+
+    Ranges are widened to whole minutes. Where minute or hour buckets
+    have expired the enclosing hour or day bucket is used instead.
+    """
+    now = now or utc_now()
+
+    def retained(resolution: str, at: datetime) -> bool:
+        keep = RETENTION.get(resolution)
+        return keep is None or at >= bucket_start(resolution, now - keep)
+
+    plan = []
+    cursor = bucket_start("minute", start)
+    while cursor < end:
+        for resolution in RESOLUTIONS:
+            if bucket_start(resolution, cursor) != cursor or not retained(resolution, cursor):
+                continue
+            if resolution == "minute" or bucket_end(resolution, cursor) <= end:
+                break
+        else:
+            resolution = "hour" if retained("hour", bucket_start("hour", cursor)) else "day"
+            cursor = bucket_start(resolution, cursor)
+        plan.append((resolution, cursor))
+        cursor = bucket_end(resolution, cursor)
+    return plan
+
+
+class HyperLogLog:
+    """HyperLogLog with 4096 registers, stored sparsely so small buckets stay small."""
+
+    P = 12
+    M = 1 << P
+    ALPHA = 0.7213 / (1 + 1.079 / M)
+
+    def __init__(self, registers: Optional[Dict[int, int]] = None):
+        self.registers: Dict[int, int] = dict(registers or {})
+
+    @staticmethod
+    def hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def add_hash(self, hashed: int) -> None:
+        index = hashed >> (64 - self.P)
+        rest = hashed & ((1 << (64 - self.P)) - 1)
+        rank = (64 - self.P) - rest.bit_length() + 1
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def count(self) -> int:
+        zeros = self.M - len(self.registers)
+        estimate = self.ALPHA * self.M * self.M / (sum(2.0 ** -r for r in self.registers.values()) + zeros)
+        if estimate <= 2.5 * self.M and zeros:
+            # Linear counting is exact-ish for small cardinalities
+            return round(self.M * math.log(self.M / zeros))
+        return round(estimate)
+
+
+class LatencySketch:
+    """Histogram with logarithmic bins; quantiles within RELATIVE_ERROR of the true value."""
+
+    RELATIVE_ERROR = 0.01
+    GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_VALUE = 1e-3
+
+    def __init__(self, bins: Optional[Dict[int, int]] = None, count: int = 0, total: float = 0.0,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None):
+        self.bins: Dict[int, int] = dict(bins or {})
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def add(self, value: float) -> None:
+        index = math.ceil(math.log(max(value, self.MIN_VALUE)) / self.LOG_GAMMA)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def merge(self, other: "LatencySketch") -> None:
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.minimum is not None:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.GAMMA ** index / (self.GAMMA + 1)
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+
+def _count_key(counter: Counter, key: str, amount: int = 1) -> None:
+    """Count key, folding new keys into OTHER once MAX_KEYS are tracked."""
+    if key not in counter and len(counter) >= MAX_KEYS:
+        key = OTHER
+    counter[key] += amount
+
+
+class RollupBucket:
+    """Mergeable aggregates for one time bucket."""
+
+    def __init__(self):
+        self.events = 0
+        self.requests = 0
+        self.errors = 0
+        self.event_types: Counter = Counter()
+        self.endpoints: Counter = Counter()
+        self.features: Counter = Counter()
+        self.documents: Counter = Counter()
+        self.latency = LatencySketch()
+        self.users = HyperLogLog()
+
+    def add(self, event: Any, user_hash: Optional[int]) -> None:
+        event_type = event.event_type.value
+        self.events += 1
+        self.event_types[event_type] += 1
+        if event_type == API_REQUEST:
+            self.requests += 1
+        if event.status_code and event.status_code >= 400:
+            self.errors += 1
+        if event.endpoint:
+            _count_key(self.endpoints, event.endpoint)
+        if event_type == FEATURE_USED:
+            _count_key(self.features, event.metadata.get("feature", "unknown"))
+        if event_type in DOCUMENT_EVENTS:
+            _count_key(self.documents, event.metadata.get("doc_type") or "unknown")
+        if event.duration_ms is not None:
+            self.latency.add(event.duration_ms)
+        if user_hash is not None:
+            self.users.add_hash(user_hash)
+
+    def merge(self, other: "RollupBucket") -> None:
+        self.events += other.events
+        self.requests += other.requests
+        self.errors += other.errors
+        self.event_types.update(other.event_types)
+        for mine, theirs in ((self.endpoints, other.endpoints), (self.features, other.features),
+                             (self.documents, other.documents)):
+            for key, count in theirs.items():
+                _count_key(mine, key, count)
+        self.latency.merge(other.latency)
+        self.users.merge(other.users)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "events": self.events,
+            "requests": self.requests,
+            "errors": self.errors,
+            "event_types": dict(self.event_types),
+            "endpoints": dict(self.endpoints),
+            "features": dict(self.features),
+            "documents": dict(self.documents),
+            "latency": {
+                "bins": {str(i): c for i, c in self.latency.bins.items()},
+                "count": self.latency.count,
+                "total": self.latency.total,
+                "min": self.latency.minimum,
+                "max": self.latency.maximum,
+            },
+            "users": {str(i): r for i, r in self.users.registers.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "RollupBucket":
+        bucket = cls()
+        bucket.events = data.get("events", 0)
+        bucket.requests = data.get("requests", 0)
+        bucket.errors = data.get("errors", 0)
+        bucket.event_types = Counter(data.get("event_types", {}))
+        bucket.endpoints = Counter(data.get("endpoints", {}))
+        bucket.features = Counter(data.get("features", {}))
+        bucket.documents = Counter(data.get("documents", {}))
+        latency = data.get("latency", {})
+        bucket.latency = LatencySketch(
+            {int(i): c for i, c in latency.get("bins", {}).items()},
+            latency.get("count", 0), latency.get("total", 0.0), latency.get("min"), latency.get("max"),
+        )
+        bucket.users = HyperLogLog({int(i): r for i, r in data.get("users", {}).items()})
+        return bucket
+
+
+class AnalyticsRollups:
+    """Open buckets for this worker, their persistence and range reads."""
+
+    def __init__(self, worker_id: Optional[str] = None, flush_interval: float = 10.0):
+        self.worker_id = worker_id or f"{socket.gethostname()[:16]}-{os.getpid()}-{make_id('w', 6)}"
+        self.flush_interval = flush_interval
+        self.stats = {"recorded": 0, "rows_written": 0, "flushes": 0, "buckets_read": 0}
+        self._open: Dict[Tuple[str, datetime], RollupBucket] = {}
+        # Per-minute counts not yet merged into the open buckets
+        self._deltas: Dict[datetime, RollupBucket] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._last_prune: Optional[datetime] = None
+
+    def _bind(self) -> None:
+        """Create the loop-bound write lock for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._write_lock = asyncio.Lock()
+
+    def record(self, event: Any) -> None:
+        """Count one event into its minute; flush() spreads it over the other resolutions."""
+        user_hash = HyperLogLog.hash(event.user_id) if event.user_id else None
+        minute = bucket_start("minute", event.timestamp)
+        with self._lock:
+            bucket = self._deltas.get(minute)
+            if bucket is None:
+                bucket = self._deltas[minute] = RollupBucket()
+            bucket.add(event, user_hash)
+            self.stats["recorded"] += 1
+
+    def _fold(self) -> None:
+        """Merge the pending minute counts into the open buckets (lock held)."""
+        for minute, delta in self._deltas.items():
+            for resolution in RESOLUTIONS:
+                key = (resolution, bucket_start(resolution, minute))
+                bucket = self._open.get(key)
+                if bucket is None:
+                    bucket = self._open[key] = RollupBucket()
+                bucket.merge(delta)
+                self._dirty.add(key)
+        self._deltas.clear()
+
+    async def flush(self) -> int:
+        """Write this worker's changed buckets; returns rows written."""
+        # run() and read() both flush; one at a time, so the delete and
+        # insert of a bucket's row never interleave with another flush's
+        self._bind()
+        async with self._write_lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        from app.core.database import get_db_session
+        from app.models.models import AnalyticsRollup
+
+        with self._lock:
+            self._fold()
+            keys = list(self._dirty)
+            self._dirty.clear()
+            rows = [
+                {"resolution": r, "bucket_start": s, "worker_id": self.worker_id,
+                 "data": self._open[(r, s)].to_json(), "updated_at": utc_now()}
+                for r, s in keys
+            ]
+        if rows:
+            table = AnalyticsRollup.__table__
+            try:
+                async with get_db_session() as session:
+                    await session.execute(delete(table).where(
+                        table.c.worker_id == self.worker_id,
+                        or_(*(and_(table.c.resolution == r, table.c.bucket_start == s) for r, s in keys)),
+                    ))
+                    await session.execute(table.insert(), rows)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(keys)
+                raise
+            self.stats["rows_written"] += len(rows)
+        self.stats["flushes"] += 1
+
+        now = utc_now()
+        with self._lock:
+            for key in [k for k in self._open if k not in self._dirty and bucket_end(*k) + EVICT_GRACE <= now]:
+                del self._open[key]
+        if self._last_prune is None or now - self._last_prune >= PRUNE_INTERVAL:
+            await self.prune(now)
+        return len(rows)
+
+    async def prune(self, now: Optional[datetime] = None) -> None:
+        """Delete minute and hour buckets past their retention (all workers)."""
+        from app.core.database import get_db_session
+        from app.models.models import AnalyticsRollup
+
+        now = now or utc_now()
+        table = AnalyticsRollup.__table__
+        async with get_db_session() as session:
+            for resolution, keep in RETENTION.items():
+                await session.execute(delete(table).where(
+                    table.c.resolution == resolution,
+                    table.c.bucket_start < bucket_start(resolution, now - keep),
+                ))
+        self._last_prune = now
+
+    async def read(self, start: datetime, end: datetime) -> RollupBucket:
+        """Merge of every worker's buckets covering [start, end)."""
+        from app.core.database import get_db_session
+        from app.models.models import AnalyticsRollup
+
+        await self.flush()
+        plan = plan_buckets(start, end)
+        merged = RollupBucket()
+        if not plan:
+            return merged
+
+        table = AnalyticsRollup.__table__
+        by_resolution: Dict[str, List[datetime]] = {}
+        for resolution, starts in plan:
+            by_resolution.setdefault(resolution, []).append(starts)
+        condition = or_(*(
+            and_(table.c.resolution == resolution, table.c.bucket_start.in_(starts))
+            for resolution, starts in by_resolution.items()
+        ))
+        async with get_db_session() as session:
+            rows = (await session.execute(select(table.c.data).where(condition))).scalars().all()
+        for data in rows:
+            merged.merge(RollupBucket.from_json(data))
+        self.stats["buckets_read"] += len(plan)
+        return merged
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Analytics rollup flush failed: %s", e)
@@ -19,6 +19,8 @@ Usage:
     @audit_logged(AuditAction.DOCUMENT_DELETE)
     async def delete_document(doc_id: str, user_id: str):
         ...
+
+Entries are stored by app.core.audit_store in the audit_events table.
 """
 
 import json
@@ -28,7 +30,11 @@ from enum import Enum
 from functools import wraps
 from pathlib import Path
 from typing import Any, Callable, TypeVar
+
+from app.core.audit_store import get_audit_store
+from app.core.config import get_settings
 from app.core.id_gen import make_id
+from app.core.utc import utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -106,7 +112,7 @@ class AuditEntry:
         error_message: str | None = None,
     ):
         self.id = make_id("aud")
-        self.timestamp = datetime.utcnow()
+        self.timestamp = utc_now()
         self.action = action
         self.user_id = user_id
         self.resource_type = resource_type
@@ -143,33 +149,35 @@ class AuditLogger:
     Manages audit logging with multiple backends.
     
     Backends:
-    - File: JSON lines file (default)
-    - Database: SQLAlchemy table (optional)
+    - Database: audit_events table via AuditStore (default)
+    - File: daily JSON lines files (AUDIT_LOG_FILES=true)
     - External: Webhook/API (optional)
     """
     
     def __init__(self):
         self._log_dir = Path("logs/audit")
-        self._log_dir.mkdir(parents=True, exist_ok=True)
         self._current_file: Path | None = None
         self._file_handle = None
-        self._db_enabled = False
+        self._db_enabled = True
+        self._file_enabled = get_settings().audit_log_files
         self._webhook_url: str | None = None
+        if self._file_enabled:
+            self._log_dir.mkdir(parents=True, exist_ok=True)
     
     def _get_log_file(self) -> Path:
         """Get current log file (rotated daily)."""
-        date_str = datetime.utcnow().strftime("%Y-%m-%d")
+        date_str = utc_now().strftime("%Y-%m-%d")
         return self._log_dir / f"audit_{date_str}.jsonl"
     
     async def log(self, entry: AuditEntry) -> None:
         """Log an audit entry."""
-        # Always log to file
-        await self._log_to_file(entry)
-        
-        # Log to database if enabled
         if self._db_enabled:
             await self._log_to_database(entry)
         
+        # Mirror to JSON lines files if enabled
+        if self._file_enabled:
+            await self._log_to_file(entry)
+        
         # Send to webhook if configured
         if self._webhook_url:
             await self._log_to_webhook(entry)
@@ -196,9 +204,11 @@ class AuditLogger:
             logger.error("Failed to write audit log: %s", e)
     
     async def _log_to_database(self, entry: AuditEntry) -> None:
-        """Write audit entry to database."""
-        # TODO: Implement database logging when audit table is created
-        pass
+        """Write audit entry to audit_events with the next group commit."""
+        try:
+            await get_audit_store().commit({**entry.to_dict(), "timestamp": entry.timestamp})
+        except Exception as e:
+            logger.error("Failed to write audit entry: %s", e)
     
     async def _log_to_webhook(self, entry: AuditEntry) -> None:
         """Send audit entry to external webhook."""
@@ -217,6 +227,11 @@ class AuditLogger:
         """Enable database logging backend."""
         self._db_enabled = True
     
+    def enable_file_logging(self) -> None:
+        """Also write entries to daily JSON lines files."""
+        self._log_dir.mkdir(parents=True, exist_ok=True)
+        self._file_enabled = True
+    
     def set_webhook(self, url: str) -> None:
         """Configure webhook for external audit logging."""
         self._webhook_url = url
@@ -229,48 +244,28 @@ class AuditLogger:
         start_date: datetime | None = None,
         end_date: datetime | None = None,
         limit: int = 100,
+        resource_id: str | None = None,
     ) -> list[dict[str, Any]]:
-        """
-        Query audit logs from files.
-        
-        Note: For production, use database backend for efficient querying.
-        """
-        results = []
-        
-        # Determine which files to search
-        files_to_search = sorted(self._log_dir.glob("audit_*.jsonl"), reverse=True)
-        
-        for log_file in files_to_search:
-            if len(results) >= limit:
-                break
-            
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if len(results) >= limit:
-                            break
-                        
-                        entry = json.loads(line)
-                        
-                        # Apply filters
-                        if action and entry.get("action") != action.value:
-                            continue
-                        if user_id and entry.get("user_id") != user_id:
-                            continue
-                        if resource_type and entry.get("resource_type") != resource_type:
-                            continue
-                        
-                        entry_time = datetime.fromisoformat(entry.get("timestamp", ""))
-                        if start_date and entry_time < start_date:
-                            continue
-                        if end_date and entry_time > end_date:
-                            continue
-                        
-                        results.append(entry)
-            except Exception as e:
-                logger.error("Error reading audit file %s: %s", log_file, e)
-        
-        return results
+        """Query audit logs, newest first, using the audit_events indexes."""
+        rows = await get_audit_store().query(
+            user_id=user_id,
+            resource_id=resource_id,
+            resource_type=resource_type,
+            actions=action.value if action else None,
+            start=start_date,
+            end=end_date,
+            limit=limit,
+        )
+        return [
+            {key: row[key] for key in _ENTRY_FIELDS} | {"timestamp": row["timestamp"].isoformat()}
+            for row in rows
+        ]
+
+
+_ENTRY_FIELDS = (
+    "id", "timestamp", "action", "user_id", "resource_type", "resource_id", "details",
+    "ip_address", "user_agent", "success", "error_message",
+)
 
 
 # Global audit logger instance
@@ -369,6 +364,7 @@ async def query_audit_logs(
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     limit: int = 100,
+    resource_id: str | None = None,
 ) -> list[dict[str, Any]]:
     """Query audit logs."""
     return await _audit_logger.query(
@@ -378,6 +374,7 @@ async def query_audit_logs(
         start_date=start_date,
         end_date=end_date,
         limit=limit,
+        resource_id=resource_id,
     )
 
 
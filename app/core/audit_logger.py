@@ -3,16 +3,20 @@ Audit Logger - Document Access and Security Logging
 ===============================================
 
 Tracks all document access, modifications, and security events.
+Events are stored by app.core.audit_store in the audit_events table;
+the query methods read them back through its indexes.
 """
 
 import logging
 import json
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 import os
 
+from app.core.audit_store import get_audit_store
+
 logger = logging.getLogger(__name__)
 
 class AuditEventType(Enum):
@@ -70,43 +74,73 @@ class AuditEvent:
             "success": self.success,
             "error_message": self.error_message
         }
+    
+    def to_record(self) -> Dict[str, Any]:
+        """Convert to an audit_events row."""
+        return {
+            "timestamp": self.timestamp,
+            "action": self.event_type.value,
+            "operation": self.action,
+            "user_id": self.user_id,
+            "resource_type": self.resource_type,
+            "resource_id": self.resource_id,
+            "severity": self.severity.value,
+            "success": self.success,
+            "ip_address": self.ip_address,
+            "user_agent": self.user_agent,
+            "details": self.details,
+            "error_message": self.error_message,
+        }
+    
+    @classmethod
+    def from_record(cls, row: Dict[str, Any]) -> "AuditEvent":
+        """Rebuild an event from an audit_events row."""
+        return cls(
+            event_type=AuditEventType(row["action"]),
+            user_id=row["user_id"],
+            timestamp=row["timestamp"],
+            severity=AuditSeverity(row["severity"] or AuditSeverity.LOW.value),
+            ip_address=row["ip_address"],
+            user_agent=row["user_agent"],
+            resource_id=row["resource_id"],
+            resource_type=row["resource_type"],
+            action=row["operation"] or "",
+            details=row["details"] or {},
+            success=row["success"],
+            error_message=row["error_message"],
+        )
+
+# Every action value this logger writes; its queries only return these
+EVENT_ACTIONS = [event_type.value for event_type in AuditEventType]
 
 class AuditLogger:
     """Centralized audit logging system."""
     
     def __init__(self, log_file: Optional[str] = None):
-        self.log_file = log_file or "logs/audit.log"
-        self.events: List[AuditEvent] = []
-        self.max_events = 10000  # Keep last 10k events in memory
-        
-        # Ensure log directory exists
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        self.log_file = log_file
         
         # Setup audit logger
         self.logger = logging.getLogger("semptify.audit")
         self.logger.setLevel(logging.INFO)
         
-        # Create file handler
-        handler = logging.FileHandler(self.log_file)
-        handler.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        
-        # Add handler to logger
-        self.logger.addHandler(handler)
+        # Optional plain-text copy of every event
+        if self.log_file:
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            handler = logging.FileHandler(self.log_file)
+            handler.setLevel(logging.INFO)
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
+    
+    @property
+    def store(self):
+        return get_audit_store()
     
     def log_event(self, event: AuditEvent):
         """Log an audit event."""
-        # Add to memory
-        self.events.append(event)
+        # Queue for the next group commit
+        self.store.append(event.to_record())
         
-        # Trim memory if needed
-        if len(self.events) > self.max_events:
-            self.events = self.events[-self.max_events:]
-        
-        # Log to file
         log_message = json.dumps(event.to_dict())
         
         if event.severity == AuditSeverity.CRITICAL:
@@ -327,78 +361,55 @@ class AuditLogger:
         )
         self.log_event(event)
     
-    def get_user_events(self, user_id: str, limit: int = 100) -> List[AuditEvent]:
+    async def _events(self, limit: Optional[int] = 100, event_types: Optional[Iterable[Union[AuditEventType, str]]] = None,
+                      **filters) -> List[AuditEvent]:
+        """Matching events, oldest first, from the newest `limit`."""
+        actions = [AuditEventType(t).value for t in event_types] if event_types else EVENT_ACTIONS
+        rows = await self.store.query(actions=actions, limit=limit, **filters)
+        return [AuditEvent.from_record(row) for row in reversed(rows)]
+    
+    async def get_user_events(self, user_id: str,
+                              event_types: Optional[Iterable[Union[AuditEventType, str]]] = None,
+                              start_time: Optional[datetime] = None,
+                              end_time: Optional[datetime] = None,
+                              limit: Optional[int] = 100) -> List[AuditEvent]:
         """Get events for a specific user."""
-        user_events = [event for event in self.events if event.user_id == user_id]
-        return user_events[-limit:]
+        return await self._events(limit, event_types, user_id=user_id, start=start_time, end=end_time)
     
-    def get_document_events(self, document_id: str, limit: int = 100) -> List[AuditEvent]:
+    async def get_document_events(self, document_id: str, limit: int = 100) -> List[AuditEvent]:
         """Get events for a specific document."""
-        doc_events = [event for event in self.events if event.resource_id == document_id]
-        return doc_events[-limit:]
+        return await self._events(limit, resource_id=document_id)
     
-    def get_security_events(self, severity: Optional[AuditSeverity] = None, 
-                           limit: int = 100) -> List[AuditEvent]:
+    async def get_security_events(self, severity: Optional[AuditSeverity] = None, 
+                                  limit: int = 100) -> List[AuditEvent]:
         """Get security events."""
-        security_events = [event for event in self.events 
-                          if event.event_type == AuditEventType.SECURITY_VIOLATION]
-        
-        if severity:
-            security_events = [event for event in security_events 
-                              if event.severity == severity]
-        
-        return security_events[-limit:]
+        return await self._events(limit, [AuditEventType.SECURITY_VIOLATION],
+                                  severity=severity.value if severity else None)
     
-    def get_events_by_type(self, event_type: AuditEventType, limit: int = 100) -> List[AuditEvent]:
+    async def get_events_by_type(self, event_type: AuditEventType, limit: int = 100) -> List[AuditEvent]:
         """Get events by type."""
-        typed_events = [event for event in self.events if event.event_type == event_type]
-        return typed_events[-limit:]
+        return await self._events(limit, [event_type])
     
-    def export_events(self, start_time: Optional[datetime] = None, 
-                     end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    async def export_events(self, start_time: Optional[datetime] = None, 
+                            end_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Export events for compliance reporting."""
-        events = self.events
-        
-        # Filter by time range
-        if start_time:
-            events = [event for event in events if event.timestamp >= start_time]
-        if end_time:
-            events = [event for event in events if event.timestamp <= end_time]
-        
+        events = await self._events(None, start=start_time, end=end_time)
         return [event.to_dict() for event in events]
     
-    def get_audit_summary(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+    async def get_audit_summary(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get audit summary statistics."""
-        events = self.events
-        
-        if user_id:
-            events = [event for event in events if event.user_id == user_id]
-        
-        # Count by event type
-        event_counts = {}
-        for event in events:
-            event_type = event.event_type.value
-            event_counts[event_type] = event_counts.get(event_type, 0) + 1
-        
-        # Count by severity
-        severity_counts = {}
-        for event in events:
-            severity = event.severity.value
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        
-        # Success rate
-        total_events = len(events)
-        successful_events = len([event for event in events if event.success])
-        success_rate = (successful_events / total_events * 100) if total_events > 0 else 0
+        summary = await self.store.summary(actions=EVENT_ACTIONS, user_id=user_id)
+        total_events = summary["total"]
+        success_rate = (summary["succeeded"] / total_events * 100) if total_events > 0 else 0
         
         return {
             "total_events": total_events,
-            "event_counts": event_counts,
-            "severity_counts": severity_counts,
+            "event_counts": summary["by_action"],
+            "severity_counts": summary["by_severity"],
             "success_rate": success_rate,
             "time_range": {
-                "earliest": min([event.timestamp for event in events]).isoformat() if events else None,
-                "latest": max([event.timestamp for event in events]).isoformat() if events else None
+                "earliest": summary["earliest"].isoformat() if summary["earliest"] else None,
+                "latest": summary["latest"].isoformat() if summary["latest"] else None
             }
         }
 
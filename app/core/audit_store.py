@@ -0,0 +1,461 @@
+"""
+Audit Store - one database-backed audit trail for Semptify.
+
+app.core.audit and app.core.audit_logger both write here. Events go to
+the audit_events table (app.models.models.AuditRecord), which PostgreSQL
+range-partitions by month, so years of history stay queryable through
+the (user_id, timestamp), (resource_id, timestamp) and (action, timestamp)
+indexes.
+
+Writes are group-committed: events are buffered and a background writer
+inserts everything buffered so far in one executemany per commit (at most
+AUDIT_BATCH_SIZE rows), so a burst of events costs one commit rather than
+one per event. ``await commit()`` returns once the event's batch is
+committed (or spilled to disk); append() returns at once, for sync callers
+that cannot wait. query() flushes the buffer first, so a worker always
+sees its own events.
+
+String columns are clipped to their column lengths when an event is
+buffered, so an oversized value (a long User-Agent, say) cannot fail a
+commit. If the database still rejects a batch for its data, the batch is
+retried row by row and only the rows it refuses are set aside.
+
+Events that cannot be written are appended to logs/audit/unwritten.jsonl
+and replayed by start() (by whichever worker claims the file first); no
+event is dropped because the database was briefly unavailable. stop()
+writes whatever is still buffered.
+
+On PostgreSQL the writer also creates next month's partition once a day,
+well before rows for that month arrive, so none land in the DEFAULT
+partition (which would block creating that month's partition later).
+
+Usage:
+    from app.core.audit_store import get_audit_store
+
+    store = get_audit_store()
+    await store.commit({"action": "document.access", "user_id": "GUabc12345", "resource_id": "doc_1"})
+    events = await store.query(user_id="GUabc12345", start=since, limit=50)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import case, exc, func, select, text
+
+from app.core.config import get_settings
+from app.core.id_gen import make_id
+from app.core.utc import utc_now
+
+logger = logging.getLogger(__name__)
+
+SPILL_PATH = Path("logs/audit/unwritten.jsonl")
+COLUMNS = (
+    "id", "timestamp", "action", "operation", "user_id", "resource_type", "resource_id",
+    "severity", "success", "ip_address", "user_agent", "details", "error_message",
+)
+# Lengths of AuditRecord's bounded string columns
+COLUMN_LENGTHS = {
+    "id": 40, "action": 64, "operation": 50, "user_id": 64, "resource_type": 50,
+    "resource_id": 100, "severity": 20, "ip_address": 64, "user_agent": 500,
+}
+PARTITION_CHECK_INTERVAL = 24 * 3600.0
+
+
+def _utc(value: Union[datetime, str, None]) -> Optional[datetime]:
+    """Aware UTC datetime; naive values (SQLite returns these) are taken as UTC."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """An insertable audit_events row from an event dict."""
+    row = {column: record.get(column) for column in COLUMNS}
+    row["id"] = row["id"] or make_id("aud")
+    row["timestamp"] = _utc(row["timestamp"]) or utc_now()
+    row["success"] = bool(record.get("success", True))
+    row["details"] = row["details"] or {}
+    row["action"] = row["action"] or "unknown"
+    for column, length in COLUMN_LENGTHS.items():
+        value = row[column]
+        if value is not None:
+            value = value if isinstance(value, str) else str(value)
+            row[column] = value[:length]
+    return row
+
+
+def _rejected_data(error: Exception) -> bool:
+    """True when the database refused the rows themselves, not the connection."""
+    if isinstance(error, (exc.DataError, exc.IntegrityError)):
+        return True
+    # Bind parameter processing (e.g. JSON encoding of details) fails before the database
+    return isinstance(error, exc.StatementError) and not isinstance(error, exc.DBAPIError)
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+class AuditStore:
+    """Buffered, group-committed writer and indexed reader for audit_events."""
+
+    def __init__(self, batch_size: int = 500, spill_path: Union[str, Path] = SPILL_PATH):
+        self.batch_size = max(1, batch_size)
+        self.spill_path = Path(spill_path)
+        self.stats = {"appended": 0, "written": 0, "commits": 0, "spilled": 0, "replayed": 0}
+        self._pending: List[Dict[str, Any]] = []
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._partitioner: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Buffer one event for the next commit. Safe to call from any thread."""
+        self._enqueue(_row(record))
+
+    async def commit(self, record: Dict[str, Any]) -> None:
+        """Buffer one event and wait until its batch is committed (or spilled to disk)."""
+        self._bind()
+        row = _row(record)
+        done = self._loop.create_future()
+        self._waiting[id(row)] = done
+        self._enqueue(row)
+        await done
+
+    def _enqueue(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(row)
+            self.stats["appended"] += 1
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Sync code on a worker thread: wake the writer on its own loop
+            loop = self._loop
+            if loop is not None and loop.is_running():
+                loop.call_soon_threadsafe(self._wake_writer)
+            return
+        self._wake_writer()
+
+    def _bind(self) -> None:
+        """Create the loop-bound primitives for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._write_lock = asyncio.Lock()
+            self._task = None
+            # Waiters belong to the previous loop
+            self._waiting = {}
+
+    def _wake_writer(self) -> None:
+        self._bind()
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns events written."""
+        self._bind()
+        written = 0
+        async with self._write_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return written
+                written += await self._write(batch)
+                self._release(batch)
+
+    def _release(self, batch: List[Dict[str, Any]]) -> None:
+        """Wake commit() callers whose events are now on disk."""
+        if not self._waiting:
+            return
+        for row in batch:
+            done = self._waiting.pop(id(row), None)
+            if done is not None and not done.done():
+                done.set_result(None)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        from app.core.database import get_db_session
+        from app.models.models import AuditRecord
+
+        async with get_db_session() as session:
+            await session.execute(AuditRecord.__table__.insert(), rows)
+        self.stats["written"] += len(rows)
+        self.stats["commits"] += 1
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> int:
+        """Commit a batch; returns events written. Events that cannot be written are spilled."""
+        try:
+            await self._insert(batch)
+            return len(batch)
+        except Exception as e:
+            if len(batch) == 1 or not _rejected_data(e):
+                logger.error("Audit write of %d events failed, keeping them in %s: %s", len(batch), self.spill_path, e)
+                self._spill(batch)
+                return 0
+            logger.warning("Audit batch of %d events rejected, writing them one by one: %s", len(batch), e)
+
+        written = 0
+        for index, row in enumerate(batch):
+            try:
+                await self._insert([row])
+                written += 1
+            except Exception as e:
+                if not _rejected_data(e):
+                    logger.error("Audit write failed, keeping %d events in %s: %s", len(batch) - index, self.spill_path, e)
+                    self._spill(batch[index:])
+                    break
+                logger.error("Audit event %s rejected, keeping it in %s: %s", row["id"], self.spill_path, e)
+                self._spill([row])
+        return written
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in batch:
+                    f.write(json.dumps(row, default=str) + "\n")
+            self.stats["spilled"] += len(batch)
+        except OSError as e:
+            logger.critical("Audit events lost (%d): %s", len(batch), e)
+
+    def _replay_spilled(self) -> int:
+        """Requeue events a failed write left in the spill file."""
+        replaying = self.spill_path.with_suffix(f".{os.getpid()}.replaying")
+        try:
+            os.replace(self.spill_path, replaying)
+        except FileNotFoundError:
+            # Nothing spilled, or another worker claimed the file first
+            return 0
+        rows = []
+        with open(replaying, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.append(_row(json.loads(line)))
+        with self._lock:
+            self._pending[:0] = rows
+        replaying.unlink()
+        self.stats["replayed"] += len(rows)
+        return len(rows)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Replay spilled events, create upcoming partitions and start the writer."""
+        replayed = self._replay_spilled()
+        if replayed:
+            logger.warning("Replaying %d audit events from %s", replayed, self.spill_path)
+        await self.ensure_partitions()
+        if self._partitioner is None or self._partitioner.done():
+            self._partitioner = asyncio.create_task(self._partition_loop())
+        self._wake_writer()
+
+    async def _partition_loop(self, interval: float = PARTITION_CHECK_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.ensure_partitions()
+            except Exception as e:
+                logger.warning("Audit partition check failed: %s", e)
+
+    async def stop(self) -> None:
+        """Stop the writer after its current batch and write what is left."""
+        self._bind()
+        if self._partitioner is not None:
+            self._partitioner.cancel()
+            try:
+                await self._partitioner
+            except asyncio.CancelledError:
+                pass
+            self._partitioner = None
+        if self._task is not None:
+            async with self._write_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def ensure_partitions(self, months_ahead: int = 1) -> List[str]:
+        """Create this month's and the next months' partitions (PostgreSQL only)."""
+        from app.core.database import get_engine
+
+        engine = get_engine()
+        if engine.dialect.name != "postgresql":
+            return []
+        async with engine.connect() as conn:
+            partitioned = await conn.scalar(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'audit_events')"
+            ))
+        if not partitioned:
+            return []
+
+        created = []
+        now = utc_now()
+        for offset in range(months_ahead + 1):
+            start = _month_start(now.year, now.month + offset)
+            end = _month_start(now.year, now.month + offset + 1)
+            name = f"audit_events_{start:%Y_%m}"
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_events "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                # Rows for this month already sit in the DEFAULT partition
+                logger.warning("Could not create audit partition %s: %s", name, e)
+        return created
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _filters(
+        user_id: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        actions: Union[str, Iterable[str], None] = None,
+        severity: Optional[str] = None,
+        success: Optional[bool] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> list:
+        from app.models.models import AuditRecord
+
+        table = AuditRecord.__table__
+        conditions = []
+        if user_id is not None:
+            conditions.append(table.c.user_id == user_id)
+        if resource_id is not None:
+            conditions.append(table.c.resource_id == resource_id)
+        if resource_type is not None:
+            conditions.append(table.c.resource_type == resource_type)
+        if actions is not None:
+            actions = [actions] if isinstance(actions, str) else list(actions)
+            conditions.append(table.c.action.in_(actions))
+        if severity is not None:
+            conditions.append(table.c.severity == severity)
+        if success is not None:
+            conditions.append(table.c.success == success)
+        if start is not None:
+            conditions.append(table.c.timestamp >= _utc(start))
+        if end is not None:
+            conditions.append(table.c.timestamp <= _utc(end))
+        return conditions
+
+    async def query(self, limit: Optional[int] = 100, offset: int = 0, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Events matching the filters, newest first.
+
+        Filters: user_id, resource_id, resource_type, actions (one or
+        many), severity, success, start and end (inclusive). limit=None
+        returns every match.
+        """
+        from app.core.database import get_db_session
+        from app.models.models import AuditRecord
+
+        await self.flush()
+        table = AuditRecord.__table__
+        stmt = (
+            select(table)
+            .where(*self._filters(**filters))
+            .order_by(table.c.timestamp.desc(), table.c.id.desc())
+            .offset(offset)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        async with get_db_session() as session:
+            rows = (await session.execute(stmt)).mappings().all()
+        return [{**row, "timestamp": _utc(row["timestamp"]), "details": row["details"] or {}} for row in rows]
+
+    async def summary(self, **filters: Any) -> Dict[str, Any]:
+        """Counts by action and severity, success count and time range, computed in SQL."""
+        from app.core.database import get_db_session
+        from app.models.models import AuditRecord
+
+        await self.flush()
+        table = AuditRecord.__table__
+        conditions = self._filters(**filters)
+        async with get_db_session() as session:
+            totals = (await session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(case((table.c.success, 1), else_=0)), 0),
+                    func.min(table.c.timestamp),
+                    func.max(table.c.timestamp),
+                ).where(*conditions)
+            )).one()
+            by_action = (await session.execute(
+                select(table.c.action, func.count()).where(*conditions).group_by(table.c.action)
+            )).all()
+            by_severity = (await session.execute(
+                select(table.c.severity, func.count())
+                .where(*conditions, table.c.severity.is_not(None))
+                .group_by(table.c.severity)
+            )).all()
+        return {
+            "total": totals[0],
+            "succeeded": int(totals[1]),
+            "by_action": dict(by_action),
+            "by_severity": dict(by_severity),
+            "earliest": _utc(totals[2]),
+            "latest": _utc(totals[3]),
+        }
+
+
+_store: Optional[AuditStore] = None
+
+
+def get_audit_store() -> AuditStore:
+    """The process-wide audit store."""
+    global _store
+    if _store is None:
+        _store = AuditStore(batch_size=get_settings().audit_batch_size)
+    return _store
+
+
+async def start_audit_store() -> None:
+    await get_audit_store().start()
+
+
+async def stop_audit_store() -> None:
+    if _store is not None:
+        await _store.stop()
@@ -3,16 +3,48 @@ Batch Operations Manager - Bulk Document Processing
 ==============================================
 
 Handles batch operations for document management with progress tracking.
+
+Items are handed to the operation's handler in chunks (batch_size). Chunks
+run concurrently, bounded twice:
+- a semaphore per operation type, shared by all operations of that type
+  (register_handler(..., concurrency=n))
+- an adaptive window per operation that grows by one chunk after each
+  clean chunk and halves when a chunk fails or its per-item latency is
+  over latency_target_ms, with an exponential pause before the next chunk
+
+Item status is checkpointed to SQLite after every chunk. Operations left
+running by a worker that died are picked up again by
+resume_batch_operations() and continue with the items that had not
+finished. Handlers may therefore see an item twice and should be
+idempotent.
+
+Progress is pushed over WebSocket at most once per progress_interval
+seconds, plus a final update.
+
+Operation settings:
+    batch_size              items per handler call (default 10)
+    max_concurrency         cap for the adaptive window (default: type limit)
+    latency_target_ms       per-item latency that triggers a backoff (default 2000)
+    delay_between_batches   minimum pause between chunk starts (default 0)
+    progress_interval       seconds between progress updates (default 0.5)
+
+Configuration:
+    BATCH_CHECKPOINT_DB     SQLite file for checkpoints (default: data/batch/batch.db)
 """
 
 import logging
 import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
 from app.core.id_gen import make_id
-from typing import Dict, Any, List, Optional, Callable, Union
-from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable, Union, Iterable, Tuple
+from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
 import tempfile
 import zipfile
@@ -21,6 +53,15 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DB_PATH = "data/batch/batch.db"
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_TYPE_CONCURRENCY = 4
+DEFAULT_LATENCY_TARGET_MS = 2000.0
+PROGRESS_INTERVAL = 0.5
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_MAX_SECONDS = 5.0
+STALE_AFTER = 300.0            # seconds without a checkpoint before another host may resume
+
 class BatchOperationType(Enum):
     """Batch operation types."""
     UPLOAD = "upload"
@@ -108,16 +149,294 @@ class BatchOperation:
             "items": [item.to_dict() for item in self.items]
         }
 
+FINISHED_ITEM_STATUSES = ("completed", "failed")
+
+
+def _to_datetime(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process named by owner may still be running."""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True  # can't tell; rely on the checkpoint age instead
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class BatchCheckpointStore:
+    """
+    Persistent operation and item state in SQLite (WAL mode).
+
+    Operations are written when they are created and when their status
+    changes; items are written after each chunk. updated_at doubles as a
+    heartbeat for claim_interrupted().
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batch_operations (
+                operation_id TEXT PRIMARY KEY,
+                operation_type TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                completed_at REAL,
+                owner TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                operation_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                item_id TEXT NOT NULL,
+                item_type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                started_at REAL,
+                completed_at REAL,
+                PRIMARY KEY (operation_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_batch_running ON batch_operations (updated_at)
+                WHERE status = 'running';
+        """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements: List[Tuple[str, List[tuple]]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _operation_row(operation: "BatchOperation", owner: Optional[str]) -> tuple:
+        return (
+            operation.operation_id, operation.operation_type.value, operation.user_id,
+            operation.status.value, json.dumps(operation.settings, default=str),
+            operation.created_at.timestamp(), _to_timestamp(operation.started_at),
+            _to_timestamp(operation.completed_at), owner, time.time(),
+        )
+
+    @staticmethod
+    def _item_row(operation_id: str, position: int, item: BatchItem) -> tuple:
+        return (
+            operation_id, position, item.item_id, item.item_type,
+            json.dumps(item.data, default=str), item.status,
+            json.dumps(item.result, default=str) if item.result is not None else None,
+            item.error, _to_timestamp(item.started_at), _to_timestamp(item.completed_at),
+        )
+
+    def save_operation(self, operation: "BatchOperation", owner: Optional[str] = None,
+                       items: bool = False) -> None:
+        """Write an operation's status (and all of its items when items=True)."""
+        statements = [(
+            "INSERT OR REPLACE INTO batch_operations VALUES (?,?,?,?,?,?,?,?,?,?)",
+            [self._operation_row(operation, owner)],
+        )]
+        if items:
+            statements.append((
+                "INSERT OR REPLACE INTO batch_items VALUES (?,?,?,?,?,?,?,?,?,?)",
+                [self._item_row(operation.operation_id, i, item) for i, item in enumerate(operation.items)],
+            ))
+        self._write(statements)
+
+    def checkpoint(self, operation_id: str, items: Iterable[Tuple[int, BatchItem]]) -> None:
+        """Record finished items and refresh the operation's heartbeat."""
+        self._write([
+            (
+                "UPDATE batch_items SET status = ?, result = ?, error = ?, started_at = ?, completed_at = ? "
+                "WHERE operation_id = ? AND position = ?",
+                [
+                    (item.status, json.dumps(item.result, default=str) if item.result is not None else None,
+                     item.error, _to_timestamp(item.started_at), _to_timestamp(item.completed_at),
+                     operation_id, position)
+                    for position, item in items
+                ],
+            ),
+            ("UPDATE batch_operations SET updated_at = ? WHERE operation_id = ?", [(time.time(), operation_id)]),
+        ])
+
+    def load(self, operation_id: str) -> Optional["BatchOperation"]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM batch_operations WHERE operation_id = ?", (operation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            item_rows = self._conn.execute(
+                "SELECT * FROM batch_items WHERE operation_id = ? ORDER BY position", (operation_id,)
+            ).fetchall()
+        items = [
+            BatchItem(
+                item_id=r[2], item_type=r[3], data=json.loads(r[4]), status=r[5],
+                result=json.loads(r[6]) if r[6] is not None else None, error=r[7],
+                started_at=_to_datetime(r[8]), completed_at=_to_datetime(r[9]),
+            )
+            for r in item_rows
+        ]
+        operation = BatchOperation(
+            operation_id=row[0], operation_type=BatchOperationType(row[1]), user_id=row[2],
+            items=items, status=BatchOperationStatus(row[3]), created_at=_to_datetime(row[5]),
+            started_at=_to_datetime(row[6]), completed_at=_to_datetime(row[7]),
+            settings=json.loads(row[4]),
+        )
+        operation.completed_items = sum(1 for item in items if item.status == "completed")
+        operation.failed_items = sum(1 for item in items if item.status == "failed")
+        if operation.total_items:
+            operation.progress = (operation.completed_items + operation.failed_items) / operation.total_items * 100
+        return operation
+
+    def claim_interrupted(self, owner: str, stale_after: float = STALE_AFTER,
+                          now: Optional[float] = None) -> List[str]:
+        """
+        Take over running operations whose worker is gone: its process no
+        longer exists, or it has not checkpointed for stale_after seconds.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT operation_id, owner, updated_at FROM batch_operations "
+                    "WHERE status = 'running' AND (owner IS NULL OR owner != ?)",
+                    (owner,),
+                ).fetchall()
+                claimed = [
+                    operation_id for operation_id, current, updated_at in rows
+                    if updated_at < now - stale_after or not _owner_alive(current)
+                ]
+                self._conn.executemany(
+                    "UPDATE batch_operations SET owner = ?, updated_at = ? WHERE operation_id = ?",
+                    [(owner, now, operation_id) for operation_id in claimed],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def delete_finished_before(self, cutoff: datetime) -> int:
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT operation_id FROM batch_operations "
+                "WHERE status IN ('completed', 'failed', 'cancelled') AND completed_at < ?",
+                (cutoff.timestamp(),),
+            ).fetchall()]
+        if ids:
+            self._write([
+                ("DELETE FROM batch_items WHERE operation_id = ?", [(i,) for i in ids]),
+                ("DELETE FROM batch_operations WHERE operation_id = ?", [(i,) for i in ids]),
+            ])
+        return len(ids)
+
+
+class AdaptiveWindow:
+    """
+    AIMD limit on the number of chunks an operation has in flight.
+
+    Each clean chunk widens the window by one up to max_limit; a chunk with
+    errors or with per-item latency over the target halves it and doubles
+    the pause taken before the next chunk starts.
+    """
+
+    def __init__(self, max_limit: int, latency_target: float, min_delay: float = 0.0):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.latency_target = latency_target
+        self.min_delay = min_delay
+        self.delay = min_delay
+        self.active = 0
+        self.backoffs = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> None:
+        if self.active >= self.limit or self._waiters:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                raise
+        else:
+            self.active += 1
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake()
+
+    def record(self, ok: bool, seconds_per_item: float) -> None:
+        if ok and seconds_per_item <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self.delay = max(self.min_delay, self.delay / 2 if self.delay > BACKOFF_BASE_SECONDS else 0.0)
+        else:
+            self.backoffs += 1
+            self.limit = max(1, self.limit // 2)
+            self.delay = min(BACKOFF_MAX_SECONDS, max(BACKOFF_BASE_SECONDS, self.delay * 2, self.min_delay))
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+
 class BatchProcessor:
     """Batch operations processor with progress tracking."""
     
-    def __init__(self, max_concurrent_operations: int = 5):
+    def __init__(self, max_concurrent_operations: int = 5, store: Optional[BatchCheckpointStore] = None):
         self.max_concurrent_operations = max_concurrent_operations
         self.operations: Dict[str, BatchOperation] = {}
         self.active_operations: Dict[str, asyncio.Task] = {}
+        self.store = store if store is not None else BatchCheckpointStore(
+            os.getenv("BATCH_CHECKPOINT_DB", DEFAULT_DB_PATH)
+        )
+        self.owner = _owner_id()
         
-        # Operation handlers
+        # Operation handlers and their per-type chunk limits
         self.handlers: Dict[BatchOperationType, Callable] = {}
+        self.type_limits: Dict[BatchOperationType, int] = {}
+        self._type_semaphores: Dict[BatchOperationType, asyncio.Semaphore] = {}
+        self._last_progress: Dict[str, float] = {}
         
         # Statistics
         self.stats = {
@@ -125,17 +444,29 @@ class BatchProcessor:
             "completed_operations": 0,
             "failed_operations": 0,
             "total_items_processed": 0,
-            "average_processing_time": 0.0
+            "average_processing_time": 0.0,
+            "resumed_operations": 0,
+            "backoffs": 0
         }
         
         # Shutdown flag
         self.shutdown_event = asyncio.Event()
     
-    def register_handler(self, operation_type: BatchOperationType, handler: Callable):
-        """Register a handler for batch operation type."""
+    def register_handler(self, operation_type: BatchOperationType, handler: Callable,
+                         concurrency: Optional[int] = None):
+        """Register a handler for batch operation type, optionally with its own chunk limit."""
         self.handlers[operation_type] = handler
+        self.type_limits[operation_type] = concurrency or DEFAULT_TYPE_CONCURRENCY
+        self._type_semaphores.pop(operation_type, None)
         logger.info(f"Registered handler for {operation_type.value}")
     
+    def _type_semaphore(self, operation_type: BatchOperationType) -> asyncio.Semaphore:
+        semaphore = self._type_semaphores.get(operation_type)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.type_limits.get(operation_type, DEFAULT_TYPE_CONCURRENCY))
+            self._type_semaphores[operation_type] = semaphore
+        return semaphore
+    
     def create_batch_operation(self, operation_type: BatchOperationType, user_id: str,
                            items: List[Dict[str, Any]], settings: Dict[str, Any] = None) -> str:
         """Create a new batch operation."""
@@ -161,6 +492,7 @@ class BatchProcessor:
         )
         
         self.operations[operation_id] = operation
+        self.store.save_operation(operation, items=True)
         self.stats["total_operations"] += 1
         
         logger.info(f"Created batch operation {operation_id} with {len(items)} items")
@@ -168,16 +500,20 @@ class BatchProcessor:
     
     async def start_batch_operation(self, operation_id: str) -> bool:
         """Start processing a batch operation."""
-        if operation_id not in self.operations:
+        operation = self._get_operation(operation_id)
+        if operation is None:
+            return False
+        
+        if operation_id in self.active_operations:
             return False
         
         if len(self.active_operations) >= self.max_concurrent_operations:
             logger.warning(f"Max concurrent operations reached, queuing {operation_id}")
             return False
         
-        operation = self.operations[operation_id]
         operation.status = BatchOperationStatus.RUNNING
-        operation.started_at = datetime.now(timezone.utc)
+        operation.started_at = operation.started_at or datetime.now(timezone.utc)
+        self.store.save_operation(operation, owner=self.owner)
         
         # Start processing task
         task = asyncio.create_task(self._process_batch_operation(operation))
@@ -186,65 +522,64 @@ class BatchProcessor:
         logger.info(f"Started batch operation {operation_id}")
         return True
     
+    async def resume_interrupted_operations(self) -> List[str]:
+        """Restart operations whose worker stopped before they finished."""
+        resumed = []
+        for operation_id in self.store.claim_interrupted(self.owner):
+            operation = self.store.load(operation_id)
+            if operation is None:
+                continue
+            self.operations[operation_id] = operation
+            if await self.start_batch_operation(operation_id):
+                resumed.append(operation_id)
+                self.stats["resumed_operations"] += 1
+                remaining = operation.total_items - operation.completed_items - operation.failed_items
+                logger.info(f"Resumed batch operation {operation_id} ({remaining} items left)")
+        return resumed
+    
+    def _get_operation(self, operation_id: str) -> Optional[BatchOperation]:
+        operation = self.operations.get(operation_id)
+        if operation is None:
+            operation = self.store.load(operation_id)
+            if operation is not None:
+                self.operations[operation_id] = operation
+        return operation
+    
     async def _process_batch_operation(self, operation: BatchOperation):
         """Process a batch operation."""
+        in_flight: set = set()
         try:
             # Get handler for operation type
             handler = self.handlers.get(operation.operation_type)
             if not handler:
                 raise ValueError(f"No handler for operation type: {operation.operation_type}")
             
-            # Process items in batches
-            batch_size = operation.settings.get("batch_size", 10)
-            delay_between_batches = operation.settings.get("delay_between_batches", 1.0)
+            settings = operation.settings
+            batch_size = max(1, int(settings.get("batch_size", DEFAULT_BATCH_SIZE)))
+            type_limit = self.type_limits.get(operation.operation_type, DEFAULT_TYPE_CONCURRENCY)
+            window = AdaptiveWindow(
+                max_limit=int(settings.get("max_concurrency", type_limit)),
+                latency_target=float(settings.get("latency_target_ms", DEFAULT_LATENCY_TARGET_MS)) / 1000,
+                min_delay=float(settings.get("delay_between_batches", 0.0)),
+            )
+            semaphore = self._type_semaphore(operation.operation_type)
             
-            total_items = len(operation.items)
-            processed_items = 0
+            # Items finished before an interruption are not run again
+            pending = [i for i, item in enumerate(operation.items) if item.status not in FINISHED_ITEM_STATUSES]
+            chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
             
-            for i in range(0, total_items, batch_size):
+            for positions in chunks:
                 if self.shutdown_event.is_set():
                     operation.status = BatchOperationStatus.CANCELLED
                     break
-                
-                # Get batch of items
-                batch_items = operation.items[i:i + batch_size]
-                
-                # Process batch
-                batch_results = await handler(batch_items, operation.settings)
-                
-                # Update item statuses
-                for j, item in enumerate(batch_items):
-                    item_index = i + j
-                    
-                    if item_index < len(batch_results):
-                        result = batch_results[j]
-                        if result.get("success", False):
-                            operation.items[item_index].status = "completed"
-                            operation.items[item_index].result = result.get("data")
-                            operation.completed_items += 1
-                        else:
-                            operation.items[item_index].status = "failed"
-                            operation.items[item_index].error = result.get("error", "Unknown error")
-                            operation.failed_items += 1
-                    else:
-                        operation.items[item_index].status = "failed"
-                        operation.items[item_index].error = "No result returned"
-                        operation.failed_items += 1
-                    
-                    operation.items[item_index].started_at = datetime.now(timezone.utc)
-                    operation.items[item_index].completed_at = datetime.now(timezone.utc)
-                
-                processed_items += len(batch_items)
-                
-                # Update progress
-                operation.progress = (processed_items / total_items) * 100
-                
-                # Send progress update via WebSocket
-                await self._send_progress_update(operation)
-                
-                # Delay between batches
-                if i + batch_size < total_items and delay_between_batches > 0:
-                    await asyncio.sleep(delay_between_batches)
+                await window.acquire()
+                task = asyncio.create_task(self._run_chunk(operation, handler, positions, window, semaphore))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            
+            if in_flight:
+                await asyncio.gather(*in_flight)
+            self.stats["backoffs"] += window.backoffs
             
             # Mark operation as completed
             if operation.status != BatchOperationStatus.CANCELLED:
@@ -253,7 +588,6 @@ class BatchProcessor:
                 operation.progress = 100.0
                 
                 self.stats["completed_operations"] += 1
-                self.stats["total_items_processed"] += processed_items
                 
                 # Calculate processing time
                 if operation.started_at and operation.completed_at:
@@ -264,8 +598,17 @@ class BatchProcessor:
                         (avg_time * (total_ops - 1) + processing_time) / total_ops
                     )
             
-            logger.info(f"Completed batch operation {operation_id}")
+            logger.info(f"Completed batch operation {operation.operation_id}")
             
+        except asyncio.CancelledError:
+            for task in in_flight:
+                task.cancel()
+            if operation.status == BatchOperationStatus.RUNNING:
+                # Stopped with the process, not by the user: leave it resumable
+                raise
+            operation.completed_at = datetime.now(timezone.utc)
+            raise
+        
         except Exception as e:
             operation.status = BatchOperationStatus.FAILED
             operation.completed_at = datetime.now(timezone.utc)
@@ -279,13 +622,88 @@ class BatchProcessor:
             if operation.operation_id in self.active_operations:
                 del self.active_operations[operation.operation_id]
             
+            try:
+                self.store.save_operation(operation, owner=self.owner)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to checkpoint batch operation {operation.operation_id}: {e}")
+            
             # Send final update
+            self._last_progress.pop(operation.operation_id, None)
             await self._send_progress_update(operation)
     
+    async def _run_chunk(self, operation: BatchOperation, handler: Callable, positions: List[int],
+                         window: AdaptiveWindow, semaphore: asyncio.Semaphore):
+        """Run one chunk through the handler, then checkpoint its items."""
+        batch_items = [operation.items[i] for i in positions]
+        started = datetime.now(timezone.utc)
+        for item in batch_items:
+            item.status = "running"
+            item.started_at = started
+        
+        try:
+            async with semaphore:
+                clock = time.perf_counter()
+                batch_results = await handler(batch_items, operation.settings)
+                handler_error = None
+        except asyncio.CancelledError:
+            for item in batch_items:
+                item.status = "pending"
+            raise
+        except Exception as e:
+            batch_results = []
+            handler_error = str(e) or type(e).__name__
+            logger.warning(f"Batch operation {operation.operation_id} chunk failed: {handler_error}")
+        finally:
+            window.release()
+        elapsed = time.perf_counter() - clock
+        
+        # Update item statuses
+        completed_at = datetime.now(timezone.utc)
+        failures = 0
+        for j, item in enumerate(batch_items):
+            if j < len(batch_results):
+                result = batch_results[j]
+                if result.get("success", False):
+                    item.status = "completed"
+                    item.result = result.get("data")
+                    operation.completed_items += 1
+                else:
+                    item.status = "failed"
+                    item.error = result.get("error", "Unknown error")
+                    operation.failed_items += 1
+                    failures += 1
+            else:
+                item.status = "failed"
+                item.error = handler_error or "No result returned"
+                operation.failed_items += 1
+                failures += 1
+            item.completed_at = completed_at
+        
+        window.record(failures == 0, elapsed / len(batch_items))
+        self.stats["total_items_processed"] += len(batch_items)
+        operation.progress = (operation.completed_items + operation.failed_items) / operation.total_items * 100
+        
+        try:
+            self.store.checkpoint(operation.operation_id, [(i, operation.items[i]) for i in positions])
+        except sqlite3.Error as e:
+            logger.error(f"Failed to checkpoint batch operation {operation.operation_id}: {e}")
+        
+        await self._maybe_send_progress(operation)
+    
+    async def _maybe_send_progress(self, operation: BatchOperation):
+        """Send a progress update unless one went out less than progress_interval ago."""
+        interval = float(operation.settings.get("progress_interval", PROGRESS_INTERVAL))
+        now = time.monotonic()
+        last = self._last_progress.get(operation.operation_id)
+        if last is not None and now - last < interval:
+            return
+        self._last_progress[operation.operation_id] = now
+        await self._send_progress_update(operation)
+    
     async def _send_progress_update(self, operation: BatchOperation):
         """Send progress update via WebSocket."""
         try:
-            from app.core.websocket_manager import get_websocket_manager
+            from app.core.websocket_manager import get_websocket_manager, WebSocketMessage
             
             ws_manager = get_websocket_manager()
             
@@ -305,7 +723,8 @@ class BatchProcessor:
                     type="batch_operation_update",
                     data=update_data,
                     timestamp=datetime.now(timezone.utc),
-                    user_id=operation.user_id
+                    user_id=operation.user_id,
+                    coalesce_key=f"batch_operation:{operation.operation_id}"
                 )
             )
             
@@ -314,11 +733,10 @@ class BatchProcessor:
     
     def cancel_batch_operation(self, operation_id: str) -> bool:
         """Cancel a batch operation."""
-        if operation_id not in self.operations:
+        operation = self._get_operation(operation_id)
+        if operation is None:
             return False
         
-        operation = self.operations[operation_id]
-        
         if operation.status in [BatchOperationStatus.COMPLETED, BatchOperationStatus.FAILED]:
             return False
         
@@ -329,16 +747,20 @@ class BatchProcessor:
             task = self.active_operations[operation_id]
             task.cancel()
             del self.active_operations[operation_id]
+        else:
+            operation.completed_at = datetime.now(timezone.utc)
+            self.store.save_operation(operation)
         
         logger.info(f"Cancelled batch operation {operation_id}")
         return True
     
     def get_batch_operation(self, operation_id: str) -> Optional[Dict[str, Any]]:
         """Get batch operation details."""
-        if operation_id not in self.operations:
+        operation = self._get_operation(operation_id)
+        if operation is None:
             return None
         
-        return self.operations[operation_id].to_dict()
+        return operation.to_dict()
     
     def get_user_operations(self, user_id: str, status: Optional[BatchOperationStatus] = None) -> List[Dict[str, Any]]:
         """Get all operations for a user."""
@@ -361,6 +783,8 @@ class BatchProcessor:
             "failed_operations": self.stats["failed_operations"],
             "total_items_processed": self.stats["total_items_processed"],
             "average_processing_time": self.stats["average_processing_time"],
+            "resumed_operations": self.stats["resumed_operations"],
+            "backoffs": self.stats["backoffs"],
             "active_operations": len(self.active_operations),
             "queued_operations": len([
                 op for op in self.operations.values()
@@ -380,6 +804,7 @@ class BatchProcessor:
         
         for operation_id in operations_to_remove:
             del self.operations[operation_id]
+        self.store.delete_finished_before(cutoff_time)
         
         logger.info(f"Cleaned up {len(operations_to_remove)} old operations")
 
@@ -516,6 +941,11 @@ async def start_batch_operation(operation_id: str) -> bool:
     processor = get_batch_processor()
     return await processor.start_batch_operation(operation_id)
 
+async def resume_batch_operations() -> List[str]:
+    """Resume operations interrupted by a stopped or crashed worker."""
+    processor = get_batch_processor()
+    return await processor.resume_interrupted_operations()
+
 def cancel_batch_operation(operation_id: str) -> bool:
     """Cancel a batch operation."""
     processor = get_batch_processor()
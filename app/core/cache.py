@@ -1,8 +1,15 @@
 """
-Redis Caching Utilities for Semptify.
+Two-Tier Caching Utilities for Semptify.
 
-Provides a simple caching layer with Redis backend (production)
-and in-memory fallback (development).
+One cache API for the whole app: a bounded in-process L1 (the MemoryCache
+from core/cache_manager) in front of an optional Redis L2.
+
+- Concurrent misses for the same key are coalesced into a single load.
+- Entries carry their compute time, and hits refresh probabilistically
+  before expiry (XFetch); entries past their TTL are served stale for a
+  grace period while one background refresh runs.
+- Invalidations are published over Redis pub/sub so every uvicorn worker
+  drops its L1 copy.
 
 Usage:
     from app.core.cache import cache
@@ -11,12 +18,15 @@ Usage:
     await cache.set("key", {"data": "value"}, ttl=300)
     data = await cache.get("key")
     
+    # Load-through with coalescing and early refresh
+    stats = await cache.get_or_set("dashboard:user1", lambda: build_stats("user1"), ttl=60)
+
     # Decorator for function caching
     @cached(ttl=60, key_prefix="user")
     async def get_user(user_id: str):
         return await db.fetch_user(user_id)
     
-    # Cache invalidation
+    # Cache invalidation (all workers)
     await cache.delete("key")
     await cache.clear_prefix("user:")
 """
@@ -25,99 +35,29 @@ import asyncio
 import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
+import math
+import random
+import time
+import uuid
 from functools import wraps
-from typing import Any, Callable, TypeVar
+from typing import Any, Awaitable, Callable, TypeVar
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
-
-class InMemoryCache:
-    """Simple in-memory cache for development/testing."""
-    
-    def __init__(self):
-        self._cache: dict[str, tuple[Any, datetime | None]] = {}
-        self._lock = asyncio.Lock()
-    
-    async def get(self, key: str) -> Any | None:
-        """Get value from cache."""
-        async with self._lock:
-            if key not in self._cache:
-                return None
-            
-            value, expires_at = self._cache[key]
-            
-            # Check expiration
-            if expires_at and datetime.utcnow() > expires_at:
-                del self._cache[key]
-                return None
-            
-            return value
-    
-    async def set(self, key: str, value: Any, ttl: int | None = None) -> bool:
-        """Set value in cache with optional TTL (seconds)."""
-        async with self._lock:
-            expires_at = None
-            if ttl:
-                expires_at = datetime.utcnow() + timedelta(seconds=ttl)
-            
-            self._cache[key] = (value, expires_at)
-            return True
-    
-    async def delete(self, key: str) -> bool:
-        """Delete key from cache."""
-        async with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                return True
-            return False
-    
-    async def exists(self, key: str) -> bool:
-        """Check if key exists and is not expired."""
-        return await self.get(key) is not None
-    
-    async def clear_prefix(self, prefix: str) -> int:
-        """Delete all keys with given prefix."""
-        async with self._lock:
-            keys_to_delete = [k for k in self._cache if k.startswith(prefix)]
-            for key in keys_to_delete:
-                del self._cache[key]
-            return len(keys_to_delete)
-    
-    async def clear_all(self) -> None:
-        """Clear entire cache."""
-        async with self._lock:
-            self._cache.clear()
-    
-    async def get_stats(self) -> dict[str, Any]:
-        """Get cache statistics."""
-        async with self._lock:
-            now = datetime.utcnow()
-            valid_count = 0
-            expired_count = 0
-            
-            for _, (_, expires_at) in self._cache.items():
-                if expires_at is None or now <= expires_at:
-                    valid_count += 1
-                else:
-                    expired_count += 1
-            
-            return {
-                "backend": "memory",
-                "total_keys": len(self._cache),
-                "valid_keys": valid_count,
-                "expired_keys": expired_count,
-            }
+INVALIDATION_CHANNEL = "semptify:cache:invalidate"
+TAG_SET_PREFIX = "semptify:cache:tag:"
+# Soft expiry stored for entries without a TTL (2100-01-01, JSON-safe unlike inf)
+NO_EXPIRY = 4102444800.0
 
 
 class RedisCache:
-    """Redis-backed cache for production."""
+    """Redis-backed L2 cache for production."""
     
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_url: str, client: Any = None):
         self._redis_url = redis_url
-        self._redis = None
+        self._redis = client
         self._connected = False
     
     async def _ensure_connected(self) -> bool:
@@ -126,12 +66,13 @@ class RedisCache:
             return True
         
         try:
-            import redis.asyncio as redis
-            self._redis = redis.from_url(
-                self._redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-            )
+            if self._redis is None:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(
+                    self._redis_url,
+                    encoding="utf-8",
+                    decode_responses=True,
+                )
             # Test connection
             await self._redis.ping()
             self._connected = True
@@ -143,6 +84,10 @@ class RedisCache:
         except Exception as e:
             logger.warning("Redis connection failed: %s", e)
             return False
+
+    @property
+    def client(self) -> Any:
+        return self._redis
     
     async def get(self, key: str) -> Any | None:
         """Get value from Redis."""
@@ -158,17 +103,28 @@ class RedisCache:
             logger.error("Redis GET error: %s", e)
             return None
     
-    async def set(self, key: str, value: Any, ttl: int | None = None) -> bool:
-        """Set value in Redis with optional TTL."""
+    async def set(self, key: str, value: Any, ttl: int | None = None, tags: list[str] | None = None) -> bool:
+        """Set value in Redis with optional TTL, recording key membership for each tag."""
         if not await self._ensure_connected():
             return False
         
         try:
-            serialized = json.dumps(value, default=str)
-            if ttl:
-                await self._redis.setex(key, ttl, serialized)
-            else:
-                await self._redis.set(key, serialized)
+            serialized = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            # Stringifying datetimes, Decimals or models would hand other workers a
+            # different type than the loader returned; keep such values in L1 only
+            logger.debug("Not caching %s in Redis: %s", key, e)
+            return False
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                if ttl:
+                    pipe.setex(key, ttl, serialized)
+                else:
+                    pipe.set(key, serialized)
+                for tag in tags or ():
+                    pipe.sadd(TAG_SET_PREFIX + tag, key)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error("Redis SET error: %s", e)
@@ -216,6 +172,29 @@ class RedisCache:
             logger.error("Redis CLEAR_PREFIX error: %s", e)
             return 0
     
+    async def delete_tag(self, tag: str) -> int:
+        """Delete every key recorded under tag."""
+        if not await self._ensure_connected():
+            return 0
+
+        try:
+            tag_key = TAG_SET_PREFIX + tag
+            keys = await self._redis.smembers(tag_key)
+            deleted = await self._redis.delete(*keys) if keys else 0
+            await self._redis.delete(tag_key)
+            return deleted
+        except Exception as e:
+            logger.error("Redis DELETE_TAG error: %s", e)
+            return 0
+
+    async def publish(self, channel: str, message: dict) -> None:
+        if not await self._ensure_connected():
+            return
+        try:
+            await self._redis.publish(channel, json.dumps(message))
+        except Exception as e:
+            logger.error("Redis PUBLISH error: %s", e)
+
     async def clear_all(self) -> None:
         """Clear entire cache (use with caution)."""
         if not await self._ensure_connected():
@@ -243,71 +222,299 @@ class RedisCache:
             return {"backend": "redis", "connected": False, "error": str(e)}
 
 
-class CacheManager:
+class TieredCache:
     """
-    Unified cache manager with automatic backend selection.
-    Uses Redis if available, falls back to in-memory cache.
+    L1 (in-process MemoryCache) + optional L2 (Redis) cache.
+
+    Values are stored in an envelope ``{"v": value, "exp": soft expiry,
+    "d": seconds it took to compute}``; the physical TTL adds ``stale_ttl``
+    so stale values can be served while they are revalidated.
     """
     
-    def __init__(self):
-        self._backend: InMemoryCache | RedisCache | None = None
+    def __init__(self, l1: Any = None, redis_url: str | None = None, redis_client: Any = None,
+                 stale_ttl: int = 60, early_refresh_beta: float = 1.0):
+        self._l1 = l1
+        self._redis_url = redis_url
+        self._redis_client = redis_client
+        self._l2: RedisCache | None = None
         self._initialized = False
+        self._init_task: asyncio.Task | None = None
+        self.stale_ttl = stale_ttl
+        self.early_refresh_beta = early_refresh_beta
+        self.instance_id = uuid.uuid4().hex
+
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+        self._listener: asyncio.Task | None = None
+        self._listener_ready: asyncio.Event | None = None
+
+        self.stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "early_refreshes": 0,
+            "stale_served": 0,
+            "invalidations_received": 0,
+        }
+
+    @property
+    def l1(self) -> Any:
+        if self._l1 is None:
+            from app.core.cache_manager import get_cache_manager
+            self._l1 = get_cache_manager().get_backend()
+        return self._l1
     
     async def _ensure_initialized(self) -> None:
-        """Initialize cache backend based on settings."""
+        """Connect the Redis L2 (if configured) and start the invalidation listener."""
         if self._initialized:
             return
-        
-        from app.core.config import get_settings
-        settings = get_settings()
-        
-        if settings.redis_url:
-            redis_cache = RedisCache(settings.redis_url)
+        # Concurrent first callers all wait for the one connect
+        task = self._init_task
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._init_task = asyncio.create_task(self._initialize())
+        await asyncio.shield(task)
+
+    async def _initialize(self) -> None:
+        try:
+            await self._connect_l2()
+        finally:
+            self._initialized = True
+
+    async def _connect_l2(self) -> None:
+        redis_url = self._redis_url
+        if redis_url is None and self._redis_client is None:
+            from app.core.config import get_settings
+            redis_url = get_settings().redis_url
+
+        if redis_url or self._redis_client is not None:
+            redis_cache = RedisCache(redis_url or "redis://", client=self._redis_client)
             if await redis_cache._ensure_connected():
-                self._backend = redis_cache
-                logger.info("Cache initialized with Redis backend")
-            else:
-                self._backend = InMemoryCache()
-                logger.info("Cache initialized with in-memory backend (Redis unavailable)")
+                self._l2 = redis_cache
+                self._listener_ready = asyncio.Event()
+                self._listener = asyncio.create_task(self._listen_for_invalidations())
+                await self._listener_ready.wait()
+                logger.info("Cache initialized with in-memory L1 + Redis L2")
+                return
+            logger.info("Cache initialized with in-memory L1 only (Redis unavailable)")
         else:
-            self._backend = InMemoryCache()
-            logger.info("Cache initialized with in-memory backend")
-        
-        self._initialized = True
-    
+            logger.info("Cache initialized with in-memory L1 only")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def _read(self, key: str) -> dict | None:
+        envelope = self.l1.get(key)
+        # L1 is shared with CacheManager's non-default backends; ignore raw values
+        if isinstance(envelope, dict) and "exp" in envelope:
+            self.stats["l1_hits"] += 1
+            return envelope
+        if self._l2 is not None:
+            envelope = await self._l2.get(key)
+            if isinstance(envelope, dict) and "exp" in envelope:
+                self.stats["l2_hits"] += 1
+                if envelope["exp"] >= NO_EXPIRY:
+                    self.l1.set(key, envelope, None, tags=envelope.get("t"))
+                else:
+                    remaining = int(envelope["exp"] + self.stale_ttl - time.time())
+                    if remaining > 0:
+                        self.l1.set(key, envelope, remaining, tags=envelope.get("t"))
+                return envelope
+        self.stats["misses"] += 1
+        return None
+
     async def get(self, key: str) -> Any | None:
-        """Get cached value."""
+        """Get cached value (None if missing or past its TTL)."""
         await self._ensure_initialized()
-        return await self._backend.get(key)
+        envelope = await self._read(key)
+        if envelope is None or time.time() >= envelope["exp"]:
+            return None
+        return envelope["v"]
     
-    async def set(self, key: str, value: Any, ttl: int | None = 300) -> bool:
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[T]], ttl: int = 300,
+                         tags: list[str] | None = None) -> T:
+        """
+        Return the cached value for key, loading it with loader() on a miss.
+
+        Concurrent misses share one loader call. Hits near expiry (XFetch) or
+        within the stale window trigger a single background refresh.
+        """
+        await self._ensure_initialized()
+        envelope = await self._read(key)
+        if envelope is not None:
+            now = time.time()
+            if now < envelope["exp"]:
+                # XFetch: refresh early with probability rising as expiry nears
+                jitter = envelope.get("d", 0) * self.early_refresh_beta * -math.log(1.0 - random.random())
+                if now + jitter >= envelope["exp"]:
+                    self.stats["early_refreshes"] += 1
+                    self._refresh_in_background(key, loader, ttl, tags)
+                return envelope["v"]
+            self.stats["stale_served"] += 1
+            self._refresh_in_background(key, loader, ttl, tags)
+            return envelope["v"]
+        return await self._load(key, loader, ttl, tags)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[T]], ttl: int,
+                    tags: list[str] | None) -> T:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats["loads"] += 1
+            started = time.perf_counter()
+            value = await loader()
+            if value is not None:
+                await self._write(key, value, ttl, time.perf_counter() - started, tags)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int,
+                               tags: list[str] | None) -> None:
+        if key in self._inflight:
+            return
+        task = asyncio.create_task(self._load(key, loader, ttl, tags))
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background cache refresh failed: %s", task.exception())
+
+    # ------------------------------------------------------------------
+    # Writes and invalidation
+    # ------------------------------------------------------------------
+
+    async def _write(self, key: str, value: Any, ttl: int | None, compute_seconds: float,
+                     tags: list[str] | None) -> bool:
+        envelope = {"v": value, "exp": time.time() + ttl if ttl else NO_EXPIRY, "d": compute_seconds}
+        if tags:
+            envelope["t"] = list(tags)
+        physical_ttl = ttl + self.stale_ttl if ttl else None
+        stored = self.l1.set(key, envelope, physical_ttl, tags=tags)
+        if self._l2 is not None:
+            stored = await self._l2.set(key, envelope, physical_ttl, tags=tags) or stored
+        return stored
+
+    async def set(self, key: str, value: Any, ttl: int | None = 300, tags: list[str] | None = None) -> bool:
         """Set cached value (default TTL: 5 minutes)."""
         await self._ensure_initialized()
-        return await self._backend.set(key, value, ttl)
+        written = await self._write(key, value, ttl, 0.0, tags)
+        # Other workers may hold an older L1 copy
+        await self._publish({"op": "delete", "key": key})
+        return written
     
     async def delete(self, key: str) -> bool:
-        """Delete cached value."""
+        """Delete cached value on every worker."""
         await self._ensure_initialized()
-        return await self._backend.delete(key)
+        deleted = self.l1.delete(key)
+        if self._l2 is not None:
+            deleted = await self._l2.delete(key) or deleted
+        await self._publish({"op": "delete", "key": key})
+        return deleted
     
     async def exists(self, key: str) -> bool:
         """Check if key exists."""
-        await self._ensure_initialized()
-        return await self._backend.exists(key)
+        return await self.get(key) is not None
     
     async def clear_prefix(self, prefix: str) -> int:
-        """Clear all keys with prefix."""
+        """Clear all keys with prefix on every worker."""
+        await self._ensure_initialized()
+        deleted = self.l1.delete_by_prefix(prefix)
+        if self._l2 is not None:
+            deleted = max(deleted, await self._l2.clear_prefix(prefix))
+        await self._publish({"op": "prefix", "prefix": prefix})
+        return deleted
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with tag on every worker."""
         await self._ensure_initialized()
-        return await self._backend.clear_prefix(prefix)
+        deleted = self.l1.delete_by_tag(tag)
+        if self._l2 is not None:
+            deleted = max(deleted, await self._l2.delete_tag(tag))
+        await self._publish({"op": "tag", "tag": tag})
+        return deleted
+
+    async def _publish(self, message: dict) -> None:
+        if self._l2 is not None:
+            message["origin"] = self.instance_id
+            await self._l2.publish(INVALIDATION_CHANNEL, message)
+
+    def _apply_invalidation(self, message: dict) -> None:
+        op = message.get("op")
+        if op == "delete":
+            self.l1.delete(message["key"])
+        elif op == "prefix":
+            self.l1.delete_by_prefix(message["prefix"])
+        elif op == "tag":
+            self.l1.delete_by_tag(message["tag"])
+        self.stats["invalidations_received"] += 1
+
+    async def _listen_for_invalidations(self) -> None:
+        pubsub = self._l2.client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            self._listener_ready.set()
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("origin") != self.instance_id:
+                    self._apply_invalidation(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cache invalidation listener stopped: %s", e)
+        finally:
+            self._listener_ready.set()
+            try:
+                await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """Stop the invalidation listener and pending background refreshes."""
+        tasks = list(self._background)
+        if self._listener is not None:
+            tasks.append(self._listener)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._listener = None
+        self._initialized = False
+        self._init_task = None
     
     async def get_stats(self) -> dict[str, Any]:
         """Get cache statistics."""
         await self._ensure_initialized()
-        return await self._backend.get_stats()
+        return {
+            "backend": "memory+redis" if self._l2 is not None else "memory",
+            "tiered": dict(self.stats),
+            "l1": self.l1.get_stats(),
+            "l2": await self._l2.get_stats() if self._l2 is not None else None,
+        }
 
 
 # Global cache instance
-cache = CacheManager()
+cache = TieredCache()
 
 
 def _make_cache_key(prefix: str, args: tuple, kwargs: dict) -> str:
@@ -351,20 +558,7 @@ def cached(
             else:
                 cache_key = _make_cache_key(prefix, args, kwargs)
             
-            # Try to get from cache
-            cached_value = await cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug("Cache HIT: %s", cache_key)
-                return cached_value
-            
-            # Execute function and cache result
-            logger.debug("Cache MISS: %s", cache_key)
-            result = await func(*args, **kwargs)
-            
-            if result is not None:
-                await cache.set(cache_key, result, ttl)
-            
-            return result
+            return await cache.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl)
         
         # Add cache control methods
         wrapper.cache_clear = lambda: cache.clear_prefix(f"{prefix}:")
@@ -378,6 +572,8 @@ def cached(
 def cache_invalidate(key_prefix: str):
     """
     Decorator to invalidate cache after function execution.
+
+    The invalidation is broadcast, so every worker drops its L1 entries.
     
     Usage:
         @cache_invalidate("user")
@@ -7,14 +7,15 @@ Manages caching for frequently accessed data with multiple backends.
 
 import logging
 import json
+import math
+import sys
 import time
 import hashlib
-import pickle
 from typing import Any, Optional, Dict, List, Union, Callable
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 import asyncio
 import threading
 
@@ -26,6 +27,40 @@ class CacheBackend(Enum):
     REDIS = "redis"
     FILE = "file"
 
+# Fixed per-entry bookkeeping (CacheEntry object, ordering and index slots)
+_ENTRY_OVERHEAD_BYTES = 256
+
+def estimate_size(value: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """
+    Approximate in-memory footprint of value in bytes.
+
+    Walks containers and object __dict__s with sys.getsizeof, counting shared
+    objects once. Much cheaper than pickling and closer to real RSS.
+    """
+    if _seen is None:
+        _seen = set()
+    obj_id = id(value)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    size = sys.getsizeof(value, 64)
+    if _depth >= 8 or isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _seen, _depth + 1) + estimate_size(v, _seen, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        for item in value:
+            size += estimate_size(item, _seen, _depth + 1)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _seen, _depth + 1)
+    elif hasattr(value, "__slots__"):
+        for slot in value.__slots__:
+            if hasattr(value, slot):
+                size += estimate_size(getattr(value, slot), _seen, _depth + 1)
+    return size
+
 @dataclass
 class CacheEntry:
     """Cache entry with metadata."""
@@ -44,13 +79,14 @@ class CacheEntry:
         if self.last_accessed is None:
             self.last_accessed = self.created_at
         if self.size_bytes == 0:
-            self.size_bytes = len(pickle.dumps(self.value))
+            self.size_bytes = estimate_size(self.value) + sys.getsizeof(self.key) + _ENTRY_OVERHEAD_BYTES
+        self.expires_ts = self.expires_at.timestamp() if self.expires_at else None
     
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if entry is expired."""
-        if self.expires_at is None:
+        if self.expires_ts is None:
             return False
-        return datetime.now(timezone.utc) >= self.expires_at
+        return (now if now is not None else time.time()) >= self.expires_ts
     
     def touch(self):
         """Update access statistics."""
@@ -69,40 +105,165 @@ class CacheEntry:
             "tags": self.tags
         }
 
+def _key_segment(key: str) -> str:
+    """First ':'-separated segment of a key ('' for keys without one)."""
+    return key.split(":", 1)[0] if ":" in key else ""
+
+class FrequencySketch:
+    """
+    Count-Min sketch of recent access frequency (TinyLFU).
+
+    Four 4-bit-style counters per key, capped at 15 and halved after every
+    `sample_size` increments so old popularity ages out.
+    """
+    
+    def __init__(self, width: int, sample_size: Optional[int] = None):
+        self.width = max(64, 1 << (width - 1).bit_length())
+        self.mask = self.width - 1
+        self.rows = [bytearray(self.width) for _ in range(4)]
+        self.sample_size = sample_size or self.width * 10
+        self.additions = 0
+    
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        for i in range(4):
+            yield (h >> (16 * i)) & self.mask
+    
+    def increment(self, key: str):
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+    
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+    
+    def _reset(self):
+        for row in self.rows:
+            for i in range(self.width):
+                row[i] >>= 1
+        self.additions //= 2
+
+class TimerWheel:
+    """
+    Hashed timing wheel for TTL expiry.
+
+    Each entry lands in the slot for its expiry tick; advancing the wheel
+    only visits the slots that elapsed, so expiry is O(expired) rather than
+    a scan of the whole cache.
+    """
+    
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 512):
+        self.tick_seconds = tick_seconds
+        self.slots: List[List[tuple]] = [[] for _ in range(slots)]
+        self.current_tick = int(time.time() / tick_seconds)
+    
+    def schedule(self, key: str, expires_ts: float):
+        tick = max(int(math.ceil(expires_ts / self.tick_seconds)), self.current_tick + 1)
+        self.slots[tick % len(self.slots)].append((expires_ts, key))
+    
+    def advance(self, now: float) -> List[tuple]:
+        """Return (expires_ts, key) pairs that are due as of now."""
+        target = int(now / self.tick_seconds)
+        if target <= self.current_tick:
+            return []
+        # After a long pause every slot has elapsed at least once
+        ticks = range(self.current_tick + 1, target + 1) if target - self.current_tick < len(self.slots) \
+            else range(len(self.slots))
+        due = []
+        for tick in ticks:
+            slot = self.slots[tick % len(self.slots)]
+            if not slot:
+                continue
+            pending = []
+            for item in slot:
+                (due if item[0] <= now else pending).append(item)
+            self.slots[tick % len(self.slots)] = pending
+        self.current_tick = target
+        return due
+    
+    def clear(self):
+        self.slots = [[] for _ in self.slots]
+
 class MemoryCache:
-    """In-memory cache backend."""
+    """
+    In-memory cache backend.
     
-    def __init__(self, max_size_mb: int = 100, max_entries: int = 10000):
+    Entries live in an OrderedDict kept in recency order, so LRU eviction
+    and hits are O(1). With ``admission="tinylfu"`` new keys enter a small
+    window and only displace a main-region entry if the frequency sketch
+    says they are more popular (W-TinyLFU). A tag index makes tag
+    invalidation proportional to the tagged keys, and a timer wheel
+    advanced by a background thread reclaims expired entries.
+    """
+    
+    # Distinct key prefixes tracked in stats; the rest are counted as "other"
+    MAX_TRACKED_PREFIXES = 256
+    
+    def __init__(self, max_size_mb: int = 100, max_entries: int = 10000,
+                 admission: str = "lru", expiry_tick_seconds: Optional[float] = 1.0):
         self.max_size_bytes = max_size_mb * 1024 * 1024
         self.max_entries = max_entries
-        self.cache: Dict[str, CacheEntry] = {}
+        self.cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self.current_size_bytes = 0
         self.lock = threading.RLock()
         
+        # Admission policy
+        self.admission = admission
+        self._sketch = FrequencySketch(max_entries) if admission == "tinylfu" else None
+        self._window: "OrderedDict[str, None]" = OrderedDict()
+        self._window_size = max(1, max_entries // 100)
+        
+        # Secondary indexes and expiry
+        self._tag_index: Dict[str, set] = defaultdict(set)
+        self._prefix_index: Dict[str, set] = defaultdict(set)  # first key segment -> keys
+        self._wheel = TimerWheel(tick_seconds=expiry_tick_seconds or 1.0)
+        self._stop_expiry = threading.Event()
+        self._expiry_thread: Optional[threading.Thread] = None
+        if expiry_tick_seconds:
+            self._expiry_thread = threading.Thread(
+                target=self._expiry_loop, args=(expiry_tick_seconds,),
+                name="memory-cache-expiry", daemon=True
+            )
+            self._expiry_thread.start()
+        
         # Statistics
         self.hits = 0
         self.misses = 0
         self.evictions = 0
         self.expirations = 0
+        self.rejections = 0
+        self._prefix_stats: Dict[str, Dict[str, int]] = {}
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
         with self.lock:
+            if self._sketch is not None:
+                self._sketch.increment(key)
             entry = self.cache.get(key)
             
             if entry is None:
                 self.misses += 1
+                self._count(key, "misses")
                 return None
             
             if entry.is_expired():
-                del self.cache[key]
-                self.current_size_bytes -= entry.size_bytes
+                self._remove(key)
                 self.expirations += 1
                 self.misses += 1
+                self._count(key, "expirations")
+                self._count(key, "misses")
                 return None
             
+            self.cache.move_to_end(key)
+            if key in self._window:
+                self._window.move_to_end(key)
             entry.touch()
             self.hits += 1
+            self._count(key, "hits")
             return entry.value
     
     def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None, 
@@ -122,57 +283,143 @@ class MemoryCache:
                 created_at=datetime.now(timezone.utc),
                 tags=tags or []
             )
+            if entry.size_bytes > self.max_size_bytes:
+                return False
             
-            # Check if we need to evict
-            self._ensure_capacity(entry.size_bytes)
-            
-            # Store entry
-            old_entry = self.cache.get(key)
-            if old_entry:
-                self.current_size_bytes -= old_entry.size_bytes
+            # Replacing an entry keeps it in its admission region (window or main)
+            is_new = key not in self.cache
+            in_window = key in self._window
+            if not is_new:
+                self._remove(key)
+            elif self._sketch is not None:
+                self._sketch.increment(key)
             
             self.cache[key] = entry
             self.current_size_bytes += entry.size_bytes
+            for tag in entry.tags:
+                self._tag_index[tag].add(key)
+            self._prefix_index[_key_segment(key)].add(key)
+            if entry.expires_ts is not None:
+                self._wheel.schedule(key, entry.expires_ts)
+            if self._sketch is not None and (is_new or in_window):
+                self._window[key] = None
             
-            return True
+            # Check if we need to evict
+            self._ensure_capacity()
+            
+            return key in self.cache
     
     def delete(self, key: str) -> bool:
         """Delete entry from cache."""
         with self.lock:
-            entry = self.cache.pop(key, None)
-            if entry:
-                self.current_size_bytes -= entry.size_bytes
-                return True
-            return False
+            return self._remove(key) is not None
     
     def clear(self):
         """Clear all cache entries."""
         with self.lock:
             self.cache.clear()
+            self._window.clear()
+            self._tag_index.clear()
+            self._prefix_index.clear()
+            self._wheel.clear()
             self.current_size_bytes = 0
     
-    def _ensure_capacity(self, new_entry_size: int):
-        """Ensure cache has capacity for new entry."""
-        # Check entry count limit
-        while len(self.cache) >= self.max_entries:
-            self._evict_lru()
+    def close(self):
+        """Stop the background expiry thread."""
+        self._stop_expiry.set()
+    
+    def _remove(self, key: str) -> Optional[CacheEntry]:
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return None
+        self.current_size_bytes -= entry.size_bytes
+        self._window.pop(key, None)
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        segment = _key_segment(key)
+        keys = self._prefix_index.get(segment)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._prefix_index[segment]
+        return entry
+    
+    def _over_capacity(self) -> bool:
+        return len(self.cache) > self.max_entries or self.current_size_bytes > self.max_size_bytes
+    
+    def _ensure_capacity(self):
+        """Evict until the cache is within its entry and size limits."""
+        if self._sketch is not None:
+            # W-TinyLFU: the window's LRU key leaves the window and, if the cache
+            # is full, must beat the main region's LRU key on estimated frequency
+            while len(self._window) > self._window_size:
+                candidate, _ = self._window.popitem(last=False)
+                if not self._over_capacity():
+                    continue
+                # Window keys are few, so the scan for the main LRU key is short
+                victim = next((k for k in self.cache if k not in self._window and k != candidate), None)
+                if victim is None:
+                    break
+                if self._sketch.estimate(candidate) > self._sketch.estimate(victim):
+                    self._evict(victim)
+                else:
+                    self._evict(candidate)
+                    self.rejections += 1
         
-        # Check size limit
-        while (self.current_size_bytes + new_entry_size) > self.max_size_bytes:
+        while self._over_capacity():
             self._evict_lru()
     
     def _evict_lru(self):
         """Evict least recently used entry."""
         if not self.cache:
             return
-        
-        # Find LRU entry
-        lru_key = min(self.cache.keys(), 
-                     key=lambda k: self.cache[k].last_accessed)
-        
-        lru_entry = self.cache.pop(lru_key)
-        self.current_size_bytes -= lru_entry.size_bytes
-        self.evictions += 1
+        self._evict(next(iter(self.cache)))
+    
+    def _evict(self, key: str):
+        if self._remove(key) is not None:
+            self.evictions += 1
+            self._count(key, "evictions")
+    
+    def expire_due(self) -> int:
+        """Remove entries whose TTL has elapsed (driven by the timer wheel)."""
+        now = time.time()
+        with self.lock:
+            removed = 0
+            for expires_ts, key in self._wheel.advance(now):
+                entry = self.cache.get(key)
+                # Skip keys that were deleted or re-set with a later expiry
+                if entry is not None and entry.expires_ts == expires_ts:
+                    self._remove(key)
+                    self.expirations += 1
+                    self._count(key, "expirations")
+                    removed += 1
+            return removed
+    
+    async def cleanup_expired(self):
+        """Expire due entries (called by CacheManager.cleanup_expired)."""
+        self.expire_due()
+    
+    def _expiry_loop(self, tick_seconds: float):
+        while not self._stop_expiry.wait(tick_seconds):
+            try:
+                self.expire_due()
+            except Exception as e:
+                logger.error(f"Cache expiry error: {e}")
+    
+    def _count(self, key: str, counter: str):
+        prefix = _key_segment(key) or "(none)"
+        stats = self._prefix_stats.get(prefix)
+        if stats is None:
+            if len(self._prefix_stats) >= self.MAX_TRACKED_PREFIXES:
+                prefix = "other"
+                stats = self._prefix_stats.get(prefix)
+            if stats is None:
+                stats = self._prefix_stats[prefix] = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        stats[counter] += 1
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
@@ -180,6 +427,11 @@ class MemoryCache:
             total_requests = self.hits + self.misses
             hit_rate = (self.hits / total_requests) if total_requests > 0 else 0
             
+            by_prefix = {}
+            for prefix, counts in self._prefix_stats.items():
+                requests = counts["hits"] + counts["misses"]
+                by_prefix[prefix] = dict(counts, hit_rate_percent=(counts["hits"] / requests * 100) if requests else 0)
+            
             return {
                 "entries": len(self.cache),
                 "size_bytes": self.current_size_bytes,
@@ -188,23 +440,39 @@ class MemoryCache:
                 "misses": self.misses,
                 "hit_rate_percent": hit_rate * 100,
                 "evictions": self.evictions,
-                "expirations": self.expirations
+                "expirations": self.expirations,
+                "admission": self.admission,
+                "admission_rejections": self.rejections,
+                "by_prefix": by_prefix
             }
     
     def get_entries_by_tag(self, tag: str) -> List[CacheEntry]:
         """Get all entries with a specific tag."""
         with self.lock:
-            return [entry for entry in self.cache.values() if tag in entry.tags]
+            return [self.cache[key] for key in self._tag_index.get(tag, ())]
     
     def delete_by_tag(self, tag: str) -> int:
         """Delete all entries with a specific tag."""
         with self.lock:
-            keys_to_delete = [key for key, entry in self.cache.items() 
-                            if tag in entry.tags]
+            keys_to_delete = list(self._tag_index.get(tag, ()))
             
             for key in keys_to_delete:
-                entry = self.cache.pop(key)
-                self.current_size_bytes -= entry.size_bytes
+                self._remove(key)
+            
+            return len(keys_to_delete)
+    
+    def delete_by_prefix(self, prefix: str) -> int:
+        """Delete all entries whose key starts with prefix."""
+        with self.lock:
+            if ":" in prefix:
+                # Only keys sharing the first segment can match
+                candidates = self._prefix_index.get(prefix.split(":", 1)[0], ())
+            else:
+                candidates = self.cache
+            keys_to_delete = [key for key in candidates if key.startswith(prefix)]
+            
+            for key in keys_to_delete:
+                self._remove(key)
             
             return len(keys_to_delete)
 
@@ -233,13 +501,19 @@ class CacheManager:
         backend = backend or self.default_backend
         return self.backends.get(backend)
     
+    def _tiered(self, cache_backend: Any) -> Any:
+        """The shared TieredCache when cache_backend is its L1, else None."""
+        from app.core.cache import cache
+        return cache if cache.l1 is cache_backend else None
+    
     async def get(self, key: str, backend: CacheBackend = None) -> Optional[Any]:
         """Get value from cache."""
         cache_backend = self.get_backend(backend)
         if not cache_backend:
             return None
         
-        value = cache_backend.get(key)
+        tiered = self._tiered(cache_backend)
+        value = await tiered.get(key) if tiered else cache_backend.get(key)
         self.operation_counts[f"get_{backend.value if backend else 'default'}"] += 1
         
         return value
@@ -258,7 +532,11 @@ class CacheManager:
         if ttl_seconds > self.max_ttl:
             ttl_seconds = self.max_ttl
         
-        success = cache_backend.set(key, value, ttl_seconds, tags)
+        tiered = self._tiered(cache_backend)
+        if tiered:
+            success = await tiered.set(key, value, ttl_seconds, tags=tags)
+        else:
+            success = cache_backend.set(key, value, ttl_seconds, tags)
         self.operation_counts[f"set_{backend.value if backend else 'default'}"] += 1
         
         return success
@@ -269,7 +547,8 @@ class CacheManager:
         if not cache_backend:
             return False
         
-        success = cache_backend.delete(key)
+        tiered = self._tiered(cache_backend)
+        success = await tiered.delete(key) if tiered else cache_backend.delete(key)
         self.operation_counts[f"delete_{backend.value if backend else 'default'}"] += 1
         
         return success
@@ -291,6 +570,12 @@ class CacheManager:
                     func.__name__, args, kwargs, key_prefix
                 )
                 
+                tiered = self._tiered(self.get_backend(backend))
+                if tiered:
+                    # Coalesced load-through on the shared two-tier cache
+                    ttl = min(ttl_seconds or self.default_ttl, self.max_ttl)
+                    return await tiered.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl, tags=tags)
+                
                 # Try to get from cache
                 cached_result = await self.get(cache_key, backend)
                 if cached_result is not None:
@@ -327,7 +612,8 @@ class CacheManager:
         if not cache_backend or not hasattr(cache_backend, 'delete_by_tag'):
             return 0
         
-        deleted_count = cache_backend.delete_by_tag(tag)
+        tiered = self._tiered(cache_backend)
+        deleted_count = await tiered.invalidate_tag(tag) if tiered else cache_backend.delete_by_tag(tag)
         self.operation_counts[f"invalidate_tag_{backend.value if backend else 'default'}"] += 1
         
         return deleted_count
@@ -374,19 +660,11 @@ def cache_user_data(ttl_seconds: int = 3600, tags: List[str] = None):
             if not user_id:
                 return await func(*args, **kwargs)
             
-            cache_manager = get_cache_manager()
+            from app.core.cache import cache
             cache_key = f"user_data:{user_id}:{func.__name__}"
             
-            # Try cache
-            cached_result = await cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute and cache
-            result = await func(*args, **kwargs)
-            await cache_manager.set(cache_key, result, ttl_seconds, tags=tags)
-            
-            return result
+            # Concurrent misses share one call; refreshes happen before expiry
+            return await cache.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl_seconds, tags=tags)
         
         return wrapper
     return decorator
@@ -401,19 +679,11 @@ def cache_document_data(ttl_seconds: int = 1800, tags: List[str] = None):
             if not document_id:
                 return await func(*args, **kwargs)
             
-            cache_manager = get_cache_manager()
+            from app.core.cache import cache
             cache_key = f"document_data:{document_id}:{func.__name__}"
             
-            # Try cache
-            cached_result = await cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute and cache
-            result = await func(*args, **kwargs)
-            await cache_manager.set(cache_key, result, ttl_seconds, tags=tags)
-            
-            return result
+            # Concurrent misses share one call; refreshes happen before expiry
+            return await cache.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl_seconds, tags=tags)
         
         return wrapper
     return decorator
@@ -422,19 +692,11 @@ def cache_system_data(ttl_seconds: int = 7200, tags: List[str] = None):
     """Cache system-wide data."""
     def decorator(func):
         async def wrapper(*args, **kwargs):
-            cache_manager = get_cache_manager()
+            from app.core.cache import cache
             cache_key = f"system_data:{func.__name__}"
             
-            # Try cache
-            cached_result = await cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute and cache
-            result = await func(*args, **kwargs)
-            await cache_manager.set(cache_key, result, ttl_seconds, tags=tags)
-            
-            return result
+            # Concurrent misses share one call; refreshes happen before expiry
+            return await cache.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl_seconds, tags=tags)
         
         return wrapper
     return decorator
@@ -12,10 +12,12 @@ Logic:
 """
 
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.responses import RedirectResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
 
+from app.core.path_matcher import PathMatcher
+
 logger = logging.getLogger(__name__)
 
 # Checkpoint cookie constants
@@ -57,52 +59,45 @@ PROTECTED_PREFIXES = (
 )
 
 
-class SmartCheckpointMiddleware(BaseHTTPMiddleware):
+# Exempt entries match as prefixes ("/static/" covers every asset)
+_is_exempt = PathMatcher(prefixes=EXEMPT_PATHS)
+_is_protected = PathMatcher(prefixes=PROTECTED_PREFIXES)
+
+
+class SmartCheckpointMiddleware:
     """
     Smart gate: New users through welcome, returning users bypass.
     """
-    
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Always exempt paths
-        if self._is_exempt(path):
-            return await call_next(request)
-        
+        if scope["type"] != "http" or _is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        path = scope["path"]
+
         # Has valid session? → Allow (returning user)
         user_id = request.cookies.get(USER_COOKIE)
-        if user_id and len(user_id) >= 10:
-            return await call_next(request)
-        
         # Has checkpoint? → Allow (saw welcome)
         checkpoint = request.cookies.get(CHECKPOINT_COOKIE)
-        if checkpoint == CHECKPOINT_VALUE:
-            return await call_next(request)
-        
+
         # Protected path with no credentials? → Welcome
-        if self._is_protected(path):
+        if not (user_id and len(user_id) >= 10) and checkpoint != CHECKPOINT_VALUE and _is_protected(path):
             logger.info(f"Gate: {path} → welcome (no checkpoint/session)")
-            return RedirectResponse(
+            response = RedirectResponse(
                 url="/?gate=checkpoint_required&return_to=" + path,
                 status_code=302
             )
-        
+            await response(scope, receive, send)
+            return
+
         # Public path → Allow
-        return await call_next(request)
-    
-    def _is_exempt(self, path: str) -> bool:
-        """Check if path is always exempt."""
-        for exempt in EXEMPT_PATHS:
-            if path == exempt or path.startswith(exempt):
-                return True
-        return False
-    
-    def _is_protected(self, path: str) -> bool:
-        """Check if path requires checkpoint."""
-        for prefix in PROTECTED_PREFIXES:
-            if path.startswith(prefix):
-                return True
-        return False
+        await self.app(scope, receive, send)
 
 
 def set_checkpoint_cookie(response, max_age: int = CHECKPOINT_MAX_AGE):
@@ -64,6 +64,36 @@ class Settings:
     security_mode: Literal["open", "enforced"] = os.getenv("SECURITY_MODE", "open")
     secret_key: str = _resolve_secret_key()
     database_url: str = _resolve_database_url()
+    # Connection pool per worker: DB_MAX_CONNECTIONS is split over WEB_CONCURRENCY workers
+    # (0 = 5 + 10 overflow); DB_POOL_SIZE (0 = auto) and DB_MAX_OVERFLOW (-1 = auto) override it
+    db_max_connections: int = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "0"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "-1"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # asyncpg prepared statements; DB_PGBOUNCER=true for PgBouncer transaction pooling
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "False").lower() in ("1", "true", "yes", "on")
+    # Background rebuild of documents.search_vector for changed rows (PostgreSQL only)
+    fts_reindex_interval: float = float(os.getenv("FTS_REINDEX_INTERVAL", "5"))
+    fts_reindex_batch_size: int = int(os.getenv("FTS_REINDEX_BATCH_SIZE", "500"))
+    # PDF page extraction process pool (0 = extract on a thread) and OCR render resolution
+    pdf_extract_workers: int = int(os.getenv("PDF_EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    pdf_ocr_dpi: int = int(os.getenv("PDF_OCR_DPI", "200"))
+    extraction_cache_path: str = os.getenv("EXTRACTION_CACHE_PATH", "data/extraction_cache/cache.db")
+    extraction_cache_max_mb: int = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+    # Rendered preview images on disk, their size bound (0 = unbounded) and the rendering
+    # process pool (0 = render on a thread)
+    preview_dir: str = os.getenv("PREVIEW_DIR", "data/previews")
+    preview_max_mb: int = int(os.getenv("PREVIEW_MAX_MB", "2048"))
+    preview_workers: int = int(os.getenv("PREVIEW_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    # Audit events are group-committed to audit_events, at most AUDIT_BATCH_SIZE rows per commit;
+    # AUDIT_LOG_FILES=true also mirrors app.core.audit entries to daily logs/audit/*.jsonl files
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    audit_log_files: bool = os.getenv("AUDIT_LOG_FILES", "False").lower() in ("1", "true", "yes", "on")
+    # Seconds between writes of this worker's open analytics rollup buckets
+    analytics_rollup_flush_interval: float = float(os.getenv("ANALYTICS_ROLLUP_FLUSH_INTERVAL", "10"))
     upload_dir: str = "uploads"
     vault_dir: str = "uploads/vault"
     max_upload_size_mb: int = 50
@@ -72,6 +102,19 @@ class Settings:
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     log_json_format: bool = os.getenv("LOG_JSON_FORMAT", "False").lower() in ("1", "true", "yes", "on")
     cors_origins: str = os.getenv("CORS_ORIGINS", "*")
+    # Optional Redis L2 cache + cross-worker invalidation (empty = in-process only)
+    redis_url: str = os.getenv("REDIS_URL", "")
+    # Feature routers load on first request; PRELOAD_ROUTERS lists names to import at startup ("*" = all)
+    lazy_routers: bool = os.getenv("LAZY_ROUTERS", "True").lower() in ("1", "true", "yes", "on")
+    preload_routers: str = os.getenv("PRELOAD_ROUTERS", "")
+    # Prometheus /metrics and /metrics/json (per-worker snapshots are merged from METRICS_DIR);
+    # off by default, and METRICS_TOKEN makes scrapers send "Authorization: Bearer <token>"
+    enable_metrics: bool = os.getenv("ENABLE_METRICS", "False").lower() in ("1", "true", "yes", "on")
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
+    # Cross-worker event delivery: local (in-process) or redis (Redis Streams via REDIS_URL)
+    event_bus_backend: str = os.getenv("EVENT_BUS_BACKEND", "local")
+    # Where AdvancedRateLimiter keeps client state: local (per process) or redis (global via REDIS_URL)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "local")
 
     @property
     def cors_origins_list(self):
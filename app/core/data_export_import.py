@@ -428,7 +428,7 @@ class DataExportImportManager:
             date_to = datetime.fromisoformat(filters["date_to"]) if "date_to" in filters else None
             event_types = filters.get("event_types", [])
             
-            audit_events = audit_logger.get_user_events(user_id, event_types, date_from, date_to)
+            audit_events = await audit_logger.get_user_events(user_id, event_types, date_from, date_to, limit=None)
             
             return {
                 "export_type": "audit_log",
@@ -2,9 +2,35 @@
 Semptify Database Module
 Async SQLAlchemy with SQLite (dev) / PostgreSQL (prod) support.
 Includes connection pooling configuration for production.
+
+get_engine() is the only engine factory in the app; database_pool and
+everything else share its pool. Every engine is instrumented by db_metrics
+(per-statement latency, pool checkout wait).
+
+Pool sizing (per worker):
+    DB_MAX_CONNECTIONS   connections the server allows this app; split
+                         evenly over WEB_CONCURRENCY workers (default: off,
+                         5 + 10 overflow per worker)
+    DB_POOL_SIZE         override the persistent connections per worker
+    DB_MAX_OVERFLOW      override the extra connections under load
+    DB_POOL_TIMEOUT      seconds to wait for a connection (default: 30)
+    DB_POOL_RECYCLE      seconds before a connection is replaced (default: 1800)
+
+SQLite connections get radians/sin/cos/asin/sqrt registered when the
+linked SQLite library was built without its math functions, so radius
+searches use the same SQL on both databases.
+
+asyncpg:
+    DB_STATEMENT_CACHE_SIZE   prepared statements cached per connection (default: 100)
+    DB_PGBOUNCER              true when connecting through PgBouncer in
+                              transaction mode: disables statement caching and
+                              gives prepared statements unique names
 """
 
-from typing import AsyncGenerator
+import math
+import sqlite3
+import uuid
+from typing import AsyncGenerator, Any, Callable, Dict, Optional, Tuple
 
 try:
     from sqlalchemy.ext.asyncio import (
@@ -37,48 +63,128 @@ _engine = None
 _async_session_factory = None
 
 
+def pool_sizing(settings) -> Tuple[int, int]:
+    """Return (pool_size, max_overflow) for one worker."""
+    pool_size, max_overflow = 5, 10
+    if settings.db_max_connections > 0:
+        per_worker = max(2, settings.db_max_connections // max(1, settings.web_concurrency))
+        pool_size = (per_worker + 1) // 2
+        max_overflow = per_worker - pool_size
+    if settings.db_pool_size > 0:
+        pool_size = settings.db_pool_size
+    if settings.db_max_overflow >= 0:
+        max_overflow = settings.db_max_overflow
+    return pool_size, max_overflow
+
+
+def _pgbouncer_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4().hex}__"
+
+
+def engine_options(settings) -> Dict[str, Any]:
+    """Keyword arguments for create_async_engine() for the configured database."""
+    from app.core.db_metrics import InstrumentedAsyncPool
+
+    url = settings.database_url
+    if "sqlite" in url:
+        # SQLite: disable pooling, use check_same_thread=False
+        return {
+            "poolclass": NullPool,
+            "connect_args": {"check_same_thread": False},
+        }
+
+    pool_size, max_overflow = pool_sizing(settings)
+    options: Dict[str, Any] = {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": pool_size,  # Base connections
+        "max_overflow": max_overflow,  # Extra connections under load
+        "pool_timeout": settings.db_pool_timeout,  # Seconds to wait for connection
+        "pool_recycle": settings.db_pool_recycle,  # Recycle connections
+        "pool_pre_ping": True,  # Verify connections before use
+    }
+    if "+asyncpg" in url:
+        connect_args: Dict[str, Any] = {
+            "command_timeout": 30,  # Seconds before a statement is cancelled
+            "server_settings": {
+                "application_name": "semptify_fastapi",
+                "jit": "off",  # Consistent latency for short OLTP queries
+            },
+        }
+        if settings.db_pgbouncer:
+            # Transaction pooling hands each transaction a different server
+            # connection, so named statements must not be reused across them
+            connect_args.update({
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _pgbouncer_statement_name,
+            })
+        else:
+            connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+        options["connect_args"] = connect_args
+    return options
+
+
+def _null_safe(fn: Callable[[float], float]) -> Callable[[Optional[float]], Optional[float]]:
+    return lambda value: None if value is None else fn(value)
+
+
+SQLITE_MATH_FUNCTIONS: Dict[str, Callable] = {
+    "radians": _null_safe(math.radians),
+    "sin": _null_safe(math.sin),
+    "cos": _null_safe(math.cos),
+    "asin": _null_safe(lambda value: math.asin(max(-1.0, min(1.0, value)))),
+    "sqrt": _null_safe(math.sqrt),
+}
+
+
+def sqlite_has_math_functions() -> bool:
+    """True when the linked SQLite was built with SQLITE_ENABLE_MATH_FUNCTIONS."""
+    try:
+        sqlite3.connect(":memory:").execute("SELECT asin(sin(radians(1)))")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _register_sqlite_math(dbapi_connection, connection_record) -> None:
+    for name, fn in SQLITE_MATH_FUNCTIONS.items():
+        dbapi_connection.create_function(name, 1, fn, deterministic=True)
+
+
 def get_engine():
     """
     Get or create the async engine with proper connection pooling.
 
     Pool settings:
-    - PostgreSQL: QueuePool with configurable size
+    - PostgreSQL: instrumented queue pool sized by pool_sizing()
     - SQLite: NullPool (SQLite doesn't support concurrent connections well)
     """
     if not SQLALCHEMY_AVAILABLE:
         raise RuntimeError("SQLAlchemy is not installed in this environment")
     global _engine
     if _engine is None:
-        settings = get_settings()
-        is_sqlite = "sqlite" in settings.database_url
-
-        # Connection pool configuration
-        pool_config = {}
-        if is_sqlite:
-            # SQLite: disable pooling, use check_same_thread=False
-            pool_config = {
-                "poolclass": NullPool,
-                "connect_args": {"check_same_thread": False},
-            }
-        else:
-            # PostgreSQL: use async-compatible connection pooling
-            pool_config = {
-                "poolclass": AsyncAdaptedQueuePool,
-                "pool_size": 5,  # Base connections
-                "max_overflow": 10,  # Extra connections under load
-                "pool_timeout": 30,  # Seconds to wait for connection
-                "pool_recycle": 1800,  # Recycle connections after 30 min
-                "pool_pre_ping": True,  # Verify connections before use
-            }
+        from app.core.db_metrics import db_metrics
 
+        settings = get_settings()
         _engine = create_async_engine(
             settings.database_url,
             echo=settings.debug,
-            **pool_config,
+            **engine_options(settings),
         )
+        db_metrics.instrument(_engine)
+        if _engine.dialect.name == "sqlite" and not sqlite_has_math_functions():
+            from sqlalchemy import event
+            event.listen(_engine.sync_engine, "connect", _register_sqlite_math)
     return _engine
 
 
+def get_pool_status() -> Dict[str, Any]:
+    """Connection pool occupancy and wait times for this worker."""
+    from app.core.db_metrics import db_metrics
+
+    return db_metrics.pool_status(_engine)
+
+
 def get_session_factory():
     """Get or create the session factory."""
     if not SQLALCHEMY_AVAILABLE:
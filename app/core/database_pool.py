@@ -3,6 +3,10 @@ Database Connection Pool - Optimized Database Access
 ===============================================
 
 Manages database connections with pooling, query optimization, and monitoring.
+
+The pool is the application engine from app.core.database, so this module
+adds query bookkeeping without opening a second set of connections.
+Statement latency and pool wait times come from app.core.db_metrics.
 """
 
 import logging
@@ -13,11 +17,12 @@ from contextlib import asynccontextmanager
 from dataclasses import dataclass, asdict
 from collections import defaultdict, deque
 import json
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text, event
-from sqlalchemy.pool import QueuePool
-import threading
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
+from sqlalchemy import text
+
+from app.core.database import close_db, get_engine, get_session_factory
+from app.core.db_metrics import db_metrics
+from app.core.performance_monitor import get_performance_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -57,13 +62,12 @@ class PoolStats:
 class DatabaseConnectionPool:
     """Enhanced database connection pool with monitoring and optimization."""
     
-    def __init__(self, database_url: str, pool_size: int = 20, max_overflow: int = 30):
+    def __init__(self, database_url: Optional[str] = None):
+        # The engine (and its pool sizing) comes from app.core.database
         self.database_url = database_url
-        self.pool_size = pool_size
-        self.max_overflow = max_overflow
         
         self.engine: Optional[AsyncEngine] = None
-        self.session_factory: Optional[sessionmaker] = None
+        self.session_factory: Optional[async_sessionmaker] = None
         
         # Query monitoring
         self.query_stats: deque = deque(maxlen=10000)
@@ -72,51 +76,30 @@ class DatabaseConnectionPool:
         
         # Performance thresholds
         self.slow_query_threshold = 500  # ms
-        self.max_connection_age = 3600  # 1 hour
         
         # Pool monitoring
         self.pool_stats_history: deque = deque(maxlen=1000)
-        self.connection_events: deque = deque(maxlen=5000)
         
         self._initialized = False
+    
+    @property
+    def pool_size(self) -> int:
+        pool = self.engine.sync_engine.pool if self.engine else None
+        return pool.size() if pool is not None and hasattr(pool, "size") else 0
+    
+    @property
+    def max_overflow(self) -> int:
+        pool = self.engine.sync_engine.pool if self.engine else None
+        return getattr(pool, "_max_overflow", 0) if pool is not None else 0
         
     async def initialize(self):
-        """Initialize the database connection pool."""
+        """Attach to the application engine."""
         if self._initialized:
             return
         
         try:
-            # Create async engine with optimized settings
-            self.engine = create_async_engine(
-                self.database_url,
-                poolclass=QueuePool,
-                pool_size=self.pool_size,
-                max_overflow=self.max_overflow,
-                pool_pre_ping=True,  # Validate connections
-                pool_recycle=self.max_connection_age,
-                echo=False,  # Disable SQL echo for production
-                future=True,
-                # Connection timeout settings
-                connect_args={
-                    "command_timeout": 30,
-                    "server_settings": {
-                        "application_name": "semptify_fastapi",
-                        "jit": "off"  # Disable JIT for consistent performance
-                    }
-                }
-            )
-            
-            # Create session factory
-            self.session_factory = sessionmaker(
-                bind=self.engine,
-                class_=AsyncSession,
-                expire_on_commit=False,
-                future=True
-            )
-            
-            # Register event listeners for monitoring
-            self._register_event_listeners()
-            
+            self.engine = get_engine()
+            self.session_factory = get_session_factory()
             self._initialized = True
             logger.info(f"Database connection pool initialized (size: {self.pool_size}, overflow: {self.max_overflow})")
             
@@ -124,36 +107,6 @@ class DatabaseConnectionPool:
             logger.error(f"Failed to initialize database pool: {e}")
             raise
     
-    def _register_event_listeners(self):
-        """Register SQLAlchemy event listeners for monitoring."""
-        
-        @event.listens_for(self.engine.sync_engine, "connect")
-        def receive_connect(dbapi_connection, connection_record):
-            """Log new connections."""
-            self.connection_events.append({
-                "event": "connect",
-                "timestamp": time.time(),
-                "connection_id": id(connection_record)
-            })
-        
-        @event.listens_for(self.engine.sync_engine, "checkout")
-        def receive_checkout(dbapi_connection, connection_record, connection_proxy):
-            """Log connection checkouts."""
-            self.connection_events.append({
-                "event": "checkout",
-                "timestamp": time.time(),
-                "connection_id": id(connection_record)
-            })
-        
-        @event.listens_for(self.engine.sync_engine, "checkin")
-        def receive_checkin(dbapi_connection, connection_record):
-            """Log connection checkins."""
-            self.connection_events.append({
-                "event": "checkin",
-                "timestamp": time.time(),
-                "connection_id": id(connection_record)
-            })
-    
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
         """Get a database session from the pool."""
@@ -161,32 +114,13 @@ class DatabaseConnectionPool:
             await self.initialize()
         
         session = self.session_factory()
-        start_time = time.time()
         
         try:
             yield session
             await session.commit()
             
-            # Record successful session
-            duration_ms = (time.time() - start_time) * 1000
-            self.connection_events.append({
-                "event": "session_success",
-                "timestamp": time.time(),
-                "duration_ms": duration_ms
-            })
-            
         except Exception as e:
             await session.rollback()
-            
-            # Record failed session
-            duration_ms = (time.time() - start_time) * 1000
-            self.connection_events.append({
-                "event": "session_error",
-                "timestamp": time.time(),
-                "duration_ms": duration_ms,
-                "error": str(e)
-            })
-            
             logger.error(f"Database session error: {e}")
             raise
             
@@ -226,9 +160,7 @@ class DatabaseConnectionPool:
                     self.slow_queries.append(stats)
                 
                 # Log to performance monitor
-                from app.core.performance_monitor import get_performance_monitor
-                perf_monitor = get_performance_monitor()
-                perf_monitor.record_database_query(query, duration_ms, rows_affected)
+                get_performance_monitor().record_database_query(query, duration_ms, rows_affected)
                 
                 return result
                 
@@ -300,6 +232,9 @@ class DatabaseConnectionPool:
             return PoolStats(0, 0, 0, 0, 0, 0)
         
         pool = self.engine.sync_engine.pool
+        if not hasattr(pool, "checkedout"):
+            # NullPool (SQLite) keeps no connections
+            return PoolStats(0, 0, 0, 0, 0, 0)
         
         stats = PoolStats(
             total_connections=pool.size(),
@@ -408,6 +343,7 @@ class DatabaseConnectionPool:
                 "status": "healthy",
                 "response_time_ms": health_time,
                 "pool_stats": pool_stats.to_dict(),
+                "pool": db_metrics.pool_status(self.engine),
                 "query_stats": query_stats,
                 "timestamp": time.time()
             }
@@ -423,7 +359,8 @@ class DatabaseConnectionPool:
     async def close(self):
         """Close the database connection pool."""
         if self.engine:
-            await self.engine.dispose()
+            await close_db()
+            self.engine = None
             self._initialized = False
             logger.info("Database connection pool closed")
 
@@ -438,11 +375,7 @@ async def get_database_pool() -> DatabaseConnectionPool:
         from app.core.config import get_settings
         settings = get_settings()
         
-        _database_pool = DatabaseConnectionPool(
-            database_url=settings.database_url,
-            pool_size=settings.db_pool_size if hasattr(settings, 'db_pool_size') else 20,
-            max_overflow=settings.db_max_overflow if hasattr(settings, 'db_max_overflow') else 30
-        )
+        _database_pool = DatabaseConnectionPool(database_url=settings.database_url)
         
         await _database_pool.initialize()
     
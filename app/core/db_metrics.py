@@ -0,0 +1,305 @@
+"""
+Database Metrics - Statement Latency and Connection Pool Health
+===============================================================
+
+Always-on, fixed-memory database metrics for this worker:
+
+- Statements: one LatencySketch per statement fingerprint, timed by the
+  engine's before/after_cursor_execute events. fingerprint() replaces
+  literals with ? and collapses IN lists and multi-row VALUES, so raw SQL
+  with inlined values shares one label. At most MAX_STATEMENTS labels are
+  kept; later ones share OTHER_STATEMENT.
+- Pool: InstrumentedAsyncPool times every connection checkout (queue wait
+  plus any new connection) and counts checkout timeouts; pool_status()
+  adds the pool's own size/checked-out/overflow figures.
+
+Recording is a perf_counter() pair and a dict lookup per statement (the
+fingerprint of each raw statement string is cached), with no locks (events
+fire on the event loop thread).
+
+Usage:
+    db_metrics.instrument(engine)                # done by database.get_engine()
+    status = db_metrics.pool_status(get_engine())
+    text = db_metrics.render_prometheus(pool_status=status)
+"""
+
+import logging
+import re
+import time
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.core.request_metrics import BUCKETS, LatencySketch
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENTS = 500
+SLOW_STATEMENT_MS = 500.0
+SLOW_SAMPLES = 100
+OTHER_STATEMENT = "<other>"
+LABEL_LENGTH = 120
+# Raw statement strings remembered with their fingerprint; cleared when full
+MAX_ALIASES = 4096
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+
+try:
+    from sqlalchemy import event, exc
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+except ImportError:  # pragma: no cover - SQLAlchemy is a hard dependency of the app
+    event = exc = None
+    AsyncAdaptedQueuePool = object
+
+
+def fingerprint(statement: str) -> str:
+    """Statement text with literals as ? and variable-length lists collapsed."""
+    text = " ".join(statement.split())
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    return _VALUES_ROWS.sub(r"\1, ...", text)
+
+
+def _label(key: str) -> str:
+    if len(key) <= LABEL_LENGTH:
+        return key
+    # Long statements often share a prefix; the checksum keeps labels distinct
+    return f"{key[:LABEL_LENGTH]}... #{zlib.crc32(key.encode()):08x}"
+
+
+class StatementStats:
+    """Latency and error count for one SQL statement."""
+
+    __slots__ = ("label", "latency", "errors")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.latency = LatencySketch()
+        self.errors = 0
+
+
+class DatabaseMetrics:
+    """Per-statement latency sketches and pool checkout timing for one worker."""
+
+    def __init__(self, max_statements: int = MAX_STATEMENTS, slow_statement_ms: float = SLOW_STATEMENT_MS):
+        self.max_statements = max_statements
+        self.slow_statement_ms = slow_statement_ms
+        # Keyed by fingerprint; _aliases maps raw statement strings to them
+        self.statements: Dict[str, StatementStats] = {}
+        self._aliases: Dict[str, StatementStats] = {}
+        self.slow: deque = deque(maxlen=SLOW_SAMPLES)
+        self.pool_wait = LatencySketch()
+        self.pool_timeouts = 0
+
+    # -- recording -----------------------------------------------------------
+
+    def _stats_for(self, statement: str) -> StatementStats:
+        stats = self._aliases.get(statement)
+        if stats is None:
+            key = fingerprint(statement)
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = OTHER_STATEMENT
+                    stats = self.statements.get(key)
+                if stats is None:
+                    stats = self.statements[key] = StatementStats(_label(key))
+            if len(self._aliases) >= MAX_ALIASES:
+                self._aliases.clear()
+            self._aliases[statement] = stats
+        return stats
+
+    def record_statement(self, statement: str, duration_ms: float) -> None:
+        stats = self._stats_for(statement)
+        stats.latency.add(duration_ms)
+        if duration_ms >= self.slow_statement_ms:
+            self.slow.append((time.time(), stats.label, round(duration_ms, 2)))
+
+    def record_error(self, statement: str) -> None:
+        self._stats_for(statement).errors += 1
+
+    def record_pool_wait(self, duration_ms: float, timed_out: bool = False) -> None:
+        self.pool_wait.add(duration_ms)
+        if timed_out:
+            self.pool_timeouts += 1
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self._aliases.clear()
+        self.slow.clear()
+        self.pool_wait = LatencySketch()
+        self.pool_timeouts = 0
+
+    # -- engine hooks ----------------------------------------------------------
+
+    def instrument(self, engine: Any) -> None:
+        """Time every statement the engine (sync or async) executes."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if getattr(sync_engine, "_semptify_metrics", False):
+            return
+        sync_engine._semptify_metrics = True
+
+        perf_counter = time.perf_counter
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("query_start")
+            if starts:
+                self.record_statement(statement, (perf_counter() - starts.pop()) * 1000)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(context):
+            starts = context.connection.info.get("query_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
+            if context.statement:
+                self.record_error(context.statement)
+
+    # -- queries ---------------------------------------------------------------
+
+    def statement_stats(self, limit: int = 20, order_by: str = "total") -> List[Dict[str, Any]]:
+        """Statements ordered by total time (or "count", "p99"), heaviest first."""
+        keys = {
+            "total": lambda s: s.latency.total,
+            "count": lambda s: s.latency.count,
+            "p99": lambda s: s.latency.quantile(0.99),
+        }
+        ordered = sorted(self.statements.values(), key=keys[order_by], reverse=True)
+        return [
+            {
+                "statement": stats.label,
+                "count": stats.latency.count,
+                "errors": stats.errors,
+                "total_ms": round(stats.latency.total, 2),
+                "mean_ms": round(stats.latency.mean, 3),
+                "p50_ms": round(stats.latency.quantile(0.5), 3),
+                "p95_ms": round(stats.latency.quantile(0.95), 3),
+                "p99_ms": round(stats.latency.quantile(0.99), 3),
+                "max_ms": round(stats.latency.max, 3),
+            }
+            for stats in ordered[:limit]
+        ]
+
+    def slow_statements(self, limit: int = SLOW_SAMPLES) -> List[Dict[str, Any]]:
+        return [
+            {"timestamp": timestamp, "statement": label, "duration_ms": duration_ms}
+            for timestamp, label, duration_ms in list(self.slow)[-limit:]
+        ]
+
+    def overall_latency(self) -> LatencySketch:
+        sketch = LatencySketch()
+        for stats in self.statements.values():
+            sketch.merge(stats.latency)
+        return sketch
+
+    def pool_status(self, engine: Optional[Any] = None) -> Dict[str, Any]:
+        """Pool occupancy and checkout wait times, for /health."""
+        status: Dict[str, Any] = {"initialized": engine is not None}
+        if engine is not None:
+            pool = getattr(engine, "sync_engine", engine).pool
+            status["pool_class"] = type(pool).__name__
+            if hasattr(pool, "checkedout"):
+                status.update({
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                    "timeout_s": pool.timeout(),
+                })
+        wait = self.pool_wait
+        status["checkouts"] = wait.count
+        status["checkout_timeouts"] = self.pool_timeouts
+        status["wait_ms"] = {
+            "mean": round(wait.mean, 3),
+            "p50": round(wait.quantile(0.5), 3),
+            "p99": round(wait.quantile(0.99), 3),
+            "max": round(wait.max, 3),
+        }
+        statements = self.overall_latency()
+        status["statements"] = {
+            "count": statements.count,
+            "distinct": len(self.statements),
+            "p50_ms": round(statements.quantile(0.5), 3),
+            "p99_ms": round(statements.quantile(0.99), 3),
+        }
+        return status
+
+    def render_prometheus(self, prefix: str = "semptify_db", pool_status: Optional[Dict[str, Any]] = None) -> str:
+        """Prometheus text exposition of statement histograms and pool gauges."""
+        lines = [
+            f"# HELP {prefix}_statement_duration_seconds SQL statement latency",
+            f"# TYPE {prefix}_statement_duration_seconds histogram",
+        ]
+        bounds_ms = [bound * 1000 for bound in BUCKETS]
+        for stats in sorted(self.statements.values(), key=lambda s: s.label):
+            labels = f'statement="{_escape(stats.label)}"'
+            sketch = stats.latency
+            for bound, count in zip(BUCKETS, sketch.cumulative(bounds_ms)):
+                lines.append(f'{prefix}_statement_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{prefix}_statement_duration_seconds_bucket{{{labels},le="+Inf"}} {sketch.count}')
+            lines.append(f'{prefix}_statement_duration_seconds_sum{{{labels}}} {sketch.total / 1000:.6f}')
+            lines.append(f'{prefix}_statement_duration_seconds_count{{{labels}}} {sketch.count}')
+
+        wait = self.pool_wait
+        lines += [
+            "",
+            f"# HELP {prefix}_pool_wait_seconds Time to check a connection out of the pool",
+            f"# TYPE {prefix}_pool_wait_seconds histogram",
+        ]
+        for bound, count in zip(BUCKETS, wait.cumulative(bounds_ms)):
+            lines.append(f'{prefix}_pool_wait_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{prefix}_pool_wait_seconds_bucket{{le="+Inf"}} {wait.count}')
+        lines.append(f"{prefix}_pool_wait_seconds_sum {wait.total / 1000:.6f}")
+        lines.append(f"{prefix}_pool_wait_seconds_count {wait.count}")
+        lines += [
+            "",
+            f"# HELP {prefix}_pool_timeouts_total Connection checkouts that timed out",
+            f"# TYPE {prefix}_pool_timeouts_total counter",
+            f"{prefix}_pool_timeouts_total {self.pool_timeouts}",
+        ]
+
+        status = pool_status or {}
+        for name in ("size", "checked_out", "overflow"):
+            if name in status:
+                lines += [
+                    "",
+                    f"# TYPE {prefix}_pool_{name} gauge",
+                    f"{prefix}_pool_{name} {status[name]}",
+                ]
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+db_metrics = DatabaseMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time and timeouts."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            db_metrics.record_pool_wait((time.perf_counter() - start) * 1000, timed_out)
+
+
+def get_db_metrics() -> DatabaseMetrics:
+    """This worker's database metrics."""
+    return db_metrics
@@ -1,10 +1,27 @@
 """
 Event Bus - Central Nervous System for Semptify
 Enables bi-directional communication between all modules.
+
+Events are delivered to this worker's subscribers and WebSocket clients,
+and handed to a transport that carries them to the other workers:
+- LocalTransport (default): events stay in this process
+- RedisStreamTransport: Redis Streams, sharded by user_id so each user's
+  events arrive everywhere, and reach subscribers, in publish order
+
+Async subscribers run concurrently, each bounded by subscriber_timeout, so
+one slow callback cannot hold up the others. History is a fixed-size ring
+buffer.
+
+Configuration:
+    EVENT_BUS_BACKEND   local | redis (uses REDIS_URL; default: local)
 """
 
 import asyncio
-from typing import Any, Callable, Dict, List, Optional
+import functools
+import uuid
+import zlib
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
 from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
@@ -13,6 +30,13 @@ import json
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIBER_TIMEOUT = 10.0      # seconds an async subscriber may take per event
+STREAM_PREFIX = "semptify:events"
+STREAM_SHARDS = 4
+STREAM_MAXLEN = 10000
+REMOTE_DELIVERY_CONCURRENCY = 100  # events from other workers being delivered at once
+CLOSE_TIMEOUT = 5.0            # seconds close() waits for deliveries in flight
+
 
 class EventType(str, Enum):
     """All event types in the system"""
@@ -106,6 +130,164 @@ class Event:
     
     def to_json(self) -> str:
         return json.dumps(self.to_dict())
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Event":
+        return cls(
+            type=EventType(data["type"]),
+            data=data.get("data") or {},
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            source=data.get("source", "system"),
+            user_id=data.get("user_id"),
+        )
+
+
+class LocalTransport:
+    """In-process transport: events stay in this worker."""
+    name = "local"
+    
+    async def start(self, deliver: Callable[[Event], Awaitable[None]]) -> bool:
+        return True
+    
+    async def send(self, event: Event) -> None:
+        pass
+    
+    async def close(self) -> None:
+        pass
+
+
+class RedisStreamTransport:
+    """
+    Carries events between workers on Redis Streams.
+    
+    Each event goes to one of `shards` streams chosen by user_id, so every
+    event for a user passes through a single stream and is read back in the
+    order it was published. Streams are trimmed to about `maxlen` entries.
+    A worker skips the events it wrote itself.
+    
+    Each received event is delivered in its own task. A user's events are
+    delivered one after another, in stream order: each task waits for the
+    previous one for the same user_id (events without one form their own
+    chain). Different users' events are delivered concurrently, so a hung
+    subscriber only holds up the events of the user it hung on. At most
+    `concurrency` deliveries (waiting or running) exist at once; past that
+    the reader waits. close() gives deliveries in flight `close_timeout`
+    seconds, then cancels them.
+    """
+    name = "redis"
+    
+    def __init__(self, redis_url: str = "", client: Any = None, prefix: str = STREAM_PREFIX,
+                 shards: int = STREAM_SHARDS, maxlen: int = STREAM_MAXLEN,
+                 concurrency: int = REMOTE_DELIVERY_CONCURRENCY, close_timeout: float = CLOSE_TIMEOUT):
+        self._redis_url = redis_url
+        self._redis = client
+        self._owns_client = client is None
+        self.streams = [f"{prefix}:{i}" for i in range(shards)]
+        self.maxlen = maxlen
+        self.concurrency = concurrency
+        self.close_timeout = close_timeout
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._deliveries: set = set()
+        # Last delivery per user_id, which the user's next delivery waits for
+        self._tails: Dict[str, asyncio.Task] = {}
+        self._delivery_slots: Optional[asyncio.Semaphore] = None
+    
+    def stream_for(self, user_id: Optional[str]) -> str:
+        return self.streams[zlib.crc32((user_id or "").encode()) % len(self.streams)]
+    
+    async def start(self, deliver: Callable[[Event], Awaitable[None]]) -> bool:
+        try:
+            if self._redis is None:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(self._redis_url, encoding="utf-8", decode_responses=True)
+            await self._redis.ping()
+            # Start after the newest entry of each stream; older events are history
+            last_ids = {}
+            for stream in self.streams:
+                newest = await self._redis.xrevrange(stream, count=1)
+                last_ids[stream] = newest[0][0] if newest else "0-0"
+        except ImportError:
+            logger.warning("redis package not installed, event bus stays in-process")
+            return False
+        except Exception as e:
+            logger.warning("Event bus Redis connection failed: %s", e)
+            return False
+        self._delivery_slots = asyncio.Semaphore(self.concurrency)
+        self._listener = asyncio.create_task(self._listen(last_ids, deliver))
+        logger.info("Event bus using Redis Streams (%d shards)", len(self.streams))
+        return True
+    
+    async def send(self, event: Event) -> None:
+        try:
+            await self._redis.xadd(
+                self.stream_for(event.user_id),
+                {"event": event.to_json(), "origin": self.instance_id},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        except Exception as e:
+            logger.error("Event bus publish to Redis failed: %s", e)
+    
+    async def _listen(self, last_ids: Dict[str, str], deliver: Callable[[Event], Awaitable[None]]) -> None:
+        while True:
+            try:
+                response = await self._redis.xread(last_ids, count=100, block=1000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Event bus Redis read failed: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            for stream, entries in response or ():
+                for entry_id, fields in entries:
+                    last_ids[stream] = entry_id
+                    if fields.get("origin") == self.instance_id:
+                        continue
+                    try:
+                        event = Event.from_dict(json.loads(fields["event"]))
+                    except (KeyError, TypeError, ValueError) as e:
+                        logger.warning("Skipping malformed event %s: %s", entry_id, e)
+                        continue
+                    await self._delivery_slots.acquire()
+                    key = event.user_id or ""
+                    task = asyncio.create_task(self._deliver_after(self._tails.get(key), deliver, event))
+                    self._tails[key] = task
+                    self._deliveries.add(task)
+                    task.add_done_callback(functools.partial(self._delivery_done, key))
+    
+    @staticmethod
+    async def _deliver_after(previous: Optional[asyncio.Task], deliver: Callable[[Event], Awaitable[None]],
+                             event: Event) -> None:
+        if previous is not None:
+            # Whatever its outcome; it reports its own failure
+            await asyncio.wait([previous])
+        await deliver(event)
+    
+    def _delivery_done(self, key: str, task: asyncio.Task) -> None:
+        self._deliveries.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+        self._delivery_slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Event bus delivery failed: %s", task.exception())
+    
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        # Sync subscribers and direct WebSocket writes have no timeout of their own
+        if self._deliveries:
+            _, stuck = await asyncio.wait(set(self._deliveries), timeout=self.close_timeout)
+            for task in stuck:
+                task.cancel()
+            if stuck:
+                logger.warning("Event bus cancelled %d remote deliveries on close", len(stuck))
+                await asyncio.gather(*stuck, return_exceptions=True)
+        if self._redis is not None and self._owns_client:
+            await self._redis.aclose()
+            self._redis = None
 
 
 class EventBus:
@@ -128,8 +310,17 @@ class EventBus:
         self._subscribers: Dict[EventType, List[Callable]] = {}
         self._async_subscribers: Dict[EventType, List[Callable]] = {}
         self._websocket_connections: Dict[str, List[Any]] = {}  # user_id -> websockets
-        self._event_history: List[Event] = []
         self._max_history = 1000
+        self._event_history: Deque[Event] = deque(maxlen=self._max_history)
+        self._transport: Any = LocalTransport()
+        self._pending: set = set()
+        self.subscriber_timeout = SUBSCRIBER_TIMEOUT
+        self.stats = {
+            "published": 0,
+            "received": 0,
+            "subscriber_errors": 0,
+            "subscriber_timeouts": 0,
+        }
         self._initialized = True
         
         logger.info("🚌 EventBus initialized")
@@ -159,6 +350,22 @@ class EventBus:
                 cb for cb in self._async_subscribers[event_type] if cb != callback
             ]
     
+    @property
+    def transport(self) -> str:
+        return self._transport.name
+    
+    async def start_transport(self, transport: Any) -> bool:
+        """Switch to a cross-worker transport; stays in-process if it cannot start."""
+        await self.stop_transport()
+        if not await transport.start(self._deliver_remote):
+            return False
+        self._transport = transport
+        return True
+    
+    async def stop_transport(self) -> None:
+        transport, self._transport = self._transport, LocalTransport()
+        await transport.close()
+    
     async def publish(
         self,
         event_type: EventType,
@@ -176,32 +383,14 @@ class EventBus:
             source=source,
             user_id=user_id,
         )
-        
-        # Store in history
-        self._event_history.append(event)
-        if len(self._event_history) > self._max_history:
-            self._event_history = self._event_history[-self._max_history:]
+        self._record(event)
+        self.stats["published"] += 1
         
         logger.info(f"📢 Event: {event_type.value} from {source}")
         
-        # Call sync subscribers
-        if event_type in self._subscribers:
-            for callback in self._subscribers[event_type]:
-                try:
-                    callback(event)
-                except Exception as e:
-                    logger.error(f"Error in sync subscriber {callback.__name__}: {e}")
-        
-        # Call async subscribers
-        if event_type in self._async_subscribers:
-            for callback in self._async_subscribers[event_type]:
-                try:
-                    await callback(event)
-                except Exception as e:
-                    logger.error(f"Error in async subscriber {callback.__name__}: {e}")
-        
-        # Push to WebSocket connections
-        await self._push_to_websockets(event, user_id)
+        await self._transport.send(event)
+        self._call_sync_subscribers(event)
+        await self._process_async_subscribers(event, user_id)
         
         return event
     
@@ -219,59 +408,95 @@ class EventBus:
             source=source,
             user_id=user_id,
         )
-        
-        self._event_history.append(event)
-        if len(self._event_history) > self._max_history:
-            self._event_history = self._event_history[-self._max_history:]
+        self._record(event)
+        self.stats["published"] += 1
         
         # Call sync subscribers only
-        if event_type in self._subscribers:
-            for callback in self._subscribers[event_type]:
-                try:
-                    callback(event)
-                except Exception as e:
-                    logger.error(f"Error in sync subscriber: {e}")
+        self._call_sync_subscribers(event)
         
         # Schedule async work
         try:
             loop = asyncio.get_event_loop()
             if loop.is_running():
-                asyncio.create_task(self._process_async_subscribers(event, user_id))
+                task = loop.create_task(self._send_and_process(event, user_id))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
         except RuntimeError:
             pass  # No event loop, skip async
         
         return event
     
+    async def _send_and_process(self, event: Event, user_id: Optional[str]):
+        await self._transport.send(event)
+        await self._process_async_subscribers(event, user_id)
+    
+    async def _deliver_remote(self, event: Event):
+        """Deliver an event published by another worker."""
+        self._record(event)
+        self.stats["received"] += 1
+        self._call_sync_subscribers(event)
+        await self._process_async_subscribers(event, event.user_id)
+    
+    def _record(self, event: Event):
+        self._event_history.append(event)
+    
+    def _call_sync_subscribers(self, event: Event):
+        for callback in self._subscribers.get(event.type, ()):
+            try:
+                callback(event)
+            except Exception as e:
+                self.stats["subscriber_errors"] += 1
+                logger.error(f"Error in sync subscriber {getattr(callback, '__name__', callback)}: {e}")
+    
     async def _process_async_subscribers(self, event: Event, user_id: Optional[str]):
-        """Process async subscribers and websockets"""
-        if event.type in self._async_subscribers:
-            for callback in self._async_subscribers[event.type]:
-                try:
-                    await callback(event)
-                except Exception as e:
-                    logger.error(f"Error in async subscriber: {e}")
-        
+        """Push to websockets, then run async subscribers concurrently"""
         await self._push_to_websockets(event, user_id)
+        
+        callbacks = self._async_subscribers.get(event.type)
+        if callbacks:
+            await asyncio.gather(*(self._run_async_subscriber(callback, event) for callback in callbacks))
+    
+    async def _run_async_subscriber(self, callback: Callable, event: Event):
+        name = getattr(callback, "__name__", repr(callback))
+        try:
+            await asyncio.wait_for(callback(event), self.subscriber_timeout)
+        except asyncio.TimeoutError:
+            self.stats["subscriber_timeouts"] += 1
+            logger.warning(f"Async subscriber {name} timed out on {event.type.value}")
+        except Exception as e:
+            self.stats["subscriber_errors"] += 1
+            logger.error(f"Error in async subscriber {name}: {e}")
     
     async def _push_to_websockets(self, event: Event, user_id: Optional[str]):
-        """Push event to connected WebSocket clients"""
-        message = event.to_json()
-        
+        """
+        Push event to connected WebSocket clients.
+
+        The event is encoded once. Sockets that also belong to the
+        WebSocketManager get it through their outbound queue, so a slow
+        client never holds up the others; any other socket is written
+        directly.
+        """
+        from app.core.websocket_manager import OutboundMessage, get_websocket_manager
+
+        targets: List[Any] = []
         # Push to specific user if user_id provided
         if user_id and user_id in self._websocket_connections:
-            for ws in self._websocket_connections[user_id]:
-                try:
-                    await ws.send_text(message)
-                except Exception as e:
-                    logger.error(f"WebSocket send error: {e}")
-        
+            targets.extend(self._websocket_connections[user_id])
         # Also push to broadcast connections (user_id = "broadcast")
         if "broadcast" in self._websocket_connections:
-            for ws in self._websocket_connections["broadcast"]:
-                try:
-                    await ws.send_text(message)
-                except Exception as e:
-                    logger.error(f"WebSocket broadcast error: {e}")
+            targets.extend(self._websocket_connections["broadcast"])
+        if not targets:
+            return
+
+        message = OutboundMessage(event.to_json())
+        manager = get_websocket_manager()
+        for ws in targets:
+            if manager.send_to_websocket(ws, message):
+                continue
+            try:
+                await ws.send_text(message.text)
+            except Exception as e:
+                logger.error(f"WebSocket send error: {e}")
     
     def register_websocket(self, websocket: Any, user_id: str = "broadcast") -> None:
         """Register a WebSocket connection"""
@@ -294,7 +519,7 @@ class EventBus:
         limit: int = 100,
     ) -> List[Event]:
         """Get recent events from history"""
-        events = self._event_history
+        events = list(self._event_history)
         
         if event_type:
             events = [e for e in events if e.type == event_type]
@@ -306,13 +531,34 @@ class EventBus:
     
     def clear_history(self) -> None:
         """Clear event history"""
-        self._event_history = []
+        self._event_history.clear()
 
 
 # Global singleton instance
 event_bus = EventBus()
 
 
+async def start_event_transport() -> str:
+    """Connect the event bus to the configured cross-worker backend."""
+    from app.core.config import get_settings
+    
+    settings = get_settings()
+    backend = settings.event_bus_backend.lower()
+    if backend == "redis":
+        if not settings.redis_url:
+            logger.warning("EVENT_BUS_BACKEND=redis but REDIS_URL is not set; event bus stays in-process")
+        else:
+            await event_bus.start_transport(RedisStreamTransport(settings.redis_url))
+    elif backend != "local":
+        logger.warning(f"Unknown EVENT_BUS_BACKEND {backend!r}; event bus stays in-process")
+    return event_bus.transport
+
+
+async def stop_event_transport() -> None:
+    """Disconnect the event bus from its cross-worker backend."""
+    await event_bus.stop_transport()
+
+
 # Convenience functions
 async def publish_event(
     event_type: EventType,
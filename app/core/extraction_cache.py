@@ -0,0 +1,246 @@
+"""
+Content-Addressed Extraction Cache
+==================================
+
+Maps (SHA-256 of a file, extractor, extractor version) to what was
+extracted from it - text, per-page layout, OCR confidence - so a document
+is parsed and OCR'd once, whichever entry point sees it first.
+
+- One SQLite file (WAL mode), shared by every worker process.
+- Payloads are JSON compressed with zstd when the zstandard package is
+  installed, zlib otherwise; the codec is stored per row.
+- Bounded by size: writes that push the file over EXTRACTION_CACHE_MAX_MB
+  evict least recently used entries. Entry and byte totals live in a
+  one-row table kept by triggers, so writes never scan the store; it is
+  recounted once when the cache is opened.
+
+Usage:
+    cache = get_extraction_cache()
+    if cache:
+        value = await cache.aget(digest, "pdf", "2")
+        ...
+        await cache.aput(digest, "pdf", "2", {"text": text, "pages": [...]})
+
+Configuration:
+    EXTRACTION_CACHE_PATH     SQLite file (default data/extraction_cache/cache.db)
+    EXTRACTION_CACHE_MAX_MB   size bound (default 512; 0 = cache disabled)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+DEFAULT_DB_PATH = "data/extraction_cache/cache.db"
+EVICT_TO = 0.9                  # eviction frees space down to this fraction of the bound
+ACCESS_WRITE_INTERVAL = 60.0    # hits only rewrite last_access when it is older than this
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 hex digest, the same key uploads already compute."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    if HAS_ZSTD:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, data: bytes) -> Optional[bytes]:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data) if HAS_ZSTD else None
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return None
+
+
+class ExtractionCache:
+    """Size-bounded LRU store of extraction results keyed by content hash."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                content_hash TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                version TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, extractor, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_extractions_lru ON extractions (last_access);
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                entries INTEGER NOT NULL,
+                bytes INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS extractions_insert AFTER INSERT ON extractions BEGIN
+                UPDATE totals SET entries = entries + 1, bytes = bytes + new.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS extractions_delete AFTER DELETE ON extractions BEGIN
+                UPDATE totals SET entries = entries - 1, bytes = bytes - old.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS extractions_resize AFTER UPDATE OF size ON extractions BEGIN
+                UPDATE totals SET bytes = bytes - old.size + new.size WHERE id = 0;
+            END;
+        """)
+        self.stats_counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO totals "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._entries, self._bytes = self._totals()
+
+    def _totals(self) -> tuple[int, int]:
+        count, total = self._conn.execute("SELECT entries, bytes FROM totals WHERE id = 0").fetchone()
+        return count, total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, digest: str, extractor: str, version: str) -> Optional[dict[str, Any]]:
+        """Cached value, or None on a miss."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT codec, payload, last_access FROM extractions "
+                    "WHERE content_hash = ? AND extractor = ? AND version = ?",
+                    (digest, extractor, version),
+                ).fetchone()
+                if row is not None and time.time() - row[2] > ACCESS_WRITE_INTERVAL:
+                    self._conn.execute(
+                        "UPDATE extractions SET last_access = ? "
+                        "WHERE content_hash = ? AND extractor = ? AND version = ?",
+                        (time.time(), digest, extractor, version),
+                    )
+            data = _decompress(row[0], row[1]) if row is not None else None
+        except (sqlite3.Error, zlib.error) as e:
+            self.stats_counters["errors"] += 1
+            logger.warning(f"Extraction cache read failed: {e}")
+            data = None
+        if data is None:
+            self.stats_counters["misses"] += 1
+            return None
+        self.stats_counters["hits"] += 1
+        return json.loads(data)
+
+    def put(self, digest: str, extractor: str, version: str, value: dict[str, Any]) -> None:
+        """Store a value, evicting least recently used entries past the size bound."""
+        codec, payload = _compress(json.dumps(value, default=str).encode())
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # An upsert rather than OR REPLACE: REPLACE deletes without
+                    # firing the delete trigger
+                    self._conn.execute(
+                        "INSERT INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (content_hash, extractor, version) DO UPDATE SET "
+                        "codec = excluded.codec, payload = excluded.payload, size = excluded.size, "
+                        "created_at = excluded.created_at, last_access = excluded.last_access",
+                        (digest, extractor, version, codec, payload, len(payload), now, now),
+                    )
+                    self._entries, self._bytes = self._evict()
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self.stats_counters["writes"] += 1
+        except sqlite3.Error as e:
+            self.stats_counters["errors"] += 1
+            logger.warning(f"Extraction cache write failed: {e}")
+
+    def _evict(self) -> tuple[int, int]:
+        """Delete least recently used entries past the bound; returns the new totals."""
+        count, total = self._totals()
+        if total <= self.max_bytes:
+            return count, total
+        excess = total - int(self.max_bytes * EVICT_TO)
+        victims, freed = [], 0
+        for rowid, size in self._conn.execute("SELECT rowid, size FROM extractions ORDER BY last_access"):
+            victims.append((rowid,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM extractions WHERE rowid = ?", victims)
+        self.stats_counters["evictions"] += len(victims)
+        return count - len(victims), total - freed
+
+    async def aget(self, digest: str, extractor: str, version: str) -> Optional[dict[str, Any]]:
+        return await asyncio.to_thread(self.get, digest, extractor, version)
+
+    async def aput(self, digest: str, extractor: str, version: str, value: dict[str, Any]) -> None:
+        await asyncio.to_thread(self.put, digest, extractor, version, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._entries, self._bytes = 0, 0
+
+    def stats(self) -> dict[str, Any]:
+        """This process's hit/miss counters plus the store's size as of its last write."""
+        lookups = self.stats_counters["hits"] + self.stats_counters["misses"]
+        return {
+            **self.stats_counters,
+            "hit_rate": round(self.stats_counters["hits"] / lookups, 4) if lookups else None,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "codec": "zstd" if HAS_ZSTD else "zlib",
+        }
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Shared extraction cache (None when EXTRACTION_CACHE_MAX_MB is 0)."""
+    global _cache
+    if _cache is None:
+        from app.core.config import get_settings
+        settings = get_settings()
+        if settings.extraction_cache_max_mb <= 0:
+            return None
+        _cache = ExtractionCache(settings.extraction_cache_path, settings.extraction_cache_max_mb * 1024 * 1024)
+    return _cache
+
+
+def close_extraction_cache() -> None:
+    """Close the shared cache's database connection (called on application shutdown)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
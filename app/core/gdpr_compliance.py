@@ -159,7 +159,7 @@ class GDPRComplianceManager:
         
         return request_id
     
-    def process_data_request(self, request_id: str) -> bool:
+    async def process_data_request(self, request_id: str) -> bool:
         """Process a data subject request."""
         request = self.data_requests.get(request_id)
         if not request:
@@ -170,9 +170,9 @@ class GDPRComplianceManager:
         
         try:
             if request.request_type == "access":
-                success = self._process_access_request(request)
+                success = await self._process_access_request(request)
             elif request.request_type == "portability":
-                success = self._process_portability_request(request)
+                success = await self._process_portability_request(request)
             elif request.request_type == "deletion":
                 success = self._process_deletion_request(request)
             elif request.request_type == "rectification":
@@ -196,11 +196,11 @@ class GDPRComplianceManager:
             logger.error(f"Error processing data request {request_id}: {e}")
             return False
     
-    def _process_access_request(self, request: DataSubjectRequest) -> bool:
+    async def _process_access_request(self, request: DataSubjectRequest) -> bool:
         """Process data access request."""
         try:
             # Collect all user data
-            user_data = self._collect_user_data(request.user_id)
+            user_data = await self._collect_user_data(request.user_id)
             
             # Create JSON export
             export_data = {
@@ -225,11 +225,11 @@ class GDPRComplianceManager:
             logger.error(f"Error processing access request: {e}")
             return False
     
-    def _process_portability_request(self, request: DataSubjectRequest) -> bool:
+    async def _process_portability_request(self, request: DataSubjectRequest) -> bool:
         """Process data portability request."""
         try:
             # Collect user data
-            user_data = self._collect_user_data(request.user_id)
+            user_data = await self._collect_user_data(request.user_id)
             
             # Create ZIP file with structured data
             zip_buffer = io.BytesIO()
@@ -303,13 +303,13 @@ class GDPRComplianceManager:
         logger.info(f"Rectification request {request_id} requires manual review")
         return True
     
-    def _collect_user_data(self, user_id: str) -> Dict[str, Any]:
+    async def _collect_user_data(self, user_id: str) -> Dict[str, Any]:
         """Collect all user data for export."""
         user_data = {
             "user_id": user_id,
             "consent_records": [consent.to_dict() for consent in self.get_user_consents(user_id)],
             "documents": self._get_user_documents(user_id),
-            "audit_events": self._get_user_audit_events(user_id),
+            "audit_events": await self._get_user_audit_events(user_id),
             "storage_info": self._get_user_storage_info(user_id),
             "account_info": self._get_user_account_info(user_id)
         }
@@ -339,12 +339,12 @@ class GDPRComplianceManager:
             logger.error(f"Error getting user documents: {e}")
             return []
     
-    def _get_user_audit_events(self, user_id: str) -> List[Dict[str, Any]]:
+    async def _get_user_audit_events(self, user_id: str) -> List[Dict[str, Any]]:
         """Get user audit events."""
         try:
             from app.core.audit_logger import get_audit_logger
             audit_logger = get_audit_logger()
-            events = audit_logger.get_user_events(user_id, limit=1000)
+            events = await audit_logger.get_user_events(user_id, limit=None)
             
             return [event.to_dict() for event in events]
         except Exception as e:
@@ -3,23 +3,58 @@ Job Processor - Background Task Processing System
 ============================================
 
 Handles asynchronous background jobs for document analysis and processing.
+
+Jobs live in a persistent SQLite queue (JobStore), so queued, delayed and
+in-flight jobs survive a restart. Workers take jobs with a lease: a job is
+running until its lease expires, after which any worker may take it again,
+so every job runs at least once. Handlers must therefore be idempotent.
+
+Execution happens on one long-lived event loop in a background thread:
+- async handlers run as tasks on that loop
+- sync handlers run in a thread, or in a process pool when registered
+  with cpu_bound=True (the handler must then be a picklable module-level
+  function)
+
+Retries back off exponentially. Delayed jobs are kept in a timer heap so
+the dispatcher wakes exactly when the next one is due instead of polling.
+Concurrency is limited overall (max_workers) and per job type.
+
+Usage:
+    processor = get_job_processor()
+    processor.register_handler("ocr", ocr_pages, concurrency=2, cpu_bound=True)
+    job_id = processor.submit_job("ocr", {"document_id": "doc_123"})
+
+Configuration:
+    JOB_QUEUE_DB          SQLite file for the queue (default: data/jobs/jobs.db)
+    JOB_PROCESS_WORKERS   process pool size for cpu_bound handlers (default: CPU count)
 """
 
 import logging
 import asyncio
+import multiprocessing
 from app.core.id_gen import make_id
+import heapq
 import json
+import os
+import sqlite3
 import time
-from typing import Dict, Any, List, Optional, Callable, Union
-from datetime import datetime, timezone, timedelta
-from dataclasses import dataclass, asdict, field
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
 from enum import Enum
-from collections import defaultdict, deque
 import threading
-import traceback
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DB_PATH = "data/jobs/jobs.db"
+LEASE_GRACE_SECONDS = 30       # visibility timeout = job timeout + grace
+POLL_INTERVAL = 1.0            # picks up jobs submitted by other processes
+RETRY_BASE_SECONDS = 10.0
+RETRY_MAX_SECONDS = 300.0
+
+
 class JobStatus(Enum):
     """Job status types."""
     PENDING = "pending"
@@ -36,6 +71,17 @@ class JobPriority(Enum):
     HIGH = 3
     URGENT = 4
 
+FINISHED_STATUSES = (JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value)
+
+
+def _to_datetime(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
 @dataclass
 class Job:
     """Background job definition."""
@@ -54,7 +100,8 @@ class Job:
     timeout_seconds: int = 300
     progress: float = 0.0
     user_id: Optional[str] = None
-    
+    available_at: float = 0.0      # epoch seconds; later than now while delayed
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
         return {
@@ -74,217 +121,527 @@ class Job:
             "user_id": self.user_id
         }
 
-class JobQueue:
-    """Priority-based job queue."""
-    
-    def __init__(self, max_size: int = 10000):
-        self.max_size = max_size
-        self._queues: Dict[JobPriority, deque] = {
-            priority: deque() for priority in JobPriority
-        }
+
+class JobStore:
+    """
+    Persistent job queue in SQLite (WAL mode, safe to share between processes).
+
+    lease() claims due jobs atomically: pending jobs whose available_at has
+    passed, plus running jobs whose lease expired (their worker died).
+    """
+
+    COLUMNS = (
+        "id", "type", "payload", "status", "priority", "user_id", "created_at",
+        "started_at", "completed_at", "available_at", "lease_expires", "lease_owner",
+        "retry_count", "max_retries", "timeout_seconds", "progress", "result", "error_message",
+    )
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
         self._lock = threading.Lock()
-        self._not_empty = threading.Condition(self._lock)
-    
-    def put(self, job: Job):
-        """Add job to queue."""
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                user_id TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                completed_at REAL,
+                available_at REAL NOT NULL,
+                lease_expires REAL,
+                lease_owner TEXT,
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL DEFAULT 3,
+                timeout_seconds INTEGER NOT NULL DEFAULT 300,
+                progress REAL NOT NULL DEFAULT 0,
+                result TEXT,
+                error_message TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (priority DESC, available_at)
+                WHERE status IN ('pending', 'retrying');
+            CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (lease_expires) WHERE status = 'running';
+            CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at);
+        """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(job: Job, lease_expires: Optional[float] = None, lease_owner: Optional[str] = None) -> tuple:
+        return (
+            job.id, job.type, json.dumps(job.payload, default=str), job.status.value,
+            job.priority.value, job.user_id, job.created_at.timestamp(),
+            _to_timestamp(job.started_at), _to_timestamp(job.completed_at), job.available_at,
+            lease_expires, lease_owner, job.retry_count, job.max_retries, job.timeout_seconds,
+            job.progress, json.dumps(job.result, default=str) if job.result is not None else None,
+            job.error_message,
+        )
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row[0], type=row[1], payload=json.loads(row[2]), status=JobStatus(row[3]),
+            priority=JobPriority(row[4]), user_id=row[5], created_at=_to_datetime(row[6]),
+            started_at=_to_datetime(row[7]), completed_at=_to_datetime(row[8]), available_at=row[9],
+            retry_count=row[12], max_retries=row[13], timeout_seconds=row[14], progress=row[15],
+            result=json.loads(row[16]) if row[16] is not None else None, error_message=row[17],
+        )
+
+    def insert(self, job: Job) -> None:
+        placeholders = ",".join("?" * len(self.COLUMNS))
+        with self._lock:
+            self._conn.execute(f"INSERT INTO jobs VALUES ({placeholders})", self._row(job))
+
+    def save(self, job: Job) -> None:
+        """Write back a job's state and release its lease."""
+        self.save_many([job])
+
+    def save_many(self, jobs: List[Job]) -> None:
+        """Write back several jobs in one transaction."""
+        placeholders = ",".join("?" * len(self.COLUMNS))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO jobs VALUES ({placeholders})",
+                    [self._row(job) for job in jobs],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def lease(self, owner: str, types: Iterable[str], limit: int, now: Optional[float] = None) -> List[Job]:
+        """Claim up to limit due jobs of the given types, highest priority first."""
+        types = list(types)
+        if limit <= 0 or not types:
+            return []
+        now = time.time() if now is None else now
+        marks = ",".join("?" * len(types))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases first (rare), then due jobs in priority order
+                rows = self._conn.execute(
+                    f"""SELECT * FROM jobs
+                        WHERE status = 'running' AND lease_expires < ? AND type IN ({marks})
+                        LIMIT ?""",
+                    (now, *types, limit),
+                ).fetchall()
+                if len(rows) < limit:
+                    rows += self._conn.execute(
+                        f"""SELECT * FROM jobs
+                            WHERE status IN ('pending', 'retrying') AND available_at <= ? AND type IN ({marks})
+                            ORDER BY priority DESC, available_at
+                            LIMIT ?""",
+                        (now, *types, limit - len(rows)),
+                    ).fetchall()
+                jobs = [self._job(row) for row in rows]
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'running', started_at = ?, lease_expires = ?, lease_owner = ? "
+                    "WHERE id = ?",
+                    [(now, now + job.timeout_seconds + LEASE_GRACE_SECONDS, owner, job.id) for job in jobs],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        for job in jobs:
+            job.status = JobStatus.RUNNING
+            job.started_at = _to_datetime(now)
+        return jobs
+
+    def release(self, owner: str) -> int:
+        """Hand jobs still leased by owner back to the queue (clean shutdown)."""
         with self._lock:
-            if len(self) >= self.max_size:
-                # Remove oldest low priority job if needed
-                self._remove_oldest_low_priority()
-            
-            self._queues[job.priority].append(job)
-            self._not_empty.notify()
-    
-    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
-        """Get next job from queue."""
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', lease_expires = NULL, lease_owner = NULL, started_at = NULL "
+                "WHERE status = 'running' AND lease_owner = ?",
+                (owner,),
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', completed_at = ? "
+                "WHERE id = ? AND status IN ('pending', 'retrying')",
+                (time.time(), job_id),
+            )
+            return cursor.rowcount == 1
+
+    def user_jobs(self, user_id: str, status: Optional[JobStatus] = None, limit: int = 200) -> List[Job]:
+        query = "SELECT * FROM jobs WHERE user_id = ?"
+        params: list = [user_id]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status.value)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        with self._lock:
+            by_status = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+            by_priority = dict(self._conn.execute(
+                "SELECT priority, COUNT(*) FROM jobs WHERE status IN ('pending', 'retrying') GROUP BY priority"
+            ).fetchall())
+            delayed = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'retrying') AND available_at > ?",
+                (now,),
+            ).fetchone()[0]
+        return {"by_status": by_status, "by_priority": by_priority, "delayed": delayed}
+
+    def next_available(self) -> Optional[float]:
+        """Earliest available_at among waiting jobs (to rebuild the timer heap)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status IN ('pending', 'retrying')"
+            ).fetchone()[0]
+
+    def purge_finished(self, keep: int) -> int:
+        """Delete all but the newest keep finished jobs."""
+        marks = ",".join("?" * len(FINISHED_STATUSES))
         with self._lock:
-            # Wait for job to be available
-            while self.is_empty():
-                if not self._not_empty.wait(timeout):
-                    return None
-            
-            # Get highest priority job
-            for priority in sorted(JobPriority, key=lambda p: p.value, reverse=True):
-                if self._queues[priority]:
-                    return self._queues[priority].popleft()
-            
-            return None
-    
-    def is_empty(self) -> bool:
-        """Check if queue is empty."""
-        return all(len(queue) == 0 for queue in self._queues.values())
-    
-    def __len__(self) -> int:
-        """Get total queue size."""
-        return sum(len(queue) for queue in self._queues.values())
-    
-    def _remove_oldest_low_priority(self):
-        """Remove oldest low priority job."""
-        if self._queues[JobPriority.LOW]:
-            self._queues[JobPriority.LOW].popleft()
+            cursor = self._conn.execute(
+                f"""DELETE FROM jobs WHERE status IN ({marks}) AND id NOT IN (
+                        SELECT id FROM jobs WHERE status IN ({marks})
+                        ORDER BY completed_at DESC LIMIT ?)""",
+                (*FINISHED_STATUSES, *FINISHED_STATUSES, keep),
+            )
+            return cursor.rowcount
+
+
+@dataclass
+class _Handler:
+    func: Callable
+    concurrency: Optional[int] = None
+    cpu_bound: bool = False
+
 
 class JobProcessor:
     """Background job processor."""
-    
-    def __init__(self, max_workers: int = 4):
+
+    def __init__(self, max_workers: int = 4, store: Optional[JobStore] = None,
+                 process_workers: Optional[int] = None):
         self.max_workers = max_workers
-        self.job_queue = JobQueue()
+        self.store = store or JobStore(os.getenv("JOB_QUEUE_DB", DEFAULT_DB_PATH))
+        self.owner = f"{os.getpid()}-{make_id('w')}"
         self.running_jobs: Dict[str, Job] = {}
-        self.completed_jobs: Dict[str, Job] = {}
-        self.job_handlers: Dict[str, Callable] = {}
-        
-        # Worker threads
-        self.workers: List[threading.Thread] = []
-        self.shutdown_event = threading.Event()
-        
+        self._finished: Dict[str, Job] = {}    # done, not yet written back
+        self.job_handlers: Dict[str, _Handler] = {}
+        self.process_workers = process_workers
+        self.retry_base_seconds = RETRY_BASE_SECONDS
+        self.retry_max_seconds = RETRY_MAX_SECONDS
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks: set = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running_by_type: Dict[str, int] = {}
+        self._timers: List[float] = []      # heap of available_at for delayed jobs
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._notify_loop: Optional[asyncio.AbstractEventLoop] = None
+
         # Statistics
         self.stats = {
             "jobs_processed": 0,
             "jobs_failed": 0,
             "jobs_cancelled": 0,
+            "jobs_retried": 0,
             "total_processing_time": 0.0,
             "average_processing_time": 0.0
         }
-        
+
         # Job retention
         self.max_completed_jobs = 1000
-        
-    def register_handler(self, job_type: str, handler: Callable):
-        """Register a job handler."""
-        self.job_handlers[job_type] = handler
+        self._finished_since_purge = 0
+
+    @property
+    def workers(self) -> int:
+        return self.max_workers if self._thread is not None else 0
+
+    def register_handler(self, job_type: str, handler: Callable,
+                         concurrency: Optional[int] = None, cpu_bound: bool = False):
+        """
+        Register a job handler.
+
+        concurrency caps how many jobs of this type run at once; cpu_bound
+        sends a sync handler to the process pool instead of a thread.
+        """
+        self.job_handlers[job_type] = _Handler(handler, concurrency, cpu_bound)
         logger.info(f"Registered job handler for type: {job_type}")
-    
-    def submit_job(self, job_type: str, payload: Dict[str, Any], 
+        self._wake()
+
+    def submit_job(self, job_type: str, payload: Dict[str, Any],
                   priority: JobPriority = JobPriority.NORMAL,
-                  user_id: str = None, **kwargs) -> str:
-        """Submit a new job."""
+                  user_id: str = None, delay_seconds: float = 0.0, **kwargs) -> str:
+        """Submit a new job (persisted before this returns)."""
         job_id = make_id("job")
-        
+        if "job_id" in payload:
+            payload = {**payload, "job_id": job_id}
+
         job = Job(
             id=job_id,
             type=job_type,
             payload=payload,
             priority=priority,
             user_id=user_id,
+            available_at=time.time() + delay_seconds,
             **kwargs
         )
-        
-        self.job_queue.put(job)
-        logger.info(f"Submitted job {job_id} of type {job_type}")
-        
+
+        self.store.insert(job)
+        self._capture_notify_loop()
+        if delay_seconds > 0:
+            self._call_soon(self._schedule_timer, job.available_at)
+        else:
+            self._wake()
+        logger.debug(f"Submitted job {job_id} of type {job_type}")
+
         return job_id
-    
+
     def start(self):
-        """Start the job processor."""
-        if self.workers:
+        """Start the job processor loop thread."""
+        if self._thread is not None:
             return  # Already started
-        
-        # Start worker threads
-        for i in range(self.max_workers):
-            worker = threading.Thread(target=self._worker_loop, name=f"JobWorker-{i}")
-            worker.daemon = True
-            worker.start()
-            self.workers.append(worker)
-        
+
+        self._stopping = False
+        self._capture_notify_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="JobProcessor", daemon=True)
+        self._thread.start()
+        ready.wait()
+
         logger.info(f"Started job processor with {self.max_workers} workers")
-    
-    def stop(self):
-        """Stop the job processor."""
-        self.shutdown_event.set()
-        
-        # Wait for workers to finish
-        for worker in self.workers:
-            worker.join(timeout=5)
-        
-        self.workers.clear()
-        logger.info("Stopped job processor")
-    
-    def _worker_loop(self):
-        """Worker thread main loop."""
-        while not self.shutdown_event.is_set():
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the job processor; unfinished jobs go back to the queue."""
+        if self._thread is None:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop)
+        try:
+            future.result(timeout + 5)
+        except Exception as e:
+            logger.warning(f"Job processor shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._loop = None
+
+        released = self.store.release(self.owner)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        logger.info(f"Stopped job processor ({released} unfinished jobs requeued)")
+
+    def _run_loop(self, ready: threading.Event):
+        """Background thread: one long-lived event loop for every job."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        next_due = self.store.next_available()
+        if next_due is not None:
+            self._timers = [next_due]
+        self._dispatcher = loop.create_task(self._dispatch())
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _call_soon(self, callback: Callable, *args):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
             try:
-                # Get next job
-                job = self.job_queue.get(timeout=1.0)
-                if job is None:
+                loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError:
+                pass  # loop shutting down
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._call_soon(self._wakeup.set)
+
+    def _schedule_timer(self, available_at: float):
+        heapq.heappush(self._timers, available_at)
+        self._wakeup.set()
+
+    def _capture_notify_loop(self):
+        """Remember the application's loop so notifications reach its WebSockets."""
+        try:
+            self._notify_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+
+    def _free_types(self) -> Dict[str, int]:
+        """Job types with spare capacity, and how many more each may start."""
+        free = {}
+        for job_type, handler in self.job_handlers.items():
+            limit = handler.concurrency or self.max_workers
+            spare = limit - self._running_by_type.get(job_type, 0)
+            if spare > 0:
+                free[job_type] = spare
+        return free
+
+    async def _dispatch(self):
+        """Lease due jobs whenever there is capacity, sleep until the next is due."""
+        while not self._stopping:
+            self._wakeup.clear()
+            self._flush_finished()
+            capacity = self.max_workers - len(self.running_jobs)
+            if capacity > 0:
+                free = self._free_types()
+                try:
+                    jobs = self.store.lease(self.owner, free, min(capacity, sum(free.values())))
+                except sqlite3.Error as e:
+                    logger.error(f"Job lease failed: {e}")
+                    jobs = []
+                started = handed_back = 0
+                for job in jobs:
+                    if free.get(job.type, 0) <= 0:
+                        # Over this type's share of the batch; hand it straight back
+                        job.status = JobStatus.PENDING
+                        job.started_at = None
+                        self.store.save(job)
+                        handed_back += 1
+                        continue
+                    free[job.type] -= 1
+                    self._start(job)
+                    started += 1
+                if started == capacity or handed_back:
+                    await asyncio.sleep(0)
                     continue
-                
-                # Process job
-                self._process_job(job)
-                
-            except Exception as e:
-                logger.error(f"Worker error: {e}")
-    
-    def _process_job(self, job: Job):
-        """Process a single job."""
-        job.status = JobStatus.RUNNING
-        job.started_at = datetime.now(timezone.utc)
+
+            now = time.time()
+            while self._timers and self._timers[0] <= now:
+                heapq.heappop(self._timers)
+            wait = POLL_INTERVAL
+            if self._timers:
+                wait = min(wait, self._timers[0] - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.001))
+            except asyncio.TimeoutError:
+                pass
+
+    def _flush_finished(self):
+        """Write finished jobs back in one transaction (a crash before this re-runs them)."""
+        if not self._finished:
+            return
+        jobs = list(self._finished.values())
+        try:
+            self.store.save_many(jobs)
+        except sqlite3.Error as e:
+            logger.error(f"Job write-back failed: {e}")
+            return
+        for job in jobs:
+            self._finished.pop(job.id, None)
+
+    def _start(self, job: Job):
         self.running_jobs[job.id] = job
-        
+        self._running_by_type[job.type] = self._running_by_type.get(job.type, 0) + 1
+        task = asyncio.get_running_loop().create_task(self._process_job(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _shutdown(self, timeout: float):
+        self._stopping = True
+        self._wakeup.set()
+        await self._dispatcher
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._flush_finished()
+
+    async def _process_job(self, job: Job):
+        """Process a single job."""
         start_time = time.time()
-        
+
         # Send job started notification
         self._send_job_notification(job, "started")
-        
+
         try:
-            # Check if handler exists
-            if job.type not in self.job_handlers:
-                raise ValueError(f"No handler registered for job type: {job.type}")
-            
             handler = self.job_handlers[job.type]
-            
+
             # Execute job with timeout
-            result = asyncio.run(self._execute_with_timeout(
-                handler, job.payload, job.timeout_seconds
-            ))
-            
+            result = await self._execute_with_timeout(handler, job.payload, job.timeout_seconds)
+
             # Mark as completed
             job.status = JobStatus.COMPLETED
             job.result = result
             job.progress = 100.0
             job.completed_at = datetime.now(timezone.utc)
-            
+
             self.stats["jobs_processed"] += 1
-            
+
             # Send job completed notification
             self._send_job_notification(job, "completed")
-            
-            logger.info(f"Completed job {job.id}")
-            
+
+            logger.debug(f"Completed job {job.id}")
+
+        except asyncio.CancelledError:
+            # Shutting down: leave the lease for release() to requeue
+            raise
+
         except Exception as e:
             job.error_message = str(e)
             job.completed_at = datetime.now(timezone.utc)
-            
+
             # Check if should retry
             if job.retry_count < job.max_retries:
                 job.status = JobStatus.RETRYING
                 job.retry_count += 1
-                
+                self.stats["jobs_retried"] += 1
+
                 # Send job retry notification
                 self._send_job_notification(job, "retrying")
-                
-                # Re-queue with delay
-                def retry_job():
-                    time.sleep(min(60, job.retry_count * 10))  # Exponential backoff
-                    job.status = JobStatus.PENDING
-                    job.started_at = None
-                    job.completed_at = None
-                    self.job_queue.put(job)
-                
-                retry_thread = threading.Thread(target=retry_job)
-                retry_thread.daemon = True
-                retry_thread.start()
-                
-                logger.warning(f"Retrying job {job.id} (attempt {job.retry_count})")
+
+                # Re-queue with exponential backoff through the timer heap
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (job.retry_count - 1))
+                job.available_at = time.time() + delay
+                job.started_at = None
+                job.completed_at = None
+                heapq.heappush(self._timers, job.available_at)
+
+                logger.warning(f"Retrying job {job.id} in {delay:.1f}s (attempt {job.retry_count})")
             else:
                 job.status = JobStatus.FAILED
                 self.stats["jobs_failed"] += 1
-                
+
                 # Send job failed notification
                 self._send_job_notification(job, "failed")
-                
+
                 logger.error(f"Failed job {job.id}: {e}")
-        
+
         finally:
+            if job.status != JobStatus.RUNNING:
+                self._finished[job.id] = job
+
             # Update statistics
             processing_time = time.time() - start_time
             self.stats["total_processing_time"] += processing_time
@@ -292,203 +649,169 @@ class JobProcessor:
                 self.stats["total_processing_time"] / self.stats["jobs_processed"]
                 if self.stats["jobs_processed"] > 0 else 0
             )
-            
-            # Move to completed jobs
-            if job.id in self.running_jobs:
-                del self.running_jobs[job.id]
-            
-            self.completed_jobs[job.id] = job
-            
+
+            self.running_jobs.pop(job.id, None)
+            self._running_by_type[job.type] -= 1
+            self._wakeup.set()
+
             # Clean up old completed jobs
-            self._cleanup_completed_jobs()
-    
+            self._finished_since_purge += 1
+            if self._finished_since_purge >= max(100, self.max_completed_jobs // 10):
+                self._finished_since_purge = 0
+                self.store.purge_finished(self.max_completed_jobs)
+
     def _send_job_notification(self, job: Job, status: str):
         """Send real-time job status notification via WebSocket."""
+        loop = self._notify_loop
+        if loop is None or loop.is_closed() or not job.user_id:
+            return
         try:
             from app.core.websocket_manager import get_websocket_manager
-            
+
             ws_manager = get_websocket_manager()
-            
-            # Create notification data
-            notification_data = {
-                "job_id": job.id,
-                "type": job.type,
-                "status": status,
-                "progress": job.progress,
-                "error_message": job.error_message,
-                "result": job.result,
-                "retry_count": job.retry_count,
-                "max_retries": job.max_retries,
-                "created_at": job.created_at.isoformat(),
-                "started_at": job.started_at.isoformat() if job.started_at else None,
-                "completed_at": job.completed_at.isoformat() if job.completed_at else None
-            }
-            
-            # Send to user if user_id is available
-            if job.user_id:
-                asyncio.run(ws_manager.send_job_status_update(
-                    user_id=job.user_id,
-                    job_id=job.id,
-                    status=status,
-                    progress=job.progress,
-                    result=job.result
-                ))
-            
-            # Also broadcast to job monitoring subscription
-            asyncio.run(ws_manager.broadcast_to_subscription(
-                "job_monitoring",
-                WebSocketMessage(
-                    type="job_update",
-                    data=notification_data,
-                    timestamp=datetime.now(timezone.utc)
-                )
-            ))
-            
+            if not ws_manager.user_connections.get(job.user_id):
+                return
+
+            asyncio.run_coroutine_threadsafe(ws_manager.send_job_status_update(
+                user_id=job.user_id,
+                job_id=job.id,
+                status=status,
+                progress=job.progress,
+                result=job.result
+            ), loop)
+
         except Exception as e:
             logger.error(f"Failed to send job notification: {e}")
-    
-    async def _execute_with_timeout(self, handler: Callable, payload: Dict[str, Any], 
+
+    async def _execute_with_timeout(self, handler: _Handler, payload: Dict[str, Any],
                                   timeout_seconds: int) -> Any:
         """Execute handler with timeout."""
+        func = handler.func
+        if asyncio.iscoroutinefunction(func):
+            call = func(payload)
+        elif handler.cpu_bound:
+            call = asyncio.get_running_loop().run_in_executor(self._get_process_pool(), func, payload)
+        else:
+            call = asyncio.to_thread(func, payload)
         try:
-            if asyncio.iscoroutinefunction(handler):
-                return await asyncio.wait_for(handler(payload), timeout=timeout_seconds)
-            else:
-                # Run synchronous function in thread pool
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(None, handler, payload)
+            return await asyncio.wait_for(call, timeout=timeout_seconds)
         except asyncio.TimeoutError:
             raise TimeoutError(f"Job timed out after {timeout_seconds} seconds")
-    
-    def _cleanup_completed_jobs(self):
-        """Clean up old completed jobs."""
-        if len(self.completed_jobs) > self.max_completed_jobs:
-            # Remove oldest jobs
-            sorted_jobs = sorted(
-                self.completed_jobs.items(),
-                key=lambda x: x[1].completed_at or x[1].created_at
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            workers = self.process_workers or int(os.getenv("JOB_PROCESS_WORKERS", "0")) or os.cpu_count() or 2
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
             )
-            
-            jobs_to_remove = len(self.completed_jobs) - self.max_completed_jobs
-            for job_id, _ in sorted_jobs[:jobs_to_remove]:
-                del self.completed_jobs[job_id]
-    
+        return self._process_pool
+
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job status."""
-        # Check running jobs
-        if job_id in self.running_jobs:
-            return self.running_jobs[job_id].to_dict()
-        
-        # Check completed jobs
-        if job_id in self.completed_jobs:
-            return self.completed_jobs[job_id].to_dict()
-        
-        # Check queue
-        for queue in self.job_queue._queues.values():
-            for job in queue:
-                if job.id == job_id:
-                    return job.to_dict()
-        
-        return None
-    
+        # Running jobs carry live progress
+        job = self.running_jobs.get(job_id) or self._finished.get(job_id) or self.store.get(job_id)
+        return job.to_dict() if job else None
+
     def cancel_job(self, job_id: str) -> bool:
-        """Cancel a job."""
-        # Remove from queue if pending
-        for queue in self.job_queue._queues.values():
-            for i, job in enumerate(queue):
-                if job.id == job_id and job.status == JobStatus.PENDING:
-                    job.status = JobStatus.CANCELLED
-                    del queue[i]
-                    self.completed_jobs[job_id] = job
-                    self.stats["jobs_cancelled"] += 1
-                    return True
-        
+        """Cancel a job that has not started yet."""
+        if self.store.cancel(job_id):
+            self.stats["jobs_cancelled"] += 1
+            return True
+
         # Cannot cancel running jobs (would need interrupt mechanism)
         return False
-    
+
     def get_user_jobs(self, user_id: str, status: Optional[JobStatus] = None) -> List[Dict[str, Any]]:
         """Get jobs for a specific user."""
         user_jobs = []
-        
-        # Check running jobs
-        for job in self.running_jobs.values():
-            if job.user_id == user_id and (status is None or job.status == status):
-                user_jobs.append(job.to_dict())
-        
-        # Check completed jobs
-        for job in self.completed_jobs.values():
-            if job.user_id == user_id and (status is None or job.status == status):
-                user_jobs.append(job.to_dict())
-        
-        return sorted(user_jobs, key=lambda x: x["created_at"], reverse=True)
-    
+        for job in self.store.user_jobs(user_id, status):
+            live = self.running_jobs.get(job.id) or self._finished.get(job.id)
+            user_jobs.append((live or job).to_dict())
+        return user_jobs
+
     def get_queue_stats(self) -> Dict[str, Any]:
         """Get queue statistics."""
+        counts = self.store.counts()
+        by_status = counts["by_status"]
         queue_sizes = {
-            priority.name.lower(): len(queue)
-            for priority, queue in self.job_queue._queues.items()
+            priority.name.lower(): counts["by_priority"].get(priority.value, 0)
+            for priority in JobPriority
         }
-        
+
         return {
             "total_pending": sum(queue_sizes.values()),
             "by_priority": queue_sizes,
+            "delayed": counts["delayed"],
             "running": len(self.running_jobs),
-            "completed": len(self.completed_jobs),
-            "workers": len(self.workers),
+            "running_by_type": {t: n for t, n in self._running_by_type.items() if n},
+            "completed": sum(by_status.get(s, 0) for s in FINISHED_STATUSES),
+            "workers": self.workers,
             "stats": self.stats.copy()
         }
-    
+
     def update_job_progress(self, job_id: str, progress: float, message: str = None):
         """Update job progress."""
         if job_id in self.running_jobs:
             job = self.running_jobs[job_id]
             job.progress = min(100.0, max(0.0, progress))
-            
+
             if message:
                 job.result = job.result or {}
                 job.result["progress_message"] = message
 
 # Global job processor instance
 _job_processor: Optional[JobProcessor] = None
+_job_processor_lock = threading.Lock()
 
 def get_job_processor() -> JobProcessor:
     """Get the global job processor instance."""
     global _job_processor
-    
+
     if _job_processor is None:
-        _job_processor = JobProcessor(max_workers=4)
-        _job_processor.start()
-        
-        # Register default handlers
-        register_default_handlers(_job_processor)
-    
+        with _job_processor_lock:
+            if _job_processor is None:
+                processor = JobProcessor(max_workers=4)
+
+                # Register default handlers
+                register_default_handlers(processor)
+                processor.start()
+                _job_processor = processor
+
     return _job_processor
 
+def shutdown_job_processor():
+    """Stop the global job processor if it was started."""
+    global _job_processor
+
+    if _job_processor is not None:
+        _job_processor.stop()
+        _job_processor = None
+
 def register_default_handlers(processor: JobProcessor):
     """Register default job handlers."""
-    
+
     async def document_analysis_handler(payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle document analysis job."""
         document_id = payload.get("document_id")
         analysis_type = payload.get("analysis_type", "basic")
-        
+
         logger.info(f"Starting document analysis for {document_id}")
-        
+
         # Simulate analysis work
         await asyncio.sleep(2)
-        
+
         # Update progress
         processor.update_job_progress(payload.get("job_id"), 25, "Extracting text...")
         await asyncio.sleep(1)
-        
+
         processor.update_job_progress(payload.get("job_id"), 50, "Analyzing content...")
         await asyncio.sleep(1)
-        
+
         processor.update_job_progress(payload.get("job_id"), 75, "Generating insights...")
         await asyncio.sleep(1)
-        
+
         processor.update_job_progress(payload.get("job_id"), 100, "Analysis complete")
-        
+
         return {
             "document_id": document_id,
             "analysis_type": analysis_type,
@@ -499,17 +822,17 @@ def register_default_handlers(processor: JobProcessor):
                 "confidence": 0.95
             }
         }
-    
+
     async def thumbnail_generation_handler(payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle thumbnail generation job."""
         document_id = payload.get("document_id")
         page_numbers = payload.get("page_numbers", [1])
-        
+
         logger.info(f"Generating thumbnails for {document_id}")
-        
+
         # Simulate thumbnail generation
         await asyncio.sleep(1)
-        
+
         return {
             "document_id": document_id,
             "thumbnails": [
@@ -521,31 +844,31 @@ def register_default_handlers(processor: JobProcessor):
                 for page in page_numbers
             ]
         }
-    
+
     async def document_indexing_handler(payload: Dict[str, Any]) -> Dict[str, Any]:
         """Handle document indexing job."""
         document_id = payload.get("document_id")
         content = payload.get("content", "")
-        
+
         logger.info(f"Indexing document {document_id}")
-        
+
         # Simulate indexing
         await asyncio.sleep(0.5)
-        
+
         return {
             "document_id": document_id,
             "indexed_words": len(content.split()),
             "keywords": ["housing", "tenant", "rights"][:10],
             "indexed_at": datetime.now(timezone.utc).isoformat()
         }
-    
+
     # Register handlers
-    processor.register_handler("document_analysis", document_analysis_handler)
+    processor.register_handler("document_analysis", document_analysis_handler, concurrency=2)
     processor.register_handler("thumbnail_generation", thumbnail_generation_handler)
     processor.register_handler("document_indexing", document_indexing_handler)
 
 # Helper functions
-def submit_document_analysis_job(document_id: str, analysis_type: str = "basic", 
+def submit_document_analysis_job(document_id: str, analysis_type: str = "basic",
                                 user_id: str = None) -> str:
     """Submit document analysis job."""
     processor = get_job_processor()
@@ -554,7 +877,7 @@ def submit_document_analysis_job(document_id: str, analysis_type: str = "basic",
         payload={
             "document_id": document_id,
             "analysis_type": analysis_type,
-            "job_id": make_id("job")  # Will be overridden
+            "job_id": None  # Filled in with the assigned job ID
         },
         priority=JobPriority.NORMAL,
         user_id=user_id
@@ -592,4 +915,4 @@ def get_job_queue_stats() -> Dict[str, Any]:
 
 # Cleanup on shutdown
 import atexit
-atexit.register(lambda: get_job_processor().stop())
+atexit.register(shutdown_job_processor)
@@ -11,12 +11,47 @@ from app.core.id_gen import make_id
 from typing import Callable
 
 from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.path_matcher import PathMatcher
 
 logger = logging.getLogger("semptify.requests")
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+def request_id_for(scope: Scope) -> str:
+    """The request ID assigned by RequestIdMiddleware, or the client's X-Request-Id, or a new one."""
+    state = scope.setdefault("state", {})
+    request_id = state.get("request_id")
+    if request_id is None:
+        request_id = Request(scope).headers.get("X-Request-Id") or make_id("req")
+        state["request_id"] = request_id
+    return request_id
+
+
+class RequestIdMiddleware:
+    """Assign every HTTP request an ID (request.state.request_id) and echo it as X-Request-Id."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = request_id_for(scope)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-Id"] = request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
+
+
+class RequestLoggingMiddleware:
     """
     Middleware for logging HTTP requests and responses.
     
@@ -25,6 +60,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
     - Response timing
     - Structured logging format
     - Configurable path exclusions
+
+    Duration is measured to the start of the response; bodies stream
+    through without buffering.
     """
     
     # Paths to exclude from logging (health checks, static files)
@@ -42,20 +80,25 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         "/_next/",
         "/assets/",
     )
+    _is_excluded = PathMatcher(EXCLUDE_PATHS, EXCLUDE_PREFIXES)
     
-    def __init__(self, app, log_body: bool = False, log_headers: bool = False):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, log_body: bool = False, log_headers: bool = False):
+        self.app = app
         self.log_body = log_body
         self.log_headers = log_headers
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip logging for excluded paths
-        path = request.url.path
-        if path in self.EXCLUDE_PATHS or path.startswith(self.EXCLUDE_PREFIXES):
-            return await call_next(request)
-        
+        if scope["type"] != "http" or self._is_excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        path = scope["path"]
+        method = scope["method"]
+
         # Generate or extract request ID
-        request_id = request.headers.get("X-Request-Id", make_id("req"))
+        request_id = request_id_for(scope)
         
         # Record start time
         start_time = time.perf_counter()
@@ -63,9 +106,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         # Log request
         log_data = {
             "request_id": request_id,
-            "method": request.method,
+            "method": method,
             "path": path,
-            "query": str(request.query_params) if request.query_params else None,
+            "query": scope["query_string"].decode("latin-1") or None,
             "client_ip": self._get_client_ip(request),
             "user_agent": request.headers.get("User-Agent", "")[:100],
         }
@@ -73,65 +116,20 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         if self.log_headers:
             log_data["headers"] = dict(request.headers)
         
-        logger.info("Request started: %s %s", request.method, path, extra=log_data)
+        logger.info("Request started: %s %s", method, path, extra=log_data)
+
+        async def send_and_log(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self._log_response(request, log_data, message["status"], start_time)
+                headers = MutableHeaders(scope=message)
+                # Add request ID to response headers
+                headers["X-Request-Id"] = request_id
+                headers["X-Response-Time"] = f"{log_data['duration_ms']:.2f}ms"
+            await send(message)
         
         # Process request
         try:
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration_ms = (time.perf_counter() - start_time) * 1000
-            
-            # Log response
-            log_data.update({
-                "status_code": response.status_code,
-                "duration_ms": round(duration_ms, 2),
-            })
-            
-            # Track analytics for API requests
-            try:
-                from app.core.analytics_engine import track_api_request
-                user_id = None
-                if hasattr(request.state, 'user'):
-                    user_id = getattr(request.state.user, 'user_id', None)
-                
-                track_api_request(
-                    endpoint=path,
-                    method=request.method,
-                    user_id=user_id,
-                    status_code=response.status_code,
-                    duration_ms=duration_ms
-                )
-            except Exception:
-                # Analytics tracking should not break requests
-                pass
-            
-            # Determine log level based on status
-            if response.status_code >= 500:
-                logger.error(
-                    "Request completed: %s %s -> %d (%.2fms)",
-                    request.method, path, response.status_code, duration_ms,
-                    extra=log_data
-                )
-            elif response.status_code >= 400:
-                logger.warning(
-                    "Request completed: %s %s -> %d (%.2fms)",
-                    request.method, path, response.status_code, duration_ms,
-                    extra=log_data
-                )
-            else:
-                logger.info(
-                    "Request completed: %s %s -> %d (%.2fms)",
-                    request.method, path, response.status_code, duration_ms,
-                    extra=log_data
-                )
-            
-            # Add request ID to response headers
-            response.headers["X-Request-Id"] = request_id
-            response.headers["X-Response-Time"] = f"{duration_ms:.2f}ms"
-            
-            return response
-            
+            await self.app(scope, receive, send_and_log)
         except Exception as e:
             # Log exception
             duration_ms = (time.perf_counter() - start_time) * 1000
@@ -142,10 +140,52 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             })
             logger.exception(
                 "Request failed: %s %s -> 500 (%.2fms) - %s",
-                request.method, path, duration_ms, str(e),
+                method, path, duration_ms, str(e),
                 extra=log_data
             )
             raise
+
+    def _log_response(self, request: Request, log_data: dict, status_code: int, start_time: float) -> None:
+        # Calculate duration
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        method, path = log_data["method"], log_data["path"]
+
+        # Log response
+        log_data.update({
+            "status_code": status_code,
+            "duration_ms": round(duration_ms, 2),
+        })
+        
+        # Track analytics for API requests
+        try:
+            from app.core.analytics_engine import track_api_request
+            user_id = None
+            if hasattr(request.state, 'user'):
+                user_id = getattr(request.state.user, 'user_id', None)
+            
+            track_api_request(
+                endpoint=path,
+                method=method,
+                user_id=user_id,
+                status_code=status_code,
+                duration_ms=duration_ms
+            )
+        except Exception:
+            # Analytics tracking should not break requests
+            pass
+        
+        # Determine log level based on status
+        if status_code >= 500:
+            log = logger.error
+        elif status_code >= 400:
+            log = logger.warning
+        else:
+            log = logger.info
+        log(
+            "Request completed: %s %s -> %d (%.2fms)",
+            method, path, status_code, duration_ms,
+            extra=log_data
+        )
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP, respecting proxy headers."""
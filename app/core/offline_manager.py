@@ -8,9 +8,14 @@ Handles offline/online state detection and user notifications.
 import logging
 from typing import Optional, Callable
 from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
+BODY_END = b"</body>"
+HOLD_BACK = len(BODY_END) - 1
+
 class OfflineManager:
     """Manages offline/online state detection and user notifications."""
     
@@ -159,7 +164,7 @@ class OfflineManager:
                 
                 // Create online indicator
                 onlineIndicator = document.createElement('div');
-                onlineIndicator.innerHTML = `""" + self.get_online_html().replace('"', '\\"').replace("'", "\\'") + """;
+                onlineIndicator.innerHTML = `""" + self.get_online_html().replace('"', '\\"').replace("'", "\\'") + """`;
                 document.body.appendChild(onlineIndicator);
             }
             
@@ -273,3 +278,80 @@ def get_offline_indicators() -> str:
 def is_offline() -> bool:
     """Check if currently offline."""
     return not offline_manager.is_online
+
+
+class OfflineIndicatorMiddleware:
+    """
+    Injects the offline indicators into full HTML documents as they stream.
+
+    The markup goes just before the last </body>; responses without one
+    (fragments, error snippets) pass through unchanged. When the whole body
+    arrives in one message its Content-Length is adjusted; otherwise the
+    response switches to chunked encoding and each chunk holds back the few
+    bytes that could be the start of a </body> split across chunks.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.indicators = get_offline_indicators().encode()
+
+    def _inject(self, body: bytes) -> Optional[bytes]:
+        index = body.lower().rfind(BODY_END)
+        if index < 0:
+            return None
+        return body[:index] + self.indicators + body[index:]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        pending = False     # still looking for </body>
+        carry = b""         # tail of the previous chunk, sent with the next one
+
+        async def send_with_indicators(message: Message) -> None:
+            nonlocal start, pending, carry
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if headers.get("content-type", "").startswith("text/html") and "content-encoding" not in headers:
+                    start = message
+                    pending = True
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body" or not pending:
+                await send(message)
+                return
+
+            body = carry + message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if not more:
+                    # The whole body in one message
+                    injected = self._inject(body)
+                    if injected is not None:
+                        body = injected
+                        if "content-length" in headers:
+                            headers["content-length"] = str(len(body))
+                    pending = False
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+                # Body continues; the final length is unknown from here
+                del headers["content-length"]
+                await send(start)
+                start = None
+
+            injected = self._inject(body)
+            if injected is not None:
+                body, carry, pending = injected, b"", False
+            elif more:
+                body, carry = body[:-HOLD_BACK], body[-HOLD_BACK:]
+            else:
+                carry = b""
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_with_indicators)
@@ -0,0 +1,48 @@
+"""
+Path Matcher
+============
+
+Compiles a set of exact paths, path prefixes and suffixes into one matcher
+so middleware can classify a request path with a set lookup plus one
+str.startswith / str.endswith call, instead of looping over the rules in
+Python on every request.
+
+Usage:
+    is_public = PathMatcher(exact={"/", "/health"}, prefixes=("/static/",), suffixes=(".css",))
+    if is_public(scope["path"]):
+        ...
+"""
+
+from typing import Iterable, Tuple
+
+
+def minimal_prefixes(prefixes: Iterable[str]) -> Tuple[str, ...]:
+    """Drop prefixes already covered by a shorter one ("/api" makes "/api/x" redundant)."""
+    kept = []
+    for prefix in sorted(set(prefixes)):
+        # Sorted order puts a prefix right before the strings it covers
+        if kept and prefix.startswith(kept[-1]):
+            continue
+        kept.append(prefix)
+    return tuple(kept)
+
+
+class PathMatcher:
+    """Matches a path against exact, prefix and suffix rules in a single call."""
+
+    __slots__ = ("exact", "prefixes", "suffixes")
+
+    def __init__(self, exact: Iterable[str] = (), prefixes: Iterable[str] = (), suffixes: Iterable[str] = ()):
+        self.prefixes = minimal_prefixes(prefixes)
+        self.suffixes = tuple(suffixes)
+        self.exact = frozenset(p for p in exact if not (self.prefixes and p.startswith(self.prefixes)))
+
+    def __call__(self, path: str) -> bool:
+        return (
+            path in self.exact
+            or (bool(self.prefixes) and path.startswith(self.prefixes))
+            or (bool(self.suffixes) and path.endswith(self.suffixes))
+        )
+
+    def __repr__(self) -> str:
+        return f"PathMatcher(exact={sorted(self.exact)}, prefixes={self.prefixes}, suffixes={self.suffixes})"
@@ -3,11 +3,14 @@ Performance Monitor - System Performance Tracking and Optimization
 ==============================================================
 
 Tracks application performance, bottlenecks, and optimization opportunities.
+
+HTTP request figures come from the fixed-memory registry in
+app.core.request_metrics (aggregated across workers), so memory stays
+bounded regardless of traffic.
 """
 
 import logging
 import time
-import psutil
 import asyncio
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, List, Optional
@@ -16,6 +19,14 @@ from collections import defaultdict, deque
 import json
 import threading
 
+from app.core.request_metrics import aggregated_metrics, get_request_metrics
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -81,10 +92,8 @@ class PerformanceMonitor:
     
     def __init__(self):
         self.metrics: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
-        self.request_metrics: deque = deque(maxlen=10000)
         self.system_metrics: deque = deque(maxlen=1000)
         self.slow_queries: deque = deque(maxlen=1000)
-        self.error_rates: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
         
         # Performance thresholds
         self.slow_request_threshold = 1000  # ms
@@ -132,6 +141,8 @@ class PerformanceMonitor:
     
     def _collect_system_metrics(self):
         """Collect system resource metrics."""
+        if not HAS_PSUTIL:
+            return
         try:
             # CPU usage
             cpu_percent = psutil.cpu_percent(interval=1)
@@ -194,10 +205,11 @@ class PerformanceMonitor:
     
     def _check_error_rates(self):
         """Check for high error rates."""
-        for endpoint, errors in self.error_rates.items():
-            if len(errors) >= 10:  # Need at least 10 requests
-                recent_errors = list(errors)[-10:]
-                error_rate = sum(recent_errors) / len(recent_errors) * 100
+        for stats in get_request_metrics().routes.values():
+            requests = stats.latency.count
+            if requests >= 10:  # Need at least 10 requests
+                endpoint = f"{stats.method} {stats.route}"
+                error_rate = stats.errors / requests * 100
                 
                 if error_rate > self.high_error_rate_threshold:
                     self._alert_performance_issue(
@@ -226,45 +238,8 @@ class PerformanceMonitor:
     
     def record_request(self, endpoint: str, method: str, status_code: int, 
                       duration_ms: float, user_id: str = None, ip_address: str = None):
-        """Record HTTP request performance."""
-        request_metric = RequestMetrics(
-            endpoint=endpoint,
-            method=method,
-            status_code=status_code,
-            duration_ms=duration_ms,
-            timestamp=datetime.now(timezone.utc),
-            user_id=user_id,
-            ip_address=ip_address
-        )
-        
-        self.request_metrics.append(request_metric)
-        
-        # Store request duration metric
-        self._store_metric(f"request.duration.{endpoint}", duration_ms, "ms", {
-            "method": method,
-            "status_code": str(status_code)
-        })
-        
-        # Track slow requests
-        if duration_ms > self.slow_request_threshold:
-            self.slow_queries.append(request_metric)
-            self._store_metric("slow_requests.count", 1, "count", {
-                "endpoint": endpoint,
-                "method": method,
-                "duration_ms": duration_ms
-            })
-        
-        # Track error rates
-        is_error = status_code >= 400
-        self.error_rates[endpoint].append(1 if is_error else 0)
-        
-        # Store error rate metric
-        if is_error:
-            self._store_metric("request.errors", 1, "count", {
-                "endpoint": endpoint,
-                "method": method,
-                "status_code": str(status_code)
-            })
+        """Record HTTP request performance (endpoint should be the route template)."""
+        get_request_metrics().record(method, endpoint, status_code, duration_ms)
     
     def record_database_query(self, query: str, duration_ms: float, 
                             rows_affected: int = None):
@@ -317,18 +292,15 @@ class PerformanceMonitor:
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get performance summary statistics."""
         now = datetime.now(timezone.utc)
-        one_hour_ago = now - timedelta(hours=1)
-        
-        # Request metrics
-        recent_requests = [
-            req for req in self.request_metrics 
-            if req.timestamp >= one_hour_ago
-        ]
-        
-        if recent_requests:
-            avg_response_time = sum(req.duration_ms for req in recent_requests) / len(recent_requests)
-            requests_per_minute = len(recent_requests) / 60
-            error_rate = len([req for req in recent_requests if req.status_code >= 400]) / len(recent_requests) * 100
+        http = aggregated_metrics()
+        
+        # Request metrics (last hour, from the per-minute window)
+        recent = http.recent(60)
+        total = recent["requests"]
+        if total:
+            avg_response_time = recent["duration_ms"] / total
+            requests_per_minute = total / 60
+            error_rate = recent["errors"] / total * 100
         else:
             avg_response_time = 0
             requests_per_minute = 0
@@ -346,94 +318,66 @@ class PerformanceMonitor:
         else:
             system_stats = {}
         
-        # Slow requests
-        slow_requests_count = len([
-            req for req in recent_requests 
-            if req.duration_ms > self.slow_request_threshold
-        ])
-        
         return {
             "timestamp": now.isoformat(),
             "requests": {
-                "total_last_hour": len(recent_requests),
+                "total_last_hour": total,
                 "requests_per_minute": round(requests_per_minute, 2),
                 "average_response_time_ms": round(avg_response_time, 2),
                 "error_rate_percent": round(error_rate, 2),
-                "slow_requests_count": slow_requests_count
+                "slow_requests_count": recent["slow"],
+                "workers": http.workers,
             },
             "system": system_stats,
             "slow_queries": {
-                "total_count": len(self.slow_queries),
-                "database_queries": len([sq for sq in self.slow_queries if isinstance(sq, dict) and sq.get('type') == 'database']),
-                "http_requests": len([sq for sq in self.slow_queries if isinstance(sq, RequestMetrics)])
+                "total_count": len(self.slow_queries) + len(http.slow),
+                "database_queries": len(self.slow_queries),
+                "http_requests": len(http.slow)
             }
         }
     
     def get_endpoint_performance(self, endpoint: str) -> Dict[str, Any]:
-        """Get performance statistics for a specific endpoint."""
-        endpoint_requests = [
-            req for req in self.request_metrics 
-            if req.endpoint == endpoint
-        ]
+        """Get performance statistics for a specific endpoint (route template)."""
+        stats = aggregated_metrics().route_stats(endpoint)
         
-        if not endpoint_requests:
+        if stats is None:
             return {"error": "No data found for endpoint"}
         
         # Calculate statistics
-        durations = [req.duration_ms for req in endpoint_requests]
-        status_codes = [req.status_code for req in endpoint_requests]
+        latency = stats.latency
         
         return {
             "endpoint": endpoint,
-            "total_requests": len(endpoint_requests),
-            "average_response_time_ms": sum(durations) / len(durations),
-            "min_response_time_ms": min(durations),
-            "max_response_time_ms": max(durations),
-            "p50_response_time_ms": self._percentile(durations, 50),
-            "p95_response_time_ms": self._percentile(durations, 95),
-            "p99_response_time_ms": self._percentile(durations, 99),
-            "error_rate_percent": len([sc for sc in status_codes if sc >= 400]) / len(status_codes) * 100,
-            "status_code_distribution": self._count_status_codes(status_codes)
+            "total_requests": latency.count,
+            "average_response_time_ms": latency.mean,
+            "min_response_time_ms": latency.min,
+            "max_response_time_ms": latency.max,
+            "p50_response_time_ms": latency.quantile(0.50),
+            "p95_response_time_ms": latency.quantile(0.95),
+            "p99_response_time_ms": latency.quantile(0.99),
+            "error_rate_percent": stats.errors / latency.count * 100,
+            "status_code_distribution": {str(code): count for code, count in sorted(stats.statuses.items())}
         }
     
-    def _percentile(self, values: List[float], percentile: int) -> float:
-        """Calculate percentile of values."""
-        if not values:
-            return 0
-        
-        sorted_values = sorted(values)
-        index = int((percentile / 100) * len(sorted_values))
-        return sorted_values[min(index, len(sorted_values) - 1)]
-    
-    def _count_status_codes(self, status_codes: List[int]) -> Dict[str, int]:
-        """Count distribution of status codes."""
-        distribution = defaultdict(int)
-        for code in status_codes:
-            distribution[str(code)] += 1
-        return dict(distribution)
-    
     def get_slow_queries(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get slow queries and requests."""
-        slow_items = list(self.slow_queries)[-limit:]
-        
         result = []
-        for item in slow_items:
-            if isinstance(item, RequestMetrics):
-                result.append({
-                    "type": "http_request",
-                    "endpoint": item.endpoint,
-                    "method": item.method,
-                    "duration_ms": item.duration_ms,
-                    "timestamp": item.timestamp.isoformat(),
-                    "user_id": item.user_id
-                })
-            elif isinstance(item, dict):
-                result.append({
-                    "type": item.get("type", "unknown"),
-                    "query": item.get("query", ""),
-                    "duration_ms": item.get("duration_ms", 0),
-                    "timestamp": item.get("timestamp", datetime.now(timezone.utc)).isoformat()
-                })
+        for item in list(self.slow_queries)[-limit:]:
+            result.append({
+                "type": item.get("type", "unknown"),
+                "query": item.get("query", ""),
+                "duration_ms": item.get("duration_ms", 0),
+                "timestamp": item.get("timestamp", datetime.now(timezone.utc)).isoformat()
+            })
+        
+        for item in aggregated_metrics().slow_requests(limit):
+            result.append({
+                "type": "http_request",
+                "endpoint": item["route"],
+                "method": item["method"],
+                "duration_ms": item["duration_ms"],
+                "timestamp": datetime.fromtimestamp(item["timestamp"], timezone.utc).isoformat(),
+            })
         
         return result
     
@@ -456,30 +400,38 @@ class PerformanceMonitor:
         cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
         
         # Filter recent data
-        recent_requests = [
-            req.to_dict() for req in self.request_metrics
-            if req.timestamp >= cutoff_time
-        ]
+        http = aggregated_metrics()
+        cutoff_ts = cutoff_time.timestamp()
         
         recent_system = [
             sys.to_dict() for sys in self.system_metrics
             if sys.timestamp >= cutoff_time
         ]
         
-        recent_slow = []
+        recent_slow = [
+            {**item, "timestamp": datetime.fromtimestamp(item["timestamp"], timezone.utc).isoformat()}
+            for item in http.slow_requests()
+            if item["timestamp"] >= cutoff_ts
+        ]
         for item in self.slow_queries:
-            if isinstance(item, RequestMetrics):
-                if item.timestamp >= cutoff_time:
-                    recent_slow.append(item.to_dict())
-            elif isinstance(item, dict):
-                timestamp = item.get("timestamp")
-                if isinstance(timestamp, datetime) and timestamp >= cutoff_time:
-                    recent_slow.append(item)
+            timestamp = item.get("timestamp")
+            if isinstance(timestamp, datetime) and timestamp >= cutoff_time:
+                recent_slow.append(item)
         
         return {
             "export_timestamp": datetime.now(timezone.utc).isoformat(),
             "time_range_hours": hours,
-            "requests": recent_requests,
+            "requests": [
+                {
+                    "method": stats.method,
+                    "endpoint": stats.route,
+                    "total_requests": stats.latency.count,
+                    "average_response_time_ms": round(stats.latency.mean, 2),
+                    "p95_response_time_ms": round(stats.latency.quantile(0.95), 2),
+                    "status_code_distribution": {str(code): count for code, count in stats.statuses.items()},
+                }
+                for stats in http.routes.values()
+            ],
             "system_metrics": recent_system,
             "slow_operations": recent_slow,
             "summary": self.get_performance_summary()
@@ -10,15 +10,36 @@ Features:
 - tsvector column management
 - Query ranking with ts_rank
 - Highlighting with ts_headline
-- Hybrid search combining FTS with BM25
+- Hybrid search: documents and vault items in one round trip, merged by
+  reciprocal-rank fusion
+- SearchVectorReindexer: rebuilds documents.search_vector for changed rows
+  in batches, off the request path
+
+vault_items.search_vector is a generated column and never needs rebuilding.
+documents.search_vector is cleared by a trigger when filename, document_type
+or extracted_text change (migration 20250427_document_vector_reindex); the
+reindexer fills it back in.
 """
 
+import asyncio
+import logging
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 from sqlalchemy import text, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
+
+# Reciprocal-rank fusion constant: score = weight / (RRF_K + rank)
+RRF_K = 60
+
+DOCUMENT_VECTOR_SQL = """
+    setweight(to_tsvector('english', COALESCE(filename, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(document_type, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(extracted_text, '')), 'C')
+"""
+
 
 @dataclass
 class FTSResult:
@@ -126,7 +147,7 @@ class PostgresFTSService:
         
         sql = """
         SELECT 
-            v.id,
+            v.item_id::text AS id,
             v.title,
             ts_rank(v.search_vector, to_tsquery(:tsquery)) as rank,
             ts_headline(
@@ -166,62 +187,103 @@ class PostgresFTSService:
         self,
         query: str,
         user_id: Optional[str] = None,
-        limit: int = 20
+        limit: int = 20,
+        rrf_k: int = RRF_K,
+        weights: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
         """
-        Hybrid search combining FTS with simple text search.
+        Search documents and vault items together in one statement.
         
-        This provides best results by:
-        1. Getting FTS ranked results
-        2. Adding fallback text search results
-        3. Merging and re-ranking
+        ts_rank values are not comparable across the two tables (different
+        weights and text lengths), so each table is ranked on its own with
+        row_number() and the lists are merged by reciprocal-rank fusion:
+        score = weight / (rrf_k + rank). Headlines are only generated for
+        the rows that make the final cut.
         
         Args:
             query: Search query text
             user_id: Optional user ID filter
             limit: Maximum results
+            rrf_k: Fusion constant; larger values flatten rank differences
+            weights: Per-type weight, e.g. {"document": 1.0, "vault_item": 0.8}
             
         Returns:
-            List of merged search results
+            List of merged search results, best first
         """
-        # Get FTS results
-        fts_results = await self.search_documents(query, user_id, limit)
-        
-        # Get vault results
-        vault_results = await self.search_vault_items(query, user_id, limit)
-        
-        # Combine results
-        all_results = []
-        seen_ids = set()
-        
-        # Add FTS results first (higher relevance)
-        for result in fts_results:
-            if result.document_id not in seen_ids:
-                all_results.append({
-                    "id": result.document_id,
-                    "type": "document",
-                    "title": result.headline,
-                    "rank": result.rank,
-                    "source": "fts"
-                })
-                seen_ids.add(result.document_id)
-        
-        # Add vault results
-        for result in vault_results:
-            if result.document_id not in seen_ids:
-                all_results.append({
-                    "id": result.document_id,
-                    "type": "vault_item",
-                    "title": result.headline,
-                    "rank": result.rank * 0.9,  # Slight penalty vs documents
-                    "source": "fts"
-                })
-                seen_ids.add(result.document_id)
-        
-        # Sort by rank and limit
-        all_results.sort(key=lambda x: x["rank"], reverse=True)
-        
-        return all_results[:limit]
+        tsquery = self._build_tsquery(query)
+        if not tsquery:
+            return []
+        weights = {"document": 1.0, "vault_item": 1.0, **(weights or {})}
+        user_filter = "AND {alias}.user_id = :user_id" if user_id else ""
+        
+        sql = f"""
+        WITH q AS (SELECT to_tsquery(:tsquery) AS tsq),
+        document_hits AS (
+            SELECT top.*, row_number() OVER (ORDER BY top.rank DESC, top.id) AS source_rank
+            FROM (
+                SELECT d.id::text AS id, 'document' AS type,
+                       COALESCE(d.extracted_text, d.filename) AS body,
+                       d.filename AS title,
+                       ts_rank(d.search_vector, q.tsq) AS rank
+                FROM documents d, q
+                WHERE d.search_vector @@ q.tsq {user_filter.format(alias="d")}
+                ORDER BY rank DESC, d.id
+                LIMIT :limit
+            ) top
+        ),
+        vault_hits AS (
+            SELECT top.*, row_number() OVER (ORDER BY top.rank DESC, top.id) AS source_rank
+            FROM (
+                SELECT v.item_id::text AS id, 'vault_item' AS type,
+                       COALESCE(v.summary, v.title) AS body,
+                       v.title AS title,
+                       ts_rank(v.search_vector, q.tsq) AS rank
+                FROM vault_items v, q
+                WHERE v.search_vector @@ q.tsq {user_filter.format(alias="v")}
+                ORDER BY rank DESC, v.item_id
+                LIMIT :limit
+            ) top
+        ),
+        fused AS (
+            SELECT hits.*,
+                   CASE hits.type
+                       WHEN 'document' THEN CAST(:document_weight AS double precision)
+                       ELSE CAST(:vault_weight AS double precision)
+                   END / (:rrf_k + hits.source_rank) AS score
+            FROM (SELECT * FROM document_hits UNION ALL SELECT * FROM vault_hits) hits
+            ORDER BY score DESC, hits.source_rank, hits.type
+            LIMIT :limit
+        )
+        SELECT fused.id, fused.type, fused.title, fused.source_rank, fused.score,
+               ts_headline('english', fused.body, q.tsq,
+                           'MaxWords=25, MinWords=10, MaxFragments=3') AS headline
+        FROM fused, q
+        ORDER BY fused.score DESC, fused.source_rank, fused.type
+        """
+        
+        params = {
+            "tsquery": tsquery,
+            "limit": limit,
+            "rrf_k": rrf_k,
+            "document_weight": float(weights["document"]),
+            "vault_weight": float(weights["vault_item"]),
+        }
+        if user_id:
+            params["user_id"] = user_id
+        
+        result = await self.db.execute(text(sql), params)
+        
+        return [
+            {
+                "id": row.id,
+                "type": row.type,
+                "title": row.headline or row.title,
+                "rank": float(row.score),
+                "source_rank": row.source_rank,
+                "source": "fts",
+            }
+            for row in result.fetchall()
+        ]
     
     def _build_tsquery(self, query: str) -> str:
         """
@@ -250,66 +312,6 @@ class PostgresFTSService:
         # Join multiple words with AND operator (&)
         return " & ".join(words)
     
-    async def update_document_vector(self, document_id: str) -> bool:
-        """
-        Update the search vector for a document.
-        
-        This should be called when:
-        - Document is created/updated
-        - OCR/extraction completes
-        - Content changes
-        
-        Args:
-            document_id: Document ID to update
-            
-        Returns:
-            True if updated successfully
-        """
-        sql = """
-        UPDATE documents
-        SET search_vector = 
-            setweight(to_tsvector('english', COALESCE(filename, '')), 'A') ||
-            setweight(to_tsvector('english', COALESCE(document_type, '')), 'B') ||
-            setweight(to_tsvector('english', COALESCE(extracted_text, '')), 'C')
-        WHERE id = :document_id
-        """
-        
-        try:
-            await self.db.execute(text(sql), {"document_id": document_id})
-            await self.db.commit()
-            return True
-        except Exception as e:
-            await self.db.rollback()
-            return False
-    
-    async def update_vault_item_vector(self, item_id: str) -> bool:
-        """
-        Update the search vector for a vault item.
-        
-        Args:
-            item_id: Vault item ID to update
-            
-        Returns:
-            True if updated successfully
-        """
-        sql = """
-        UPDATE vault_items
-        SET search_vector = 
-            setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
-            setweight(to_tsvector('english', COALESCE(summary, '')), 'B') ||
-            setweight(to_tsvector('english', COALESCE(item_type, '')), 'C') ||
-            setweight(to_tsvector('english', COALESCE(tags::text, '')), 'D')
-        WHERE id = :item_id
-        """
-        
-        try:
-            await self.db.execute(text(sql), {"item_id": item_id})
-            await self.db.commit()
-            return True
-        except Exception as e:
-            await self.db.rollback()
-            return False
-    
     async def get_search_suggestions(
         self,
         partial: str,
@@ -378,3 +380,111 @@ class PostgresFTSService:
 def get_fts_service(db: AsyncSession) -> PostgresFTSService:
     """Get FTS service instance."""
     return PostgresFTSService(db)
+
+
+class SearchVectorReindexer:
+    """
+    Rebuilds documents.search_vector for rows the trigger marked stale (NULL).
+    
+    Each batch is one UPDATE over up to batch_size rows claimed with
+    FOR UPDATE SKIP LOCKED, so several workers can sweep at once without
+    blocking each other or the writers. run() sweeps every interval
+    seconds, or sooner after notify().
+    """
+    
+    def __init__(self, session_factory: Any, batch_size: int = 500, interval: float = 5.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.rows_reindexed = 0
+        self._wake = asyncio.Event()
+    
+    async def reindex_batch(self) -> int:
+        """Rebuild one batch of stale vectors; returns rows updated."""
+        sql = f"""
+        WITH batch AS (
+            SELECT id FROM documents
+            WHERE search_vector IS NULL
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE documents d
+        SET search_vector = {DOCUMENT_VECTOR_SQL.replace('COALESCE(', 'COALESCE(d.')}
+        FROM batch
+        WHERE d.id = batch.id
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(text(sql), {"batch_size": self.batch_size})
+            await session.commit()
+        updated = result.rowcount or 0
+        self.rows_reindexed += updated
+        return updated
+    
+    async def run_once(self) -> int:
+        """Sweep until no stale rows are left; returns rows updated."""
+        total = 0
+        while True:
+            updated = await self.reindex_batch()
+            total += updated
+            if updated < self.batch_size:
+                return total
+    
+    def notify(self) -> None:
+        """Sweep now rather than at the next interval."""
+        self._wake.set()
+    
+    async def run(self) -> None:
+        while True:
+            try:
+                updated = await self.run_once()
+                if updated:
+                    logger.debug("Rebuilt %d document search vectors", updated)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Search vector reindex failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+_reindexer: Optional[SearchVectorReindexer] = None
+_reindex_task: Optional[asyncio.Task] = None
+
+
+def get_search_reindexer() -> Optional[SearchVectorReindexer]:
+    """The running reindexer, if this worker started one."""
+    return _reindexer
+
+
+async def start_search_reindexer() -> bool:
+    """Start the background reindexer on PostgreSQL; returns True if started."""
+    global _reindexer, _reindex_task
+    from app.core.config import get_settings
+    from app.core.database import get_engine, get_session_factory
+
+    if _reindex_task is not None or get_engine().dialect.name != "postgresql":
+        return False
+    settings = get_settings()
+    _reindexer = SearchVectorReindexer(
+        get_session_factory(),
+        batch_size=settings.fts_reindex_batch_size,
+        interval=settings.fts_reindex_interval,
+    )
+    _reindex_task = asyncio.create_task(_reindexer.run())
+    return True
+
+
+async def stop_search_reindexer() -> None:
+    global _reindexer, _reindex_task
+    if _reindex_task is None:
+        return
+    _reindex_task.cancel()
+    try:
+        await _reindex_task
+    except asyncio.CancelledError:
+        pass
+    _reindexer = _reindex_task = None
@@ -3,27 +3,65 @@ Document Preview Generator - Multi-format Preview System
 ====================================================
 
 Generates previews and thumbnails for various document formats.
+
+- PDF pages are rendered by PyMuPDF straight at the target size (a scaled
+  matrix rather than a full-resolution page resized afterwards), in a
+  process pool (PREVIEW_WORKERS) so rendering never runs on the event loop.
+- Rendered pages are WebP files (JPEG when Pillow lacks WebP) on disk under
+  PREVIEW_DIR, addressed by the document's SHA-256, so every worker serves
+  the same files and they survive restarts.
+- A preview is a JSON manifest of pages, paged by offset/limit; each page
+  image is rendered the first time it is requested.
+- The preview router serves the files by URL with ETag and Range support.
+- PREVIEW_DIR is bounded by PREVIEW_MAX_MB: a periodic scan (and any render
+  that takes the total past the bound) deletes the least recently used
+  documents' previews. Statistics report that scan's totals plus files
+  written since, so they never walk the tree on the event loop.
 """
 
+import asyncio
+import hashlib
+import importlib.util
+import json
 import logging
+import mimetypes
+import multiprocessing
 import os
-import io
+import re
+import shutil
 import tempfile
-import subprocess
-from typing import Dict, Any, List, Optional, Union, Tuple
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timezone
-from dataclasses import dataclass, asdict
 from enum import Enum
 from pathlib import Path
-import base64
-import hashlib
-import asyncio
-from PIL import Image, ImageDraw, ImageFont
-import fitz  # PyMuPDF for PDF processing
-import magic  # python-magic for file type detection
+from typing import Any, Dict, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont, features
 
 logger = logging.getLogger(__name__)
 
+# PyMuPDF for PDF processing; imported by the render functions in the worker processes
+HAS_PYMUPDF = importlib.util.find_spec("fitz") is not None
+
+try:
+    import magic  # python-magic for file type detection
+    HAS_MAGIC = True
+except ImportError:
+    HAS_MAGIC = False
+
+# File names of rendered pages: {kind}-{width}x{height}-p{page}.{ext}
+RENDERED_NAME = re.compile(r"^(thumbnail|preview)-\d+x\d+-p\d+\.(webp|jpeg)$")
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+# Remembered file digests, so repeated requests for a file do not hash it again
+DIGEST_MEMO_SIZE = 1024
+PRUNE_INTERVAL = 300.0          # seconds between scans of PREVIEW_DIR
+PRUNE_TO = 0.9                  # pruning frees space down to this fraction of the bound
+ACCESS_TOUCH_INTERVAL = 60.0    # a document's last use is recorded at most this often
+
 class PreviewType(Enum):
     """Preview generation types."""
     THUMBNAIL = "thumbnail"
@@ -45,17 +83,21 @@ class PreviewConfig:
     """Preview generation configuration."""
     thumbnail_size: Tuple[int, int] = (200, 300)
     preview_size: Tuple[int, int] = (800, 1200)
-    quality: int = 85
-    format: str = "JPEG"
+    quality: int = 80
+    format: str = field(default_factory=lambda: "WEBP" if features.check("webp") else "JPEG")
     max_text_length: int = 10000
     max_pages: int = 10
-    
+
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
 @dataclass
 class PreviewResult:
-    """Preview generation result."""
+    """Preview generation result.
+
+    For rendered pages content is the image's path on disk and cache_key is
+    "{digest}/{file name}"; for previews content is the page manifest.
+    """
     document_id: str
     preview_type: PreviewType
     content: Union[str, bytes, Dict[str, Any]]
@@ -64,7 +106,7 @@ class PreviewResult:
     generated_at: datetime
     cache_key: str
     metadata: Dict[str, Any] = None
-    
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "document_id": self.document_id,
@@ -76,12 +118,194 @@ class PreviewResult:
             "metadata": self.metadata
         }
 
+
+# =============================================================================
+# Rendering (runs in the worker processes; module level so spawn can import it)
+# =============================================================================
+
+def _save_image(img: Image.Image, out_path: str, image_format: str, quality: int) -> None:
+    """Write atomically, so a concurrent reader never sees a partial file."""
+    # WebP effort 2 of 6: same size as the default on page scans, about 3x faster
+    options = {"method": 2} if image_format == "WEBP" else {"optimize": True}
+    _write_atomic(out_path, lambda f: img.save(f, format=image_format, quality=quality, **options))
+
+
+def _write_atomic(out_path: Union[str, Path], write) -> None:
+    """Call write(file) on a unique temp file beside out_path, then move it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _render_pdf_page(source: str, page_number: int, box: Tuple[int, int], image_format: str,
+                     quality: int, out_path: str) -> Tuple[int, int]:
+    """Render one page scaled to fit box; returns the image size."""
+    import fitz
+
+    with fitz.open(source) as doc:
+        if not 1 <= page_number <= len(doc):
+            raise ValueError(f"Page {page_number} out of range (1-{len(doc)})")
+        page = doc.load_page(page_number - 1)
+        scale = min(box[0] / page.rect.width, box[1] / page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    _save_image(img, out_path, image_format, quality)
+    return img.width, img.height
+
+
+def _render_image(source: str, box: Tuple[int, int], image_format: str, quality: int,
+                  out_path: str) -> Tuple[int, int]:
+    """Downscale an image to fit box; returns the image size."""
+    with Image.open(source) as img:
+        # JPEGs decode straight at a reduced scale instead of full resolution
+        img.draft("RGB", box)
+        img = img.convert("RGB")
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        _save_image(img, out_path, image_format, quality)
+        return img.width, img.height
+
+
+def _render_text(source: str, box: Tuple[int, int], image_format: str, quality: int,
+                 out_path: str) -> Tuple[int, int]:
+    """Draw the first lines of a text file."""
+    with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = [f.readline() for _ in range(15)]
+
+    img = Image.new('RGB', box, color='white')
+    draw = ImageDraw.Draw(img)
+    font = _load_font(12)
+    y_offset = 10
+    for line in lines:
+        if y_offset > box[1] - 20:
+            break
+        line = line.rstrip("\n")
+        # Truncate long lines
+        display_line = line[:50] + "..." if len(line) > 50 else line
+        draw.text((10, y_offset), display_line, fill='black', font=font)
+        y_offset += 15
+    _save_image(img, out_path, image_format, quality)
+    return box
+
+
+def _render_placeholder(label: str, box: Tuple[int, int], image_format: str, quality: int,
+                        out_path: str) -> Tuple[int, int]:
+    """Grey card with the format name, for formats that are not rendered."""
+    img = Image.new('RGB', box, color='#f0f0f0')
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, box[0] - 1, box[1] - 1], outline='#cccccc')
+    font = _load_font(16)
+    bbox = draw.textbbox((0, 0), label, font=font)
+    x = (box[0] - (bbox[2] - bbox[0])) // 2
+    y = (box[1] - (bbox[3] - bbox[1])) // 2
+    draw.text((x, y), label, fill='#666666', font=font)
+    _save_image(img, out_path, image_format, quality)
+    return box
+
+
+def _load_font(size: int):
+    for name in ("DejaVuSans.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _pdf_manifest(source: str, offset: int, limit: int, max_text_length: int) -> Dict[str, Any]:
+    """Page count, document metadata, and size and text of pages [offset, offset + limit)."""
+    import fitz
+
+    with fitz.open(source) as doc:
+        pages = []
+        for index in range(offset, min(len(doc), offset + limit)):
+            page = doc.load_page(index)
+            pages.append({
+                "page_number": index + 1,
+                "text": page.get_text()[:max_text_length],
+                "dimensions": {"width": round(page.rect.width), "height": round(page.rect.height)},
+            })
+        return {
+            "type": "pdf",
+            "pages": pages,
+            "metadata": {
+                "page_count": len(doc),
+                "title": doc.metadata.get('title', ''),
+                "author": doc.metadata.get('author', ''),
+                "subject": doc.metadata.get('subject', ''),
+                "creator": doc.metadata.get('creator', ''),
+                "producer": doc.metadata.get('producer', ''),
+                "creation_date": doc.metadata.get('creationDate', ''),
+                "modification_date": doc.metadata.get('modDate', '')
+            }
+        }
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_render_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared preview rendering process pool (None when PREVIEW_WORKERS is 0)."""
+    global _render_executor
+    if _render_executor is None:
+        from app.core.config import get_settings
+        workers = get_settings().preview_workers
+        if workers <= 0:
+            return None
+        # spawn: the parent runs an event loop and threads, which fork does not copy safely
+        _render_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _render_executor
+
+
+def shutdown_render_executor(wait: bool = True) -> None:
+    """Stop the preview rendering worker processes (called on application shutdown)."""
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=wait, cancel_futures=True)
+        _render_executor = None
+
+
+async def _run_render(fn, *args):
+    """Run fn in the render pool, or a thread when the pool is off or has died."""
+    executor = get_render_executor()
+    if executor is not None:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            logger.warning("Preview render worker died; rendering in-process")
+            shutdown_render_executor(wait=False)
+    return await asyncio.to_thread(fn, *args)
+
+
 class PreviewGenerator:
     """Document preview and thumbnail generator."""
-    
-    def __init__(self, config: PreviewConfig = None):
+
+    def __init__(self, config: PreviewConfig = None, root: Union[str, Path, None] = None,
+                 max_bytes: Optional[int] = None):
         self.config = config or PreviewConfig()
-        
+        if root is None or max_bytes is None:
+            from app.core.config import get_settings
+            settings = get_settings()
+            root = settings.preview_dir if root is None else root
+            max_bytes = settings.preview_max_mb * 1024 * 1024 if max_bytes is None else max_bytes
+        self.root = Path(root)
+        self.max_bytes = max_bytes  # 0 = unbounded
+
         # Supported formats mapping
         self.mime_types = {
             "application/pdf": SupportedFormat.PDF,
@@ -90,6 +314,7 @@ class PreviewGenerator:
             "image/gif": SupportedFormat.IMAGE,
             "image/bmp": SupportedFormat.IMAGE,
             "image/tiff": SupportedFormat.IMAGE,
+            "image/webp": SupportedFormat.IMAGE,
             "text/plain": SupportedFormat.TEXT,
             "text/html": SupportedFormat.TEXT,
             "text/css": SupportedFormat.TEXT,
@@ -101,380 +326,218 @@ class PreviewGenerator:
             "application/vnd.ms-powerpoint": SupportedFormat.POWERPOINT,
             "application/vnd.openxmlformats-officedocument.presentationml.presentation": SupportedFormat.POWERPOINT,
         }
-        
-        # Preview cache
-        self.preview_cache: Dict[str, PreviewResult] = {}
-        
+
+        self._digests: "OrderedDict[tuple, str]" = OrderedDict()
+
+        # Files under root as of the last scan, plus files written since (None until scanned)
+        self.disk_files: Optional[int] = None
+        self.disk_bytes: Optional[int] = None
+        self.scanned_at: Optional[float] = None
+        self._prune_task: Optional[asyncio.Task] = None
+
         # Statistics
         self.stats = {
             "previews_generated": 0,
             "thumbnails_generated": 0,
+            "pages_rendered": 0,
             "cache_hits": 0,
             "cache_misses": 0,
             "errors": 0
         }
-    
-    def detect_format(self, file_path: str) -> Optional[SupportedFormat]:
-        """Detect document format from file."""
-        try:
-            mime_type = magic.from_file(file_path, mime=True)
-            return self.mime_types.get(mime_type)
-        except Exception as e:
-            logger.error(f"Format detection failed: {e}")
+
+    @property
+    def image_extension(self) -> str:
+        return self.config.format.lower()
+
+    def detect_format(self, file_path: str, mime_type: Optional[str] = None) -> Optional[SupportedFormat]:
+        """Detect document format from content (python-magic), else the MIME hint or extension."""
+        if HAS_MAGIC:
+            try:
+                mime_type = magic.from_file(file_path, mime=True)
+            except Exception as e:
+                logger.warning(f"Format detection failed: {e}")
+        mime_type = mime_type or mimetypes.guess_type(file_path)[0]
+        return self.mime_types.get(mime_type)
+
+    async def document_digest(self, file_path: str) -> str:
+        """SHA-256 of the file, remembered per (path, size, mtime)."""
+        stat = await asyncio.to_thread(os.stat, file_path)
+        key = (file_path, stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = await asyncio.to_thread(_hash_file, file_path)
+            self._digests[key] = digest
+            if len(self._digests) > DIGEST_MEMO_SIZE:
+                self._digests.popitem(last=False)
+        return digest
+
+    def document_dir(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def rendered_name(self, preview_type: PreviewType, page_number: int) -> str:
+        width, height = self._box(preview_type)
+        return f"{preview_type.value}-{width}x{height}-p{page_number}.{self.image_extension}"
+
+    def rendered_path(self, cache_key: str) -> Optional[Path]:
+        """Path of a rendered image from its cache key, or None if the key is invalid or missing."""
+        digest, _, name = cache_key.partition("/")
+        if not DIGEST.match(digest) or not RENDERED_NAME.match(name):
             return None
-    
-    def generate_cache_key(self, document_id: str, preview_type: PreviewType, 
-                          file_path: str = None) -> str:
-        """Generate cache key for preview."""
-        key_data = f"{document_id}:{preview_type.value}"
-        
-        if file_path and os.path.exists(file_path):
-            # Include file modification time for cache invalidation
-            mtime = os.path.getmtime(file_path)
-            key_data += f":{mtime}"
-        
-        return hashlib.md5(key_data.encode()).hexdigest()
-    
-    async def generate_thumbnail(self, document_id: str, file_path: str, 
-                               page_number: int = 1) -> Optional[PreviewResult]:
-        """Generate thumbnail for document."""
-        try:
-            cache_key = self.generate_cache_key(document_id, PreviewType.THUMBNAIL, file_path)
-            
-            # Check cache first
-            if cache_key in self.preview_cache:
-                self.stats["cache_hits"] += 1
-                return self.preview_cache[cache_key]
-            
+        path = self.document_dir(digest) / name
+        if not path.is_file():
+            return None
+        self._touch(path.parent)
+        return path
+
+    def _box(self, preview_type: PreviewType) -> Tuple[int, int]:
+        return self.config.thumbnail_size if preview_type == PreviewType.THUMBNAIL else self.config.preview_size
+
+    async def render_page(self, file_path: str, page_number: int = 1,
+                          preview_type: PreviewType = PreviewType.THUMBNAIL, document_id: str = "",
+                          digest: Optional[str] = None, mime_type: Optional[str] = None) -> PreviewResult:
+        """
+        Image of one page at thumbnail or preview size, rendered on first request.
+
+        Raises ValueError for an unsupported format or a page out of range.
+        """
+        digest = digest or await self.document_digest(file_path)
+        name = self.rendered_name(preview_type, page_number)
+        path = self.document_dir(digest) / name
+        cached = path.is_file()
+        if cached:
+            self.stats["cache_hits"] += 1
+            self._touch(path.parent)
+        else:
             self.stats["cache_misses"] += 1
-            
-            # Detect format
-            doc_format = self.detect_format(file_path)
+            doc_format = self.detect_format(file_path, mime_type)
             if not doc_format:
                 raise ValueError(f"Unsupported document format: {file_path}")
-            
-            # Generate thumbnail based on format
+            if page_number != 1 and doc_format != SupportedFormat.PDF:
+                raise ValueError(f"Page {page_number} out of range (1-1)")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            box = self._box(preview_type)
+            args = (box, self.config.format, self.config.quality, str(path))
             if doc_format == SupportedFormat.PDF:
-                thumbnail_data = await self._generate_pdf_thumbnail(file_path, page_number)
+                if not HAS_PYMUPDF:
+                    raise ValueError("PDF rendering requires PyMuPDF")
+                await _run_render(_render_pdf_page, file_path, page_number, *args)
             elif doc_format == SupportedFormat.IMAGE:
-                thumbnail_data = await self._generate_image_thumbnail(file_path)
+                await _run_render(_render_image, file_path, *args)
             elif doc_format == SupportedFormat.TEXT:
-                thumbnail_data = await self._generate_text_thumbnail(file_path)
+                await asyncio.to_thread(_render_text, file_path, *args)
             else:
-                thumbnail_data = await self._generate_generic_thumbnail(file_path, doc_format)
-            
-            # Create preview result
-            result = PreviewResult(
-                document_id=document_id,
-                preview_type=PreviewType.THUMBNAIL,
-                content=thumbnail_data,
-                format=self.config.format,
-                size_bytes=len(thumbnail_data) if isinstance(thumbnail_data, bytes) else 0,
-                generated_at=datetime.now(timezone.utc),
-                cache_key=cache_key,
-                metadata={
-                    "page_number": page_number,
-                    "size": self.config.thumbnail_size,
-                    "format": doc_format.value
-                }
-            )
-            
-            # Cache result
-            self.preview_cache[cache_key] = result
-            self.stats["thumbnails_generated"] += 1
-            
-            logger.info(f"Generated thumbnail for {document_id}")
+                await asyncio.to_thread(_render_placeholder, doc_format.value.upper(), *args)
+            self.stats["pages_rendered"] += 1
+            self._written(path)
+
+        with Image.open(path) as img:
+            width, height = img.size
+        return PreviewResult(
+            document_id=document_id,
+            preview_type=preview_type,
+            content=str(path),
+            format=self.image_extension,
+            size_bytes=path.stat().st_size,
+            generated_at=datetime.fromtimestamp(path.stat().st_mtime, timezone.utc),
+            cache_key=f"{digest}/{name}",
+            metadata={"page_number": page_number, "width": width, "height": height, "cached": cached}
+        )
+
+    async def generate_thumbnail(self, document_id: str, file_path: str, page_number: int = 1,
+                                 digest: Optional[str] = None) -> Optional[PreviewResult]:
+        """Generate thumbnail for document."""
+        try:
+            result = await self.render_page(file_path, page_number, PreviewType.THUMBNAIL, document_id, digest)
+            if not result.metadata["cached"]:
+                self.stats["thumbnails_generated"] += 1
+                logger.info(f"Generated thumbnail for {document_id}")
             return result
-            
+
         except Exception as e:
             self.stats["errors"] += 1
             logger.error(f"Thumbnail generation failed for {document_id}: {e}")
             return None
-    
-    async def generate_preview(self, document_id: str, file_path: str, 
-                              max_pages: int = None) -> Optional[PreviewResult]:
-        """Generate full preview for document."""
+
+    async def generate_preview(self, document_id: str, file_path: str, max_pages: int = None,
+                               offset: int = 0, digest: Optional[str] = None) -> Optional[PreviewResult]:
+        """
+        Page manifest for pages [offset, offset + max_pages) of a document.
+
+        Page images are not rendered here; each manifest page carries the
+        file name its preview image will have (render_page renders it).
+        """
         try:
-            cache_key = self.generate_cache_key(document_id, PreviewType.PREVIEW, file_path)
-            
-            # Check cache first
-            if cache_key in self.preview_cache:
+            digest = digest or await self.document_digest(file_path)
+            limit = max_pages or self.config.max_pages
+            manifest_path = self.document_dir(digest) / f"manifest-{offset}-{limit}.json"
+
+            if manifest_path.is_file():
                 self.stats["cache_hits"] += 1
-                return self.preview_cache[cache_key]
-            
-            self.stats["cache_misses"] += 1
-            
-            # Detect format
-            doc_format = self.detect_format(file_path)
-            if not doc_format:
-                raise ValueError(f"Unsupported document format: {file_path}")
-            
-            max_pages = max_pages or self.config.max_pages
-            
-            # Generate preview based on format
-            if doc_format == SupportedFormat.PDF:
-                preview_data = await self._generate_pdf_preview(file_path, max_pages)
-            elif doc_format == SupportedFormat.IMAGE:
-                preview_data = await self._generate_image_preview(file_path)
-            elif doc_format == SupportedFormat.TEXT:
-                preview_data = await self._generate_text_preview(file_path)
+                self._touch(manifest_path.parent)
+                preview_data = json.loads(await asyncio.to_thread(manifest_path.read_text))
             else:
-                preview_data = await self._generate_generic_preview(file_path, doc_format)
-            
-            # Create preview result
-            result = PreviewResult(
+                self.stats["cache_misses"] += 1
+                doc_format = self.detect_format(file_path)
+                if not doc_format:
+                    raise ValueError(f"Unsupported document format: {file_path}")
+                preview_data = await self._build_manifest(file_path, doc_format, offset, limit)
+                manifest_path.parent.mkdir(parents=True, exist_ok=True)
+                payload = json.dumps(preview_data).encode("utf-8")
+                await asyncio.to_thread(_write_atomic, manifest_path, lambda f: f.write(payload))
+                self._written(manifest_path)
+                self.stats["previews_generated"] += 1
+                logger.info(f"Generated preview for {document_id}")
+
+            for page in preview_data.get("pages", []):
+                page["image"] = self.rendered_name(PreviewType.PREVIEW, page["page_number"])
+
+            return PreviewResult(
                 document_id=document_id,
                 preview_type=PreviewType.PREVIEW,
                 content=preview_data,
                 format="json",
-                size_bytes=len(str(preview_data).encode()),
+                size_bytes=manifest_path.stat().st_size,
                 generated_at=datetime.now(timezone.utc),
-                cache_key=cache_key,
+                cache_key=f"{digest}/{manifest_path.name}",
                 metadata={
-                    "max_pages": max_pages,
-                    "format": doc_format.value,
+                    "offset": offset,
+                    "max_pages": limit,
+                    "page_count": preview_data.get("metadata", {}).get("page_count", len(preview_data.get("pages", []))),
+                    "format": preview_data["type"],
                     "size": self.config.preview_size
                 }
             )
-            
-            # Cache result
-            self.preview_cache[cache_key] = result
-            self.stats["previews_generated"] += 1
-            
-            logger.info(f"Generated preview for {document_id}")
-            return result
-            
+
         except Exception as e:
             self.stats["errors"] += 1
             logger.error(f"Preview generation failed for {document_id}: {e}")
             return None
-    
-    async def _generate_pdf_thumbnail(self, file_path: str, page_number: int) -> bytes:
-        """Generate thumbnail from PDF."""
-        try:
-            doc = fitz.open(file_path)
-            
-            if page_number > len(doc):
-                page_number = 1
-            
-            page = doc.load_page(page_number - 1)
-            
-            # Get page dimensions
-            pix = page.get_pixmap()
-            
-            # Create thumbnail
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # Resize to thumbnail size
-            img.thumbnail(self.config.thumbnail_size, Image.Resampling.LANCZOS)
-            
-            # Convert to bytes
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-            
-            doc.close()
-            return img_buffer.getvalue()
-            
-        except Exception as e:
-            logger.error(f"PDF thumbnail generation failed: {e}")
-            raise
-    
-    async def _generate_image_thumbnail(self, file_path: str) -> bytes:
-        """Generate thumbnail from image."""
-        try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Resize to thumbnail size
-                img.thumbnail(self.config.thumbnail_size, Image.Resampling.LANCZOS)
-                
-                # Convert to bytes
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-                
-                return img_buffer.getvalue()
-                
-        except Exception as e:
-            logger.error(f"Image thumbnail generation failed: {e}")
-            raise
-    
-    async def _generate_text_thumbnail(self, file_path: str) -> bytes:
-        """Generate thumbnail from text file."""
-        try:
-            # Read first few lines of text
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()[:10]
-                text = ''.join(lines)
-            
-            # Create image with text
-            width, height = self.config.thumbnail_size
-            img = Image.new('RGB', (width, height), color='white')
-            draw = ImageDraw.Draw(img)
-            
-            # Try to use a default font
-            try:
-                font = ImageFont.truetype("arial.ttf", 12)
-            except:
-                font = ImageFont.load_default()
-            
-            # Draw text
-            y_offset = 10
-            for line in lines[:15]:  # Max 15 lines
-                if y_offset > height - 20:
-                    break
-                
-                # Truncate long lines
-                display_line = line[:50] + "..." if len(line) > 50 else line
-                draw.text((10, y_offset), display_line, fill='black', font=font)
-                y_offset += 15
-            
-            # Convert to bytes
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-            
-            return img_buffer.getvalue()
-            
-        except Exception as e:
-            logger.error(f"Text thumbnail generation failed: {e}")
-            raise
-    
-    async def _generate_generic_thumbnail(self, file_path: str, doc_format: SupportedFormat) -> bytes:
-        """Generate generic thumbnail for unsupported formats."""
-        try:
-            width, height = self.config.thumbnail_size
-            img = Image.new('RGB', (width, height), color='#f0f0f0')
-            draw = ImageDraw.Draw(img)
-            
-            # Try to use a default font
-            try:
-                font = ImageFont.truetype("arial.ttf", 16)
-            except:
-                font = ImageFont.load_default()
-            
-            # Draw format icon/text
-            format_text = doc_format.value.upper()
-            bbox = draw.textbbox((0, 0), format_text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            x = (width - text_width) // 2
-            y = (height - text_height) // 2
-            
-            draw.text((x, y), format_text, fill='#666666', font=font)
-            
-            # Convert to bytes
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-            
-            return img_buffer.getvalue()
-            
-        except Exception as e:
-            logger.error(f"Generic thumbnail generation failed: {e}")
-            raise
-    
-    async def _generate_pdf_preview(self, file_path: str, max_pages: int) -> Dict[str, Any]:
-        """Generate preview from PDF."""
-        try:
-            doc = fitz.open(file_path)
-            
-            preview_data = {
-                "type": "pdf",
-                "pages": [],
-                "metadata": {
-                    "page_count": len(doc),
-                    "title": doc.metadata.get('title', ''),
-                    "author": doc.metadata.get('author', ''),
-                    "subject": doc.metadata.get('subject', ''),
-                    "creator": doc.metadata.get('creator', ''),
-                    "producer": doc.metadata.get('producer', ''),
-                    "creation_date": doc.metadata.get('creationDate', ''),
-                    "modification_date": doc.metadata.get('modDate', '')
-                }
+
+    async def _build_manifest(self, file_path: str, doc_format: SupportedFormat, offset: int,
+                              limit: int) -> Dict[str, Any]:
+        if doc_format == SupportedFormat.PDF:
+            if not HAS_PYMUPDF:
+                raise ValueError("PDF previews require PyMuPDF")
+            return await _run_render(_pdf_manifest, file_path, offset, limit, self.config.max_text_length)
+
+        if doc_format == SupportedFormat.IMAGE:
+            def image_info():
+                with Image.open(file_path) as img:
+                    return {"width": img.width, "height": img.height, "format": img.format}
+            info = await asyncio.to_thread(image_info)
+            return {
+                "type": "image",
+                "pages": [{"page_number": 1, "dimensions": {"width": info["width"], "height": info["height"]}}]
+                         if offset == 0 else [],
+                "metadata": {**info, "page_count": 1}
             }
-            
-            # Generate preview for each page
-            for page_num in range(min(len(doc), max_pages)):
-                page = doc.load_page(page_num)
-                
-                # Extract text
-                text = page.get_text()
-                
-                # Generate page image
-                pix = page.get_pixmap()
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                
-                # Resize to preview size
-                img.thumbnail(self.config.preview_size, Image.Resampling.LANCZOS)
-                
-                # Convert to base64
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-                
-                preview_data["pages"].append({
-                    "page_number": page_num + 1,
-                    "text": text[:self.config.max_text_length],
-                    "image": f"data:image/{self.config.format.lower()};base64,{img_base64}",
-                    "dimensions": {
-                        "width": pix.width,
-                        "height": pix.height
-                    }
-                })
-            
-            doc.close()
-            return preview_data
-            
-        except Exception as e:
-            logger.error(f"PDF preview generation failed: {e}")
-            raise
-    
-    async def _generate_image_preview(self, file_path: str) -> Dict[str, Any]:
-        """Generate preview from image."""
-        try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Get image info
-                preview_data = {
-                    "type": "image",
-                    "format": img.format,
-                    "mode": img.mode,
-                    "size": img.size,
-                    "metadata": {
-                        "width": img.width,
-                        "height": img.height,
-                        "format": img.format
-                    }
-                }
-                
-                # Generate preview image
-                preview_img = img.copy()
-                preview_img.thumbnail(self.config.preview_size, Image.Resampling.LANCZOS)
-                
-                # Convert to base64
-                img_buffer = io.BytesIO()
-                preview_img.save(img_buffer, format=self.config.format, quality=self.config.quality)
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-                
-                preview_data["preview"] = f"data:image/{self.config.format.lower()};base64,{img_base64}"
-                
-                return preview_data
-                
-        except Exception as e:
-            logger.error(f"Image preview generation failed: {e}")
-            raise
-    
-    async def _generate_text_preview(self, file_path: str) -> Dict[str, Any]:
-        """Generate preview from text file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read(self.config.max_text_length)
-            
-            preview_data = {
+
+        if doc_format == SupportedFormat.TEXT:
+            def read_text():
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    return f.read(self.config.max_text_length)
+            content = await asyncio.to_thread(read_text)
+            return {
                 "type": "text",
                 "content": content,
                 "metadata": {
@@ -483,37 +546,20 @@ class PreviewGenerator:
                     "truncated": len(content) == self.config.max_text_length
                 }
             }
-            
-            return preview_data
-            
-        except Exception as e:
-            logger.error(f"Text preview generation failed: {e}")
-            raise
-    
-    async def _generate_generic_preview(self, file_path: str, doc_format: SupportedFormat) -> Dict[str, Any]:
-        """Generate preview for unsupported formats."""
-        try:
-            file_size = os.path.getsize(file_path)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path), timezone.utc)
-            
-            preview_data = {
-                "type": "generic",
-                "format": doc_format.value,
-                "metadata": {
-                    "file_size": file_size,
-                    "file_size_human": self._format_file_size(file_size),
-                    "modified_time": file_mtime.isoformat(),
-                    "supported": False
-                },
-                "message": f"Preview not available for {doc_format.value} files"
-            }
-            
-            return preview_data
-            
-        except Exception as e:
-            logger.error(f"Generic preview generation failed: {e}")
-            raise
-    
+
+        file_size = os.path.getsize(file_path)
+        return {
+            "type": "generic",
+            "format": doc_format.value,
+            "metadata": {
+                "file_size": file_size,
+                "file_size_human": self._format_file_size(file_size),
+                "modified_time": datetime.fromtimestamp(os.path.getmtime(file_path), timezone.utc).isoformat(),
+                "supported": False
+            },
+            "message": f"Preview not available for {doc_format.value} files"
+        }
+
     def _format_file_size(self, size_bytes: int) -> str:
         """Format file size in human readable format."""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -521,35 +567,117 @@ class PreviewGenerator:
                 return f"{size_bytes:.1f} {unit}"
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
-    
-    def get_preview(self, document_id: str, preview_type: PreviewType) -> Optional[PreviewResult]:
-        """Get cached preview."""
-        for key, result in self.preview_cache.items():
-            if result.document_id == document_id and result.preview_type == preview_type:
-                self.stats["cache_hits"] += 1
-                return result
-        
-        self.stats["cache_misses"] += 1
-        return None
-    
-    def clear_cache(self, document_id: str = None):
-        """Clear preview cache."""
-        if document_id:
-            # Clear specific document previews
-            keys_to_remove = [key for key, result in self.preview_cache.items() 
-                            if result.document_id == document_id]
-            for key in keys_to_remove:
-                del self.preview_cache[key]
-        else:
-            # Clear all cache
-            self.preview_cache.clear()
-    
+
+    def get_preview(self, digest: str, preview_type: PreviewType, page_number: int = 1) -> Optional[PreviewResult]:
+        """Already rendered page image of a document, without rendering it."""
+        if not DIGEST.match(digest or ""):
+            return None
+        cache_key = f"{digest}/{self.rendered_name(preview_type, page_number)}"
+        path = self.rendered_path(cache_key)
+        if path is None:
+            self.stats["cache_misses"] += 1
+            return None
+        self.stats["cache_hits"] += 1
+        stat = path.stat()
+        return PreviewResult(
+            document_id="",
+            preview_type=preview_type,
+            content=str(path),
+            format=self.image_extension,
+            size_bytes=stat.st_size,
+            generated_at=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            cache_key=cache_key,
+            metadata={"page_number": page_number, "cached": True}
+        )
+
+    def clear_cache(self, digest: str = None):
+        """Delete rendered previews of one document (by SHA-256), or all of them when digest is None."""
+        if digest is not None:
+            if DIGEST.match(digest):
+                files, size = _dir_usage(str(self.document_dir(digest)))
+                shutil.rmtree(self.document_dir(digest), ignore_errors=True)
+                if self.disk_files is not None:
+                    self.disk_files = max(0, self.disk_files - files)
+                    self.disk_bytes = max(0, self.disk_bytes - size)
+        elif self.root.exists():
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.disk_files, self.disk_bytes = 0, 0
+
+    def _touch(self, directory: Path) -> None:
+        """Record a use of a document's previews; pruning removes the least recently used."""
+        try:
+            if time.time() - directory.stat().st_mtime > ACCESS_TOUCH_INTERVAL:
+                os.utime(directory)
+        except OSError:
+            pass
+
+    def _written(self, path: Path) -> None:
+        """Count a new file, and prune in the background once past the bound."""
+        if self.disk_bytes is None:
+            return
+        self.disk_files += 1
+        self.disk_bytes += path.stat().st_size
+        if self.max_bytes and self.disk_bytes > self.max_bytes and (self._prune_task is None or self._prune_task.done()):
+            self._prune_task = asyncio.get_running_loop().create_task(self.aprune())
+
+    def prune(self) -> int:
+        """
+        Recount the files under root and delete the least recently used
+        documents' previews until the total is under the bound.
+
+        Returns the number of documents removed. Blocking; use aprune()
+        from the event loop.
+        """
+        documents = []
+        try:
+            shards = [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except OSError:
+            shards = []
+        for shard in shards:
+            try:
+                entries = [entry for entry in os.scandir(shard) if entry.is_dir()]
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    last_used = entry.stat().st_mtime
+                except OSError:
+                    continue
+                documents.append((last_used, entry.path, *_dir_usage(entry.path)))
+
+        total_files = sum(files for _, _, files, _ in documents)
+        total_bytes = sum(size for _, _, _, size in documents)
+        removed = 0
+        if self.max_bytes and total_bytes > self.max_bytes:
+            target = int(self.max_bytes * PRUNE_TO)
+            for _, path, files, size in sorted(documents):
+                if total_bytes <= target:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total_files -= files
+                total_bytes -= size
+                removed += 1
+        self.disk_files, self.disk_bytes, self.scanned_at = total_files, total_bytes, time.time()
+        return removed
+
+    async def aprune(self) -> int:
+        removed = await asyncio.to_thread(self.prune)
+        if removed:
+            logger.info(f"Pruned previews of {removed} documents ({self.disk_bytes} bytes kept)")
+        return removed
+
     def get_statistics(self) -> Dict[str, Any]:
-        """Get preview generation statistics."""
+        """Get preview generation statistics (disk usage as of the last scan, plus writes since)."""
         return {
-            "cache_size": len(self.preview_cache),
+            "cache_files": self.disk_files,
+            "cache_bytes": self.disk_bytes,
+            "cache_max_bytes": self.max_bytes,
+            "cache_scanned_at": (
+                datetime.fromtimestamp(self.scanned_at, timezone.utc).isoformat() if self.scanned_at else None
+            ),
             "previews_generated": self.stats["previews_generated"],
             "thumbnails_generated": self.stats["thumbnails_generated"],
+            "pages_rendered": self.stats["pages_rendered"],
             "cache_hits": self.stats["cache_hits"],
             "cache_misses": self.stats["cache_misses"],
             "cache_hit_rate": (
@@ -559,40 +687,81 @@ class PreviewGenerator:
             "errors": self.stats["errors"]
         }
 
+def _dir_usage(path: str) -> Tuple[int, int]:
+    """(files, bytes) directly inside a document directory."""
+    files = size = 0
+    try:
+        for entry in os.scandir(path):
+            if entry.is_file():
+                files += 1
+                size += entry.stat().st_size
+    except OSError:
+        pass
+    return files, size
+
 # Global preview generator instance
 _preview_generator: Optional[PreviewGenerator] = None
+_pruner: Optional[asyncio.Task] = None
 
 def get_preview_generator() -> PreviewGenerator:
     """Get the global preview generator instance."""
     global _preview_generator
-    
+
     if _preview_generator is None:
         _preview_generator = PreviewGenerator()
-    
+
     return _preview_generator
 
 # Helper functions
-async def generate_document_thumbnail(document_id: str, file_path: str, page_number: int = 1) -> Optional[PreviewResult]:
+async def generate_document_thumbnail(document_id: str, file_path: str, page_number: int = 1,
+                                      digest: Optional[str] = None) -> Optional[PreviewResult]:
     """Generate thumbnail for document."""
     generator = get_preview_generator()
-    return await generator.generate_thumbnail(document_id, file_path, page_number)
+    return await generator.generate_thumbnail(document_id, file_path, page_number, digest)
 
-async def generate_document_preview(document_id: str, file_path: str, max_pages: int = None) -> Optional[PreviewResult]:
+async def generate_document_preview(document_id: str, file_path: str, max_pages: int = None,
+                                    offset: int = 0, digest: Optional[str] = None) -> Optional[PreviewResult]:
     """Generate preview for document."""
     generator = get_preview_generator()
-    return await generator.generate_preview(document_id, file_path, max_pages)
+    return await generator.generate_preview(document_id, file_path, max_pages, offset, digest)
 
-def get_cached_preview(document_id: str, preview_type: PreviewType) -> Optional[PreviewResult]:
+def get_cached_preview(digest: str, preview_type: PreviewType, page_number: int = 1) -> Optional[PreviewResult]:
     """Get cached preview."""
     generator = get_preview_generator()
-    return generator.get_preview(document_id, preview_type)
+    return generator.get_preview(digest, preview_type, page_number)
 
-def clear_preview_cache(document_id: str = None):
+def clear_preview_cache(digest: str = None):
     """Clear preview cache."""
     generator = get_preview_generator()
-    generator.clear_cache(document_id)
+    generator.clear_cache(digest)
 
 def get_preview_statistics() -> Dict[str, Any]:
     """Get preview generation statistics."""
     generator = get_preview_generator()
     return generator.get_statistics()
+
+async def _prune_loop(interval: float) -> None:
+    generator = get_preview_generator()
+    while True:
+        try:
+            await generator.aprune()
+        except Exception as e:
+            logger.warning(f"Preview pruning failed: {e}")
+        await asyncio.sleep(interval)
+
+async def start_preview_pruner(interval: float = PRUNE_INTERVAL) -> None:
+    """Scan PREVIEW_DIR now and every interval seconds, pruning it to PREVIEW_MAX_MB."""
+    global _pruner
+    if _pruner is None:
+        _pruner = asyncio.create_task(_prune_loop(interval))
+
+async def stop_preview_pruner() -> None:
+    global _pruner
+    if _pruner is None:
+        return
+    _pruner.cancel()
+    try:
+        await _pruner
+    except asyncio.CancelledError:
+        pass
+    _pruner = None
@@ -0,0 +1,512 @@
+"""
+Request Metrics - Fixed-Memory Always-On HTTP Metrics
+=====================================================
+
+Per-route request counters and latency sketches whose memory does not grow
+with traffic, so they can stay enabled in production:
+
+- Latency: one DDSketch-style log-bucketed histogram per route (1% relative
+  accuracy, at most MAX_BINS buckets), mergeable across workers.
+- Counters: per route and status code, plus a 60-slot per-minute window for
+  "last hour" figures.
+- Slow requests: a ring buffer of the most recent SLOW_SAMPLES samples.
+- Cardinality: routes are labelled by their template ("/api/vault/{id}"),
+  unmatched paths share one label and at most MAX_ROUTES labels are kept.
+
+Recording happens on the event loop thread without locks. Each worker
+periodically writes a snapshot to METRICS_DIR; aggregated_metrics() merges
+the live worker with every fresh sibling snapshot, which is what /metrics
+and the performance summaries read.
+
+Usage:
+    app.add_middleware(RequestMetricsMiddleware)
+    await start_metrics_publisher()          # lifespan startup
+    text = aggregated_metrics().render_prometheus()
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("METRICS_DIR", "data/metrics")
+PUBLISH_INTERVAL = 10.0         # seconds between worker snapshots
+STALE_AFTER = 3 * PUBLISH_INTERVAL
+
+MAX_ROUTES = 1000
+SLOW_SAMPLES = 100
+SLOW_REQUEST_MS = 1000.0
+UNMATCHED_ROUTE = "<unmatched>"
+OTHER_ROUTE = "<other>"
+WINDOW_MINUTES = 60
+
+# Prometheus histogram boundaries, seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencySketch:
+    """
+    Log-bucketed latency histogram with bounded relative error (DDSketch).
+
+    A value v lands in bucket ceil(log_gamma(v)); any quantile is returned
+    within RELATIVE_ACCURACY of the true value. Sketches merge by adding
+    bucket counts, so per-worker sketches combine exactly.
+    """
+
+    __slots__ = ("bins", "count", "total", "min", "max")
+
+    RELATIVE_ACCURACY = 0.01
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    MIN_VALUE = 0.001           # ms; anything faster is counted as zero
+    ZERO_KEY = -(1 << 30)
+    MAX_BINS = 2048
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        key = math.ceil(math.log(value) / self.LOG_GAMMA) if value > self.MIN_VALUE else self.ZERO_KEY
+        bins = self.bins
+        bins[key] = bins.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(bins) > self.MAX_BINS:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        # Fold the lowest buckets together: fast requests lose precision first
+        keys = sorted(self.bins)
+        excess = len(keys) - self.MAX_BINS
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def value_of(self, key: int) -> float:
+        """Representative value of a bucket."""
+        if key == self.ZERO_KEY:
+            return 0.0
+        return 2 * self.GAMMA ** key / (self.GAMMA + 1)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return min(max(self.value_of(key), self.min), self.max)
+        return self.max
+
+    def cumulative(self, bounds: Iterable[float]) -> List[int]:
+        """Counts at or below each bound (ascending), for histogram export."""
+        result = []
+        items = sorted(self.bins.items())
+        index = 0
+        seen = 0
+        for bound in bounds:
+            while index < len(items) and self.value_of(items[index][0]) <= bound:
+                seen += items[index][1]
+                index += 1
+            result.append(seen)
+        return result
+
+    def merge(self, other: "LatencySketch") -> None:
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.MAX_BINS:
+            self._collapse()
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bins": [[key, count] for key, count in self.bins.items()],
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls()
+        sketch.bins = {int(key): int(count) for key, count in data["bins"]}
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"] if sketch.count else math.inf
+        sketch.max = data["max"]
+        return sketch
+
+
+class RouteStats:
+    """Counters and latency for one (method, route) pair."""
+
+    __slots__ = ("method", "route", "statuses", "latency")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.statuses: Dict[int, int] = {}
+        self.latency = LatencySketch()
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status >= 400)
+
+    def merge(self, other: "RouteStats") -> None:
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.latency.merge(other.latency)
+
+
+class MetricsRegistry:
+    """Fixed-memory request metrics for one worker, or a merged view of several."""
+
+    def __init__(self, max_routes: int = MAX_ROUTES, slow_samples: int = SLOW_SAMPLES,
+                 slow_request_ms: float = SLOW_REQUEST_MS):
+        self.max_routes = max_routes
+        self.slow_request_ms = slow_request_ms
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.slow: deque = deque(maxlen=slow_samples)
+        # Per-minute ring: [minute, requests, errors, slow, duration_ms_total]
+        self.window: List[list] = [[-1, 0, 0, 0, 0.0] for _ in range(WINDOW_MINUTES)]
+        self.started = time.time()
+        self.workers = 1
+
+    # -- recording -----------------------------------------------------------
+
+    def record(self, method: str, route: str, status_code: int, duration_ms: float,
+               path: Optional[str] = None, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            if len(self.routes) >= self.max_routes:
+                key = (method, OTHER_ROUTE)
+                stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats(*key)
+        stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+        stats.latency.add(duration_ms)
+
+        slow = duration_ms >= self.slow_request_ms
+        if slow:
+            self.slow.append((now, method, route, path or route, status_code, round(duration_ms, 2)))
+
+        minute = int(now // 60)
+        slot = self.window[minute % WINDOW_MINUTES]
+        if slot[0] != minute:
+            slot[:] = [minute, 0, 0, 0, 0.0]
+        slot[1] += 1
+        slot[2] += status_code >= 400
+        slot[3] += slow
+        slot[4] += duration_ms
+
+    # -- snapshots -----------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "started": self.started,
+            "routes": [
+                {
+                    "method": stats.method,
+                    "route": stats.route,
+                    "statuses": {str(code): count for code, count in stats.statuses.items()},
+                    "latency": stats.latency.to_dict(),
+                }
+                for stats in self.routes.values()
+            ],
+            "slow": [list(sample) for sample in self.slow],
+            "window": [list(slot) for slot in self.window if slot[0] >= 0],
+        }
+
+    def merge_snapshot(self, data: Dict[str, Any]) -> None:
+        for item in data["routes"]:
+            key = (item["method"], item["route"])
+            other = RouteStats(*key)
+            other.statuses = {int(code): count for code, count in item["statuses"].items()}
+            other.latency = LatencySketch.from_dict(item["latency"])
+            stats = self.routes.get(key)
+            if stats is None:
+                self.routes[key] = other
+            else:
+                stats.merge(other)
+
+        samples = sorted(list(self.slow) + [tuple(s) for s in data["slow"]])
+        self.slow.clear()
+        self.slow.extend(samples[-self.slow.maxlen:])
+
+        for minute, requests, errors, slow, duration in data["window"]:
+            slot = self.window[minute % WINDOW_MINUTES]
+            if slot[0] < minute:
+                slot[:] = [minute, 0, 0, 0, 0.0]
+            if slot[0] == minute:
+                slot[1] += requests
+                slot[2] += errors
+                slot[3] += slow
+                slot[4] += duration
+        self.started = min(self.started, data.get("started", self.started))
+
+    @classmethod
+    def merged(cls, snapshots: Iterable[Dict[str, Any]]) -> "MetricsRegistry":
+        registry = cls(max_routes=math.inf)
+        registry.workers = 0
+        for data in snapshots:
+            registry.merge_snapshot(data)
+            registry.workers += 1
+        return registry
+
+    # -- queries -------------------------------------------------------------
+
+    @property
+    def total_requests(self) -> int:
+        return sum(stats.latency.count for stats in self.routes.values())
+
+    def overall_latency(self) -> LatencySketch:
+        sketch = LatencySketch()
+        for stats in self.routes.values():
+            sketch.merge(stats.latency)
+        return sketch
+
+    def recent(self, minutes: int = WINDOW_MINUTES, now: Optional[float] = None) -> Dict[str, float]:
+        """Totals over the last `minutes` minutes from the per-minute window."""
+        now = time.time() if now is None else now
+        oldest = int(now // 60) - min(minutes, WINDOW_MINUTES) + 1
+        requests = errors = slow = 0
+        duration = 0.0
+        for minute, r, e, s, d in self.window:
+            if minute >= oldest:
+                requests += r
+                errors += e
+                slow += s
+                duration += d
+        return {"requests": requests, "errors": errors, "slow": slow, "duration_ms": duration}
+
+    def route_stats(self, route: str) -> Optional[RouteStats]:
+        """Stats for a route template (or raw path) across all methods."""
+        combined = None
+        for (_, name), stats in self.routes.items():
+            if name == route:
+                if combined is None:
+                    combined = RouteStats("*", route)
+                combined.merge(stats)
+        return combined
+
+    def slow_requests(self, limit: int = SLOW_SAMPLES) -> List[Dict[str, Any]]:
+        return [
+            {
+                "timestamp": timestamp,
+                "method": method,
+                "route": route,
+                "path": path,
+                "status_code": status_code,
+                "duration_ms": duration_ms,
+            }
+            for timestamp, method, route, path, status_code, duration_ms in list(self.slow)[-limit:]
+        ]
+
+    def render_prometheus(self, prefix: str = "semptify_http") -> str:
+        """Prometheus text exposition of the per-route counters and histograms."""
+        lines = [
+            f"# HELP {prefix}_requests_total HTTP requests by route and status",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        ordered = sorted(self.routes.values(), key=lambda s: (s.route, s.method))
+        for stats in ordered:
+            labels = f'method="{stats.method}",route="{_escape(stats.route)}"'
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'{prefix}_requests_total{{{labels},status="{status}"}} {count}')
+
+        lines += [
+            "",
+            f"# HELP {prefix}_request_duration_seconds HTTP request latency by route",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        bounds_ms = [bound * 1000 for bound in BUCKETS]
+        for stats in ordered:
+            labels = f'method="{stats.method}",route="{_escape(stats.route)}"'
+            sketch = stats.latency
+            for bound, count in zip(BUCKETS, sketch.cumulative(bounds_ms)):
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {sketch.count}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {sketch.total / 1000:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {sketch.count}')
+
+        lines += [
+            "",
+            f"# HELP {prefix}_workers Worker processes included in these metrics",
+            f"# TYPE {prefix}_workers gauge",
+            f"{prefix}_workers {self.workers}",
+        ]
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def route_template(scope: Scope) -> str:
+    """
+    The matched route's path template, e.g. "/api/vault/{document_id}".
+
+    Built from the request path and its path parameters so include prefixes
+    are kept whichever way the router nests them; requests that matched no
+    route share UNMATCHED_ROUTE.
+    """
+    if scope.get("route") is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    params = scope.get("path_params")
+    if not params:
+        return path
+    # Substitute from the right so a value repeated in the prefix is left alone
+    for name, value in sorted(params.items(), key=lambda item: -len(str(item[1]))):
+        value = str(value)
+        if not value:
+            continue
+        end = len(path)
+        while True:
+            start = path.rfind("/" + value, 0, end)
+            if start == -1:
+                break
+            stop = start + 1 + len(value)
+            if stop == len(path) or path[stop] == "/":
+                path = f"{path[:start + 1]}{{{name}}}{path[stop:]}"
+                break
+            end = start + len(value)
+    return path
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware that records every HTTP request into the worker registry."""
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or get_request_metrics()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.record(
+                scope["method"],
+                route_template(scope),
+                status_code,
+                (time.perf_counter() - started) * 1000,
+                path=scope["path"],
+            )
+
+
+# =============================================================================
+# Worker registry, publishing and aggregation
+# =============================================================================
+
+_registry = MetricsRegistry()
+_publisher: Optional[asyncio.Task] = None
+
+
+def get_request_metrics() -> MetricsRegistry:
+    """This worker's registry."""
+    return _registry
+
+
+def _snapshot_path(directory: Path, pid: int) -> Path:
+    return directory / f"worker-{pid}.json"
+
+
+def publish_snapshot(directory: Optional[str] = None) -> None:
+    """Write this worker's snapshot for sibling workers to read (atomic replace)."""
+    path = Path(directory or METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    target = _snapshot_path(path, os.getpid())
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(json.dumps(_registry.snapshot()), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def aggregated_metrics(directory: Optional[str] = None) -> MetricsRegistry:
+    """This worker's live metrics merged with every fresh sibling snapshot."""
+    snapshots = [_registry.snapshot()]
+    path = Path(directory or METRICS_DIR)
+    if path.is_dir():
+        own = _snapshot_path(path, os.getpid()).name
+        cutoff = time.time() - STALE_AFTER
+        for file in path.glob("worker-*.json"):
+            try:
+                if file.name == own or file.stat().st_mtime < cutoff:
+                    continue
+                snapshots.append(json.loads(file.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue    # worker exiting or mid-write
+    return MetricsRegistry.merged(snapshots)
+
+
+async def _publish_loop(interval: float) -> None:
+    while True:
+        try:
+            publish_snapshot()
+        except OSError as e:
+            logger.warning("Could not publish metrics snapshot: %s", e)
+        await asyncio.sleep(interval)
+
+
+async def start_metrics_publisher(interval: float = PUBLISH_INTERVAL) -> None:
+    global _publisher
+    if _publisher is None:
+        _publisher = asyncio.create_task(_publish_loop(interval))
+
+
+async def stop_metrics_publisher() -> None:
+    global _publisher
+    if _publisher is None:
+        return
+    _publisher.cancel()
+    try:
+        await _publisher
+    except asyncio.CancelledError:
+        pass
+    _publisher = None
+    try:
+        _snapshot_path(Path(METRICS_DIR), os.getpid()).unlink()
+    except OSError:
+        pass
@@ -0,0 +1,189 @@
+"""
+Lazy Router Registry
+====================
+
+Maps URL prefixes to router modules so each module is imported the first
+time a request reaches one of its prefixes, instead of when app.main is
+imported. Workers start faster and only pay the memory for the subsystems
+they actually serve.
+
+Usage:
+    registry = RouterRegistry([
+        LazyRouter("app.routers.recognition", ("/api/recognition",), tags=["Document Recognition"]),
+        LazyRouter("app.routers.vault", ("/api/vault",), prefix="/api/vault", tags=["Document Vault"]),
+    ])
+    registry.install(app, preload=["recognition"])
+
+Prefixes are the public paths a router serves (including any include
+prefix) and are matched on whole path segments. Routes of a loaded router
+are spliced into app.router.routes at the point install() was called, in
+registry order, so routes registered afterwards (SPA catch-alls) still
+match last - exactly as if every router had been included eagerly.
+
+Configuration:
+    LAZY_ROUTERS      "false" imports every router at startup (default: true)
+    PRELOAD_ROUTERS   comma-separated router names or module paths to import
+                      at startup; "*" preloads all
+"""
+
+import importlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.startup_profiler import current_rss
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LazyRouter:
+    """Where a router lives and how to include it."""
+
+    module: str
+    prefixes: Tuple[str, ...]
+    attr: str = "router"
+    prefix: str = ""
+    tags: Optional[List[str]] = None
+    preload: bool = False   # import at startup (module has import-time side effects)
+
+    @property
+    def name(self) -> str:
+        short = self.module.rsplit(".", 1)[-1]
+        return short if self.attr == "router" else f"{short}.{self.attr}"
+
+    def include_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {}
+        if self.prefix:
+            kwargs["prefix"] = self.prefix
+        if self.tags:
+            kwargs["tags"] = list(self.tags)
+        return kwargs
+
+
+class RouterRegistry:
+    """Imports and includes registered routers on demand."""
+
+    def __init__(self, routers: Sequence[LazyRouter]):
+        self.routers = list(routers)
+        self.app = None
+        self._anchor = 0
+        self._lock = threading.RLock()
+        self._pending = set(range(len(self.routers)))
+        self._route_counts: Dict[int, int] = {}
+        self.load_stats: Dict[str, Dict[str, Any]] = {}
+
+        self._by_prefix: Dict[str, List[int]] = {}
+        for index, entry in enumerate(self.routers):
+            for path_prefix in entry.prefixes:
+                self._by_prefix.setdefault(path_prefix.rstrip("/"), []).append(index)
+
+    @property
+    def pending(self) -> int:
+        """Number of routers not imported yet."""
+        return len(self._pending)
+
+    def install(self, app, lazy: bool = True, preload: Iterable[str] = ()) -> None:
+        """Attach to app; routes of loaded routers go where this is called."""
+        self.app = app
+        self._anchor = len(app.router.routes)
+        app.add_middleware(LazyRouterMiddleware, registry=self)
+
+        # The OpenAPI schema has to describe every route, loaded or not
+        build_openapi = app.openapi
+
+        def openapi() -> Dict[str, Any]:
+            if self._pending:
+                self.load_all()
+            return build_openapi()
+
+        app.openapi = openapi
+
+        wanted = {name.strip() for name in preload if name.strip()}
+        if not lazy or "*" in wanted:
+            self.load_all()
+            return
+        for index, entry in enumerate(self.routers):
+            if entry.preload or entry.name in wanted or entry.module in wanted:
+                self._load(index)
+
+    def ensure_loaded(self, path: str) -> int:
+        """Load every router serving path; returns how many were loaded."""
+        if not self._pending:
+            return 0
+        loaded = 0
+        end = 0
+        # Walk the segment prefixes of path: /api, /api/vault, /api/vault/upload
+        while True:
+            end = path.find("/", end + 1)
+            segment = path if end == -1 else path[:end]
+            for index in self._by_prefix.get(segment, ()):
+                if index in self._pending:
+                    self._load(index)
+                    loaded += 1
+            if end == -1:
+                return loaded
+
+    def load_all(self) -> None:
+        for index in range(len(self.routers)):
+            if index in self._pending:
+                self._load(index)
+
+    def _load(self, index: int) -> None:
+        with self._lock:
+            if index not in self._pending:
+                return
+            self._pending.discard(index)
+            entry = self.routers[index]
+            started = time.perf_counter()
+            rss_before = current_rss()
+            try:
+                module = importlib.import_module(entry.module)
+                router = getattr(module, entry.attr)
+            except (ImportError, AttributeError) as ex:
+                logger.warning("Router import failed (%s): %s", entry.module, ex)
+                self.load_stats[entry.name] = {"loaded": False, "error": str(ex)}
+                return
+
+            routes = self.app.router.routes
+            before = len(routes)
+            self.app.include_router(router, **entry.include_kwargs())
+            added = routes[before:]
+            del routes[before:]
+            position = self._anchor + sum(
+                count for i, count in self._route_counts.items() if i < index
+            )
+            routes[position:position] = added
+            self._route_counts[index] = len(added)
+            self.app.openapi_schema = None
+
+            elapsed = time.perf_counter() - started
+            self.load_stats[entry.name] = {
+                "loaded": True,
+                "routes": len(router.routes),
+                "seconds": round(elapsed, 4),
+                "rss_delta_bytes": current_rss() - rss_before,
+            }
+            logger.debug("Loaded router %s (%d routes) in %.1fms", entry.name, len(router.routes), elapsed * 1000)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "registered": len(self.routers),
+            "pending": self.pending,
+            "loaded": self.load_stats,
+        }
+
+
+class LazyRouterMiddleware:
+    """Pure ASGI middleware that loads the routers for a path before routing."""
+
+    def __init__(self, app, registry: RouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.registry.pending:
+            self.registry.ensure_loaded(scope["path"])
+        await self.app(scope, receive, send)
@@ -5,16 +5,31 @@ Advanced Search Engine - Full-text Search with Indexing
 Provides advanced search capabilities with document indexing and relevance scoring.
 """
 
+import heapq
 import logging
 import re
 import math
+from bisect import bisect_left, bisect_right
 from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, asdict
 from collections import defaultdict, Counter
 import json
+import os
 import asyncio
+import time
+import uuid
+from contextlib import contextmanager
 from enum import Enum
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.core.search_segment import IndexSegment, SegmentDocument, SegmentWriter, bitmap_from_positions
 
 logger = logging.getLogger(__name__)
 
@@ -164,220 +179,849 @@ class TextProcessor:
         
         return keywords
 
+# Reserved facet terms (NUL-prefixed so they can never collide with tokenized words)
+USER_FACET = "\x00u:"
+FILE_TYPE_FACET = "\x00f:"
+TAG_FACET = "\x00g:"
+TITLE_FACET = "\x00h:"
+
+# BM25 parameters and score boosts
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_MATCH_BOOST = 2.0
+RECENCY_BOOST = 0.5
+
+
+def _document_facets(doc: DocumentIndex, title_tokens: List[str]) -> Dict[str, int]:
+    """Facet terms indexed alongside a document's words."""
+    facets = {USER_FACET + doc.user_id: 1, FILE_TYPE_FACET + doc.file_type: 1}
+    for tag in doc.tags:
+        facets[TAG_FACET + tag] = 1
+    for token in title_tokens:
+        facets[TITLE_FACET + token] = 1
+    return facets
+
+
+class _PostingCursor:
+    """
+    Forward-only cursor over one term's postings in global ordinal order.
+
+    Ordinals number every document across the index: each segment's doc
+    numbers are offset by the size of the segments before it, and buffered
+    documents come last.
+    """
+
+    __slots__ = ("chunks", "chunk", "pos", "df", "max_tf")
+
+    def __init__(self, chunks: List[Tuple[int, Any, Any, Set[int]]]):
+        # chunks: [(base ordinal, doc numbers, term frequencies, deleted doc numbers)]
+        self.chunks = [c for c in chunks if len(c[1])]
+        self.chunk = 0
+        self.pos = 0
+        self.df = sum(len(ords) - self._count_deleted(ords, deleted) for _, ords, _, deleted in self.chunks)
+        self.max_tf = max((max(tfs) for _, _, tfs, _ in self.chunks), default=0)
+        self._settle()
+
+    @staticmethod
+    def _count_deleted(ords, deleted: Set[int]) -> int:
+        count = 0
+        for docnum in deleted:
+            i = bisect_left(ords, docnum)
+            if i < len(ords) and ords[i] == docnum:
+                count += 1
+        return count
+
+    def _settle(self):
+        while self.chunk < len(self.chunks):
+            _, ords, _, deleted = self.chunks[self.chunk]
+            if deleted:
+                while self.pos < len(ords) and ords[self.pos] in deleted:
+                    self.pos += 1
+            if self.pos < len(ords):
+                return
+            self.chunk += 1
+            self.pos = 0
+
+    @property
+    def doc(self) -> Optional[int]:
+        if self.chunk >= len(self.chunks):
+            return None
+        base, ords, _, _ = self.chunks[self.chunk]
+        return base + ords[self.pos]
+
+    @property
+    def tf(self) -> int:
+        return self.chunks[self.chunk][2][self.pos]
+
+    def next(self):
+        self.pos += 1
+        self._settle()
+
+    def seek(self, target: int):
+        """Advance to the first document >= target."""
+        while self.chunk < len(self.chunks):
+            base, ords, _, _ = self.chunks[self.chunk]
+            if base + ords[-1] >= target:
+                self.pos = bisect_left(ords, target - base, self.pos)
+                self._settle()
+                return
+            self.chunk += 1
+            self.pos = 0
+
+
+class _Scorer:
+    """One query term's contribution: BM25 for words, a flat boost for title facets."""
+
+    __slots__ = ("cursor", "weight", "upper_bound", "is_title")
+
+    def __init__(self, cursor: _PostingCursor, weight: float, upper_bound: float, is_title: bool = False):
+        self.cursor = cursor
+        self.weight = weight
+        self.upper_bound = upper_bound
+        self.is_title = is_title
+
+
+def _iter_bits(bits: int):
+    """Yield the positions of set bits in ascending order."""
+    for index, byte in enumerate(bits.to_bytes(bits.bit_length() // 8 + 1, "little")):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _lock_file(f, blocking: bool = True) -> bool:
+    """Take an exclusive lock on an open file; False if it is held elsewhere and blocking is off."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _document_to_stored(doc: DocumentIndex) -> Dict[str, Any]:
+    """Serialize a DocumentIndex into segment stored fields."""
+    stored = asdict(doc)
+    stored["created_at"] = doc.created_at.isoformat()
+    stored["updated_at"] = doc.updated_at.isoformat()
+    return stored
+
+
+def _document_from_stored(stored: Dict[str, Any]) -> DocumentIndex:
+    """Rebuild a DocumentIndex from segment stored fields."""
+    stored = dict(stored)
+    stored["created_at"] = datetime.fromisoformat(stored["created_at"])
+    stored["updated_at"] = datetime.fromisoformat(stored["updated_at"])
+    return DocumentIndex(**stored)
+
+
 class InvertedIndex:
-    """Inverted index for fast text search."""
-    
-    def __init__(self):
+    """
+    Inverted index for fast text search.
+
+    New documents go into an in-memory buffer. When ``index_dir`` is set the
+    buffer is flushed into immutable on-disk segments (see search_segment.py)
+    once it reaches ``flush_threshold`` documents, and the index is reopened
+    from those segments on startup instead of being rebuilt. Deletes against
+    flushed documents are tombstoned in the manifest and dropped on merge.
+
+    Several workers may share one ``index_dir``. Every change to segments or
+    the manifest happens under an exclusive lock on ``write.lock`` and
+    starts by re-reading the manifest, and searches reload it when another
+    worker has replaced it. Buffered documents are also appended to this
+    process's ``buffer-*.jsonl`` journal; a journal whose owner died before
+    flushing is replayed by the next index to open the directory.
+
+    Each change takes the lock and fsyncs the journal. ``batch()`` holds the
+    lock across many changes and fsyncs their journal records once at the
+    end, for bulk indexing.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    LOCK_NAME = "write.lock"
+    JOURNAL_GLOB = "buffer-*.jsonl"
+
+    def __init__(self, index_dir: Optional[str] = None, flush_threshold: int = 1000,
+                 max_segments: int = 8):
+        # In-memory buffer (documents not yet flushed to a segment)
         self.index: Dict[str, Set[str]] = defaultdict(set)  # word -> document_ids
         self.document_index: Dict[str, DocumentIndex] = {}  # document_id -> DocumentIndex
         self.word_counts: Dict[str, Dict[str, int]] = defaultdict(dict)  # word -> {doc_id: count}
         self.document_lengths: Dict[str, int] = {}  # document_id -> word_count
+        self._doc_terms: Dict[str, Dict[str, int]] = {}  # document_id -> {word: count}
+        self._buffer_ords: Dict[str, int] = {}  # document_id -> ordinal within the buffer
+        self._buffer_docs: Dict[int, str] = {}  # ordinal within the buffer -> document_id
+        self._next_buffer_ord = 0
+
+        # On-disk segments
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.flush_threshold = flush_threshold
+        self.max_segments = max_segments
+        self.segments: List[IndexSegment] = []
+        self._segment_docs: Dict[str, Tuple[IndexSegment, int]] = {}  # document_id -> (segment, docnum)
+        self._deleted: Dict[str, Set[int]] = {}  # segment name -> tombstoned docnums
+        self._next_segment = 1
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+        self._lock_handle = None
+        self._lock_depth = 0
+        self._batch_depth = 0
+        self._journal = None
+
         self.total_documents = 0
-        self.avg_document_length = 0
-        
+        self.total_length = 0
+        self.processor = TextProcessor()
+
+        if self.index_dir:
+            self._open()
+
+    @property
+    def avg_document_length(self) -> float:
+        return self.total_length / self.total_documents if self.total_documents else 0
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.document_index or document_id in self._segment_docs
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def batch(self):
+        """
+        Group many changes: the write lock is taken and the manifest read
+        once, and the journal is synced once when the batch ends (or its
+        documents are flushed to a segment).
+        """
+        with self._writer():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._sync_journal()
+
     def add_document(self, doc: DocumentIndex):
         """Add document to index."""
-        processor = TextProcessor()
-        
-        # Process content
-        content_tokens = processor.tokenize(doc.content)
-        title_tokens = processor.tokenize(doc.title)
-        
+        with self._writer():
+            self._add_document(doc)
+
+    def _add_document(self, doc: DocumentIndex):
+        if doc.document_id in self:
+            self._remove_document(doc.document_id)
+        self._log({"op": "add", "doc": _document_to_stored(doc)})
+
         # Combine tokens (title gets higher weight)
-        all_tokens = title_tokens + content_tokens
-        
-        # Update document length
-        self.document_lengths[doc.document_id] = len(all_tokens)
-        
-        # Update inverted index
-        token_counts = Counter(all_tokens)
-        
+        title_tokens = self.processor.tokenize(doc.title)
+        all_tokens = title_tokens + self.processor.tokenize(doc.content)
+        token_counts = dict(Counter(all_tokens))
+        token_counts.update(_document_facets(doc, title_tokens))
+
         for token, count in token_counts.items():
             self.index[token].add(doc.document_id)
             self.word_counts[token][doc.document_id] = count
-        
-        # Store document
+
         self.document_index[doc.document_id] = doc
+        self.document_lengths[doc.document_id] = len(all_tokens)
+        self._doc_terms[doc.document_id] = token_counts
+        self._buffer_ords[doc.document_id] = self._next_buffer_ord
+        self._buffer_docs[self._next_buffer_ord] = doc.document_id
+        self._next_buffer_ord += 1
         self.total_documents += 1
-        
-        # Update average document length
-        total_length = sum(self.document_lengths.values())
-        self.avg_document_length = total_length / self.total_documents
-    
+        self.total_length += len(all_tokens)
+
+        if self.index_dir and len(self.document_index) >= self.flush_threshold:
+            self._flush()
+
     def remove_document(self, document_id: str):
         """Remove document from index."""
-        if document_id not in self.document_index:
+        with self._writer():
+            self._remove_document(document_id)
+
+    def _remove_document(self, document_id: str):
+        if document_id in self.document_index:
+            self._log({"op": "remove", "document_id": document_id})
+            for token in self._doc_terms.pop(document_id):
+                postings = self.index.get(token)
+                if postings is not None:
+                    postings.discard(document_id)
+                    if not postings:
+                        del self.index[token]
+                counts = self.word_counts.get(token)
+                if counts is not None:
+                    counts.pop(document_id, None)
+                    if not counts:
+                        del self.word_counts[token]
+            del self.document_index[document_id]
+            del self._buffer_docs[self._buffer_ords.pop(document_id)]
+            self.total_length -= self.document_lengths.pop(document_id)
+            self.total_documents -= 1
             return
-        
-        doc = self.document_index[document_id]
-        processor = TextProcessor()
-        
-        # Get tokens
-        content_tokens = processor.tokenize(doc.content)
-        title_tokens = processor.tokenize(doc.title)
-        all_tokens = title_tokens + content_tokens
-        
-        # Remove from inverted index
-        token_counts = Counter(all_tokens)
-        
-        for token in token_counts:
-            if document_id in self.index[token]:
-                self.index[token].discard(document_id)
-                if not self.index[token]:
-                    del self.index[token]
-            
-            if token in self.word_counts and document_id in self.word_counts[token]:
-                del self.word_counts[token][document_id]
-        
-        # Remove document
-        del self.document_index[document_id]
-        del self.document_lengths[document_id]
+
+        location = self._segment_docs.pop(document_id, None)
+        if location is None:
+            return
+        segment, docnum = location
+        self._deleted.setdefault(segment.name, set()).add(docnum)
+        self.total_length -= segment.doc_length(docnum)
         self.total_documents -= 1
-        
-        # Update average document length
-        if self.total_documents > 0:
-            total_length = sum(self.document_lengths.values())
-            self.avg_document_length = total_length / self.total_documents
-        else:
-            self.avg_document_length = 0
-    
+        # Persist the tombstone right away so a deleted document cannot resurface after a crash
+        self._write_manifest()
+
+    def clear(self):
+        """Drop every document, including on-disk segments."""
+        with self._writer():
+            old_segments = self.segments
+            self._clear_buffer()
+            self.segments = []
+            self._segment_docs.clear()
+            self._deleted.clear()
+            self.total_documents = 0
+            self.total_length = 0
+            if self.index_dir:
+                self._write_manifest()
+            self._remove_segment_files(old_segments)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get_document(self, document_id: str) -> Optional[DocumentIndex]:
+        """Fetch a document from the buffer or its segment."""
+        doc = self.document_index.get(document_id)
+        if doc is not None:
+            return doc
+        location = self._segment_docs.get(document_id)
+        if location is None:
+            return None
+        segment, docnum = location
+        return _document_from_stored(segment.stored_fields(docnum))
+
+    def get_document_length(self, document_id: str) -> int:
+        length = self.document_lengths.get(document_id)
+        if length is not None:
+            return length
+        segment, docnum = self._segment_docs[document_id]
+        return segment.doc_length(docnum)
+
+    def get_postings(self, token: str) -> Dict[str, int]:
+        """Return {document_id: term frequency} for token across buffer and segments."""
+        postings = dict(self.word_counts.get(token, {}))
+        for segment in self.segments:
+            deleted = self._deleted.get(segment.name, ())
+            for docnum, tf in segment.postings(token):
+                if docnum not in deleted:
+                    postings[segment.doc_id(docnum)] = tf
+        return postings
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Write buffered documents to a new segment."""
+        with self._writer():
+            self._flush()
+
+    def _flush(self):
+        if not self.index_dir or not self.document_index:
+            return
+
+        rows = [
+            SegmentDocument(doc_id, self.document_lengths[doc_id], doc.created_at.timestamp(),
+                            self._doc_terms[doc_id], _document_to_stored(doc))
+            for doc_id, doc in self.document_index.items()
+        ]
+        segment = self._write_segment(rows)
+
+        for docnum, row in enumerate(rows):
+            self._segment_docs[row.document_id] = (segment, docnum)
+        self._clear_buffer()
+        self._write_manifest()
+        self._truncate_journal()
+        logger.info(f"Flushed {len(rows)} documents to search segment {segment.name}")
+
+        if len(self.segments) > self.max_segments:
+            self._merge_segments()
+
+    def merge_segments(self):
+        """Merge all segments into one, dropping tombstoned documents."""
+        with self._writer():
+            self._merge_segments()
+
+    def _merge_segments(self):
+        if not self.index_dir or (len(self.segments) < 2 and not self._deleted):
+            return
+
+        rows: List[SegmentDocument] = []
+        for segment in self.segments:
+            deleted = self._deleted.get(segment.name, set())
+            live: Dict[int, int] = {}  # old docnum -> row in merged segment
+            for docnum in range(segment.doc_count):
+                if docnum in deleted:
+                    continue
+                live[docnum] = len(rows)
+                rows.append(SegmentDocument(segment.doc_id(docnum), segment.doc_length(docnum),
+                                            segment.doc_created_at(docnum), {}, segment.stored_fields(docnum)))
+            for term, postings in segment.iter_terms():
+                for docnum, tf in postings:
+                    if docnum in live:
+                        rows[live[docnum]].term_counts[term] = tf
+
+        old_segments = self.segments
+        self.segments = []
+        self._deleted = {}
+        self._segment_docs = {}
+        if rows:
+            merged = self._write_segment(rows)
+            self._segment_docs = {row.document_id: (merged, n) for n, row in enumerate(rows)}
+        self._write_manifest()
+        self._remove_segment_files(old_segments)
+        logger.info(f"Merged {len(old_segments)} search segments ({len(rows)} live documents)")
+
+    def close(self):
+        """Flush pending documents and release segment mappings."""
+        self.flush()
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self._segment_docs.clear()
+        if self._journal is not None:
+            path = Path(self._journal.name)
+            self._journal.close()
+            self._journal = None
+            path.unlink(missing_ok=True)
+
+    def _clear_buffer(self):
+        self.index.clear()
+        self.document_index.clear()
+        self.word_counts.clear()
+        self.document_lengths.clear()
+        self._doc_terms.clear()
+        self._buffer_ords.clear()
+        self._buffer_docs.clear()
+        self._next_buffer_ord = 0
+
+    def _write_segment(self, rows: List[SegmentDocument]) -> IndexSegment:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self.index_dir / f"seg_{self._next_segment:06d}.seg"
+        while path.exists():
+            self._next_segment += 1
+            path = self.index_dir / f"seg_{self._next_segment:06d}.seg"
+        self._next_segment += 1
+        SegmentWriter.write(path, rows)
+        segment = IndexSegment(path)
+        self.segments.append(segment)
+        return segment
+
+    def _write_manifest(self):
+        manifest = {
+            "version": 1,
+            "next_segment": self._next_segment,
+            "segments": [
+                {"name": s.name, "deleted": sorted(self._deleted.get(s.name, ()))}
+                for s in self.segments
+            ],
+        }
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self.index_dir / self.MANIFEST_NAME
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._manifest_stamp = self._current_stamp()
+
+    def _open(self):
+        with self._writer():
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            journal_path = self.index_dir / f"buffer-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+            self._journal = open(journal_path, "a+b")
+            _lock_file(self._journal)
+            self._recover_journals()
+        logger.info(f"Opened search index with {self.total_documents} documents "
+                    f"in {len(self.segments)} segments")
+
+    # ------------------------------------------------------------------
+    # Sharing the directory between workers
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _writer(self):
+        """Hold the directory's write lock with the latest manifest loaded (re-entrant)."""
+        if not self.index_dir:
+            yield
+            return
+        if self._lock_depth == 0:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            self._lock_handle = open(self.index_dir / self.LOCK_NAME, "a+b")
+            _lock_file(self._lock_handle)
+        self._lock_depth += 1
+        try:
+            if self._lock_depth == 1:
+                self._refresh()
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                _unlock_file(self._lock_handle)
+                self._lock_handle.close()
+                self._lock_handle = None
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = (self.index_dir / self.MANIFEST_NAME).stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _sync(self):
+        """Reload the manifest if another worker has replaced it since we last read it."""
+        if self.index_dir and self._lock_depth == 0 and self._current_stamp() != self._manifest_stamp:
+            with self._writer():
+                pass
+
+    def _refresh(self):
+        """Load segments and tombstones from the manifest, reusing segments already open."""
+        stamp = self._current_stamp()
+        if stamp is None or stamp == self._manifest_stamp:
+            return
+        with open(self.index_dir / self.MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._manifest_stamp = stamp
+
+        self._next_segment = max(self._next_segment, manifest.get("next_segment", 1))
+        current = {segment.name: segment for segment in self.segments}
+        self.segments = []
+        self._deleted = {}
+        self._segment_docs = {}
+        segment_length = 0
+        for entry in manifest.get("segments", []):
+            segment = current.pop(entry["name"], None) or IndexSegment(self.index_dir / entry["name"])
+            deleted = set(entry.get("deleted", []))
+            self.segments.append(segment)
+            if deleted:
+                self._deleted[segment.name] = deleted
+            segment_length += segment.total_length
+            for doc_id, docnum in segment.docnums().items():
+                if docnum in deleted:
+                    segment_length -= segment.doc_length(docnum)
+                else:
+                    self._segment_docs[doc_id] = (segment, docnum)
+        # Segments another worker merged away
+        for segment in current.values():
+            segment.close()
+        self.total_documents = len(self._segment_docs) + len(self.document_index)
+        self.total_length = segment_length + sum(self.document_lengths.values())
+
+    def _log(self, record: Dict[str, Any]):
+        """Journal one change to the buffer; durable now, or at the end of a batch."""
+        if self._journal is None:
+            return
+        self._journal.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+        if self._batch_depth == 0:
+            self._sync_journal()
+
+    def _sync_journal(self):
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def _truncate_journal(self):
+        if self._journal is not None:
+            # Write out batched records first, or they would land after the truncation
+            self._journal.flush()
+            self._journal.truncate(0)
+            os.fsync(self._journal.fileno())
+
+    def _recover_journals(self):
+        """Re-buffer documents from journals whose process exited without flushing."""
+        own = Path(self._journal.name).name
+        for path in sorted(self.index_dir.glob(self.JOURNAL_GLOB)):
+            if path.name == own:
+                continue
+            docs: Dict[str, Dict[str, Any]] = {}
+            with open(path, "a+b") as f:
+                # A journal still locked belongs to a live worker
+                if not _lock_file(f, blocking=False):
+                    continue
+                f.seek(0)
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn final write
+                    if record["op"] == "add":
+                        docs[record["doc"]["document_id"]] = record["doc"]
+                    else:
+                        docs.pop(record["document_id"], None)
+                _unlock_file(f)
+            for stored in docs.values():
+                self._add_document(_document_from_stored(stored))
+            path.unlink(missing_ok=True)
+            if docs:
+                logger.warning(f"Recovered {len(docs)} unflushed search documents from {path.name}")
+
+    def _remove_segment_files(self, segments: List[IndexSegment]):
+        for segment in segments:
+            segment.close()
+            try:
+                segment.path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove search segment {segment.path}: {e}")
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
     def search(self, query: SearchQuery) -> List[SearchResult]:
-        """Search documents."""
-        processor = TextProcessor()
-        
-        # Process query
-        query_tokens = processor.tokenize(query.query)
-        
-        if not query_tokens:
+        """
+        Search documents and return one page of results.
+
+        Evaluation is top-k: filters resolve to facet bitmaps, candidates are
+        scored document-at-a-time with MaxScore pruning against per-term
+        score upper bounds, and only the final page is loaded and highlighted.
+        """
+        self._sync()
+        query_tokens = self.processor.tokenize(query.query)
+        k = query.offset + query.limit
+        if not query_tokens or k <= 0 or not self.total_documents:
             return []
-        
-        # Get matching documents
-        matching_docs = set()
-        
-        if query.operator == SearchOperator.AND:
-            # All tokens must be present
-            matching_docs = set.intersection(*[
-                self.index.get(token, set()) for token in query_tokens
-                if token in self.index
-            ]) if query_tokens else set()
-        
-        elif query.operator == SearchOperator.OR:
-            # Any token can be present
-            for token in query_tokens:
-                if token in self.index:
-                    matching_docs.update(self.index[token])
-        
-        elif query.operator == SearchOperator.NOT:
-            # Exclude documents with certain tokens
+
+        bases, buffer_base = self._segment_bases()
+        weights = Counter(query_tokens)
+        if query.operator == SearchOperator.NOT:
             # This is simplified - real implementation would be more complex
-            exclude_tokens = [token for token in query_tokens if token.startswith('-')]
-            include_tokens = [token for token in query_tokens if not token.startswith('-')]
-            
-            if include_tokens:
-                matching_docs = set.union(*[
-                    self.index.get(token, set()) for token in include_tokens
-                    if token in self.index
-                ])
-            
-            for token in exclude_tokens:
-                clean_token = token[1:]  # Remove '-'
-                if clean_token in self.index:
-                    matching_docs.difference_update(self.index[clean_token])
-        
-        # Apply filters
-        filtered_docs = self._apply_filters(matching_docs, query)
-        
-        # Calculate relevance scores
+            include_tokens = [token for token in weights if not token.startswith('-')]
+            exclude_tokens = [token[1:] for token in weights if token.startswith('-')]
+        else:
+            include_tokens = list(weights)
+            exclude_tokens = []
+
+        # One group per query word: its BM25 scorer plus its title-match scorer
+        groups: List[Tuple[_Scorer, Optional[_Scorer], float]] = []
+        for token in include_tokens:
+            cursor = self._cursor(token, bases, buffer_base)
+            if not cursor.df:
+                continue
+            idf = math.log((self.total_documents - cursor.df + 0.5) / (cursor.df + 0.5))
+            weight = weights[token] * idf
+            # Normalized tf is largest for the most frequent occurrence in a zero-length document
+            max_tf = cursor.max_tf
+            upper = max(0.0, weight * max_tf * (BM25_K1 + 1) / (max_tf + BM25_K1 * (1 - BM25_B)))
+            word = _Scorer(cursor, weight, upper)
+
+            title_cursor = self._cursor(TITLE_FACET + token, bases, buffer_base)
+            title = _Scorer(title_cursor, TITLE_MATCH_BOOST, TITLE_MATCH_BOOST, is_title=True) \
+                if title_cursor.df else None
+            groups.append((word, title, upper + (title.upper_bound if title else 0.0)))
+
+        if not groups:
+            return []
+
+        allowed = self._filter_bitmap(query, bases, buffer_base)
+        denied = 0
+        for token in exclude_tokens:
+            denied |= self._bitmap(token, bases, buffer_base)
+        size = (buffer_base + self._next_buffer_ord) // 8 + 1
+        allowed_bytes = allowed.to_bytes(size, "little") if allowed is not None else None
+        denied_bytes = denied.to_bytes(size, "little") if denied else None
+        if query.date_range:
+            start_ts, end_ts = (d.timestamp() for d in query.date_range)
+
+        scorers = [g[0] for g in groups] + [g[1] for g in groups if g[1]]
+        scorers.sort(key=lambda s: s.upper_bound, reverse=True)
+        total_upper = sum(s.upper_bound for s in scorers)
+        require_all = query.operator == SearchOperator.AND
+        avg_length = self.avg_document_length
+        now_ts = datetime.now(timezone.utc).timestamp()
+        heap: List[Tuple[float, int]] = []  # (score, -ordinal); smallest ordinal wins ties
+
+        def threshold() -> float:
+            return heap[0][0] if len(heap) >= k else -math.inf
+
+        def score(ordinal: int, floor: float) -> Optional[float]:
+            if allowed_bytes is not None and not allowed_bytes[ordinal >> 3] >> (ordinal & 7) & 1:
+                return None
+            if denied_bytes is not None and denied_bytes[ordinal >> 3] >> (ordinal & 7) & 1:
+                return None
+
+            total = 0.0
+            remaining = total_upper
+            stats = None
+            for scorer in scorers:
+                # Candidates arrive in ordinal order, so a tie with the floor can never win
+                if total + remaining + RECENCY_BOOST <= floor:
+                    return None
+                remaining -= scorer.upper_bound
+                cursor = scorer.cursor
+                cursor.seek(ordinal)
+                if cursor.doc != ordinal:
+                    if require_all and not scorer.is_title:
+                        return None
+                    continue
+                if scorer.is_title:
+                    total += scorer.weight
+                    continue
+                if stats is None:
+                    stats = self._ordinal_stats(ordinal, bases, buffer_base)
+                tf = cursor.tf
+                total += scorer.weight * (tf * (BM25_K1 + 1)) / (
+                    tf + BM25_K1 * (1 - BM25_B + BM25_B * (stats[0] / avg_length))
+                )
+
+            if stats is None:
+                return None
+            created_ts = stats[1]
+            if query.date_range and not (start_ts <= created_ts <= end_ts):
+                return None
+
+            # Boost for recent documents (decay over a year)
+            days_old = (now_ts - created_ts) // 86400
+            total += min(1.0, max(0.0, 1 - days_old / 365)) * RECENCY_BOOST
+            return total
+
+        def offer(ordinal: int, value: Optional[float]):
+            if value is None:
+                return
+            entry = (value, -ordinal)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        word_postings = sum(g[0].cursor.df for g in groups)
+        if allowed is not None and allowed.bit_count() * len(scorers) < word_postings:
+            # Selective filter (e.g. one user's documents): drive from the filter bitmap
+            for ordinal in _iter_bits(allowed):
+                offer(ordinal, score(ordinal, threshold()))
+
+        elif require_all:
+            # Drive from the rarest term; the rest are checked by seeking
+            lead = min((g[0].cursor for g in groups), key=lambda c: c.df)
+            while lead.doc is not None:
+                ordinal = lead.doc
+                offer(ordinal, score(ordinal, threshold()))
+                lead.seek(ordinal + 1)
+
+        else:
+            # MaxScore: words whose combined upper bounds cannot beat the current
+            # k-th score are non-essential and never generate candidates
+            groups.sort(key=lambda g: g[2])
+            prefix = []
+            running = 0.0
+            for g in groups:
+                running += g[2]
+                prefix.append(running)
+
+            first_essential = 0
+            while True:
+                floor = threshold()
+                while first_essential < len(groups) and prefix[first_essential] + RECENCY_BOOST <= floor:
+                    first_essential += 1
+                essential = [g[0].cursor for g in groups[first_essential:]]
+                candidates = [c.doc for c in essential if c.doc is not None]
+                if not candidates:
+                    break
+                ordinal = min(candidates)
+                offer(ordinal, score(ordinal, floor))
+                for cursor in essential:
+                    if cursor.doc == ordinal:
+                        cursor.next()
+
+        # Only the requested page is loaded from storage and highlighted
+        page = sorted(heap, reverse=True)[query.offset:k]
         results = []
-        for doc_id in filtered_docs:
-            doc = self.document_index[doc_id]
-            score = self._calculate_relevance_score(doc, query_tokens, query)
-            highlights = self._generate_highlights(doc, query_tokens)
-            
+        for value, negative_ordinal in page:
+            doc = self._document_at(-negative_ordinal, bases, buffer_base)
             results.append(SearchResult(
                 document=doc,
-                score=score,
-                highlights=highlights,
+                score=value,
+                highlights=self._generate_highlights(doc, query_tokens),
                 match_type=query.search_type.value
             ))
-        
-        # Sort by score
-        results.sort(key=lambda x: x.score, reverse=True)
-        
-        # Apply pagination
-        start = query.offset
-        end = start + query.limit
-        return results[start:end]
-    
-    def _apply_filters(self, document_ids: Set[str], query: SearchQuery) -> Set[str]:
-        """Apply search filters."""
-        filtered_docs = set(document_ids)
-        
-        for doc_id in list(filtered_docs):
-            doc = self.document_index[doc_id]
-            
-            # User filter
-            if query.user_id and doc.user_id != query.user_id:
-                filtered_docs.discard(doc_id)
-                continue
-            
-            # File type filter
-            if query.file_types and doc.file_type not in query.file_types:
-                filtered_docs.discard(doc_id)
-                continue
-            
-            # Tags filter
-            if query.tags and not any(tag in doc.tags for tag in query.tags):
-                filtered_docs.discard(doc_id)
-                continue
-            
-            # Date range filter
-            if query.date_range:
-                start_date, end_date = query.date_range
-                if not (start_date <= doc.created_at <= end_date):
-                    filtered_docs.discard(doc_id)
-                    continue
-        
-        return filtered_docs
-    
-    def _calculate_relevance_score(self, doc: DocumentIndex, query_tokens: List[str], 
-                                  query: SearchQuery) -> float:
-        """Calculate BM25 relevance score."""
-        k1 = 1.2  # BM25 parameter
-        b = 0.75  # BM25 parameter
-        
-        score = 0.0
-        doc_length = self.document_lengths[doc.document_id]
-        
-        for token in query_tokens:
-            if token not in self.index or doc.document_id not in self.index[token]:
+        return results
+
+    def _segment_bases(self) -> Tuple[List[int], int]:
+        """First global ordinal of each segment, and of the buffer."""
+        bases = []
+        base = 0
+        for segment in self.segments:
+            bases.append(base)
+            base += segment.doc_count
+        return bases, base
+
+    def _cursor(self, term: str, bases: List[int], buffer_base: int) -> _PostingCursor:
+        chunks = []
+        for segment, base in zip(self.segments, bases):
+            docnums, tfs = segment.postings_arrays(term)
+            chunks.append((base, docnums, tfs, self._deleted.get(segment.name, set())))
+        buffered = self.word_counts.get(term)
+        if buffered:
+            # Buffer dicts keep insertion order, which is buffer ordinal order
+            chunks.append((buffer_base, [self._buffer_ords[d] for d in buffered], list(buffered.values()), set()))
+        return _PostingCursor(chunks)
+
+    def _bitmap(self, term: str, bases: List[int], buffer_base: int) -> int:
+        """Bitmap over global ordinals of documents containing term."""
+        bits = 0
+        for segment, base in zip(self.segments, bases):
+            segment_bits = segment.bitmap(term)
+            if segment_bits:
+                bits |= segment_bits << base
+        buffered = self.word_counts.get(term)
+        if buffered:
+            bits |= bitmap_from_positions((self._buffer_ords[d] for d in buffered), buffer_base)
+        return bits
+
+    def _filter_bitmap(self, query: SearchQuery, bases: List[int], buffer_base: int) -> Optional[int]:
+        """Apply user/file-type/tag filters as bitmaps (None means unfiltered)."""
+        allowed = None
+        if query.user_id:
+            allowed = self._bitmap(USER_FACET + query.user_id, bases, buffer_base)
+        for facet, values in ((FILE_TYPE_FACET, query.file_types), (TAG_FACET, query.tags)):
+            if not values:
                 continue
-            
-            # BM25 formula
-            df = len(self.index[token])  # Document frequency
-            idf = math.log((self.total_documents - df + 0.5) / (df + 0.5))
-            
-            tf = self.word_counts[token].get(doc.document_id, 0)  # Term frequency
-            
-            # Normalize term frequency
-            normalized_tf = (tf * (k1 + 1)) / (
-                tf + k1 * (1 - b + b * (doc_length / self.avg_document_length))
-            )
-            
-            score += idf * normalized_tf
-        
-        # Boost for title matches
-        title_tokens = TextProcessor().tokenize(doc.title)
-        title_matches = len(set(query_tokens) & set(title_tokens))
-        score += title_matches * 2.0
-        
-        # Boost for recent documents
-        days_old = (datetime.now(timezone.utc) - doc.created_at).days
-        recency_boost = max(0, 1 - (days_old / 365))  # Decay over year
-        score += recency_boost * 0.5
-        
-        return score
-    
+            bits = 0
+            for value in values:
+                bits |= self._bitmap(facet + value, bases, buffer_base)
+            allowed = bits if allowed is None else allowed & bits
+        return allowed
+
+    def _ordinal_stats(self, ordinal: int, bases: List[int], buffer_base: int) -> Tuple[int, float]:
+        """(document length, created_at timestamp) for a global ordinal."""
+        if ordinal >= buffer_base:
+            doc_id = self._buffer_docs[ordinal - buffer_base]
+            return self.document_lengths[doc_id], self.document_index[doc_id].created_at.timestamp()
+        i = bisect_right(bases, ordinal) - 1
+        segment, docnum = self.segments[i], ordinal - bases[i]
+        return segment.doc_length(docnum), segment.doc_created_at(docnum)
+
+    def _document_at(self, ordinal: int, bases: List[int], buffer_base: int) -> DocumentIndex:
+        if ordinal >= buffer_base:
+            return self.document_index[self._buffer_docs[ordinal - buffer_base]]
+        i = bisect_right(bases, ordinal) - 1
+        return _document_from_stored(self.segments[i].stored_fields(ordinal - bases[i]))
+
     def _generate_highlights(self, doc: DocumentIndex, query_tokens: List[str]) -> List[str]:
         """Generate search highlights."""
         highlights = []
@@ -408,22 +1052,21 @@ class InvertedIndex:
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get index statistics."""
+        self._sync()
         return {
             "total_documents": self.total_documents,
-            "total_terms": len(self.index),
+            "buffered_documents": len(self.document_index),
+            "segments": len(self.segments),
+            "deleted_documents": sum(len(d) for d in self._deleted.values()),
+            "total_terms": len(self.index) + sum(s.term_count for s in self.segments),
             "avg_document_length": self.avg_document_length,
-            "document_lengths": {
-                "min": min(self.document_lengths.values()) if self.document_lengths else 0,
-                "max": max(self.document_lengths.values()) if self.document_lengths else 0,
-                "avg": self.avg_document_length
-            }
         }
 
 class SearchEngine:
     """Advanced search engine with indexing."""
     
-    def __init__(self):
-        self.index = InvertedIndex()
+    def __init__(self, index_dir: Optional[str] = None):
+        self.index = InvertedIndex(index_dir=index_dir)
         self.processor = TextProcessor()
         
         # Search statistics
@@ -440,7 +1083,7 @@ class SearchEngine:
         """Index a document for search."""
         try:
             # Remove existing document if it exists
-            if document_id in self.index.document_index:
+            if document_id in self.index:
                 self.index.remove_document(document_id)
             
             # Create document index
@@ -466,6 +1109,16 @@ class SearchEngine:
             logger.error(f"Failed to index document {document_id}: {e}")
             return False
     
+    def add_document(self, doc: DocumentIndex) -> bool:
+        """Index a prebuilt DocumentIndex entry."""
+        try:
+            self.index.add_document(doc)
+            logger.info(f"Indexed document {doc.document_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index document {doc.document_id}: {e}")
+            return False
+
     def remove_document(self, document_id: str) -> bool:
         """Remove document from search index."""
         try:
@@ -552,21 +1205,24 @@ class SearchEngine:
     def reindex_all_documents(self, documents: List[Dict[str, Any]]) -> bool:
         """Reindex all documents."""
         try:
-            # Clear existing index
-            self.index = InvertedIndex()
-            
-            # Reindex all documents
-            for doc_data in documents:
-                self.index_document(
-                    document_id=doc_data["document_id"],
-                    user_id=doc_data["user_id"],
-                    title=doc_data["title"],
-                    content=doc_data["content"],
-                    metadata=doc_data.get("metadata", {}),
-                    file_type=doc_data["file_type"],
-                    tags=doc_data.get("tags", [])
-                )
-            
+            # One lock and one journal sync for the whole rebuild
+            with self.index.batch():
+                # Clear existing index (including on-disk segments)
+                self.index.clear()
+                
+                # Reindex all documents
+                for doc_data in documents:
+                    self.index_document(
+                        document_id=doc_data["document_id"],
+                        user_id=doc_data["user_id"],
+                        title=doc_data["title"],
+                        content=doc_data["content"],
+                        metadata=doc_data.get("metadata", {}),
+                        file_type=doc_data["file_type"],
+                        tags=doc_data.get("tags", [])
+                    )
+                
+                self.index.flush()
             logger.info(f"Reindexed {len(documents)} documents")
             return True
             
@@ -582,10 +1238,18 @@ def get_search_engine() -> SearchEngine:
     global _search_engine
     
     if _search_engine is None:
-        _search_engine = SearchEngine()
+        _search_engine = SearchEngine(index_dir=os.getenv("SEARCH_INDEX_DIR", "data/search_index"))
     
     return _search_engine
 
+def close_search_engine():
+    """Flush buffered documents to disk and release the global index."""
+    global _search_engine
+
+    if _search_engine is not None:
+        _search_engine.index.close()
+        _search_engine = None
+
 # Helper functions
 def index_document_for_search(document_id: str, user_id: str, title: str, 
                             content: str, metadata: Dict[str, Any], 
@@ -0,0 +1,311 @@
+"""
+Search Index Segments - Immutable On-Disk Postings
+==================================================
+
+Compact, memory-mappable segment files for the search engine's inverted index.
+
+A segment is written once and never modified. Deletes are recorded as
+tombstones in the index manifest and dropped when segments are merged.
+
+Layout (little-endian):
+
+    header    MAGIC, version, doc/term counts, total token length, section offsets
+    docs      fixed-width rows: length u32, created_at f64 (epoch seconds),
+              id offset u64, id len u16, stored offset u64, stored len u32
+    terms     fixed-width rows sorted by term bytes: term offset u64, term len u16,
+              df u32, postings offset u64, postings len u32
+    strings   doc ids and term bytes
+    postings  per term: varint (doc number delta, term frequency) pairs
+    stored    per doc: UTF-8 JSON of the DocumentIndex fields
+
+Filterable fields (user, file type, tags) and title words are indexed as
+reserved facet terms prefixed with NUL, so filters resolve to postings and
+bitmaps from the same dictionary instead of decoding stored documents.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SSEG"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sHHIIQQQQQQ")
+_DOC_ROW = struct.Struct("<IdQHQI")
+_TERM_ROW = struct.Struct("<QHIQI")
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Append an unsigned LEB128 varint to out."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(buf, start: int, end: int) -> Tuple[array, array]:
+    """Decode delta-encoded postings into parallel (doc numbers, term frequencies) arrays."""
+    docnums = array("I")
+    tfs = array("I")
+    pos = start
+    docnum = 0
+    values = []
+    value = 0
+    shift = 0
+    while pos < end:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = 0
+        shift = 0
+        if len(values) == 2:
+            docnum += values[0]
+            docnums.append(docnum)
+            tfs.append(values[1])
+            values = []
+    return docnums, tfs
+
+
+def bitmap_from_positions(positions, offset: int = 0) -> int:
+    """Build an int bitmap with bit (offset + p) set for every position p."""
+    positions = list(positions)
+    if not positions:
+        return 0
+    bits = bytearray((max(positions) + offset) // 8 + 1)
+    for p in positions:
+        p += offset
+        bits[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(bits, "little")
+
+
+class SegmentDocument:
+    """Input row for SegmentWriter: stored fields plus analyzed term counts."""
+
+    __slots__ = ("document_id", "length", "created_at", "term_counts", "stored")
+
+    def __init__(self, document_id: str, length: int, created_at: float, term_counts: Dict[str, int],
+                 stored: Dict[str, Any]):
+        self.document_id = document_id
+        self.length = length
+        self.created_at = created_at
+        self.term_counts = term_counts
+        self.stored = stored
+
+
+class SegmentWriter:
+    """Serialize a batch of analyzed documents into a segment file."""
+
+    @staticmethod
+    def write(path: Path, documents: List[SegmentDocument]) -> None:
+        """Write documents to path atomically (temp file + fsync + rename)."""
+        path = Path(path)
+        postings: Dict[bytes, List[Tuple[int, int]]] = {}
+        for docnum, doc in enumerate(documents):
+            for term, tf in doc.term_counts.items():
+                postings.setdefault(term.encode("utf-8"), []).append((docnum, tf))
+
+        strings = bytearray()
+        doc_rows = bytearray()
+        stored = bytearray()
+        stored_refs = []
+        for doc in documents:
+            blob = json.dumps(doc.stored, default=str, separators=(",", ":")).encode("utf-8")
+            stored_refs.append((len(stored), len(blob)))
+            stored.extend(blob)
+
+        id_refs = []
+        for doc in documents:
+            raw = doc.document_id.encode("utf-8")
+            id_refs.append((len(strings), len(raw)))
+            strings.extend(raw)
+
+        term_refs = []
+        postings_blob = bytearray()
+        for term in sorted(postings):
+            term_offset = len(strings)
+            strings.extend(term)
+            start = len(postings_blob)
+            previous = 0
+            for docnum, tf in postings[term]:
+                encode_varint(docnum - previous, postings_blob)
+                encode_varint(tf, postings_blob)
+                previous = docnum
+            term_refs.append((term_offset, len(term), len(postings[term]), start, len(postings_blob) - start))
+
+        for doc, (id_off, id_len), (st_off, st_len) in zip(documents, id_refs, stored_refs):
+            doc_rows.extend(_DOC_ROW.pack(doc.length, doc.created_at, id_off, id_len, st_off, st_len))
+        term_rows = bytearray()
+        for row in term_refs:
+            term_rows.extend(_TERM_ROW.pack(*row))
+
+        docs_offset = _HEADER.size
+        terms_offset = docs_offset + len(doc_rows)
+        strings_offset = terms_offset + len(term_rows)
+        postings_offset = strings_offset + len(strings)
+        stored_offset = postings_offset + len(postings_blob)
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, 0,
+            len(documents), len(term_refs), sum(doc.length for doc in documents),
+            docs_offset, terms_offset, strings_offset, postings_offset, stored_offset,
+        )
+
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            for part in (header, doc_rows, term_rows, strings, postings_blob, stored):
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class IndexSegment:
+    """Read-only view over a memory-mapped segment file."""
+
+    # Decoded postings / bitmaps kept per segment (segments are immutable, so never stale)
+    CACHE_SIZE = 64
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"Segment too small: {self.path}")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _flags, self.doc_count, self.term_count, self.total_length,
+         self._docs_offset, self._terms_offset, self._strings_offset,
+         self._postings_offset, self._stored_offset) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported segment format in {self.path}")
+
+        self._docnums: Optional[Dict[str, int]] = None
+        self._postings_cache: "OrderedDict[str, Tuple[array, array]]" = OrderedDict()
+        self._bitmap_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        try:
+            self._buf.close()
+        finally:
+            self._file.close()
+
+    # ------------------------------------------------------------------
+    # Documents
+    # ------------------------------------------------------------------
+
+    def _doc_row(self, docnum: int) -> Tuple[int, float, int, int, int, int]:
+        return _DOC_ROW.unpack_from(self._buf, self._docs_offset + docnum * _DOC_ROW.size)
+
+    def doc_length(self, docnum: int) -> int:
+        return self._doc_row(docnum)[0]
+
+    def doc_created_at(self, docnum: int) -> float:
+        return self._doc_row(docnum)[1]
+
+    def doc_id(self, docnum: int) -> str:
+        _, _, id_off, id_len, _, _ = self._doc_row(docnum)
+        start = self._strings_offset + id_off
+        return self._buf[start:start + id_len].decode("utf-8")
+
+    def stored_fields(self, docnum: int) -> Dict[str, Any]:
+        """Decode the stored JSON fields for a document."""
+        _, _, _, _, st_off, st_len = self._doc_row(docnum)
+        start = self._stored_offset + st_off
+        return json.loads(self._buf[start:start + st_len])
+
+    def docnums(self) -> Dict[str, int]:
+        """Map of document id -> doc number (built once, on first use)."""
+        if self._docnums is None:
+            self._docnums = {self.doc_id(n): n for n in range(self.doc_count)}
+        return self._docnums
+
+    # ------------------------------------------------------------------
+    # Terms
+    # ------------------------------------------------------------------
+
+    def _term_row(self, ordinal: int) -> Tuple[int, int, int, int, int]:
+        return _TERM_ROW.unpack_from(self._buf, self._terms_offset + ordinal * _TERM_ROW.size)
+
+    def _term_bytes(self, row: Tuple[int, int, int, int, int]) -> bytes:
+        start = self._strings_offset + row[0]
+        return self._buf[start:start + row[1]]
+
+    def _find_term(self, term: str) -> Optional[Tuple[int, int, int, int, int]]:
+        """Binary search the sorted term dictionary."""
+        target = term.encode("utf-8")
+        lo, hi = 0, self.term_count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            row = self._term_row(mid)
+            current = self._term_bytes(row)
+            if current == target:
+                return row
+            if current < target:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+    def doc_frequency(self, term: str) -> int:
+        row = self._find_term(term)
+        return row[2] if row else 0
+
+    def postings_arrays(self, term: str) -> Tuple[array, array]:
+        """Return (doc numbers, term frequencies) for term, ascending by doc number."""
+        cached = self._postings_cache.get(term)
+        if cached is not None:
+            self._postings_cache.move_to_end(term)
+            return cached
+        row = self._find_term(term)
+        if row is None:
+            decoded = (array("I"), array("I"))
+        else:
+            start = self._postings_offset + row[3]
+            decoded = decode_postings(self._buf, start, start + row[4])
+        self._postings_cache[term] = decoded
+        if len(self._postings_cache) > self.CACHE_SIZE:
+            self._postings_cache.popitem(last=False)
+        return decoded
+
+    def postings(self, term: str) -> List[Tuple[int, int]]:
+        """Return [(doc number, term frequency), ...] for term, ascending by doc number."""
+        docnums, tfs = self.postings_arrays(term)
+        return list(zip(docnums, tfs))
+
+    def bitmap(self, term: str) -> int:
+        """Bitmap of doc numbers containing term (used for facet filters)."""
+        cached = self._bitmap_cache.get(term)
+        if cached is not None:
+            self._bitmap_cache.move_to_end(term)
+            return cached
+        bits = bitmap_from_positions(self.postings_arrays(term)[0])
+        self._bitmap_cache[term] = bits
+        if len(self._bitmap_cache) > self.CACHE_SIZE:
+            self._bitmap_cache.popitem(last=False)
+        return bits
+
+    def iter_terms(self) -> Iterator[Tuple[str, List[Tuple[int, int]]]]:
+        """Yield (term, postings) in dictionary order (used when merging)."""
+        for ordinal in range(self.term_count):
+            row = self._term_row(ordinal)
+            start = self._postings_offset + row[3]
+            docnums, tfs = decode_postings(self._buf, start, start + row[4])
+            yield self._term_bytes(row).decode("utf-8"), list(zip(docnums, tfs))
@@ -4,13 +4,13 @@ Security Headers Middleware for Semptify.
 Adds security headers to all responses following OWASP guidelines.
 """
 
-from typing import Callable
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to all responses.
     
@@ -22,23 +22,45 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     - Permissions-Policy: Restrict browser features
     - Content-Security-Policy: Control resource loading (configurable)
     - Strict-Transport-Security: Force HTTPS (production only)
+
+    Headers are added to the response start message; the body streams
+    through untouched.
     """
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enable_hsts: bool = False,
         hsts_max_age: int = 31536000,  # 1 year
         csp_policy: str | None = None,
         frame_options: str = "SAMEORIGIN",
     ):
-        super().__init__(app)
+        self.app = app
         self.enable_hsts = enable_hsts
         self.hsts_max_age = hsts_max_age
         self.frame_options = frame_options
         
         # Default CSP - restrictive but functional
         self.csp_policy = csp_policy or self._default_csp()
+
+        # Headers added to every response, built once
+        self.static_headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": self.frame_options,
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            # Permissions Policy (replaces Feature-Policy)
+            "Permissions-Policy": (
+                "accelerometer=(), camera=(), geolocation=(self), "
+                "gyroscope=(), magnetometer=(), microphone=(), "
+                "payment=(), usb=()"
+            ),
+        }
+        # HSTS (only enable in production with HTTPS)
+        if self.enable_hsts:
+            self.static_headers["Strict-Transport-Security"] = (
+                f"max-age={self.hsts_max_age}; includeSubDomains"
+            )
     
     def _default_csp(self) -> str:
         """
@@ -57,51 +79,44 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "base-uri 'self'",
         ])
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # Basic security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = self.frame_options
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Permissions Policy (replaces Feature-Policy)
-        response.headers["Permissions-Policy"] = (
-            "accelerometer=(), camera=(), geolocation=(self), "
-            "gyroscope=(), magnetometer=(), microphone=(), "
-            "payment=(), usb=()"
-        )
-        
-        # Content Security Policy
-        # Skip for API JSON responses to avoid breaking clients
-        content_type = response.headers.get("Content-Type", "")
-        if "text/html" in content_type:
-            response.headers["Content-Security-Policy"] = self.csp_policy
-        
-        # HSTS (only enable in production with HTTPS)
-        if self.enable_hsts:
-            response.headers["Strict-Transport-Security"] = (
-                f"max-age={self.hsts_max_age}; includeSubDomains"
-            )
-        
-        # Cache control for sensitive pages
-        if request.url.path.startswith("/api/") and request.method in ("GET", "HEAD"):
-            # Don't cache authenticated API responses by default
-            if "Authorization" in request.headers or "storage_token" in request.cookies:
-                response.headers.setdefault("Cache-Control", "private, no-store")
-        
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Don't cache authenticated API responses by default
+        private = False
+        if scope["path"].startswith("/api/") and scope["method"] in ("GET", "HEAD"):
+            request = Request(scope)
+            private = "Authorization" in request.headers or "storage_token" in request.cookies
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.static_headers.items():
+                    headers[name] = value
+
+                # Content Security Policy
+                # Skip for API JSON responses to avoid breaking clients
+                if "text/html" in headers.get("Content-Type", ""):
+                    headers["Content-Security-Policy"] = self.csp_policy
+
+                # Cache control for sensitive pages
+                if private:
+                    headers.setdefault("Cache-Control", "private, no-store")
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 
-class TrustedHostMiddleware(BaseHTTPMiddleware):
+class TrustedHostMiddleware:
     """
     Middleware to validate Host header against allowed hosts.
     Prevents host header attacks.
     """
     
-    def __init__(self, app, allowed_hosts: list[str] | None = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, allowed_hosts: list[str] | None = None):
+        self.app = app
         # Default: allow localhost and common dev hosts
         self.allowed_hosts = allowed_hosts or [
             "localhost",
@@ -111,23 +126,24 @@ class TrustedHostMiddleware(BaseHTTPMiddleware):
         # Add wildcard support
         self.allow_all = "*" in self.allowed_hosts
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if self.allow_all:
-            return await call_next(request)
-        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.allow_all or scope["type"] != "http" or self._is_allowed(Request(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        # Host not allowed
+        response = JSONResponse(
+            status_code=400,
+            content={"detail": "Invalid host header"}
+        )
+        await response(scope, receive, send)
+
+    def _is_allowed(self, request: Request) -> bool:
         host = request.headers.get("host", "").split(":")[0]  # Remove port
-        
-        if host not in self.allowed_hosts:
-            # Check if it matches any wildcard patterns
-            for allowed in self.allowed_hosts:
-                if allowed.startswith("*.") and host.endswith(allowed[1:]):
-                    return await call_next(request)
-            
-            # Host not allowed
-            from fastapi.responses import JSONResponse
-            return JSONResponse(
-                status_code=400,
-                content={"detail": "Invalid host header"}
-            )
-        
-        return await call_next(request)
+        if host in self.allowed_hosts:
+            return True
+        # Check if it matches any wildcard patterns
+        for allowed in self.allowed_hosts:
+            if allowed.startswith("*.") and host.endswith(allowed[1:]):
+                return True
+        return False
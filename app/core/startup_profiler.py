@@ -0,0 +1,172 @@
+"""
+Startup Profiler
+================
+
+Measures import time and resident-memory growth per module while the
+application starts, to show which subsystems make worker cold starts slow
+and heavy.
+
+Usage:
+    python -m app.main --profile-startup                  # default startup
+    python -m app.main --profile-startup --all-routers    # plus every lazy router
+
+    profiler = StartupProfiler().start()
+    import app.main
+    profiler.stop()
+    print(profiler.report())
+
+Times and memory are reported both cumulative (the module and everything it
+imported) and self (the module's own share), so self values can be summed
+per subsystem without double counting.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_process = psutil.Process() if HAS_PSUTIL else None
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if unavailable)."""
+    if _process is not None:
+        return _process.memory_info().rss
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+@dataclass
+class ModuleTiming:
+    name: str
+    seconds: float
+    self_seconds: float
+    rss_bytes: int
+    self_rss_bytes: int
+
+
+def subsystem_of(module_name: str) -> str:
+    """Group app modules by package (app.routers.vault) and libraries by top-level name."""
+    parts = module_name.split(".")
+    if parts[0] == "app":
+        return ".".join(parts[:3])
+    return parts[0]
+
+
+class _TimingFinder(MetaPathFinder):
+    """Finds modules with the normal finders and times their execution."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Builtin/frozen importers are classes shared by every module; leave them alone
+            instance_attrs = getattr(loader, "__dict__", None)
+            if (instance_attrs is not None and not isinstance(loader, type)
+                    and hasattr(loader, "exec_module") and "exec_module" not in instance_attrs):
+                exec_module = loader.exec_module
+                loader.exec_module = lambda module: self.profiler._exec(module.__name__, exec_module, module)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """Records per-module import time and memory growth between start() and stop()."""
+
+    def __init__(self):
+        self.modules: Dict[str, ModuleTiming] = {}
+        self._finder = _TimingFinder(self)
+        self._stack: List[list] = []
+        self._started = 0.0
+        self._rss_start = 0
+        self.total_seconds = 0.0
+        self.total_rss_bytes = 0
+
+    def start(self) -> "StartupProfiler":
+        self._started = time.perf_counter()
+        self._rss_start = current_rss()
+        sys.meta_path.insert(0, self._finder)
+        return self
+
+    def stop(self) -> "StartupProfiler":
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self.total_seconds = time.perf_counter() - self._started
+        self.total_rss_bytes = current_rss() - self._rss_start
+        return self
+
+    def _exec(self, name: str, exec_module, module) -> None:
+        # frame: [start time, start rss, time spent in children, rss grown in children]
+        frame = [time.perf_counter(), current_rss(), 0.0, 0]
+        self._stack.append(frame)
+        try:
+            exec_module(module)
+        finally:
+            self._stack.pop()
+            seconds = time.perf_counter() - frame[0]
+            grown = current_rss() - frame[1]
+            self.modules[name] = ModuleTiming(name, seconds, seconds - frame[2], grown, grown - frame[3])
+            if self._stack:
+                self._stack[-1][2] += seconds
+                self._stack[-1][3] += grown
+
+    def by_subsystem(self) -> List[dict]:
+        """Self time and memory summed per subsystem, slowest first."""
+        groups: Dict[str, dict] = {}
+        for timing in self.modules.values():
+            group = groups.setdefault(subsystem_of(timing.name), {
+                "subsystem": subsystem_of(timing.name), "modules": 0, "seconds": 0.0, "rss_bytes": 0,
+            })
+            group["modules"] += 1
+            group["seconds"] += timing.self_seconds
+            group["rss_bytes"] += timing.self_rss_bytes
+        return sorted(groups.values(), key=lambda g: -g["seconds"])
+
+    def report(self, top: int = 30, router_stats: Optional[Dict[str, dict]] = None) -> str:
+        """Plain-text report: totals, subsystems, slowest modules and router loads."""
+        mb = 1024 * 1024
+        lines = [
+            f"Startup: {self.total_seconds * 1000:.0f} ms, RSS +{self.total_rss_bytes / mb:.1f} MB, "
+            f"{len(self.modules)} modules imported",
+            "",
+            f"{'subsystem':<48} {'modules':>7} {'self ms':>9} {'self MB':>8}",
+        ]
+        for group in self.by_subsystem()[:top]:
+            lines.append(f"{group['subsystem']:<48} {group['modules']:>7} "
+                         f"{group['seconds'] * 1000:>9.1f} {group['rss_bytes'] / mb:>8.1f}")
+
+        lines += ["", f"{'module (cumulative)':<48} {'ms':>9} {'self ms':>9} {'MB':>8}"]
+        slowest = sorted(self.modules.values(), key=lambda t: -t.seconds)[:top]
+        for timing in slowest:
+            lines.append(f"{timing.name:<48} {timing.seconds * 1000:>9.1f} "
+                         f"{timing.self_seconds * 1000:>9.1f} {timing.rss_bytes / mb:>8.1f}")
+
+        if router_stats:
+            lines += ["", f"{'router':<48} {'routes':>7} {'ms':>9} {'MB':>8}"]
+            loaded = sorted(router_stats.items(), key=lambda item: -item[1].get("seconds", 0.0))
+            for name, stats in loaded:
+                if not stats.get("loaded"):
+                    lines.append(f"{name:<48} failed: {stats.get('error', '')}")
+                    continue
+                lines.append(f"{name:<48} {stats['routes']:>7} {stats['seconds'] * 1000:>9.1f} "
+                             f"{stats['rss_delta_bytes'] / mb:>8.1f}")
+        return "\n".join(lines)
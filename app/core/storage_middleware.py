@@ -9,10 +9,11 @@ This middleware enforces storage connection for all protected pages.
 """
 
 from fastapi import Request
-from fastapi.responses import RedirectResponse, JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Set
+from fastapi.responses import RedirectResponse, JSONResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+from typing import Optional, Set
 
+from app.core.path_matcher import PathMatcher
 from app.core.user_id import parse_user_id, COOKIE_USER_ID
 
 # Redirect loop tracking cookie name
@@ -88,22 +89,15 @@ PUBLIC_PREFIXES = (
 )
 
 
+# Static assets
+STATIC_SUFFIXES = ('.css', '.js', '.png', '.jpg', '.ico', '.svg', '.woff', '.woff2')
+
+_is_public = PathMatcher(PUBLIC_PATHS, PUBLIC_PREFIXES, STATIC_SUFFIXES)
+
+
 def is_public_path(path: str) -> bool:
     """Check if path is public (doesn't require storage)."""
-    # Exact match
-    if path in PUBLIC_PATHS:
-        return True
-    
-    # Prefix match
-    for prefix in PUBLIC_PREFIXES:
-        if path.startswith(prefix):
-            return True
-    
-    # Static assets
-    if path.endswith(('.css', '.js', '.png', '.jpg', '.ico', '.svg', '.woff', '.woff2')):
-        return True
-    
-    return False
+    return _is_public(path)
 
 
 def is_valid_storage_user(user_id: str) -> bool:
@@ -161,7 +155,7 @@ def is_valid_storage_user(user_id: str) -> bool:
     return True
 
 
-class StorageRequirementMiddleware(BaseHTTPMiddleware):
+class StorageRequirementMiddleware:
     """
     Middleware that enforces storage connection requirement.
     
@@ -171,9 +165,10 @@ class StorageRequirementMiddleware(BaseHTTPMiddleware):
     - Unauthenticated users are redirected to storage providers
     
     This ensures nobody can use the app without their own cloud storage.
+    Pure ASGI: allowed requests pass straight through without buffering.
     """
     
-    def __init__(self, app, enforce: bool = True):
+    def __init__(self, app: ASGIApp, enforce: bool = True):
         """
         Initialize middleware.
         
@@ -181,16 +176,25 @@ class StorageRequirementMiddleware(BaseHTTPMiddleware):
             app: FastAPI application
             enforce: If False, only logs warnings (for debugging)
         """
-        super().__init__(app)
+        self.app = app
         self.enforce = enforce
     
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Public paths don't need storage
-        if is_public_path(path):
-            return await call_next(request)
-        
+        if scope["type"] != "http" or is_public_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        response = await self.check(Request(scope))
+        if response is None:
+            await self.app(scope, receive, send)
+        else:
+            await response(scope, receive, send)
+
+    async def check(self, request: Request) -> Optional[Response]:
+        """Return a redirect/error response for a blocked request, None to let it through."""
+        path = request.url.path
+
         # Get user ID from cookie
         user_id = request.cookies.get(COOKIE_USER_ID)
         
@@ -211,7 +215,7 @@ class StorageRequirementMiddleware(BaseHTTPMiddleware):
             
             if not self.enforce:
                 # Debug mode - just log and continue
-                return await call_next(request)
+                return None
             
             # For API calls, return JSON error
             if path.startswith("/api/"):
@@ -352,4 +356,4 @@ class StorageRequirementMiddleware(BaseHTTPMiddleware):
                 # This degrades gracefully: format validation still passed above.
                 pass
 
-        return await call_next(request)
+        return None
@@ -12,13 +12,19 @@ from typing import Callable
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.path_matcher import PathMatcher
 
 logger = logging.getLogger(__name__)
 
 
-class TimeoutMiddleware(BaseHTTPMiddleware):
+class TimeoutMiddleware:
     """
     Middleware to enforce request timeout.
+
+    The timeout covers the time until the response starts; once headers
+    are sent the body streams without a deadline.
     
     Usage:
         app.add_middleware(TimeoutMiddleware, timeout=30.0)
@@ -39,17 +45,17 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
         "/ws",           # WebSocket connections
         "/api/stream",   # Streaming responses
     }
+    _is_excluded = PathMatcher(prefixes=EXCLUDED_PATHS)
     
-    def __init__(self, app, timeout: float = 30.0):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, timeout: float = 30.0):
+        self.app = app
         self.default_timeout = timeout
     
     def _get_timeout(self, path: str) -> float | None:
         """Get timeout for a specific path."""
         # Check excluded paths
-        for excluded in self.EXCLUDED_PATHS:
-            if path.startswith(excluded):
-                return None  # No timeout
+        if self._is_excluded(path):
+            return None  # No timeout
         
         # Check extended timeout paths
         for prefix, timeout in self.EXTENDED_TIMEOUT_PATHS.items():
@@ -58,32 +64,40 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
         
         return self.default_timeout
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        timeout = self._get_timeout(request.url.path)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timeout = self._get_timeout(scope["path"]) if scope["type"] == "http" else None
         
         # No timeout for excluded paths
         if timeout is None:
-            return await call_next(request)
-        
+            await self.app(scope, receive, send)
+            return
+
+        deadline = asyncio.timeout(timeout)
+
+        async def send_and_disarm(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                deadline.reschedule(None)
+            await send(message)
+
         try:
-            return await asyncio.wait_for(
-                call_next(request),
-                timeout=timeout
-            )
-        except asyncio.TimeoutError:
+            async with deadline:
+                await self.app(scope, receive, send_and_disarm)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
             logger.warning(
                 "Request timeout: %s %s (%.1fs)",
-                request.method,
-                request.url.path,
+                scope["method"],
+                scope["path"],
                 timeout,
                 extra={
                     "timeout_seconds": timeout,
-                    "path": request.url.path,
-                    "method": request.method,
+                    "path": scope["path"],
+                    "method": scope["method"],
                 }
             )
             
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=504,
                 content={
                     "error": "gateway_timeout",
@@ -94,6 +108,7 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
                     "Retry-After": "30",
                 }
             )
+            await response(scope, receive, send)
 
 
 class SlowRequestLoggerMiddleware(BaseHTTPMiddleware):
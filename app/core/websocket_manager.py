@@ -3,21 +3,41 @@ WebSocket Manager - Real-time Communication System
 ===============================================
 
 Manages WebSocket connections for real-time notifications and updates.
+
+Every connection has its own bounded outbound queue drained by a writer
+task, so broadcasting only enqueues and one slow or stalled client cannot
+delay delivery to anyone else. A message is JSON-encoded once and the
+same text is shared by every queue it goes to.
+
+Slow consumers:
+- messages with a coalesce_key (job and batch progress) replace a queued
+  message with the same key, so a client that falls behind only gets the
+  latest progress for each job
+- when a queue is full its oldest message is dropped
+- a client that does not accept a frame within SEND_TIMEOUT_SECONDS is
+  disconnected
+
+Queue depth, drops and coalesced messages are reported per connection
+(get_user_connections) and in total (get_connection_stats).
 """
 
 import logging
 import json
 import asyncio
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Iterable
 from datetime import datetime, timezone
 from dataclasses import dataclass, asdict
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, deque
 from app.core.id_gen import make_id
 import weakref
 
 logger = logging.getLogger(__name__)
 
+MAX_QUEUE_SIZE = 256           # outbound messages buffered per connection
+SEND_TIMEOUT_SECONDS = 10.0    # a client stalled this long on one frame is dropped
+SLOW_CONSUMER_CLOSE_CODE = 1008
+
 class NotificationType(Enum):
     """Types of notifications."""
     JOB_STATUS = "job_status"
@@ -35,6 +55,7 @@ class WebSocketMessage:
     timestamp: datetime
     user_id: Optional[str] = None
     session_id: Optional[str] = None
+    coalesce_key: Optional[str] = None  # newer messages with this key replace queued ones
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -45,6 +66,91 @@ class WebSocketMessage:
             "session_id": self.session_id
         }
 
+@dataclass
+class OutboundMessage:
+    """A message encoded once and shared by every queue it is sent to."""
+    text: str
+    coalesce_key: Optional[str] = None
+    
+    @classmethod
+    def encode(cls, message: WebSocketMessage) -> "OutboundMessage":
+        return cls(json.dumps(message.to_dict()), message.coalesce_key)
+
+class ConnectionQueue:
+    """
+    Bounded outbound queue for one connection, drained by run().
+    
+    Slots are [coalesce_key, text] lists so a newer message with the same
+    key can take over a queued slot in place.
+    """
+    
+    def __init__(self, websocket: Any, maxsize: int = MAX_QUEUE_SIZE,
+                 send_timeout: float = SEND_TIMEOUT_SECONDS):
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.peak_depth = 0
+        self._slots: deque = deque()
+        self._keyed: Dict[str, list] = {}
+        self._ready = asyncio.Event()
+    
+    @property
+    def depth(self) -> int:
+        return len(self._slots)
+    
+    def put(self, message: OutboundMessage) -> bool:
+        """Queue a message without waiting; False once the connection is closed."""
+        if self.closed:
+            return False
+        key = message.coalesce_key
+        if key is not None:
+            slot = self._keyed.get(key)
+            if slot is not None:
+                slot[1] = message.text
+                self.coalesced += 1
+                return True
+        if len(self._slots) >= self.maxsize:
+            self._forget(self._slots.popleft())
+            self.dropped += 1
+        slot = [key, message.text]
+        self._slots.append(slot)
+        if key is not None:
+            self._keyed[key] = slot
+        if len(self._slots) > self.peak_depth:
+            self.peak_depth = len(self._slots)
+        self._ready.set()
+        return True
+    
+    def _forget(self, slot: list) -> None:
+        if slot[0] is not None and self._keyed.get(slot[0]) is slot:
+            del self._keyed[slot[0]]
+    
+    async def run(self) -> None:
+        """Send queued messages in order until cancelled or a send fails."""
+        while True:
+            if not self._slots:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            slot = self._slots.popleft()
+            self._forget(slot)
+            async with asyncio.timeout(self.send_timeout):
+                await self.websocket.send_text(slot[1])
+            self.sent += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._slots),
+            "peak_depth": self.peak_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced
+        }
+
 @dataclass
 class ConnectionInfo:
     """WebSocket connection information."""
@@ -54,6 +160,8 @@ class ConnectionInfo:
     connected_at: datetime
     last_ping: datetime
     subscriptions: Set[str]
+    queue: Optional[ConnectionQueue] = None
+    writer_task: Optional[asyncio.Task] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -61,20 +169,26 @@ class ConnectionInfo:
             "session_id": self.session_id,
             "connected_at": self.connected_at.isoformat(),
             "last_ping": self.last_ping.isoformat(),
-            "subscriptions": list(self.subscriptions)
+            "subscriptions": list(self.subscriptions),
+            "queue": self.queue.stats() if self.queue else None
         }
 
 class WebSocketManager:
     """Manages WebSocket connections and real-time messaging."""
     
-    def __init__(self):
+    def __init__(self, max_queue_size: int = MAX_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT_SECONDS):
         # Active connections
         self.connections: Dict[str, ConnectionInfo] = {}
         self.user_connections: Dict[str, Set[str]] = defaultdict(set)  # user_id -> connection_ids
         self.subscriptions: Dict[str, Set[str]] = defaultdict(set)  # subscription -> connection_ids
+        self.websocket_connections: Dict[int, str] = {}  # id(websocket) -> connection_id
+        
+        # Outbound queue limits per connection
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
         
         # Message queues
-        self.message_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        self.message_queue: Optional[asyncio.Queue] = None
         
         # Background tasks
         self.broadcast_task: Optional[asyncio.Task] = None
@@ -86,6 +200,9 @@ class WebSocketManager:
             "active_connections": 0,
             "messages_sent": 0,
             "messages_failed": 0,
+            "messages_dropped": 0,
+            "messages_coalesced": 0,
+            "slow_consumers_closed": 0,
             "subscriptions_active": 0
         }
         
@@ -106,12 +223,15 @@ class WebSocketManager:
             session_id=session_id,
             connected_at=datetime.now(timezone.utc),
             last_ping=datetime.now(timezone.utc),
-            subscriptions=set()
+            subscriptions=set(),
+            queue=ConnectionQueue(websocket, self.max_queue_size, self.send_timeout)
         )
         
-        # Store connection
+        # Store connection and start its writer
         self.connections[connection_id] = connection_info
         self.user_connections[user_id].add(connection_id)
+        self.websocket_connections[id(websocket)] = connection_id
+        connection_info.writer_task = asyncio.create_task(self._write_loop(connection_id, connection_info))
         
         # Update statistics
         self.stats["total_connections"] += 1
@@ -159,6 +279,18 @@ class WebSocketManager:
         
         # Remove connection
         del self.connections[connection_id]
+        if self.websocket_connections.get(id(connection_info.websocket)) == connection_id:
+            del self.websocket_connections[id(connection_info.websocket)]
+        
+        # Stop the writer; whatever is still queued is discarded
+        queue = connection_info.queue
+        if queue is not None:
+            queue.closed = True
+            self.stats["messages_dropped"] += queue.dropped
+            self.stats["messages_coalesced"] += queue.coalesced
+        task = connection_info.writer_task
+        if task is not None and task is not asyncio.current_task() and not task.get_loop().is_closed():
+            task.cancel()
         
         # Update statistics
         self.stats["active_connections"] -= 1
@@ -199,67 +331,74 @@ class WebSocketManager:
         logger.info(f"Connection {connection_id} unsubscribed from {subscription}")
         return True
     
-    async def send_to_connection(self, connection_id: str, message: WebSocketMessage):
-        """Send a message to a specific connection."""
-        if connection_id not in self.connections:
-            return False
-        
-        connection_info = self.connections[connection_id]
-        
+    async def _write_loop(self, connection_id: str, connection_info: ConnectionInfo):
+        """Writer task: drain one connection's queue, dropping the connection if it fails or stalls."""
+        queue = connection_info.queue
         try:
-            await connection_info.websocket.send_text(json.dumps(message.to_dict()))
-            self.stats["messages_sent"] += 1
-            return True
-            
+            await queue.run()
+        except asyncio.CancelledError:
+            raise
+        except TimeoutError:
+            self.stats["slow_consumers_closed"] += 1
+            logger.warning(f"Closing slow WebSocket consumer {connection_id} "
+                           f"({queue.depth} queued, {queue.dropped} dropped)")
+            try:
+                await connection_info.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+            except Exception:
+                pass
         except Exception as e:
             logger.error(f"Failed to send message to connection {connection_id}: {e}")
             self.stats["messages_failed"] += 1
-            
-            # Remove dead connection
-            await self.disconnect(connection_id)
+        finally:
+            self.stats["messages_sent"] += queue.sent
+            queue.sent = 0
+        
+        # Remove dead connection
+        await self.disconnect(connection_id)
+    
+    def _enqueue(self, connection_ids: Iterable[str], message: OutboundMessage) -> int:
+        """Queue one encoded message on several connections; returns how many took it."""
+        queued = 0
+        for connection_id in connection_ids:
+            connection_info = self.connections.get(connection_id)
+            if connection_info is not None and connection_info.queue.put(message):
+                queued += 1
+        return queued
+    
+    async def send_to_connection(self, connection_id: str, message: WebSocketMessage):
+        """Send a message to a specific connection."""
+        return self._enqueue((connection_id,), OutboundMessage.encode(message)) > 0
+    
+    def send_to_websocket(self, websocket: Any, message: OutboundMessage) -> bool:
+        """Queue an encoded message for a socket registered here; False if it is not managed."""
+        connection_id = self.websocket_connections.get(id(websocket))
+        if connection_id is None:
             return False
+        return self._enqueue((connection_id,), message) > 0
     
     async def send_to_user(self, user_id: str, message: WebSocketMessage):
         """Send a message to all connections for a user."""
         if user_id not in self.user_connections:
             return False
         
-        connection_ids = list(self.user_connections[user_id])
-        success_count = 0
-        
-        for connection_id in connection_ids:
-            if await self.send_to_connection(connection_id, message):
-                success_count += 1
-        
-        return success_count > 0
+        return self._enqueue(list(self.user_connections[user_id]), OutboundMessage.encode(message)) > 0
     
     async def broadcast_to_subscription(self, subscription: str, message: WebSocketMessage):
         """Broadcast a message to all subscribers."""
         if subscription not in self.subscriptions:
             return False
         
-        connection_ids = list(self.subscriptions[subscription])
-        success_count = 0
-        
-        for connection_id in connection_ids:
-            if await self.send_to_connection(connection_id, message):
-                success_count += 1
-        
-        return success_count > 0
+        return self._enqueue(list(self.subscriptions[subscription]), OutboundMessage.encode(message)) > 0
     
     async def broadcast_to_all(self, message: WebSocketMessage):
         """Broadcast a message to all active connections."""
-        connection_ids = list(self.connections.keys())
-        success_count = 0
-        
-        for connection_id in connection_ids:
-            if await self.send_to_connection(connection_id, message):
-                success_count += 1
-        
-        return success_count > 0
+        return self._enqueue(list(self.connections), OutboundMessage.encode(message)) > 0
     
     async def queue_message(self, message: WebSocketMessage, target: str = None, target_type: str = "all"):
         """Queue a message for background processing."""
+        if self.message_queue is None:
+            self.message_queue = asyncio.Queue(maxsize=1000)
+            await self._ensure_background_tasks()
         await self.message_queue.put({
             "message": message,
             "target": target,
@@ -277,7 +416,8 @@ class WebSocketManager:
                 "result": result
             },
             timestamp=datetime.now(timezone.utc),
-            user_id=user_id
+            user_id=user_id,
+            coalesce_key=f"job_status:{job_id}"
         )
         
         await self.send_to_user(user_id, message)
@@ -330,7 +470,7 @@ class WebSocketManager:
     
     async def _ensure_background_tasks(self):
         """Ensure background tasks are running."""
-        if self.broadcast_task is None or self.broadcast_task.done():
+        if self.message_queue is not None and (self.broadcast_task is None or self.broadcast_task.done()):
             self.broadcast_task = asyncio.create_task(self._broadcast_loop())
         
         if self.cleanup_task is None or self.cleanup_task.done():
@@ -368,12 +508,12 @@ class WebSocketManager:
             try:
                 await asyncio.sleep(30)  # Run every 30 seconds
                 
-                current_time = datetime.now(timezone.utc())
+                current_time = datetime.now(timezone.utc)
                 dead_connections = []
                 
                 # Check for dead connections (no ping for 5 minutes)
                 for connection_id, connection_info in self.connections.items():
-                    if (current_time - connection_info.last_ping).seconds > 300:
+                    if (current_time - connection_info.last_ping).total_seconds() > 300:
                         dead_connections.append(connection_id)
                 
                 # Clean up dead connections
@@ -394,13 +534,13 @@ class WebSocketManager:
             timestamp=datetime.now(timezone.utc)
         )
         
+        encoded = OutboundMessage.encode(ping_message)
         dead_connections = []
         
         for connection_id, connection_info in self.connections.items():
-            try:
-                await connection_info.websocket.send_text(json.dumps(ping_message.to_dict()))
+            if connection_info.queue.put(encoded):
                 connection_info.last_ping = datetime.now(timezone.utc)
-            except Exception:
+            else:
                 dead_connections.append(connection_id)
         
         # Clean up dead connections
@@ -411,12 +551,18 @@ class WebSocketManager:
     
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get connection statistics."""
+        queues = [info.queue for info in self.connections.values() if info.queue is not None]
         return {
             "active_connections": len(self.connections),
             "total_users": len(self.user_connections),
             "total_subscriptions": len(self.subscriptions),
-            "messages_sent": self.stats["messages_sent"],
+            "messages_sent": self.stats["messages_sent"] + sum(q.sent for q in queues),
             "messages_failed": self.stats["messages_failed"],
+            "messages_dropped": self.stats["messages_dropped"] + sum(q.dropped for q in queues),
+            "messages_coalesced": self.stats["messages_coalesced"] + sum(q.coalesced for q in queues),
+            "slow_consumers_closed": self.stats["slow_consumers_closed"],
+            "queued_messages": sum(q.depth for q in queues),
+            "max_queue_depth": max((q.depth for q in queues), default=0),
             "total_connections": self.stats["total_connections"]
         }
     
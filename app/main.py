@@ -40,6 +40,12 @@ else:
     # Log Python version for debugging
     print(f"✅ Python {python_version.major}.{python_version.minor}.{python_version.micro} - Compatible")
 
+# --profile-startup: time every import from here on (see app/core/startup_profiler.py)
+_startup_profiler = None
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    from app.core.startup_profiler import StartupProfiler
+    _startup_profiler = StartupProfiler().start()
+
 import asyncio
 import json
 import logging
@@ -74,107 +80,111 @@ BASE_PATH = get_base_path()
 # Jinja2 templates for frontend UI pages
 templates = Jinja2Templates(directory=str(BASE_PATH / "app" / "templates"))
 
-def _safe_router_import(module_path: str):
-    try:
-        module = __import__(module_path, fromlist=["router"])
-        return getattr(module, "router")
-    except (ImportError, AttributeError) as ex:
-        logging.getLogger(__name__).warning("Router import failed (%s): %s", module_path, ex)
-        return None
-
-# Import optional routers
-auto_mode_router = _safe_router_import("app.routers.auto_mode")
-intake_router = _safe_router_import("app.routers.intake")
-registry_router = _safe_router_import("app.routers.registry")
-vault_engine_router = _safe_router_import("app.routers.vault_engine")
-law_library_router = _safe_router_import("app.routers.law_library")
-eviction_defense_router = _safe_router_import("app.routers.eviction_defense")
-zoom_court_router = _safe_router_import("app.routers.zoom_court")
-form_data_router = _safe_router_import("app.routers.form_data")
-setup_router = _safe_router_import("app.routers.setup")
-websocket_router = _safe_router_import("app.routers.websocket")
-brain_router = _safe_router_import("app.routers.brain")
-vault_all_in_one_router = _safe_router_import("app.routers.vault_all_in_one")
+from app.core.router_registry import LazyRouter, RouterRegistry
 
+# Core routers used by the entry pages and health probes are imported eagerly
 from app.routers import health
-cloud_sync_router = _safe_router_import("app.routers.cloud_sync")
-complaints_router = _safe_router_import("app.routers.complaints")
-module_hub_router = _safe_router_import("app.routers.module_hub")
-positronic_mesh_router = _safe_router_import("app.routers.positronic_mesh")
-mesh_network_router = _safe_router_import("app.routers.mesh_network")
-location_router = _safe_router_import("app.routers.location")
-hud_funding_router = _safe_router_import("app.routers.hud_funding")
-fraud_exposure_router = _safe_router_import("app.routers.fraud_exposure")
-public_exposure_router = _safe_router_import("app.routers.public_exposure")
-plan_maker_router = _safe_router_import("app.routers.plan_maker")
-research_router = _safe_router_import("app.routers.research")
-campaign_router = _safe_router_import("app.routers.campaign")
-research_module_router = _safe_router_import("app.modules.research_module")
-extraction_router = _safe_router_import("app.routers.extraction")
-funding_search_router = _safe_router_import("app.routers.funding_search")
-tenancy_hub_router = _safe_router_import("app.routers.tenancy_hub")
-legal_analysis_router = _safe_router_import("app.routers.legal_analysis")
-legal_filing_router = _safe_router_import("app.routers.legal_filing")
-distributed_mesh_router = _safe_router_import("app.routers.mesh")
-legal_trails_router = _safe_router_import("app.routers.legal_trails")
-state_laws_router = _safe_router_import("app.routers.state_laws")
-contacts_router = _safe_router_import("app.routers.contacts")
-recognition_router = _safe_router_import("app.routers.recognition")
-search_router = _safe_router_import("app.routers.search")
-court_forms_router = _safe_router_import("app.routers.court_forms")
-zoom_court_prep_router = _safe_router_import("app.routers.zoom_court_prep")
-pdf_tools_router = _safe_router_import("app.routers.pdf_tools")
-tools_api_router = _safe_router_import("app.routers.tools_api")
-briefcase_router = _safe_router_import("app.routers.briefcase")
-emotion_router = _safe_router_import("app.routers.emotion")
-court_packet_router = _safe_router_import("app.routers.court_packet")
-actions_router = _safe_router_import("app.routers.actions")
-progress_router = _safe_router_import("app.routers.progress")
-dashboard_router = _safe_router_import("app.routers.dashboard")
-enterprise_dashboard_router = _safe_router_import("app.routers.enterprise_dashboard")
-crawler_router = _safe_router_import("app.routers.crawler")
-role_ui_router = _safe_router_import("app.routers.role_ui")
-role_upgrade_router = _safe_router_import("app.routers.role_upgrade")
-guided_intake_router = _safe_router_import("app.routers.guided_intake")
-overlays_router = _safe_router_import("app.routers.overlays")
-document_converter_router = _safe_router_import("app.routers.document_converter")
-page_index_router = _safe_router_import("app.routers.page_index")
-documents_router = _safe_router_import("app.routers.documents")
-vault_router = _safe_router_import("app.routers.vault")
-workflow_router = _safe_router_import("app.routers.workflow")
-case_builder_router = _safe_router_import("app.routers.case_builder")
-preview_router = _safe_router_import("app.routers.preview")
-batch_router = _safe_router_import("app.routers.batch")
-analytics_router = _safe_router_import("app.routers.analytics")
-functionx_router = _safe_router_import("app.routers.functionx")
-unified_overlays_router = _safe_router_import("app.routers.unified_overlays")
-document_delivery_router = _safe_router_import("app.routers.document_delivery")
-communication_router = _safe_router_import("app.routers.communication")
-free_api_router = _safe_router_import("app.routers.free_api")
-timeline_unified_router = _safe_router_import("app.routers.timeline_unified")
-invite_codes_router = _safe_router_import("app.routers.invite_codes")
 from app.routers import storage
 from app.routers import onboarding
-from app.routers import plugins
-from app.routers import development
 # DISABLED: from app.core.mesh_integration import start_mesh_network, stop_mesh_network
 
-# Tenant Defense Module
-from app.modules.tenant_defense import router as tenant_defense_router
-
-# Dakota County Eviction Defense Module
-try:
-    from app.routers.eviction import (
-        flows_router as dakota_flows,
-        forms_router as dakota_forms,
-        case_router as dakota_case,
-        learning_router as dakota_learning,
-        procedures_router as dakota_procedures,
-    )
-    DAKOTA_AVAILABLE = True
-except ImportError as e:
-    logging.getLogger(__name__).warning("Dakota County module import failed: %s", e)
-    DAKOTA_AVAILABLE = False
+# Everything else is imported on the first request to one of its prefixes
+# (see app/core/router_registry.py). Order matches registration order.
+LAZY_ROUTERS = [
+    LazyRouter("app.routers.role_ui", ("/ui",), tags=["Role UI"]),  # Directs users to appropriate interface
+    LazyRouter("app.routers.workflow", ("/api/workflow",)),  # Workflow engine + page contract API
+    LazyRouter("app.routers.role_upgrade", ("/api/roles",), tags=["Role Management"]),
+    LazyRouter("app.routers.guided_intake", ("/api/guided-intake",), tags=["Guided Intake"]),
+    LazyRouter("app.routers.plugins", ("/api/plugins",), tags=["Plugin System"]),
+    LazyRouter("app.routers.development", ("/api/dev",), tags=["Development Tools"]),
+    LazyRouter("app.routers.documents", ("/api/documents",), tags=["Documents"]),
+    LazyRouter("app.routers.vault", ("/api/vault",), prefix="/api/vault", tags=["Document Vault"]),
+    LazyRouter("app.routers.intake", ("/api/intake",), tags=["Document Intake"]),
+    LazyRouter("app.routers.registry", ("/api/registry",), tags=["Document Registry"]),
+    LazyRouter("app.routers.vault_engine", ("/api/vault-engine",), tags=["Vault Engine"]),
+    LazyRouter("app.routers.form_data", ("/api/form-data",), prefix="/api/form-data", tags=["Form Data Hub"]),
+    LazyRouter("app.routers.setup", ("/api/setup",), prefix="/api/setup", tags=["Setup Wizard"]),
+    LazyRouter("app.routers.auto_mode", ("/api/auto-mode",), tags=["Auto Mode"]),
+    LazyRouter("app.routers.functionx", ("/api/functionx",), tags=["FunctionX"]),
+    LazyRouter("app.routers.unified_overlays", ("/api/unified-overlays",), tags=["Unified Overlays"]),
+    LazyRouter("app.routers.document_delivery", ("/api/delivery",), tags=["Document Delivery"]),
+    LazyRouter("app.routers.communication", ("/api/communications",), tags=["Communications"]),
+    LazyRouter("app.routers.websocket", ("/ws",), prefix="/ws", tags=["WebSocket Events"]),
+    LazyRouter("app.routers.module_hub", ("/api/hub",), prefix="/api", tags=["Module Hub"]),
+    LazyRouter("app.routers.positronic_mesh", ("/api/mesh",), prefix="/api", tags=["Positronic Mesh"]),
+    LazyRouter("app.routers.mesh_network", ("/api/network",), prefix="/api", tags=["Mesh Network"]),
+    LazyRouter("app.routers.location", ("/api/location",), tags=["Location"]),
+    LazyRouter("app.routers.hud_funding", ("/api/hud-funding",), tags=["HUD Funding Guide"]),
+    LazyRouter("app.routers.fraud_exposure", ("/api/fraud",), tags=["Fraud Exposure"]),
+    LazyRouter("app.routers.public_exposure", ("/api/exposure",), tags=["Public Exposure"]),
+    LazyRouter("app.routers.plan_maker", ("/api/plan-maker",), tags=["Plan Maker"]),
+    LazyRouter("app.routers.campaign", ("/api/campaign",), tags=["Campaign Orchestration"]),
+    LazyRouter("app.routers.funding_search", ("/api/funding",), tags=["Funding & Tax Credit Search"]),
+    LazyRouter("app.routers.research", ("/api/research",), tags=["Research Module"]),
+    LazyRouter("app.modules.research_module", ("/api/research-module",), tags=["Research Module SDK"]),
+    LazyRouter("app.routers.extraction", ("/api/extraction",), tags=["Form Field Extraction"]),
+    LazyRouter("app.routers.tenancy_hub", ("/api/tenancy",), tags=["Tenancy Hub"]),
+    LazyRouter("app.routers.legal_analysis", ("/api/legal-analysis",), tags=["Legal Analysis"]),
+    LazyRouter("app.routers.legal_filing", ("/api/legal-filing",), tags=["Legal Filing"]),
+    LazyRouter("app.routers.legal_trails", ("/legal-trails",), tags=["Legal Trails"]),
+    LazyRouter("app.routers.state_laws", ("/api/states",), tags=["State Laws"]),
+    LazyRouter("app.routers.contacts", ("/api/contacts",), tags=["Contact Manager"]),
+    LazyRouter("app.routers.recognition", ("/api/recognition",), tags=["Document Recognition"]),
+    LazyRouter("app.routers.search", ("/api/search",), prefix="/api/search", tags=["Global Search"]),
+    LazyRouter("app.routers.court_forms", ("/api/forms",), tags=["Court Forms"]),
+    LazyRouter("app.routers.zoom_court_prep", ("/api/zoom-court-prep",), tags=["Zoom Court Prep"]),
+    LazyRouter("app.routers.pdf_tools", ("/api/pdf",), tags=["PDF Tools"]),
+    LazyRouter("app.routers.tools_api", ("/api/tools",), tags=["Tools"]),
+    LazyRouter("app.routers.briefcase", ("/api/briefcase",), tags=["Briefcase"]),
+    LazyRouter("app.routers.emotion", ("/api/emotion",), tags=["Emotion Engine"]),
+    LazyRouter("app.routers.court_packet", ("/api/court-packet",), tags=["Court Packet"]),
+    LazyRouter("app.routers.actions", ("/api/actions",), tags=["Smart Actions"]),
+    LazyRouter("app.routers.progress", ("/progress",), tags=["Progress Tracker"]),
+    LazyRouter("app.routers.case_builder", ("/api/case-builder",), tags=["Case Builder"]),
+    LazyRouter("app.routers.document_converter", ("/api/convert",), tags=["Document Converter"]),
+    LazyRouter("app.routers.page_index", ("/api/pages",), tags=["Page Index"]),
+    LazyRouter("app.routers.dashboard", ("/api/dashboard",), tags=["Unified Dashboard"]),
+    LazyRouter("app.routers.enterprise_dashboard", ("/api/dashboard", "/api/search", "/ws/dashboard"),
+               tags=["Enterprise Dashboard"]),
+    LazyRouter("app.routers.timeline_unified", ("/api/timeline",), prefix="/api/timeline", tags=["Unified Timeline"]),
+    LazyRouter("app.routers.invite_codes", ("/api/invite-codes",), tags=["Invite Codes"]),
+    LazyRouter("app.routers.preview", ("/api/preview",), prefix="/api/preview", tags=["Document Preview"]),
+    LazyRouter("app.routers.batch", ("/api/batch",), prefix="/api/batch", tags=["Batch Operations"]),
+    LazyRouter("app.routers.analytics", ("/api/analytics",), prefix="/api/analytics", tags=["Analytics"]),
+    # Subscribes to SDK events at import time, so it must be loaded up front
+    LazyRouter("app.modules.tenant_defense", ("/api/tenant-defense",), tags=["Tenant Defense"], preload=True),
+    LazyRouter("app.routers.mesh", ("/api/mesh",), prefix="/api", tags=["Distributed Mesh"]),
+    # Dakota County Eviction Defense Module
+    LazyRouter("app.routers.eviction", ("/eviction",), attr="case_router", prefix="/eviction", tags=["Eviction Case"]),
+    LazyRouter("app.routers.eviction", ("/eviction/learn",), attr="learning_router", prefix="/eviction/learn",
+               tags=["Court Learning"]),
+    LazyRouter("app.routers.eviction", ("/dakota/procedures",), attr="procedures_router", tags=["Dakota Procedures"]),
+    LazyRouter("app.routers.eviction", ("/eviction",), attr="flows_router", prefix="/eviction", tags=["Eviction Defense"]),
+    LazyRouter("app.routers.eviction", ("/eviction/forms",), attr="forms_router", prefix="/eviction/forms",
+               tags=["Court Forms"]),
+    # Legal Defense Modules
+    LazyRouter("app.routers.law_library", ("/api/law-library",), tags=["Law Library"]),
+    LazyRouter("app.routers.eviction_defense", ("/api/eviction-defense",), tags=["Eviction Defense Toolkit"]),
+    LazyRouter("app.routers.zoom_court", ("/api/zoom-court",), tags=["Zoom Courtroom"]),
+    LazyRouter("app.routers.brain", ("/brain",), prefix="/brain", tags=["Positronic Brain"]),
+    LazyRouter("app.routers.cloud_sync", ("/api/sync",), tags=["Cloud Sync"]),
+    LazyRouter("app.routers.vault_all_in_one", ("/vault",), tags=["ALL-IN-ONE Vault"]),
+    LazyRouter("app.routers.overlays", ("/api/overlays",), tags=["Document Overlays"]),
+    LazyRouter("app.routers.components", ("/api/components",), tags=["Modular Components"]),
+    LazyRouter("app.routers.litigation_intelligence", ("/api/litigation-intelligence",), attr="lis_router",
+               tags=["Litigation Intelligence"]),
+    LazyRouter("app.routers.core_system", ("/api/core",), attr="core_router", tags=["Core System"]),
+    LazyRouter("app.routers.housing_accountability", ("/api/housing-accountability",),
+               attr="accountability_router", tags=["Housing Accountability"]),
+    # Phase 2 Advanced Features
+    LazyRouter("app.routers.export_import", ("/api/export-import",), prefix="/api/export-import",
+               tags=["Data Export/Import"]),
+    LazyRouter("app.routers.security", ("/api/security",), prefix="/api/security", tags=["Advanced Security"]),
+    LazyRouter("app.routers.testing", ("/api/testing",), prefix="/api/testing", tags=["Automated Testing"]),
+    LazyRouter("app.routers.documentation", ("/api/docs",), prefix="/api/docs", tags=["API Documentation"]),
+    LazyRouter("app.routers.free_api", ("/freeapi",)),  # Minnesota tenant rights APIs
+    LazyRouter("app.routers.complaints", ("/api/complaints",), tags=["Complaint Wizard"]),
+]
 
 
 # =============================================================================
@@ -499,6 +509,38 @@ async def lifespan(_app: FastAPI):
     # Register graceful shutdown handler
     from app.core.shutdown import register_shutdown_handler, task_manager
     register_shutdown_handler()
+
+    # Share this worker's request metrics with its siblings for /metrics
+    from app.core.request_metrics import start_metrics_publisher, stop_metrics_publisher
+    await start_metrics_publisher()
+
+    # Carry EventBus events to the other workers (EVENT_BUS_BACKEND)
+    from app.core.event_bus import start_event_transport, stop_event_transport
+    backend = await start_event_transport()
+    logger.info("   Event bus transport: %s", backend)
+
+    # Pick up batch operations a previous worker left unfinished
+    from app.core.batch_operations import resume_batch_operations
+    resumed = await resume_batch_operations()
+    if resumed:
+        logger.info("   Resumed %d interrupted batch operation(s)", len(resumed))
+
+    # Group-commit writer for the audit trail (replays events a failed write left on disk)
+    from app.core.audit_store import start_audit_store, stop_audit_store
+    await start_audit_store()
+
+    # Periodic writes of the analytics rollup buckets
+    from app.core.analytics_engine import start_analytics_rollups, stop_analytics_rollups
+    await start_analytics_rollups()
+
+    # Keep rendered previews under PREVIEW_MAX_MB
+    from app.core.preview_generator import start_preview_pruner, stop_preview_pruner
+    await start_preview_pruner()
+
+    # Rebuild document search vectors for changed rows (PostgreSQL only)
+    from app.core.postgres_fts import start_search_reindexer, stop_search_reindexer
+    if await start_search_reindexer():
+        logger.info("   Search vector reindexer started")
     
     # DISABLED: Distributed mesh network (memory hog)
     # try:
@@ -526,6 +568,44 @@ async def lifespan(_app: FastAPI):
     # except (OSError, RuntimeError, ValueError) as e:
     #     logger.warning("⚠️ Mesh network stop warning: %s", e)
 
+    await stop_search_reindexer()
+    await stop_preview_pruner()
+    await stop_event_transport()
+    await stop_metrics_publisher()
+
+    from app.services.storage.google_drive import close_drive_client
+    await close_drive_client()
+
+    from app.core.search_engine import close_search_engine
+    close_search_engine()
+    logger.info("   Search index flushed")
+
+    from app.services.recognition.worker_pool import shutdown_worker_pool
+    shutdown_worker_pool()
+    logger.info("   Recognition workers stopped")
+
+    from app.services.pdf_extractor import shutdown_page_executor
+    shutdown_page_executor()
+    logger.info("   PDF extraction workers stopped")
+
+    from app.core.preview_generator import shutdown_render_executor
+    shutdown_render_executor()
+    logger.info("   Preview render workers stopped")
+
+    from app.core.extraction_cache import close_extraction_cache
+    close_extraction_cache()
+    logger.info("   Extraction cache closed")
+
+    from app.core.job_processor import shutdown_job_processor
+    shutdown_job_processor()
+    logger.info("   Job processor stopped (unfinished jobs requeued)")
+
+    await stop_analytics_rollups()
+    logger.info("   Analytics rollups flushed")
+
+    await stop_audit_store()
+    logger.info("   Audit events flushed")
+
     await close_db()
     logger.info("   Database connections closed")
     logger.info("   Goodbye! 👋")
@@ -1519,13 +1599,7 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     from app.core.oauth_token_manager import init_oauth_token_manager
     init_oauth_token_manager()
     
-    # DISABLED: Performance monitoring - causing high memory usage (85%+)
-    # TODO: Re-enable after memory optimization
-    # from app.core.performance_monitor import get_performance_monitor
-    # performance_monitor = get_performance_monitor()
-    # performance_monitor.start_monitoring()
-    
-    logger.info("Semptify 5.0 FastAPI application created successfully (performance monitoring disabled)")
+    logger.info("Semptify 5.0 FastAPI application created successfully")
     
     # =========================================================================
     # Global Exception Handlers
@@ -1551,50 +1625,12 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     
     logger.info("Global error handling system registered")
     
-    # =========================================================================
-    # Performance Monitoring Middleware - DISABLED
-    # =========================================================================
-    # DISABLED: Causing 85%+ memory usage
-    # TODO: Re-enable after optimization
-    
-    # @fastapi_app.middleware("http")
-    # async def performance_monitoring_middleware(request: Request, call_next):
-    #     """Monitor request performance."""
-    #     from app.core.performance_monitor import get_performance_monitor
-    #     ...
-    
-    logger.info("Performance monitoring middleware DISABLED (memory optimization)")
-    
     # =========================================================================
     # Offline Detection Middleware
     # =========================================================================
     
-    @fastapi_app.middleware("http")
-    async def offline_detection_middleware(request: Request, call_next):
-        """Add offline detection to all responses."""
-        response = await call_next(request)
-        
-        # Add offline indicators to HTML responses
-        if response.headers.get("content-type", "").startswith("text/html"):
-            from app.core.offline_manager import get_offline_indicators
-            offline_indicators = get_offline_indicators()
-            
-            # Inject offline indicators into HTML
-            if hasattr(response, 'body'):
-                body = response.body.decode() if isinstance(response.body, bytes) else response.body
-                if '<head>' in body:
-                    # Insert after <head> tag
-                    body = body.replace('<head>', f'<head>{offline_indicators}')
-                elif '<html>' in body:
-                    # Insert after <html> tag
-                    body = body.replace('<html>', f'<html>{offline_indicators}')
-                else:
-                    # Insert at beginning of body
-                    body = f'{offline_indicators}{body}'
-                
-                response.body = body.encode() if isinstance(response.body, bytes) else body
-        
-        return response
+    from app.core.offline_manager import OfflineIndicatorMiddleware
+    fastapi_app.add_middleware(OfflineIndicatorMiddleware)
     
     logger.info("Offline detection middleware registered")
     
@@ -1605,18 +1641,6 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     is_production = app_settings.security_mode == "enforced"
     logger = logging.getLogger(__name__)
     
-    # PRODUCTION SECURITY MIDDLEWARE (if enforced mode)
-    if is_production:
-        try:
-            from app.core.logging_middleware import RequestLoggingMiddleware as ProdRequestLogging
-            
-            # Request logging (security audit trail)
-            fastapi_app.add_middleware(ProdRequestLogging)
-            logger.info("🚀 Request logging middleware enabled (production mode)")
-        except ImportError as e:
-            logger.error("⚠️  Failed to load request logging middleware: %s", e)
-            logger.warning("Request logging not available - continuing without it")
-    
     # Smart Gate Checkpoint (enforces welcome page for new users)
     from app.core.checkpoint_middleware import SmartCheckpointMiddleware
     fastapi_app.add_middleware(SmartCheckpointMiddleware)
@@ -1655,14 +1679,14 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     fastapi_app.add_middleware(CORSMiddleware, **cors_config)
     logger.info("🔒 CORS middleware configured (production=%s)", is_production)
     
-    # Request ID middleware
-    @fastapi_app.middleware("http")
-    async def add_request_id(request: Request, call_next):
-        from app.core.id_gen import make_id
-        request_id = request.headers.get("X-Request-Id", make_id("req"))
-        response = await call_next(request)
-        response.headers["X-Request-Id"] = request_id
-        return response
+    # Request metrics (fixed memory, exported at /metrics); outside the gates so
+    # redirects and rejections are counted too
+    from app.core.request_metrics import RequestMetricsMiddleware
+    fastapi_app.add_middleware(RequestMetricsMiddleware)
+    
+    # Request ID (outermost, so every layer and handler sees request.state.request_id)
+    from app.core.logging_middleware import RequestIdMiddleware
+    fastapi_app.add_middleware(RequestIdMiddleware)
     
     # =========================================================================
     # Exception Handlers
@@ -1674,10 +1698,6 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     # Register Routers
     # =========================================================================
 
-    def include_if(router_obj, **kwargs):
-        if router_obj is not None:
-            fastapi_app.include_router(router_obj, **kwargs)
-
     # API Version info (GET /api/version)
     from app.core.versioning import version_router
     if version_router:
@@ -1687,22 +1707,6 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     if health.router:
         fastapi_app.include_router(health.router, tags=["Health"])
 
-    # Role-based UI routing (directs users to appropriate interface)
-    if role_ui_router:
-        fastapi_app.include_router(role_ui_router, tags=["Role UI"])
-
-    # Workflow engine + page contract API
-    if workflow_router:
-        fastapi_app.include_router(workflow_router)
-    
-    # Role upgrade/verification API
-    if role_upgrade_router:
-        fastapi_app.include_router(role_upgrade_router, tags=["Role Management"])
-    
-    # Guided Intake - Conversational intake like an attorney/advocate
-    if guided_intake_router:
-        fastapi_app.include_router(guided_intake_router, tags=["Guided Intake"])
-
     # Root route - serve welcome page from static/public (outside onboarding flow)
     @fastapi_app.get("/", response_class=HTMLResponse)
     async def root_welcome():
@@ -1719,284 +1723,17 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
     # Storage OAuth (handles authentication)
     if storage.router:
         fastapi_app.include_router(storage.router, tags=["Storage Auth"])
-    
-    # Plugin System (extensible module architecture)
-    if plugins.router:
-        fastapi_app.include_router(plugins.router, tags=["Plugin System"])
-    
-    # Development Tools (crawler, analysis, debugging)
-    if development.router:
-        fastapi_app.include_router(development.router, tags=["Development Tools"])
-
-    # API routes
-    # app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-    # app.include_router(vault.router, prefix="/api/vault", tags=["Document Vault"])
-    # app.include_router(timeline.router, prefix="/api/timeline", tags=["Timeline"])
-    # app.include_router(calendar.router, prefix="/api/calendar", tags=["Calendar"])
-    # app.include_router(copilot.router, prefix="/api/copilot", tags=["AI Copilot"])
-    # app.include_router(tactics.router, prefix="/api/tactics", tags=["Proactive Tactics"])  # AI defense strategies
-    # app.include_router(documents.router, tags=["Documents"])  # Fresh document processing API
-    # app.include_router(adaptive_ui.router, tags=["Adaptive UI"])  # Self-building interface
-    # app.include_router(context_loop.router, tags=["Context Loop"])  # Core processing engine
-    include_if(documents_router, tags=["Documents"])  # Document upload, analysis, intelligence
-    include_if(vault_router, prefix="/api/vault", tags=["Document Vault"])  # User storage vault API
-    include_if(intake_router, tags=["Document Intake"])  # Document intake & extraction
-    include_if(registry_router, tags=["Document Registry"])  # Tamper-proof chain of custody
-    include_if(vault_engine_router, tags=["Vault Engine"])  # Centralized access control
-    include_if(form_data_router, prefix="/api/form-data", tags=["Form Data Hub"])  # Central data integration
-    include_if(setup_router, prefix="/api/setup", tags=["Setup Wizard"])  # Initial setup wizard
-    include_if(auto_mode_router, tags=["Auto Mode"])  # Auto mode analysis & summaries
-    include_if(functionx_router, tags=["FunctionX"])  # Action-set planning and execution scaffold
-    include_if(unified_overlays_router, tags=["Unified Overlays"])  # Unified overlay system (cloud-only)
-    include_if(document_delivery_router, tags=["Document Delivery"])  # Send/receive/sign documents
-    include_if(communication_router, tags=["Communications"])  # Messaging and document collaboration
-    include_if(websocket_router, prefix="/ws", tags=["WebSocket Events"])  # Real-time events
-    include_if(module_hub_router, prefix="/api", tags=["Module Hub"])  # Central module communication
-    include_if(positronic_mesh_router, prefix="/api", tags=["Positronic Mesh"])  # Workflow orchestration
-    include_if(mesh_network_router, prefix="/api", tags=["Mesh Network"])  # True bidirectional module communication
-    if location_router:
-        fastapi_app.include_router(location_router, tags=["Location"])  # Location detection and state-specific resources
-    if hud_funding_router:
-        fastapi_app.include_router(hud_funding_router, tags=["HUD Funding Guide"])  # HUD funding programs, tax credits, landlord eligibility
-    if fraud_exposure_router:
-        fastapi_app.include_router(fraud_exposure_router, tags=["Fraud Exposure"])  # Fraud analysis and detection
-    if public_exposure_router:
-        fastapi_app.include_router(public_exposure_router, tags=["Public Exposure"])  # Press releases and media campaigns
-    if plan_maker_router:
-        fastapi_app.include_router(plan_maker_router, tags=["Plan Maker"])  # Accountability plan builder
-    if campaign_router:
-        fastapi_app.include_router(campaign_router, tags=["Campaign Orchestration"])  # Combined complaint, fraud, press campaigns
-    if funding_search_router:
-        fastapi_app.include_router(funding_search_router, tags=["Funding & Tax Credit Search"])  # LIHTC, NMTC, HUD funding search
-    if research_router:
-        fastapi_app.include_router(research_router, tags=["Research Module"])  # Landlord/property research and dossier
-    if research_module_router:
-        fastapi_app.include_router(research_module_router, tags=["Research Module SDK"])  # SDK-based landlord/property dossier
-    if extraction_router:
-        fastapi_app.include_router(extraction_router, tags=["Form Field Extraction"])  # Extract and map document data to form fields
-    if tenancy_hub_router:
-        fastapi_app.include_router(tenancy_hub_router, tags=["Tenancy Hub"])  # Central hub for all tenancy documentation
-    if legal_analysis_router:
-        fastapi_app.include_router(legal_analysis_router, tags=["Legal Analysis"])
-    if legal_filing_router:
-        fastapi_app.include_router(legal_filing_router, tags=["Legal Filing"])  # Legal merit, consistency, evidence analysis
-    if legal_trails_router:
-        fastapi_app.include_router(legal_trails_router, tags=["Legal Trails"])  # Track violations, claims, broker oversight, filing deadlines
-    if state_laws_router:
-        fastapi_app.include_router(state_laws_router, tags=["State Laws"])  # State-specific housing law information (MN-first)
-    if contacts_router:
-        fastapi_app.include_router(contacts_router, tags=["Contact Manager"])  # Track landlords, attorneys, witnesses, agencies
-    if recognition_router:
-        fastapi_app.include_router(recognition_router, tags=["Document Recognition"])  # World-class document recognition engine
-    if search_router:
-        fastapi_app.include_router(search_router, prefix="/api/search", tags=["Global Search"])  # Universal search across all content
-    if court_forms_router:
-        fastapi_app.include_router(court_forms_router, tags=["Court Forms"])  # Auto-generate Minnesota court forms
-    if zoom_court_prep_router:
-        fastapi_app.include_router(zoom_court_prep_router, tags=["Zoom Court Prep"])  # Hearing preparation and tech checks
-    if pdf_tools_router:
-        fastapi_app.include_router(pdf_tools_router, tags=["PDF Tools"])  # PDF reader, viewer, page extractor
-    if tools_api_router:
-        fastapi_app.include_router(tools_api_router, tags=["Tools"])  # Calculators, generators, checklists wiring
-    if briefcase_router:
-        fastapi_app.include_router(briefcase_router, tags=["Briefcase"])  # Document & folder organization system
-    if emotion_router:
-        fastapi_app.include_router(emotion_router, tags=["Emotion Engine"])  # Adaptive UI emotion tracking
-    if court_packet_router:
-        fastapi_app.include_router(court_packet_router, tags=["Court Packet"])  # Export court-ready document packets
-    if actions_router:
-        fastapi_app.include_router(actions_router, tags=["Smart Actions"])  # Personalized action recommendations
-    if progress_router:
-        fastapi_app.include_router(progress_router, tags=["Progress Tracker"])  # User journey progress tracking
-    if case_builder_router:
-        fastapi_app.include_router(case_builder_router, tags=["Case Builder"])  # Case management & intake
-    if document_converter_router:
-        fastapi_app.include_router(document_converter_router, tags=["Document Converter"])  # Markdown to DOCX/HTML conversion
-    if page_index_router:
-        fastapi_app.include_router(page_index_router, tags=["Page Index"])  # HTML page index database
-
-    if dashboard_router:
-        fastapi_app.include_router(dashboard_router, tags=["Unified Dashboard"])  # Combined dashboard data
-    if enterprise_dashboard_router:
-        fastapi_app.include_router(enterprise_dashboard_router, tags=["Enterprise Dashboard"])  # Premium enterprise UI & API
-    include_if(timeline_unified_router, prefix="/api/timeline", tags=["Unified Timeline"])  # Interactive timeline with date axis switching
-    include_if(invite_codes_router, tags=["Invite Codes"])  # Advocate/Legal role validation codes
-    
-    # Storage OAuth (handles authentication)
-    if storage.router:
-        fastapi_app.include_router(storage.router, tags=["Storage Auth"])
-    
-    # Plugin System (extensible module architecture)
-    if plugins.router:
-        fastapi_app.include_router(plugins.router, tags=["Plugin System"])
-    
-    # Development Tools (crawler, analysis, debugging)
-    if development.router:
-        fastapi_app.include_router(development.router, tags=["Development Tools"])
-
-    # Document Preview - Multi-format preview generation
-    if preview_router:
-        fastapi_app.include_router(preview_router, prefix="/api/preview", tags=["Document Preview"])
-        logging.getLogger(__name__).info("📄 Document Preview router connected - Multi-format preview generation active")
-
-    # Batch Operations - Bulk document management
-    if batch_router:
-        fastapi_app.include_router(batch_router, prefix="/api/batch", tags=["Batch Operations"])
-        logging.getLogger(__name__).info("📦 Batch Operations router connected - Bulk document management active")
-
-    # Analytics Systems - Usage and performance tracking
-    if analytics_router:
-        fastapi_app.include_router(analytics_router, prefix="/api/analytics", tags=["Analytics"])
-        logging.getLogger(__name__).info("📊 Analytics router connected - Usage and performance tracking active")
-
-    # Tenant Defense Module - Evidence collection, sealing petitions, demand letters
-    if tenant_defense_router:
-        fastapi_app.include_router(tenant_defense_router, tags=["Tenant Defense"])
-        logging.getLogger(__name__).info("⚖️ Tenant Defense module loaded - Evidence, petitions, and screening disputes")
-
-    # Distributed Mesh Network - P2P Module Communication
-    if distributed_mesh_router:
-        fastapi_app.include_router(distributed_mesh_router, prefix="/api", tags=["Distributed Mesh"])
-        logging.getLogger(__name__).info("🌐 Distributed Mesh router connected - P2P architecture active")
-
-    # Dakota County Eviction Defense Module
-    if DAKOTA_AVAILABLE:
-        fastapi_app.include_router(dakota_case, prefix="/eviction", tags=["Eviction Case"])
-        fastapi_app.include_router(dakota_learning, prefix="/eviction/learn", tags=["Court Learning"])
-        fastapi_app.include_router(dakota_procedures, tags=["Dakota Procedures"])
-        fastapi_app.include_router(dakota_flows, prefix="/eviction", tags=["Eviction Defense"])
-        fastapi_app.include_router(dakota_forms, prefix="/eviction/forms", tags=["Court Forms"])
-        logging.getLogger(__name__).info("✅ Dakota County Eviction Defense module loaded")
-    else:
-        logging.getLogger(__name__).warning("⚠️ Dakota County module not available")
-
-    # New Legal Defense Modules
-    if law_library_router:
-        fastapi_app.include_router(law_library_router, tags=["Law Library"])
-    if eviction_defense_router:
-        fastapi_app.include_router(eviction_defense_router, tags=["Eviction Defense Toolkit"])
-    if zoom_court_router:
-        fastapi_app.include_router(zoom_court_router, tags=["Zoom Courtroom"])
-    logging.getLogger(__name__).info("✅ Legal Defense modules loaded (Law Library, Eviction Defense, Zoom Court)")
-
-    # Positronic Brain - Central Intelligence Hub
-    if brain_router:
-        fastapi_app.include_router(brain_router, prefix="/brain", tags=["Positronic Brain"])
-        logging.getLogger(__name__).info("🧠 Positronic Brain connected - Central intelligence hub active")
-
-    # Cloud Sync - User-Controlled Persistent Storage
-    if cloud_sync_router:
-        fastapi_app.include_router(cloud_sync_router, tags=["Cloud Sync"])
-        logging.getLogger(__name__).info("☁️ Cloud Sync router connected - User-controlled data persistence active")
-
-    # ALL-IN-ONE Unified Evidence Vault - Three-timestamp model with comprehensive metadata
-    if vault_all_in_one_router:
-        fastapi_app.include_router(vault_all_in_one_router, tags=["ALL-IN-ONE Vault"])
-        logging.getLogger(__name__).info("🏛️ ALL-IN-ONE Vault router connected - Unified evidence vault with three-timestamp model active")
-
-    # Document Overlays - Non-destructive annotations and processing
-    if overlays_router:
-        fastapi_app.include_router(overlays_router, tags=["Document Overlays"])
-        logging.getLogger(__name__).info("📝 Document Overlays router connected - Non-destructive annotation system active")
-
-    # Modular Components - New component system integration
-    from app.routers import components
-    if components.router:
-        fastapi_app.include_router(components.router, tags=["Modular Components"])
-        logging.getLogger(__name__).info("🧩 Modular Components router connected - Component system integration active")
-
-    # Litigation Intelligence System (LIS) - Justice-Grade Legal Intelligence
-    try:
-        from app.routers import litigation_intelligence
-        fastapi_app.include_router(litigation_intelligence.lis_router, tags=["Litigation Intelligence"])
-        logging.getLogger(__name__).info("📊 Litigation Intelligence System router connected - Justice-grade legal intelligence active")
-        logging.getLogger(__name__).info("?? Litigation Intelligence System router connected - Justice-grade legal intelligence active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Litigation Intelligence System not available: {e}")
-
-    # Core System - System Infrastructure and Services
-    try:
-        from app.routers import core_system
-        fastapi_app.include_router(core_system.core_router, tags=["Core System"])
-        logging.getLogger(__name__).info("?? Core System router connected - System infrastructure active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Core System not available: {e}")
-
-    # Housing Accountability - Regulatory Compliance & Oversight
-    try:
-        from app.routers import housing_accountability
-        fastapi_app.include_router(housing_accountability.accountability_router, tags=["Housing Accountability"])
-        logging.getLogger(__name__).info("?? Housing Accountability router connected - Regulatory compliance active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Housing Accountability not available: {e}")
-
-    # Phase 2 Advanced Features Integration
-    # =========================================================================
-
-    # Document Preview System - Multi-format preview generation
-    try:
-        from app.routers import preview
-        fastapi_app.include_router(preview.router, prefix="/api/preview", tags=["Document Preview"])
-        logging.getLogger(__name__).info("📄 Document Preview router connected - Multi-format preview generation active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Document Preview router not available: {e}")
 
-    # Batch Operations - Bulk document management
-    try:
-        from app.routers import batch
-        fastapi_app.include_router(batch.router, prefix="/api/batch", tags=["Batch Operations"])
-        logging.getLogger(__name__).info("📦 Batch Operations router connected - Bulk document management active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Batch Operations router not available: {e}")
-
-    # Data Export/Import - GDPR-compliant data management
-    try:
-        from app.routers import export_import
-        fastapi_app.include_router(export_import.router, prefix="/api/export-import", tags=["Data Export/Import"])
-        logging.getLogger(__name__).info("📊 Data Export/Import router connected - GDPR-compliant data management active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Data Export/Import router not available: {e}")
-
-    # Advanced Security - 2FA and session management
-    try:
-        from app.routers import security
-        fastapi_app.include_router(security.router, prefix="/api/security", tags=["Advanced Security"])
-        logging.getLogger(__name__).info("🔒 Advanced Security router connected - 2FA and session management active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Advanced Security router not available: {e}")
-
-    # Automated Testing - Comprehensive testing framework
-    try:
-        from app.routers import testing
-        fastapi_app.include_router(testing.router, prefix="/api/testing", tags=["Automated Testing"])
-        logging.getLogger(__name__).info("🧪 Automated Testing router connected - Comprehensive testing framework active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"Automated Testing router not available: {e}")
-
-    # API Documentation - Developer portal and API docs
-    try:
-        from app.routers import documentation
-        fastapi_app.include_router(documentation.router, prefix="/api/docs", tags=["API Documentation"])
-        logging.getLogger(__name__).info("📚 API Documentation router connected - Developer portal active")
-    except ImportError as e:
-        logging.getLogger(__name__).warning(f"API Documentation router not available: {e}")
-
-    # Free API Pack - Minnesota tenant rights APIs
-    if free_api_router:
-        fastapi_app.include_router(free_api_router)
-        logging.getLogger(__name__).info("📈 Free API Pack connected - Minnesota tenant rights APIs active")
-    logging.getLogger(__name__).info("🚀 Phase 2 Advanced Features Integration Complete")
-    logging.getLogger(__name__).info("   - Document Preview: Multi-format preview generation")
-    logging.getLogger(__name__).info("   - Batch Operations: Bulk document management")
-    logging.getLogger(__name__).info("   - Data Export/Import: GDPR-compliant data management")
-    logging.getLogger(__name__).info("   - Advanced Security: 2FA and session management")
-    logging.getLogger(__name__).info("   - Automated Testing: Comprehensive testing framework")
-    logging.getLogger(__name__).info("   - API Documentation: Developer portal and API docs")
-
-    # Complaint Filing Wizard - Regulatory Accountability
-    if complaints_router:
-        fastapi_app.include_router(complaints_router, tags=["Complaint Wizard"])
-        logging.getLogger(__name__).info("⚖️ Complaint Filing Wizard loaded - Regulatory accountability tools active")
+    # Feature routers - imported on the first request to their prefix
+    router_registry = RouterRegistry(LAZY_ROUTERS)
+    router_registry.install(
+        fastapi_app,
+        lazy=app_settings.lazy_routers,
+        preload=app_settings.preload_routers.split(","),
+    )
+    fastapi_app.state.router_registry = router_registry
+    logger.info("🧩 %d feature routers registered (%d load on first request)",
+                len(LAZY_ROUTERS), router_registry.pending)
 
     # app.include_router(complaints.router, prefix="/api/complaints", tags=["Complaints"])
     # app.include_router(ledger.router, prefix="/api/ledger", tags=["Rent Ledger"])
@@ -2197,11 +1934,10 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
         try:
             with get_db_session() as db:
                 stats = get_dashboard_stats(org_id, db)
-                return JSONResponse(stats)
         except Exception as e:
             logger.warning("Dashboard stats query failed: %s", e)
             # Return fallback stats on error
-            return JSONResponse({
+            stats = {
                 "total_cases": 0,
                 "new_cases_this_week": 0,
                 "pending_documents": 0,
@@ -2209,7 +1945,21 @@ All errors return JSON with `detail` field. Rate limit errors include `retry_aft
                 "active_staff": 0,
                 "total_staff": 0,
                 "overdue_tasks": 0
-            })
+            }
+
+        # Platform activity over the last 24 hours from the analytics rollups
+        try:
+            from app.core.analytics_engine import get_analytics_engine, TimePeriod
+            today = await get_analytics_engine().aggregate_metrics(TimePeriod.DAY)
+            stats["activity_today"] = {
+                "requests": today.total_requests,
+                "active_users": today.unique_users,
+                "error_rate": today.error_rate,
+                "p95_response_time_ms": today.response_time_percentiles.get("p95", 0.0),
+            }
+        except Exception as e:
+            logger.warning("Dashboard activity rollup failed: %s", e)
+        return JSONResponse(stats)
 
     @fastapi_app.get("/api/manager/cases")
     async def manager_cases(request: Request):
@@ -3601,8 +3351,25 @@ app = create_app()
 # =============================================================================
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    
+
+    parser = argparse.ArgumentParser(description="Semptify development server")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report per-module import time and memory, then exit")
+    parser.add_argument("--all-routers", action="store_true",
+                        help="with --profile-startup, also load every lazy router")
+    parser.add_argument("--top", type=int, default=30, help="rows per report table")
+    args = parser.parse_args()
+
+    if _startup_profiler is not None:
+        registry = app.state.router_registry
+        if args.all_routers:
+            registry.load_all()
+        _startup_profiler.stop()
+        print(_startup_profiler.report(top=args.top, router_stats=registry.load_stats))
+        sys.exit(0)
+
     runtime_settings = get_settings()
     uvicorn.run(
         "app.main:app",
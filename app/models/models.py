@@ -11,7 +11,7 @@ from datetime import datetime
 from typing import Optional
 
 try:
-    from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Boolean, Float, Enum
+    from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Boolean, Float, Enum, Index
     from sqlalchemy.types import JSON
     JSONB = JSON  # Use generic JSON that works with both SQLite and PostgreSQL
     from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -27,7 +27,7 @@ except ImportError:
         def __init__(self, *args, **kwargs):
             pass
 
-    String = Text = Integer = ForeignKey = Boolean = Float = Enum = DummyColumnType
+    String = Text = Integer = ForeignKey = Boolean = Float = Enum = Index = DummyColumnType
     
     # JSONB fallback for SQLite/non-PostgreSQL environments
     class JSONB(DummyColumnType):
@@ -970,6 +970,17 @@ class VaultItem(Base):
         nullable=True,
         comment="GPS, address, coordinates, location context"
     )
+    # Copied from location_data.gps at ingestion so radius searches can use an index
+    location_lat: Mapped[Optional[float]] = mapped_column(
+        Float,
+        nullable=True,
+        comment="Latitude from location_data.gps (degrees)"
+    )
+    location_lon: Mapped[Optional[float]] = mapped_column(
+        Float,
+        nullable=True,
+        comment="Longitude from location_data.gps (degrees)"
+    )
     item_metadata: Mapped[dict] = mapped_column(
         JSONB,
         nullable=False,
@@ -1109,6 +1120,62 @@ class VaultAuditLog(Base):
     vault_item: Mapped["VaultItem"] = relationship(back_populates="audit_logs")
 
 
+class AuditRecord(Base):
+    """
+    Application audit trail written by app.core.audit_store.
+
+    Both audit modules (app.core.audit and app.core.audit_logger) store
+    their events here. The timestamp is part of the primary key because
+    PostgreSQL range-partitions the table by month on it (migration
+    20250428_audit_events); every lookup index leads with its filter
+    column and ends with the timestamp, so time-range queries stay on
+    the index and only touch the matching partitions.
+    """
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("idx_audit_events_user_time", "user_id", "timestamp"),
+        Index("idx_audit_events_resource_time", "resource_id", "timestamp"),
+        Index("idx_audit_events_action_time", "action", "timestamp"),
+        Index("idx_audit_events_time", "timestamp"),
+    )
+
+    id: Mapped[str] = mapped_column(String(40), primary_key=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTimeTZ, primary_key=True, default=utc_now)
+
+    action: Mapped[str] = mapped_column(String(64), nullable=False)
+    operation: Mapped[Optional[str]] = mapped_column(
+        String(50),
+        nullable=True,
+        comment="Short verb recorded by audit_logger events (upload, view, ...)"
+    )
+    user_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    resource_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    resource_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    severity: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    success: Mapped[bool] = mapped_column(Boolean, default=True)
+    ip_address: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    user_agent: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    details: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class AnalyticsRollup(Base):
+    """
+    One time bucket of analytics counters written by app.core.analytics_rollups.
+
+    Each worker owns its rows (worker_id) and rewrites them while the
+    bucket is open; readers merge the rows of every worker. data holds the
+    counters, the latency histogram and the HyperLogLog registers.
+    """
+    __tablename__ = "analytics_rollups"
+
+    resolution: Mapped[str] = mapped_column(String(10), primary_key=True, comment="minute, hour, day, week, month")
+    bucket_start: Mapped[datetime] = mapped_column(DateTimeTZ, primary_key=True)
+    worker_id: Mapped[str] = mapped_column(String(40), primary_key=True)
+    data: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTimeTZ, default=utc_now, onupdate=utc_now)
+
+
 # =============================================================================
 # Invite Code Model - For Advocate/Legal Role Validation
 # =============================================================================
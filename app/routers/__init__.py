@@ -1,11 +1,8 @@
 # API Routers - Semptify 5.0
 # Storage-based authentication: user's cloud storage = identity
+#
+# Router modules are imported on demand (`from app.routers import vault`) so
+# importing one router does not pull in every other one; app.main registers
+# them lazily through app.core.router_registry.
 
-from app.routers import auth, vault, copilot, health, storage, intake
-
-try:
-    from app.routers import timeline, calendar
-    __all__ = ["auth", "vault", "timeline", "calendar", "copilot", "health", "storage", "intake"]
-except ImportError:
-    # Optional database-backed routers when SQLAlchemy is installed
-    __all__ = ["auth", "vault", "copilot", "health", "storage", "intake"]
+__all__ = ["auth", "vault", "timeline", "calendar", "copilot", "health", "storage", "intake"]
@@ -68,6 +68,7 @@ class MetricsResponse(BaseModel):
     top_endpoints: List[Dict[str, Any]]
     feature_usage: Dict[str, int]
     document_metrics: Dict[str, int]
+    response_time_percentiles_ms: Dict[str, float] = {}
 
 
 class EventsListResponse(BaseModel):
@@ -464,18 +465,21 @@ async def get_dashboard_summary(
                 "requests": today.total_requests,
                 "unique_users": today.unique_users,
                 "avg_response_time_ms": today.avg_response_time,
+                "p95_response_time_ms": today.response_time_percentiles.get("p95", 0.0),
                 "error_rate": today.error_rate
             },
             "this_week": {
                 "requests": this_week.total_requests,
                 "unique_users": this_week.unique_users,
                 "avg_response_time_ms": this_week.avg_response_time,
+                "p95_response_time_ms": this_week.response_time_percentiles.get("p95", 0.0),
                 "error_rate": this_week.error_rate
             },
             "this_month": {
                 "requests": this_month.total_requests,
                 "unique_users": this_month.unique_users,
                 "avg_response_time_ms": this_month.avg_response_time,
+                "p95_response_time_ms": this_month.response_time_percentiles.get("p95", 0.0),
                 "error_rate": this_month.error_rate
             },
             "top_features": today.feature_usage,
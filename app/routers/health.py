@@ -4,6 +4,7 @@ Observability endpoints for monitoring and system dashboard.
 
 Endpoints:
 - /healthz - Basic liveness check (is the process running?)
+- /health - Liveness plus this worker's database pool (checked out, overflow, wait times)
 - /livez - Kubernetes liveness probe (same as healthz)
 - /readyz - Readiness check (is the app ready to serve traffic?)
 - /metrics - Prometheus metrics
@@ -12,6 +13,7 @@ Endpoints:
 
 import time
 import asyncio
+import secrets
 from datetime import datetime, timezone
 from pathlib import Path
 import json
@@ -20,6 +22,10 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.responses import PlainTextResponse, JSONResponse, HTMLResponse
 
 from app.core.config import Settings, get_settings
+from app.core.database import get_pool_status
+from app.core.db_metrics import db_metrics
+from app.core.extraction_cache import get_extraction_cache
+from app.core.request_metrics import aggregated_metrics
 from app.core.security import get_metrics, incr_metric, record_request_latency
 
 
@@ -50,8 +56,19 @@ async def liveness_check():
 
 @router.get("/health")
 async def health_alias():
-    """Alias for /healthz for compatibility."""
-    return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
+    """
+    Alias for /healthz for compatibility, plus this worker's database pool
+    (size, checked out, overflow, checkout wait times and timeouts) and
+    extraction cache (hits, misses, hit rate, entries, bytes).
+    Reads counters only; it never opens a database connection.
+    """
+    extraction_cache = get_extraction_cache()
+    return {
+        "status": "ok",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database": get_pool_status(),
+        "extraction_cache": extraction_cache.stats() if extraction_cache else {"enabled": False},
+    }
 
 
 @router.get("/api/health")
@@ -164,19 +181,31 @@ async def readiness_check(settings: Settings = Depends(get_settings)):
     )
 
 
+def _metrics_authorized(request: Request, settings: Settings) -> bool:
+    """True when METRICS_TOKEN is unset or the request carries it as a bearer token."""
+    token = getattr(settings, "metrics_token", "")
+    if not token:
+        return True
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(credentials.strip(), token)
+
+
 @router.get("/metrics", response_class=PlainTextResponse)
-async def metrics(settings: Settings = Depends(get_settings)):
+async def metrics(request: Request, settings: Settings = Depends(get_settings)):
     """
     Prometheus-compatible metrics endpoint.
     Returns metrics in Prometheus text format or JSON.
     """
     if not getattr(settings, "enable_metrics", False):
         return PlainTextResponse("Metrics disabled", status_code=404)
+    if not _metrics_authorized(request, settings):
+        return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
 
-    # Get metrics from security module
+    # Get metrics from security module; request counts and latency from all workers
     all_metrics = get_metrics()
     uptime = all_metrics.get("uptime_seconds", time.time() - _start_time)
-    latency = all_metrics.get("latency", {})
+    http = aggregated_metrics()
+    latency = http.overall_latency()
 
     # Build Prometheus text format
     metrics_lines = [
@@ -190,7 +219,7 @@ async def metrics(settings: Settings = Depends(get_settings)):
         "",
         "# HELP semptify_requests_total Total requests",
         "# TYPE semptify_requests_total counter",
-        f'semptify_requests_total {all_metrics.get("requests_total", 0)}',
+        f'semptify_requests_total {latency.count}',
         "",
         "# HELP semptify_admin_requests_total Admin requests",
         "# TYPE semptify_admin_requests_total counter",
@@ -214,28 +243,54 @@ async def metrics(settings: Settings = Depends(get_settings)):
     ]
 
     # Add latency metrics if available
-    if latency:
+    if latency.count:
         metrics_lines.extend([
             "",
             "# HELP semptify_request_latency_ms Request latency in milliseconds",
             "# TYPE semptify_request_latency_ms summary",
-            f'semptify_request_latency_ms{{quantile="0.5"}} {latency.get("p50_ms", 0):.2f}',
-            f'semptify_request_latency_ms{{quantile="0.95"}} {latency.get("p95_ms", 0):.2f}',
-            f'semptify_request_latency_ms{{quantile="0.99"}} {latency.get("p99_ms", 0):.2f}',
+            f'semptify_request_latency_ms{{quantile="0.5"}} {latency.quantile(0.5):.2f}',
+            f'semptify_request_latency_ms{{quantile="0.95"}} {latency.quantile(0.95):.2f}',
+            f'semptify_request_latency_ms{{quantile="0.99"}} {latency.quantile(0.99):.2f}',
+            f"semptify_request_latency_ms_sum {latency.total:.2f}",
+            f"semptify_request_latency_ms_count {latency.count}",
         ])
 
+    # Per-route counters and latency histograms
+    metrics_lines.extend(["", http.render_prometheus()])
+
+    # Per-statement latency and pool occupancy (this worker)
+    metrics_lines.extend(["", db_metrics.render_prometheus(pool_status=get_pool_status())])
+
     return PlainTextResponse("\n".join(metrics_lines), media_type="text/plain")
 
 
 @router.get("/metrics/json")
-async def metrics_json(settings: Settings = Depends(get_settings)):
+async def metrics_json(request: Request, settings: Settings = Depends(get_settings)):
     """
     JSON metrics endpoint for non-Prometheus consumers.
     """
     if not getattr(settings, "enable_metrics", False):
         return {"error": "Metrics disabled"}
+    if not _metrics_authorized(request, settings):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
 
     all_metrics = get_metrics()
+    http = aggregated_metrics()
+    latency = http.overall_latency()
+    all_metrics["requests_total"] = latency.count
+    if latency.count:
+        all_metrics["latency"] = {
+            "p50_ms": round(latency.quantile(0.50), 2),
+            "p95_ms": round(latency.quantile(0.95), 2),
+            "p99_ms": round(latency.quantile(0.99), 2),
+            "mean_ms": round(latency.mean, 2),
+            "max_ms": round(latency.max, 2),
+        }
+    all_metrics["workers"] = http.workers
+    all_metrics["database"] = {
+        "pool": get_pool_status(),
+        "top_statements": db_metrics.statement_stats(limit=10),
+    }
     all_metrics["app_version"] = settings.app_version
     all_metrics["security_mode"] = settings.security_mode
 
@@ -3,17 +3,22 @@ Document Preview API - Multi-format Preview Generation
 ===================================================
 
 Provides document preview and thumbnail generation capabilities.
+
+Page images are files on disk, served to the document's owner with ETag
+(304 on If-None-Match) and byte Range support. Previews are page
+manifests, paged with offset/limit, whose page images load one by one.
 """
 
 import logging
 import os
-import tempfile
+from pathlib import Path
 from typing import Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field
 
-from app.core.security import require_user, StorageUser
+from app.core.security import require_user, require_role, StorageUser
+from app.core.user_context import UserRole
 from app.core.preview_generator import (
     get_preview_generator, PreviewType, PreviewResult,
     generate_document_thumbnail, generate_document_preview,
@@ -26,6 +31,42 @@ from sqlalchemy import select
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+PREVIEW_PREFIX = "/api/preview"
+# Images of private documents, whose file can be replaced: clients revalidate by ETag
+IMAGE_CACHE_CONTROL = "private, no-cache"
+
+
+def _files_url(document_id: str, result: PreviewResult) -> str:
+    name = result.cache_key.partition("/")[2]
+    return f"{PREVIEW_PREFIX}/{document_id}/files/{name}"
+
+
+def _manifest_url(document_id: str, offset: int, limit: int) -> str:
+    return f"{PREVIEW_PREFIX}/{document_id}/manifest?offset={offset}&limit={limit}"
+
+
+def _image_response(request: Request, path: Path, etag: str, cache_control: str) -> Response:
+    """Serve a rendered image; FileResponse handles Range and If-Range."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=f"image/{path.suffix.lstrip('.')}", headers=headers)
+
+
+async def _user_document(document_id: str, user_id: str) -> DocumentModel:
+    """The user's document with a file on disk, or 404."""
+    async with get_db_session() as session:
+        result = await session.execute(select(DocumentModel).where(
+            DocumentModel.id == document_id,
+            DocumentModel.user_id == user_id
+        ))
+        doc = result.scalar_one_or_none()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not doc.file_path or not os.path.exists(doc.file_path):
+        raise HTTPException(status_code=404, detail="Document file not found")
+    return doc
+
 # =============================================================================
 # Schemas
 # =============================================================================
@@ -36,6 +77,7 @@ class PreviewRequest(BaseModel):
     preview_type: str = Field("preview", description="Preview type: thumbnail, preview")
     page_number: int = Field(1, ge=1, description="Page number for PDF thumbnails")
     max_pages: int = Field(10, ge=1, le=50, description="Max pages for preview")
+    offset: int = Field(0, ge=0, description="First page (0-based) of the preview manifest")
 
 class PreviewResponse(BaseModel):
     """Preview generation response."""
@@ -65,120 +107,118 @@ async def generate_preview_endpoint(
     - Office documents (fallback preview)
     """
     try:
-        # Get document from database
-        async with get_db_session() as session:
-            doc_query = select(DocumentModel).where(
-                DocumentModel.id == request.document_id,
-                DocumentModel.user_id == user.user_id
+        doc = await _user_document(request.document_id, user.user_id)
+
+        if request.preview_type == "thumbnail":
+            preview_result = await generate_document_thumbnail(
+                request.document_id,
+                doc.file_path,
+                request.page_number,
+                digest=doc.sha256_hash
             )
-            result = await session.execute(doc_query)
-            doc = result.scalar_one_or_none()
-            
-            if not doc:
-                raise HTTPException(status_code=404, detail="Document not found")
-            
-            if not doc.file_path or not os.path.exists(doc.file_path):
-                raise HTTPException(status_code=404, detail="Document file not found")
-            
-            # Determine preview type
-            preview_type = PreviewType.THUMBNAIL if request.preview_type == "thumbnail" else PreviewType.PREVIEW
-            
-            # Check cache first
-            cached_preview = get_cached_preview(request.document_id, preview_type)
-            if cached_preview:
-                return PreviewResponse(
-                    success=True,
-                    document_id=request.document_id,
-                    preview_type=request.preview_type,
-                    preview_url=f"/preview/serve/{cached_preview.cache_key}",
-                    metadata=cached_preview.metadata,
-                    message="Preview retrieved from cache"
-                )
-            
-            # Generate preview
-            if preview_type == PreviewType.THUMBNAIL:
-                preview_result = await generate_document_thumbnail(
-                    request.document_id, 
-                    doc.file_path, 
-                    request.page_number
-                )
-            else:
-                preview_result = await generate_document_preview(
-                    request.document_id, 
-                    doc.file_path, 
-                    request.max_pages
-                )
-            
-            if not preview_result:
-                raise HTTPException(status_code=500, detail="Preview generation failed")
-            
-            return PreviewResponse(
-                success=True,
-                document_id=request.document_id,
-                preview_type=request.preview_type,
-                preview_url=f"/preview/serve/{preview_result.cache_key}",
-                metadata=preview_result.metadata,
-                message="Preview generated successfully"
+            preview_url = _files_url(request.document_id, preview_result) if preview_result else None
+        else:
+            preview_result = await generate_document_preview(
+                request.document_id,
+                doc.file_path,
+                request.max_pages,
+                request.offset,
+                digest=doc.sha256_hash
             )
-            
+            preview_url = _manifest_url(request.document_id, request.offset, request.max_pages)
+
+        if not preview_result:
+            raise HTTPException(status_code=500, detail="Preview generation failed")
+
+        cached = preview_result.metadata.get("cached", False)
+        return PreviewResponse(
+            success=True,
+            document_id=request.document_id,
+            preview_type=request.preview_type,
+            preview_url=preview_url,
+            metadata=preview_result.metadata,
+            message="Preview retrieved from cache" if cached else "Preview generated successfully"
+        )
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Preview generation error: {e}")
         raise HTTPException(status_code=500, detail="Preview generation failed")
 
-@router.get("/serve/{cache_key}")
-async def serve_preview(cache_key: str):
+@router.get("/{document_id}/files/{name}")
+async def serve_preview_file(
+    document_id: str,
+    name: str,
+    request: Request,
+    user: StorageUser = Depends(require_user)
+):
+    """
+    Serve an already rendered image of one of the user's documents
+    (ETag and Range supported).
+    """
+    doc = await _user_document(document_id, user.user_id)
+    digest = doc.sha256_hash or ""
+    path = get_preview_generator().rendered_path(f"{digest}/{name}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return _image_response(request, path, f'"{digest[:16]}-{name}"', IMAGE_CACHE_CONTROL)
+
+
+@router.get("/{document_id}/manifest")
+async def get_preview_manifest(
+    document_id: str,
+    offset: int = Query(0, ge=0, description="First page (0-based)"),
+    limit: int = Query(10, ge=1, le=50, description="Pages per response"),
+    user: StorageUser = Depends(require_user)
+):
     """
-    Serve generated preview content.
-    
-    Returns the actual preview data (image or JSON).
+    Page manifest for a document: metadata and page_count, plus size, text
+    and image URL for pages [offset, offset + limit). next_url pages
+    through large documents; images render when first fetched.
     """
+    doc = await _user_document(document_id, user.user_id)
+    preview_result = await generate_document_preview(
+        document_id, doc.file_path, limit, offset, digest=doc.sha256_hash
+    )
+    if not preview_result:
+        raise HTTPException(status_code=500, detail="Preview generation failed")
+
+    manifest = dict(preview_result.content)
+    manifest["pages"] = [
+        {**page, "image_url": f"{PREVIEW_PREFIX}/{document_id}/pages/{page['page_number']}"}
+        for page in manifest.get("pages", [])
+    ]
+    page_count = preview_result.metadata["page_count"]
+    manifest["offset"] = offset
+    manifest["limit"] = limit
+    manifest["next_url"] = _manifest_url(document_id, offset + limit, limit) if offset + limit < page_count else None
+    return manifest
+
+
+@router.get("/{document_id}/pages/{page_number}")
+async def get_preview_page(
+    document_id: str,
+    page_number: int,
+    request: Request,
+    size: str = Query("preview", description="Image size: thumbnail, preview"),
+    user: StorageUser = Depends(require_user)
+):
+    """Image of one page, rendered on first request (ETag and Range supported)."""
+    doc = await _user_document(document_id, user.user_id)
+    preview_type = PreviewType.THUMBNAIL if size == "thumbnail" else PreviewType.PREVIEW
     try:
-        generator = get_preview_generator()
-        
-        # Find preview in cache
-        preview_result = None
-        for key, result in generator.preview_cache.items():
-            if result.cache_key == cache_key:
-                preview_result = result
-                break
-        
-        if not preview_result:
-            raise HTTPException(status_code=404, detail="Preview not found")
-        
-        # Serve based on preview type and format
-        if preview_result.preview_type == PreviewType.THUMBNAIL:
-            # Serve image
-            if isinstance(preview_result.content, bytes):
-                media_type = f"image/{preview_result.format.lower()}"
-                return Response(
-                    content=preview_result.content,
-                    media_type=media_type,
-                    headers={
-                        "Cache-Control": "public, max-age=3600",
-                        "Content-Disposition": f"inline; filename=thumbnail_{preview_result.document_id}.{preview_result.format.lower()}"
-                    }
-                )
-        
-        elif preview_result.preview_type == PreviewType.PREVIEW:
-            # Serve JSON data
-            return Response(
-                content=str(preview_result.content),
-                media_type="application/json",
-                headers={
-                    "Cache-Control": "public, max-age=3600"
-                }
-            )
-        
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported preview type")
-            
-    except HTTPException:
-        raise
+        preview_result = await get_preview_generator().render_page(
+            doc.file_path, page_number, preview_type, document_id, doc.sha256_hash, doc.mime_type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Preview serving error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to serve preview")
+        logger.error(f"Preview page error for {document_id}: {e}")
+        raise HTTPException(status_code=500, detail="Preview generation failed")
+    digest, _, name = preview_result.cache_key.partition("/")
+    return _image_response(request, Path(preview_result.content), f'"{digest[:16]}-{name}"', IMAGE_CACHE_CONTROL)
+
 
 @router.get("/{document_id}/text")
 async def get_text_preview(
@@ -250,11 +290,9 @@ async def get_preview_info(
             if not doc:
                 raise HTTPException(status_code=404, detail="Document not found")
         
-        generator = get_preview_generator()
-        
-        # Check available previews
-        thumbnail = get_cached_preview(document_id, PreviewType.THUMBNAIL)
-        preview = get_cached_preview(document_id, PreviewType.PREVIEW)
+        # Check available previews (first page already rendered)
+        thumbnail = get_cached_preview(doc.sha256_hash, PreviewType.THUMBNAIL)
+        preview = get_cached_preview(doc.sha256_hash, PreviewType.PREVIEW)
         
         return {
             "document_id": document_id,
@@ -262,16 +300,17 @@ async def get_preview_info(
                 "thumbnail": {
                     "available": thumbnail is not None,
                     "cache_key": thumbnail.cache_key if thumbnail else None,
-                    "url": f"/preview/serve/{thumbnail.cache_key}" if thumbnail else None,
+                    "url": _files_url(document_id, thumbnail) if thumbnail else None,
                     "metadata": thumbnail.metadata if thumbnail else None
                 },
                 "preview": {
                     "available": preview is not None,
                     "cache_key": preview.cache_key if preview else None,
-                    "url": f"/preview/serve/{preview.cache_key}" if preview else None,
+                    "url": _files_url(document_id, preview) if preview else None,
                     "metadata": preview.metadata if preview else None
                 }
             },
+            "manifest_url": _manifest_url(document_id, 0, 10),
             "document_info": {
                 "filename": doc.filename,
                 "file_type": doc.document_type,
@@ -307,8 +346,12 @@ async def clear_document_cache(
             if not doc:
                 raise HTTPException(status_code=404, detail="Document not found")
         
+        # Previews are stored by file hash; without one there is nothing to clear
+        if not doc.sha256_hash:
+            raise HTTPException(status_code=404, detail="No cached previews for this document")
+        
         # Clear cache
-        clear_preview_cache(document_id)
+        clear_preview_cache(doc.sha256_hash)
         
         return {
             "success": True,
@@ -381,15 +424,21 @@ async def batch_generate_previews(
                     
                     # Generate preview
                     if preview_type_enum == PreviewType.THUMBNAIL:
-                        preview_result = await generate_document_thumbnail(document_id, doc.file_path)
+                        preview_result = await generate_document_thumbnail(
+                            document_id, doc.file_path, digest=doc.sha256_hash
+                        )
+                        preview_url = _files_url(document_id, preview_result) if preview_result else None
                     else:
-                        preview_result = await generate_document_preview(document_id, doc.file_path)
+                        preview_result = await generate_document_preview(
+                            document_id, doc.file_path, digest=doc.sha256_hash
+                        )
+                        preview_url = _manifest_url(document_id, 0, get_preview_generator().config.max_pages)
                     
                     if preview_result:
                         results.append({
                             "document_id": document_id,
                             "success": True,
-                            "preview_url": f"/preview/serve/{preview_result.cache_key}",
+                            "preview_url": preview_url,
                             "metadata": preview_result.metadata
                         })
                     else:
@@ -449,12 +498,11 @@ async def get_supported_formats():
         raise HTTPException(status_code=500, detail="Failed to get supported formats")
 
 @router.delete("/cache")
-async def clear_all_cache(user: StorageUser = Depends(require_user)):
+async def clear_all_cache(admin: StorageUser = Depends(require_role(UserRole.ADMIN))):
     """
-    Clear all preview cache (admin only or user-specific).
+    Clear all preview cache (admin only).
     """
     try:
-        # For now, clear all cache (in production, this might be admin-only)
         clear_preview_cache()
         
         return {
@@ -878,25 +878,17 @@ async def batch_analyze(
     brain = get_brain()
     
     start_time = datetime.now()
-    results = []
+    responses = {}
     successful = 0
-    failed = 0
     
-    for doc in request.documents:
+    documents = [doc for doc in request.documents if len(doc.get("text", "")) >= 10]
+    failed = len(request.documents) - len(documents)
+    
+    # Documents are analyzed across the worker pool; results arrive as they finish
+    async for position, result in engine.analyze_stream(documents):
         try:
-            text = doc.get("text", "")
-            filename = doc.get("filename")
-            
-            if len(text) < 10:
-                failed += 1
-                continue
-            
-            doc_start = datetime.now()
-            result = await engine.analyze(text, filename=filename)
-            handwriting_result = await analyzer.analyze(text)
-            doc_time = (datetime.now() - doc_start).total_seconds() * 1000
-            
-            results.append(result_to_response(result, doc_time, handwriting_result))
+            handwriting_result = await analyzer.analyze(documents[position].get("text", ""))
+            responses[position] = result_to_response(result, result.processing_time_ms, handwriting_result)
             successful += 1
             
             background_tasks.add_task(emit_analysis_event, brain, result, user.user_id)
@@ -905,6 +897,8 @@ async def batch_analyze(
             logger.error(f"Batch item failed: {e}")
             failed += 1
     
+    results = [responses[position] for position in sorted(responses)]
+    
     total_time = (datetime.now() - start_time).total_seconds() * 1000
     
     return BatchAnalyzeResponse(
@@ -38,6 +38,7 @@ from app.services.vault_search import (
     SearchCriteria,
     TimelineMode,
     SortOrder,
+    InvalidCursorError,
 )
 from app.models.models import VaultItem, Incident
 
@@ -147,6 +148,7 @@ class VaultSearchRequest(BaseModel):
     sort_order: str = Field("desc", description="asc or desc")
     offset: int = Field(0, ge=0)
     limit: int = Field(100, ge=1, le=1000)
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page (overrides offset)")
 
 
 class VaultSearchResponse(BaseModel):
@@ -156,6 +158,8 @@ class VaultSearchResponse(BaseModel):
     total_count: int
     has_more: bool
     timeline_sequence: list[dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total_count_exact: bool = True
 
 
 class IncidentCreateRequest(BaseModel):
@@ -278,6 +282,7 @@ async def search_vault_items(
     sort_order: str = Query("desc", description="asc or desc"),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
     user_id: str = Depends(get_user_id),
 ):
@@ -308,15 +313,21 @@ async def search_vault_items(
         sort_order=SortOrder(sort_order),
         offset=offset,
         limit=limit,
+        cursor=cursor,
     )
     
-    result = await service.search(user_id, criteria)
+    try:
+        result = await service.search(user_id, criteria)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return VaultSearchResponse(
         items=[VaultItemResponse.model_validate(item) for item in result.items],
         total_count=result.total_count,
         has_more=result.has_more,
         timeline_sequence=result.timeline_sequence,
+        next_cursor=result.next_cursor,
+        total_count_exact=result.total_count_exact,
     )
 
 
@@ -349,15 +360,21 @@ async def advanced_search_vault_items(
         sort_order=SortOrder(request.sort_order),
         offset=request.offset,
         limit=request.limit,
+        cursor=request.cursor,
     )
     
-    result = await service.search(user_id, criteria)
+    try:
+        result = await service.search(user_id, criteria)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return VaultSearchResponse(
         items=[VaultItemResponse.model_validate(item) for item in result.items],
         total_count=result.total_count,
         has_more=result.has_more,
         timeline_sequence=result.timeline_sequence,
+        next_cursor=result.next_cursor,
+        total_count_exact=result.total_count_exact,
     )
 
 
@@ -638,6 +655,8 @@ async def get_incident_timeline(
 async def search_by_metadata(
     field: str = Query(..., description="Metadata field name"),
     value: str = Query(..., description="Value to search for"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db),
     user_id: str = Depends(get_user_id),
 ):
@@ -649,33 +668,39 @@ async def search_by_metadata(
     """
     service = VaultSearchService(db)
     
-    result = await service.deep_metadata_search(
-        user_id=user_id,
-        metadata_field=field,
-        value=value,
-    )
+    try:
+        result = await service.deep_metadata_search(
+            user_id=user_id,
+            metadata_field=field,
+            value=value,
+            limit=limit,
+            cursor=cursor,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "items": [VaultItemResponse.model_validate(item) for item in result.items],
         "total_count": result.total_count,
+        "has_more": result.has_more,
+        "next_cursor": result.next_cursor,
         "search": {"field": field, "value": value},
     }
 
 
 @router.get("/search/location")
 async def search_by_location(
-    lat: float = Query(..., description="Latitude"),
-    lon: float = Query(..., description="Longitude"),
-    radius: float = Query(1000, description="Radius in meters"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    radius: float = Query(1000, gt=0, description="Radius in meters"),
+    limit: int = Query(100, ge=1, le=1000),
     db: AsyncSession = Depends(get_db),
     user_id: str = Depends(get_user_id),
 ):
     """
-    Search for items near a geographic location.
+    Search for items near a geographic location, nearest first.
     
     Requires items to have location_data.gps.lat/lon fields.
-    
-    Note: Production systems should use PostGIS for proper geo queries.
     """
     service = VaultSearchService(db)
     
@@ -684,10 +709,13 @@ async def search_by_location(
         lat=lat,
         lon=lon,
         radius_meters=radius,
+        limit=limit,
     )
     
     return {
         "items": [VaultItemResponse.model_validate(item) for item in result.items],
         "total_count": result.total_count,
+        "has_more": result.has_more,
+        "timeline_sequence": result.timeline_sequence,
         "search": {"lat": lat, "lon": lon, "radius_meters": radius},
     }
@@ -93,7 +93,7 @@ class AzureAIService:
                 extractor = get_pdf_extractor()
                 
                 # Try local extraction first (fast, no API calls)
-                result = extractor.extract(content)
+                result = await extractor.extract_async(content)
                 full_text = result.text
                 raw_result = {
                     "content": full_text,
@@ -106,7 +106,8 @@ class AzureAIService:
                 # If extraction failed or got very little text, try Azure OCR
                 if len(full_text.strip()) < 50 and self.api_key:
                     print(f"Local extraction got {len(full_text)} chars, trying Azure OCR...")
-                    ocr_result = extractor.extract_with_ocr(
+                    ocr_result = await asyncio.to_thread(
+                        extractor.extract_with_ocr,
                         content,
                         azure_endpoint=self.endpoint,
                         azure_key=self.api_key
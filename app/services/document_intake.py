@@ -13,6 +13,7 @@ Supports:
 - Multiple languages (English primary, with Spanish/Somali/Arabic detection)
 """
 
+import asyncio
 import hashlib
 import json
 import re
@@ -1021,7 +1022,7 @@ class DocumentIntakeEngine:
             doc.progress_percent = 40
             
             # Extract text (simplified - real implementation would use OCR)
-            text = await self._extract_text(file_content, doc.mime_type, doc.filename)
+            text = await self._extract_text(file_content, doc.mime_type, doc.filename, doc)
             
             # Stage 3: Analysis
             doc.status = IntakeStatus.ANALYZING
@@ -1088,8 +1089,14 @@ class DocumentIntakeEngine:
         
         return doc
 
-    async def _extract_text(self, content: bytes, mime_type: str, filename: str) -> str:
-        """Extract text from document content using robust multi-method extraction."""
+    async def _extract_text(self, content: bytes, mime_type: str, filename: str,
+                            doc: Optional[IntakeDocument] = None) -> str:
+        """
+        Extract text from document content using robust multi-method extraction.
+
+        PDF pages stream in as they are extracted, and doc's status message
+        follows them, so a long packet shows progress while it is read.
+        """
         # For text files
         if mime_type.startswith("text/") or filename.endswith(".txt"):
             try:
@@ -1108,18 +1115,27 @@ class DocumentIntakeEngine:
                 
                 # Try extraction with OCR fallback if Azure is configured
                 if settings.azure_ai_key1:
-                    result = extractor.extract_with_ocr(
+                    result = await asyncio.to_thread(
+                        extractor.extract_with_ocr,
                         content,
                         azure_endpoint=settings.azure_ai_endpoint,
                         azure_key=settings.azure_ai_key1
                     )
-                else:
-                    result = extractor.extract(content)
-                
-                if result.text.strip():
-                    return result.text
-                else:
+                    if result.text.strip():
+                        return result.text
                     return f"[PDF: {filename} - {result.page_count} pages, extraction method: {result.method_used}]"
+                
+                pages = []
+                async for page in extractor.extract_pages(content):
+                    pages.append(page)
+                    if doc is not None:
+                        doc.status_message = f"Extracting text... page {page.page_number}"
+                
+                text = "\n\n".join(page.text for page in pages if page.text.strip())
+                if text:
+                    return text
+                methods = "+".join(sorted({page.method for page in pages})) or "none"
+                return f"[PDF: {filename} - {len(pages)} pages, extraction method: {methods}]"
                     
             except Exception as e:
                 # Fallback to basic extraction
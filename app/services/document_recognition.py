@@ -20,6 +20,8 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, Tuple
 
+from app.services.keyword_automaton import KeywordAutomaton
+
 
 # =============================================================================
 # DOCUMENT TYPE TAXONOMY
@@ -905,7 +907,20 @@ class DocumentRecognitionEngine:
     5. Reasoning - Cross-referencing signals for final classification
     """
     
+    # Terms reported by _extract_key_terms for law matching
+    LEGAL_KEY_TERMS = [
+        "unlawful detainer", "eviction", "possession", "writ of restitution",
+        "default judgment", "summary judgment", "service of process",
+        "security deposit", "habitability", "reasonable notice",
+        "quiet enjoyment", "lease violation", "breach of lease",
+        "tenant rights", "landlord obligations", "constructive eviction",
+        "retaliation", "discrimination", "reasonable accommodation",
+        "lead paint", "mold", "bedbugs", "repairs",
+    ]
+    
     def __init__(self):
+        # Every keyword the classifier looks for, matched in one pass per document
+        self.keyword_automaton = KeywordAutomaton(self._collect_keywords())
         self.month_map = {
             'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 
             'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
@@ -915,6 +930,16 @@ class DocumentRecognitionEngine:
             'december': 12, 'dec': 12
         }
     
+    def _collect_keywords(self) -> set[str]:
+        """Keywords, context requirements, key terms and statute numbers (all lowercase)."""
+        keywords = set(self.LEGAL_KEY_TERMS)
+        for patterns in DOCUMENT_PATTERNS.values():
+            keywords.update(k for k, _ in patterns["primary_keywords"])
+            keywords.update(k for k, _ in patterns["supporting_keywords"])
+            keywords.update(patterns.get("context_requirements", []))
+        keywords.update(statute.lower() for statute, _ in MN_LEGAL_TERMS["statutes"])
+        return keywords
+    
     def recognize(self, text: str, filename: str = "") -> RecognitionResult:
         """
         Perform full document recognition.
@@ -930,6 +955,9 @@ class DocumentRecognitionEngine:
         text_lower = text.lower()
         filename_lower = filename.lower()
         
+        # Single pass over the text for every keyword (positions feed all layers)
+        keyword_hits = self.keyword_automaton.find_all(text_lower)
+        
         # Initialize result
         result = RecognitionResult(
             category=DocumentCategory.UNKNOWN,
@@ -961,7 +989,7 @@ class DocumentRecognitionEngine:
             result.case_numbers = self._extract_case_numbers(text)
             result.addresses = self._extract_addresses(text)
             result.title, result.summary = self._generate_title_summary(result, text)
-            result.key_terms = self._extract_key_terms(text_lower)
+            result.key_terms = self._extract_key_terms(keyword_hits)
             self._analyze_urgency(result)
             return result
         
@@ -989,7 +1017,7 @@ class DocumentRecognitionEngine:
                 result.case_numbers = self._extract_case_numbers(text)
                 result.addresses = self._extract_addresses(text)
                 result.title, result.summary = self._generate_title_summary(result, text)
-                result.key_terms = self._extract_key_terms(text_lower)
+                result.key_terms = self._extract_key_terms(keyword_hits)
                 self._analyze_urgency(result)
                 return result
         
@@ -998,7 +1026,7 @@ class DocumentRecognitionEngine:
         result.signals.extend(structural_signals)
         
         # === LAYER 2: Keyword Analysis ===
-        keyword_signals, type_scores = self._analyze_keywords(text_lower)
+        keyword_signals, type_scores = self._analyze_keywords(text_lower, keyword_hits)
         result.signals.extend(keyword_signals)
         
         # Boost scores if Dakota County form was partially detected
@@ -1016,7 +1044,7 @@ class DocumentRecognitionEngine:
             ))
         
         # === LAYER 3: Context Analysis ===
-        context_signals = self._analyze_context(text_lower, type_scores)
+        context_signals = self._analyze_context(type_scores, keyword_hits)
         result.signals.extend(context_signals)
         
         # === LAYER 4: Entity Extraction ===
@@ -1044,7 +1072,7 @@ class DocumentRecognitionEngine:
         result.title, result.summary = self._generate_title_summary(result, text)
         
         # Extract key terms for law matching
-        result.key_terms = self._extract_key_terms(text_lower)
+        result.key_terms = self._extract_key_terms(keyword_hits)
         
         # Analyze urgency
         self._analyze_urgency(result)
@@ -1264,8 +1292,9 @@ class DocumentRecognitionEngine:
         
         return signals
     
-    def _analyze_keywords(self, text_lower: str) -> Tuple[list[RecognitionSignal], dict]:
-        """Layer 2: Analyze keywords with weights."""
+    def _analyze_keywords(self, text_lower: str,
+                          keyword_hits: dict[str, list[int]]) -> Tuple[list[RecognitionSignal], dict]:
+        """Layer 2: Analyze keywords with weights (hits from the keyword automaton)."""
         signals = []
         type_scores = {doc_type: 0.0 for doc_type in DocumentType}
         
@@ -1275,20 +1304,22 @@ class DocumentRecognitionEngine:
             
             # Check primary keywords (high weight)
             for keyword, weight in patterns["primary_keywords"]:
-                if keyword in text_lower:
+                positions = keyword_hits.get(keyword)
+                if positions:
                     found_primary = True
                     type_score += weight
                     signals.append(RecognitionSignal(
                         source="keyword",
                         indicator=f"primary:{keyword}",
                         weight=weight,
-                        evidence=self._get_keyword_context(text_lower, keyword),
+                        evidence=self._get_keyword_context(text_lower, keyword, positions[0]),
                         reasoning=f"Primary keyword '{keyword}' strongly indicates {doc_type.value}"
                     ))
             
             # Check supporting keywords (only if primary found or as weak signal)
             for keyword, weight in patterns["supporting_keywords"]:
-                if keyword in text_lower:
+                positions = keyword_hits.get(keyword)
+                if positions:
                     # Lower weight if no primary keyword found
                     actual_weight = weight if found_primary else weight * 0.3
                     type_score += actual_weight
@@ -1298,7 +1329,7 @@ class DocumentRecognitionEngine:
                             source="keyword",
                             indicator=f"supporting:{keyword}",
                             weight=actual_weight,
-                            evidence=self._get_keyword_context(text_lower, keyword),
+                            evidence=self._get_keyword_context(text_lower, keyword, positions[0]),
                             reasoning=f"Supporting keyword '{keyword}' reinforces {doc_type.value}"
                         ))
             
@@ -1306,17 +1337,15 @@ class DocumentRecognitionEngine:
         
         return signals, type_scores
     
-    def _get_keyword_context(self, text: str, keyword: str, window: int = 50) -> str:
-        """Get surrounding context for a keyword."""
-        pos = text.find(keyword)
-        if pos == -1:
-            return keyword
+    def _get_keyword_context(self, text: str, keyword: str, pos: int, window: int = 50) -> str:
+        """Get surrounding context for a keyword found at pos."""
         start = max(0, pos - window)
         end = min(len(text), pos + len(keyword) + window)
         context = text[start:end].replace('\n', ' ').strip()
         return f"...{context}..."
     
-    def _analyze_context(self, text_lower: str, type_scores: dict) -> list[RecognitionSignal]:
+    def _analyze_context(self, type_scores: dict,
+                         keyword_hits: dict[str, list[int]]) -> list[RecognitionSignal]:
         """Layer 3: Context analysis for disambiguation."""
         signals = []
         
@@ -1331,7 +1360,7 @@ class DocumentRecognitionEngine:
             context_reqs = patterns.get("context_requirements", [])
             
             # Check if context requirements are met
-            reqs_met = sum(1 for req in context_reqs if req in text_lower)
+            reqs_met = sum(1 for req in context_reqs if req in keyword_hits)
             if context_reqs:
                 context_ratio = reqs_met / len(context_reqs)
                 
@@ -1872,27 +1901,17 @@ class DocumentRecognitionEngine:
         
         return title, summary
     
-    def _extract_key_terms(self, text_lower: str) -> list[str]:
+    def _extract_key_terms(self, keyword_hits: dict[str, list[int]]) -> list[str]:
         """Extract key legal terms for law matching."""
         terms = []
         
-        legal_terms = [
-            "unlawful detainer", "eviction", "possession", "writ of restitution",
-            "default judgment", "summary judgment", "service of process",
-            "security deposit", "habitability", "reasonable notice",
-            "quiet enjoyment", "lease violation", "breach of lease",
-            "tenant rights", "landlord obligations", "constructive eviction",
-            "retaliation", "discrimination", "reasonable accommodation",
-            "lead paint", "mold", "bedbugs", "repairs",
-        ]
-        
-        for term in legal_terms:
-            if term in text_lower:
+        for term in self.LEGAL_KEY_TERMS:
+            if term in keyword_hits:
                 terms.append(term.title())
         
         # Check for MN statute references
         for statute_num, statute_name in MN_LEGAL_TERMS["statutes"]:
-            if statute_num.lower() in text_lower:
+            if statute_num.lower() in keyword_hits:
                 terms.append(f"MN Stat. {statute_num}")
         
         return terms[:15]  # Limit to top 15
@@ -0,0 +1,110 @@
+"""
+Keyword Automaton - Single-Pass Multi-Keyword Matching
+======================================================
+
+Aho-Corasick automaton that finds every occurrence of a fixed keyword set
+in one pass over the text, instead of one substring scan per keyword.
+
+Matching has plain substring semantics (the same hits as ``keyword in
+text``), including overlapping and nested keywords: "eviction" and
+"eviction action" both match "eviction action".
+
+Uses the pyahocorasick C extension when installed, otherwise a pure-Python
+automaton with the failure links folded into a full transition table.
+
+Usage:
+    automaton = KeywordAutomaton(["summons", "you are hereby summoned"])
+    hits = automaton.find_all(text.lower())   # {"summons": [12, 480], ...}
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+
+class KeywordAutomaton:
+    """Precompiled matcher for a fixed set of keywords."""
+
+    def __init__(self, keywords: Iterable[str], use_native: bool = True):
+        self.keywords = sorted({k for k in keywords if k})
+        self.native = use_native and HAS_AHOCORASICK
+        if self.native:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, (len(keyword) - 1, keyword))
+            self._automaton.make_automaton()
+        else:
+            self._build_tables()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _build_tables(self) -> None:
+        """Build the trie, failure links and the resulting transition table."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[tuple] = [()]
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            outputs[state] = (keyword,)
+
+        # Breadth-first: a state's failure target is always processed before it
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fallback = fail[state]
+                fail[child] = delta[fallback].get(ch, 0) if state else 0
+                queue.append(child)
+
+        # Output entries carry (len - 1) so start offsets need no lookup
+        self._delta = delta
+        self._outputs = [tuple((len(k) - 1, k) for k in out) for out in outputs]
+
+    def find_all(self, text: str) -> Dict[str, List[int]]:
+        """Map each keyword found in text to its start offsets, ascending."""
+        hits: Dict[str, List[int]] = {}
+        if not self.keywords:
+            return hits
+        if self.native:
+            for end, (offset, keyword) in self._automaton.iter(text):
+                positions = hits.get(keyword)
+                if positions is None:
+                    hits[keyword] = [end - offset]
+                else:
+                    positions.append(end - offset)
+            return hits
+
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for end, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for offset, keyword in outputs[state]:
+                    positions = hits.get(keyword)
+                    if positions is None:
+                        hits[keyword] = [end - offset]
+                    else:
+                        positions.append(end - offset)
+        return hits
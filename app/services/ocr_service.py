@@ -7,6 +7,9 @@ Extracts text from images and scanned documents using:
 3. Basic image-to-text (emergency fallback)
 
 Supports: PDF, JPG, PNG, TIFF, BMP, GIF, HEIC
+
+Successful results are kept in the shared extraction cache by file hash;
+PDF text goes through PDFExtractor and shares its cache entries.
 """
 
 import asyncio
@@ -18,8 +21,13 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
+from app.core.extraction_cache import content_hash, get_extraction_cache
+
 logger = logging.getLogger(__name__)
 
+# Bump when OCR output changes so cached results from older code are ignored
+OCR_CACHE_VERSION = "1"
+
 
 class OCRResult:
     """Result of OCR processing."""
@@ -135,23 +143,24 @@ class OCRService:
                 # For images, OCR is required
                 methods_to_try = ["azure", "tesseract"]
         
+        digest = await asyncio.to_thread(content_hash, file_bytes)
         last_error = None
         for method in methods_to_try:
             try:
                 if method == "azure" and self.azure_available:
-                    result = await self._extract_azure(file_bytes, filename)
+                    result = await self._cached(method, digest, self._extract_azure, file_bytes, filename)
                     if result.success:
                         result.processing_time_ms = int((time.time() - start_time) * 1000)
                         return result
                         
                 elif method == "tesseract" and self.tesseract_available:
-                    result = await self._extract_tesseract(file_bytes, filename)
+                    result = await self._cached(method, digest, self._extract_tesseract, file_bytes, filename)
                     if result.success:
                         result.processing_time_ms = int((time.time() - start_time) * 1000)
                         return result
                         
                 elif method == "pdf_text" and is_pdf:
-                    result = await self._extract_pdf_text(file_bytes)
+                    result = await self._extract_pdf_text(file_bytes, digest)
                     if result.success:
                         result.processing_time_ms = int((time.time() - start_time) * 1000)
                         return result
@@ -170,6 +179,18 @@ class OCRService:
             metadata={"error": last_error or "All OCR methods failed"},
         )
     
+    async def _cached(self, method: str, digest: str, extract, file_bytes: bytes, filename: str) -> OCRResult:
+        """Run an OCR method through the extraction cache; only successes are stored."""
+        cache = get_extraction_cache()
+        key = (digest, f"ocr_{method}", OCR_CACHE_VERSION)
+        if cache and (cached := await cache.aget(*key)):
+            metadata = {**cached["metadata"], "cached": True}
+            return OCRResult(cached["text"], cached["confidence"], cached["method"], cached["pages"], metadata=metadata)
+        result = await extract(file_bytes, filename)
+        if cache and result.success:
+            await cache.aput(*key, result.to_dict())
+        return result
+
     async def _extract_azure(self, file_bytes: bytes, filename: str) -> OCRResult:
         """Extract text using Azure Document Intelligence."""
         try:
@@ -276,26 +297,13 @@ class OCRService:
             logger.error(f"Tesseract OCR error: {e}")
             return OCRResult(text="", method="tesseract", metadata={"error": str(e)})
     
-    async def _extract_pdf_text(self, file_bytes: bytes) -> OCRResult:
+    async def _extract_pdf_text(self, file_bytes: bytes, digest: Optional[str] = None) -> OCRResult:
         """Extract text from text-based PDFs."""
+        from app.services.pdf_extractor import get_pdf_extractor
+
         try:
-            import PyPDF2
-        except ImportError:
-            try:
-                import pypdf as PyPDF2
-            except ImportError:
-                return OCRResult(text="", method="pdf_text", metadata={"error": "PyPDF2/pypdf not installed"})
-        
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-            text_parts = []
-            
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
-            
-            full_text = "\n\n".join(text_parts)
+            result = await get_pdf_extractor().extract_async(file_bytes, digest=digest)
+            full_text = result.text
             
             # Check if we got meaningful text (not just whitespace/garbage)
             meaningful_words = len([w for w in full_text.split() if len(w) > 2])
@@ -304,8 +312,9 @@ class OCRService:
                 text=full_text,
                 confidence=0.95 if meaningful_words > 20 else 0.5,
                 method="pdf_text",
-                pages=len(pdf_reader.pages),
-                metadata={"extraction_type": "native_pdf"},
+                pages=result.page_count,
+                metadata={"extraction_type": "native_pdf", "extractor": result.method_used,
+                          "cached": result.metadata.get("cached", False)},
             )
             
         except Exception as e:
@@ -2,21 +2,167 @@
 Semptify - PDF Text Extraction Service
 Robust PDF text extraction with multiple fallback methods.
 
-Methods (in order of preference):
-1. pdfplumber - Best for text-based PDFs with tables
-2. PyMuPDF (fitz) - Fast, handles most PDFs well
-3. PyPDF2 - Fallback for simple PDFs
-4. Azure Document Intelligence - For scanned/image PDFs (uses OCR)
+Extraction decides page by page:
+1. PyMuPDF (fitz) text layer - fast, used whenever a page has real text
+2. Tesseract OCR - only for image-only (scanned) pages
+3. PyPDF2 - for a page PyMuPDF cannot parse
+
+Documents with many pages are split into page ranges across a process pool
+(PDF_EXTRACT_WORKERS) and extract_pages() streams pages back in order, so
+recognition can start before the last page is done.
+
+Without PyMuPDF the whole file goes through pdfplumber, then PyPDF2.
+Azure Document Intelligence remains available for scanned PDFs (extract_with_ocr).
+
+Results are kept in the shared extraction cache (app.core.extraction_cache)
+under the file's SHA-256, so a document already extracted by any worker is
+not parsed or OCR'd again.
 """
 
+import asyncio
 import io
-from dataclasses import dataclass
-from pathlib import Path
-from typing import Optional, Union
 import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Optional, Union
+
+from app.core.extraction_cache import content_hash, get_extraction_cache
 
 logger = logging.getLogger(__name__)
 
+# Pages with less text than this are treated as image-only
+MIN_PAGE_TEXT_CHARS = 20
+# Smaller documents are extracted on one thread; the pool is not worth the IPC
+PARALLEL_MIN_PAGES = 8
+# Pages per pool task: small enough to stream, large enough to amortize opening the file
+PAGES_PER_TASK = 4
+# Bump when extraction output changes so cached results from older code are ignored
+EXTRACTOR_VERSION = "2"
+
+
+@dataclass
+class PageText:
+    """Text of one PDF page and how it was obtained."""
+    page_number: int  # 1-based
+    text: str
+    method: str  # pymupdf, ocr, pypdf2, none
+    has_images: bool = False
+    confidence: float = 0.9
+
+
+@lru_cache(maxsize=None)
+def _tesseract_available() -> bool:
+    try:
+        import pytesseract
+        from PIL import Image  # noqa: F401
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def _ocr_page(page, dpi: int) -> str:
+    """Render one page in grayscale and OCR it with Tesseract."""
+    import fitz
+    import pytesseract
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(image)
+
+
+def _pypdf2_page(source: Union[bytes, str], index: int) -> PageText:
+    """Fallback for a page PyMuPDF cannot parse."""
+    try:
+        import PyPDF2
+        stream = io.BytesIO(source) if isinstance(source, bytes) else source
+        text = PyPDF2.PdfReader(stream).pages[index].extract_text() or ""
+        return PageText(index + 1, text, "pypdf2" if text.strip() else "none",
+                        confidence=0.8 if text.strip() else 0.0)
+    except Exception as e:
+        logger.warning(f"PyPDF2 failed on page {index + 1}: {e}")
+        return PageText(index + 1, "", "none", confidence=0.0)
+
+
+def _extract_page(doc, index: int, source: Union[bytes, str], ocr: bool, ocr_dpi: int,
+                  force_ocr: bool) -> PageText:
+    try:
+        page = doc[index]
+        text = page.get_text("text")
+        has_images = bool(page.get_images())
+    except Exception as e:
+        logger.warning(f"PyMuPDF failed on page {index + 1}: {e}")
+        return _pypdf2_page(source, index)
+
+    if len(text.strip()) >= MIN_PAGE_TEXT_CHARS and not force_ocr:
+        return PageText(index + 1, text, "pymupdf", has_images)
+
+    if ocr and (has_images or force_ocr) and _tesseract_available():
+        try:
+            ocr_text = _ocr_page(page, ocr_dpi)
+            if ocr_text.strip():
+                return PageText(index + 1, ocr_text, "ocr", True, 0.8)
+        except Exception as e:
+            logger.warning(f"Page {index + 1} OCR failed: {e}")
+
+    return PageText(index + 1, text, "pymupdf" if text.strip() else "none", has_images,
+                    0.6 if text.strip() else 0.0)
+
+
+def _extract_page_range(source: Union[bytes, str], start: int, stop: int, ocr: bool = True,
+                        ocr_dpi: int = 200, force_ocr: bool = False) -> list[PageText]:
+    """Worker entry point: extract pages [start, stop) of a PDF given as bytes or a file path."""
+    import fitz
+
+    doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    try:
+        return [_extract_page(doc, index, source, ocr, ocr_dpi, force_ocr) for index in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def _page_ranges(page_count: int) -> list[tuple[int, int]]:
+    return [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+
+
+def _spill_to_file(content: bytes) -> str:
+    """Write the PDF to a temp file so pool tasks open it by path instead of each receiving a copy."""
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="semptify_extract_")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(content)
+    return path
+
+
+_page_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_page_executor() -> Optional[ProcessPoolExecutor]:
+    """Shared page-extraction process pool (None when PDF_EXTRACT_WORKERS is 0)."""
+    global _page_executor
+    if _page_executor is None:
+        from app.core.config import get_settings
+        workers = get_settings().pdf_extract_workers
+        if workers <= 0:
+            return None
+        # spawn: the parent runs an event loop and threads, which fork does not copy safely
+        _page_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _page_executor
+
+
+def shutdown_page_executor(wait: bool = True) -> None:
+    """Stop the page-extraction worker processes (called on application shutdown)."""
+    global _page_executor
+    if _page_executor is not None:
+        _page_executor.shutdown(wait=wait, cancel_futures=True)
+        _page_executor = None
+
 
 @dataclass
 class ExtractionResult:
@@ -36,7 +182,8 @@ class ExtractionResult:
 class PDFExtractor:
     """
     Multi-method PDF text extractor.
-    Tries multiple extraction methods to get the best results.
+    Picks the method per page (text layer, OCR, PyPDF2); whole-file
+    parsers are the fallback when PyMuPDF is unavailable.
     """
 
     def __init__(self):
@@ -72,14 +219,19 @@ class PDFExtractor:
     def extract(
         self,
         content: Union[bytes, Path, str],
-        prefer_ocr: bool = False
+        prefer_ocr: bool = False,
+        digest: Optional[str] = None,
     ) -> ExtractionResult:
         """
         Extract text from a PDF file.
-        
+
+        Blocks until every page is done; async callers should use
+        extract_async() or extract_pages().
+
         Args:
             content: PDF bytes, file path, or path string
             prefer_ocr: If True, use OCR even for text PDFs
+            digest: SHA-256 of content when the caller already has it
             
         Returns:
             ExtractionResult with extracted text
@@ -88,31 +240,43 @@ class PDFExtractor:
         if isinstance(content, (str, Path)):
             content = Path(content).read_bytes()
 
-        # Try methods in order of preference
+        cache = get_extraction_cache()
+        key = self._cache_key(digest or content_hash(content), prefer_ocr) if cache else None
+        if key and (cached := cache.get(*key)):
+            return self._result_from_cache(cached)[0]
+
+        result, pages = self._extract_uncached(content, prefer_ocr)
+        if key:
+            cache.put(*key, self._cache_value(result, pages))
+        return result
+
+    def _extract_uncached(self, content: bytes, prefer_ocr: bool) -> tuple[ExtractionResult, list[PageText]]:
+        """Extract without the cache; pages is empty for the whole-file parsers."""
+        if self.has_pymupdf:
+            page_count = self._get_page_count(content)
+            if page_count:
+                pages = self._extract_pages_sync(content, page_count, prefer_ocr)
+                return self._pages_to_result(pages), pages
+
+        # Without PyMuPDF (or a file it cannot open) fall back to whole-file parsers
         result = None
         
         # Method 1: pdfplumber (best for tables and structured docs)
         if self.has_pdfplumber and not result:
             result = self._extract_pdfplumber(content)
             if result and len(result.text.strip()) > 50:
-                return result
-
-        # Method 2: PyMuPDF (fast and reliable)
-        if self.has_pymupdf and not result:
-            result = self._extract_pymupdf(content)
-            if result and len(result.text.strip()) > 50:
-                return result
+                return result, []
 
-        # Method 3: PyPDF2 (fallback)
+        # Method 2: PyPDF2 (fallback)
         if self.has_pypdf2:
             result = self._extract_pypdf2(content)
             if result and len(result.text.strip()) > 50:
-                return result
+                return result, []
 
         # If we got some text but it's short, still return it
         if result and result.text.strip():
             result.confidence = 0.5  # Low confidence for short extractions
-            return result
+            return result, []
 
         # No text extracted - likely a scanned PDF
         return ExtractionResult(
@@ -122,6 +286,174 @@ class PDFExtractor:
             has_images=True,
             confidence=0.0,
             metadata={"needs_ocr": True}
+        ), []
+
+    async def extract_async(
+        self,
+        content: Union[bytes, Path, str],
+        prefer_ocr: bool = False,
+        digest: Optional[str] = None,
+    ) -> ExtractionResult:
+        """Extract text without blocking the event loop (same result as extract())."""
+        if isinstance(content, (str, Path)):
+            content = await asyncio.to_thread(Path(content).read_bytes)
+        cache = get_extraction_cache()
+        key = self._cache_key(digest or await asyncio.to_thread(content_hash, content), prefer_ocr) if cache else None
+        if key and (cached := await cache.aget(*key)):
+            return self._result_from_cache(cached)[0]
+
+        page_count = await asyncio.to_thread(self._get_page_count, content) if self.has_pymupdf else 0
+        if page_count:
+            pages = [page async for page in self._stream_pages(content, page_count, prefer_ocr)]
+            result = self._pages_to_result(pages)
+        else:
+            result, pages = await asyncio.to_thread(self._extract_uncached, content, prefer_ocr)
+        if key:
+            await cache.aput(*key, self._cache_value(result, pages))
+        return result
+
+    async def extract_pages(
+        self,
+        content: Union[bytes, Path, str],
+        prefer_ocr: bool = False,
+        digest: Optional[str] = None,
+    ) -> AsyncIterator[PageText]:
+        """
+        Yield pages in order as they finish.
+
+        Later pages keep extracting in the pool while earlier ones are
+        consumed. Without PyMuPDF the whole-file result arrives as one page.
+        A cached document yields its stored pages immediately.
+        """
+        if isinstance(content, (str, Path)):
+            content = await asyncio.to_thread(Path(content).read_bytes)
+        cache = get_extraction_cache()
+        key = self._cache_key(digest or await asyncio.to_thread(content_hash, content), prefer_ocr) if cache else None
+        cached = await cache.aget(*key) if key else None
+        if cached:
+            result, pages = self._result_from_cache(cached)
+            for page in pages or [PageText(1, result.text, result.method_used, result.has_images, result.confidence)]:
+                yield page
+            return
+
+        page_count = await asyncio.to_thread(self._get_page_count, content) if self.has_pymupdf else 0
+        if not page_count:
+            result, _ = await asyncio.to_thread(self._extract_uncached, content, prefer_ocr)
+            if key:
+                await cache.aput(*key, self._cache_value(result, []))
+            yield PageText(1, result.text, result.method_used, result.has_images, result.confidence)
+            return
+
+        pages = []
+        async for page in self._stream_pages(content, page_count, prefer_ocr):
+            pages.append(page)
+            yield page
+        # Only a document consumed to the end is complete enough to cache
+        if key:
+            await cache.aput(*key, self._cache_value(self._pages_to_result(pages), pages))
+
+    def _cache_key(self, digest: str, prefer_ocr: bool) -> tuple[str, str, str]:
+        """(digest, extractor, version) under which this extractor's result is cached."""
+        from app.core.config import get_settings
+        # Output depends on which engines are installed, so they are part of the version
+        engines = "pymupdf" if self.has_pymupdf else "pdfplumber" if self.has_pdfplumber else "pypdf2"
+        ocr = f"tesseract@{get_settings().pdf_ocr_dpi}" if _tesseract_available() else "no-ocr"
+        return digest, "pdf_ocr" if prefer_ocr else "pdf", f"{EXTRACTOR_VERSION}:{engines}:{ocr}"
+
+    @staticmethod
+    def _cache_value(result: ExtractionResult, pages: list[PageText]) -> dict:
+        return {"result": asdict(result), "pages": [asdict(page) for page in pages]}
+
+    @staticmethod
+    def _result_from_cache(value: dict) -> tuple[ExtractionResult, list[PageText]]:
+        result = ExtractionResult(**value["result"])
+        result.metadata["cached"] = True
+        return result, [PageText(**page) for page in value["pages"]]
+
+    def _extract_pages_sync(self, content: bytes, page_count: int, force_ocr: bool) -> list[PageText]:
+        from app.core.config import get_settings
+        ocr_dpi = get_settings().pdf_ocr_dpi
+        executor = get_page_executor() if page_count >= PARALLEL_MIN_PAGES else None
+        if executor is None:
+            return _extract_page_range(content, 0, page_count, True, ocr_dpi, force_ocr)
+
+        path = _spill_to_file(content)
+        try:
+            futures = [
+                executor.submit(_extract_page_range, path, start, stop, True, ocr_dpi, force_ocr)
+                for start, stop in _page_ranges(page_count)
+            ]
+            return [page for future in futures for page in future.result()]
+        except BrokenProcessPool:
+            logger.warning("PDF extraction worker died; extracting in-process")
+            shutdown_page_executor(wait=False)
+            return _extract_page_range(content, 0, page_count, True, ocr_dpi, force_ocr)
+        finally:
+            os.unlink(path)
+
+    async def _stream_pages(self, content: bytes, page_count: int, force_ocr: bool) -> AsyncIterator[PageText]:
+        from app.core.config import get_settings
+        ocr_dpi = get_settings().pdf_ocr_dpi
+        ranges = _page_ranges(page_count)
+        executor = get_page_executor() if page_count >= PARALLEL_MIN_PAGES else None
+        if executor is None:
+            for start, stop in ranges:
+                for page in await asyncio.to_thread(_extract_page_range, content, start, stop, True, ocr_dpi, force_ocr):
+                    yield page
+            return
+
+        loop = asyncio.get_running_loop()
+        path = await asyncio.to_thread(_spill_to_file, content)
+        futures = [
+            loop.run_in_executor(executor, _extract_page_range, path, start, stop, True, ocr_dpi, force_ocr)
+            for start, stop in ranges
+        ]
+        try:
+            for (start, stop), future in zip(ranges, futures):
+                try:
+                    pages = await future
+                except BrokenProcessPool:
+                    logger.warning("PDF extraction worker died; extracting remaining pages in-process")
+                    shutdown_page_executor(wait=False)
+                    pages = await asyncio.to_thread(_extract_page_range, content, start, stop, True, ocr_dpi, force_ocr)
+                for page in pages:
+                    yield page
+        finally:
+            for future in futures:
+                future.cancel()
+            # Tasks still running keep their handle; removing the path is safe on POSIX
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _pages_to_result(self, pages: list[PageText]) -> ExtractionResult:
+        """Combine per-page results into one ExtractionResult."""
+        text_pages = [page for page in pages if page.text.strip()]
+        needs_ocr = [page.page_number for page in pages if not page.text.strip() and page.has_images]
+        methods = sorted({page.method for page in text_pages})
+        full_text = "\n\n".join(page.text for page in text_pages)
+
+        if text_pages:
+            confidence = sum(page.confidence for page in text_pages) / len(text_pages)
+            # Scanned pages left without text lower confidence in proportion
+            confidence *= len(text_pages) / (len(text_pages) + len(needs_ocr))
+            if len(full_text.strip()) <= 50:
+                confidence = min(confidence, 0.5)
+        else:
+            confidence = 0.0
+
+        metadata = {"ocr_pages": [page.page_number for page in pages if page.method == "ocr"]}
+        if needs_ocr:
+            metadata["needs_ocr"] = True
+            metadata["needs_ocr_pages"] = needs_ocr
+        return ExtractionResult(
+            text=full_text,
+            page_count=len(pages),
+            method_used="+".join(methods) if methods else "none",
+            has_images=any(page.has_images for page in pages),
+            confidence=round(confidence, 3),
+            metadata=metadata,
         )
 
     def _extract_pdfplumber(self, content: bytes) -> Optional[ExtractionResult]:
@@ -167,42 +499,6 @@ class PDFExtractor:
             logger.warning(f"pdfplumber extraction failed: {e}")
             return None
 
-    def _extract_pymupdf(self, content: bytes) -> Optional[ExtractionResult]:
-        """Extract text using PyMuPDF (fitz)."""
-        try:
-            import fitz  # PyMuPDF
-            
-            texts = []
-            has_images = False
-            
-            doc = fitz.open(stream=content, filetype="pdf")
-            page_count = len(doc)
-            
-            for page in doc:
-                # Extract text with better formatting
-                text = page.get_text("text")
-                texts.append(text)
-                
-                # Check for images
-                images = page.get_images()
-                if images:
-                    has_images = True
-
-            doc.close()
-            full_text = "\n\n".join(texts)
-            
-            return ExtractionResult(
-                text=full_text,
-                page_count=page_count,
-                method_used="pymupdf",
-                has_images=has_images,
-                confidence=0.9 if len(full_text) > 100 else 0.6
-            )
-            
-        except Exception as e:
-            logger.warning(f"PyMuPDF extraction failed: {e}")
-            return None
-
     def _extract_pypdf2(self, content: bytes) -> Optional[ExtractionResult]:
         """Extract text using PyPDF2."""
         try:
@@ -261,7 +557,8 @@ class PDFExtractor:
     ) -> ExtractionResult:
         """
         Extract text from a scanned PDF using OCR.
-        Uses Azure Document Intelligence if configured, otherwise attempts local OCR.
+        Pages are OCR'd locally (Tesseract) first; Azure Document Intelligence
+        is used when that leaves the result incomplete and it is configured.
         
         Args:
             content: PDF file bytes
@@ -271,7 +568,7 @@ class PDFExtractor:
         Returns:
             ExtractionResult with OCR-extracted text
         """
-        # First try normal extraction
+        # Normal extraction already OCRs image-only pages when Tesseract is installed
         result = self.extract(content)
         
         # If we got good text, return it
@@ -280,15 +577,16 @@ class PDFExtractor:
         
         # Need OCR - try Azure if configured
         if azure_endpoint and azure_key:
+            cache = get_extraction_cache()
+            key = (content_hash(content), "pdf_azure", "1")
+            if cache and (cached := cache.get(*key)):
+                return self._result_from_cache(cached)[0]
             ocr_result = self._azure_ocr(content, azure_endpoint, azure_key)
             if ocr_result:
+                if cache:
+                    cache.put(*key, self._cache_value(ocr_result, []))
                 return ocr_result
         
-        # Try local image extraction + OCR
-        local_result = self._local_ocr(content)
-        if local_result:
-            return local_result
-        
         # Return original result (even if empty)
         result.metadata["ocr_attempted"] = True
         result.metadata["ocr_failed"] = True
@@ -389,66 +687,6 @@ class PDFExtractor:
             logger.warning(f"Azure OCR failed: {e}")
             return None
 
-    def _local_ocr(self, content: bytes) -> Optional[ExtractionResult]:
-        """
-        Attempt local OCR using pdf2image + pytesseract.
-        Requires Tesseract OCR to be installed on the system.
-        """
-        try:
-            # Convert PDF pages to images
-            if not self.has_pymupdf:
-                return None
-                
-            import fitz
-            
-            doc = fitz.open(stream=content, filetype="pdf")
-            texts = []
-            page_count = len(doc)
-            
-            # Check if pytesseract is available
-            try:
-                import pytesseract
-                from PIL import Image
-                has_tesseract = True
-            except ImportError:
-                has_tesseract = False
-            
-            for page_num, page in enumerate(doc):
-                # Try to get text first
-                text = page.get_text("text").strip()
-                
-                if text:
-                    texts.append(text)
-                elif has_tesseract:
-                    # Render page to image and OCR it
-                    try:
-                        pix = page.get_pixmap(dpi=200)
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        ocr_text = pytesseract.image_to_string(img)
-                        texts.append(ocr_text)
-                    except Exception as e:
-                        logger.warning(f"Page {page_num} OCR failed: {e}")
-            
-            doc.close()
-            full_text = "\n\n".join(texts)
-            
-            if full_text.strip():
-                return ExtractionResult(
-                    text=full_text,
-                    page_count=page_count,
-                    method_used="local_ocr" if has_tesseract else "pymupdf",
-                    has_images=True,
-                    confidence=0.8 if has_tesseract else 0.6,
-                    metadata={"ocr_provider": "tesseract" if has_tesseract else "none"}
-                )
-            
-            return None
-            
-        except Exception as e:
-            logger.warning(f"Local OCR failed: {e}")
-            return None
-
-
 # Singleton instance
 _extractor: Optional[PDFExtractor] = None
 
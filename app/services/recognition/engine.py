@@ -20,7 +20,7 @@ import asyncio
 import time
 import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 
 from .models import (
     RecognitionResult, DocumentContext, DocumentType, DocumentCategory,
@@ -35,6 +35,10 @@ from .confidence_scorer import ConfidenceScorer
 from .text_preprocessor import get_preprocessor
 from .legal_dictionary import get_legal_dictionary
 from .tone_analyzer import get_tone_analyzer
+from .worker_pool import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_TIMEOUT_SECONDS, RecognitionWorkerPool,
+    default_worker_count, get_worker_pool,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +60,10 @@ class DocumentRecognitionEngine:
     3. Legal Analysis → Apply MN tenant law rules
     4. Relationship Mapping → Connect entities logically
     5. Confidence Scoring → Quantify certainty
+    
+    Every pass is CPU-bound, so analyze() runs in a worker process (see
+    worker_pool) and batches fan out across the pool. Set
+    config["offload"] = False to analyze on the calling event loop.
     """
     
     VERSION = "2.0.0"  # Upgraded with preprocessing and legal dictionary
@@ -86,14 +94,44 @@ class DocumentRecognitionEngine:
         self.enable_preprocessing = self.config.get("enable_preprocessing", True)
         self.min_confidence_threshold = self.config.get("min_confidence_threshold", 0.0)
         
+        # Offloading (0 worker processes = run in a thread instead)
+        self.offload = self.config.get("offload", True)
+        self.worker_processes = self.config.get("worker_processes", default_worker_count())
+        self.batch_chunk_size = self.config.get("batch_chunk_size", DEFAULT_CHUNK_SIZE)
+        self.document_timeout = self.config.get("document_timeout", DEFAULT_TIMEOUT_SECONDS)
+        self._pool: Optional[RecognitionWorkerPool] = None
+        self._owns_pool = False
+        
         logger.info(f"DocumentRecognitionEngine v{self.VERSION} initialized")
     
+    _POOL_CONFIG_KEYS = {"offload", "worker_processes", "batch_chunk_size", "document_timeout"}
+    
+    def _get_pool(self) -> RecognitionWorkerPool:
+        """Shared pool for default engines; a private one when analysis config differs."""
+        if self._pool is None:
+            analysis_config = {k: v for k, v in self.config.items() if k not in self._POOL_CONFIG_KEYS}
+            if analysis_config or self.worker_processes != default_worker_count():
+                self._pool = RecognitionWorkerPool(
+                    self.worker_processes, analysis_config, self.batch_chunk_size, self.document_timeout
+                )
+                self._owns_pool = True
+            else:
+                self._pool = get_worker_pool()
+        return self._pool
+    
+    def close(self) -> None:
+        """Stop a private worker pool (the shared one is stopped at app shutdown)."""
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown()
+        self._pool = None
+        self._owns_pool = False
+    
     async def analyze(self, text: str, 
                       filename: Optional[str] = None,
                       file_type: Optional[str] = None,
                       metadata: Optional[Dict[str, Any]] = None) -> RecognitionResult:
         """
-        Perform comprehensive document analysis.
+        Perform comprehensive document analysis off the event loop.
         
         Args:
             text: Document text to analyze
@@ -104,6 +142,21 @@ class DocumentRecognitionEngine:
         Returns:
             RecognitionResult with all analysis data
         """
+        if not self.offload:
+            return await self._analyze_inline(text, filename, file_type, metadata)
+        
+        document = {"text": text, "filename": filename, "file_type": file_type, "metadata": metadata}
+        if self.worker_processes:
+            return await self._get_pool().analyze(document, self.document_timeout)
+        return await asyncio.to_thread(
+            asyncio.run, self._analyze_inline(text, filename, file_type, metadata)
+        )
+    
+    async def _analyze_inline(self, text: str,
+                              filename: Optional[str] = None,
+                              file_type: Optional[str] = None,
+                              metadata: Optional[Dict[str, Any]] = None) -> RecognitionResult:
+        """Run every analysis pass on the current event loop."""
         start_time = time.time()
         
         result = RecognitionResult(
@@ -283,22 +336,16 @@ class DocumentRecognitionEngine:
         
         Args:
             documents: List of dicts with 'text' and optional 'filename', 'file_type'
-            parallel: Whether to process in parallel
+            parallel: Whether to process in parallel (across worker processes)
         
         Returns:
-            List of RecognitionResult
+            List of RecognitionResult, in input order
         """
         if parallel:
-            tasks = [
-                self.analyze(
-                    doc.get("text", ""),
-                    filename=doc.get("filename"),
-                    file_type=doc.get("file_type"),
-                    metadata=doc.get("metadata")
-                )
-                for doc in documents
-            ]
-            return await asyncio.gather(*tasks)
+            results: List[Optional[RecognitionResult]] = [None] * len(documents)
+            async for position, result in self.analyze_stream(documents):
+                results[position] = result
+            return results
         else:
             results = []
             for doc in documents:
@@ -311,6 +358,30 @@ class DocumentRecognitionEngine:
                 results.append(result)
             return results
     
+    async def analyze_stream(self, documents: List[Dict[str, Any]]
+                             ) -> AsyncIterator[Tuple[int, RecognitionResult]]:
+        """
+        Analyze documents, yielding (position, result) as each one finishes.
+        
+        With worker processes, documents are submitted batch_chunk_size at a
+        time and each is limited to document_timeout seconds.
+        """
+        if self.offload and self.worker_processes:
+            async for item in self._get_pool().analyze_stream(
+                documents, self.batch_chunk_size, self.document_timeout
+            ):
+                yield item
+            return
+        
+        for position, doc in enumerate(documents):
+            result = await self.analyze(
+                doc.get("text", ""),
+                filename=doc.get("filename"),
+                file_type=doc.get("file_type"),
+                metadata=doc.get("metadata")
+            )
+            yield position, result
+    
     async def _analyze_context(self, text: str, 
                                 filename: Optional[str],
                                 file_type: Optional[str]) -> Tuple[DocumentContext, ReasoningChain]:
@@ -0,0 +1,270 @@
+"""
+Recognition Worker Pool
+=======================
+
+Runs DocumentRecognitionEngine analysis in worker processes.
+
+Every pass of the engine (preprocessing, dictionary matching, regex
+extraction, multi-pass reasoning) is pure-CPU Python, so running it on the
+event loop blocks every other request and asyncio.gather() gives no
+parallelism. Each worker process builds one engine when it starts - loading
+the legal dictionary and compiling its patterns once - and drives the
+engine's coroutine API on a private event loop.
+
+Usage:
+    pool = get_worker_pool()
+    result = await pool.analyze({"text": text, "filename": "notice.pdf"})
+
+    async for position, result in pool.analyze_stream(documents):
+        ...  # results arrive in completion order
+
+Configuration:
+    RECOGNITION_WORKERS   worker processes (default: CPU count - 1; 0 = no pool)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .models import RecognitionResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 32
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+_WARMUP_TEXT = (
+    "NOTICE TO QUIT. Tenant must vacate the premises at 123 Main St within 14 days. "
+    "Rent owed: $1,200.00. Minn. Stat. 504B.135. Landlord: Example Properties LLC."
+)
+
+# Per-process state (set by _init_worker in each worker)
+_worker_engine = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def default_worker_count() -> int:
+    """Worker processes to use when none are configured."""
+    configured = os.getenv("RECOGNITION_WORKERS")
+    if configured is not None and configured.strip():
+        return max(0, int(configured))
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """Build and warm the engine once per worker process."""
+    global _worker_engine, _worker_loop
+    from .engine import DocumentRecognitionEngine
+
+    logging.getLogger("app.services.recognition").setLevel(logging.WARNING)
+    _worker_engine = DocumentRecognitionEngine({**config, "worker_processes": 0, "offload": False})
+    _worker_loop = asyncio.new_event_loop()
+    _analyze_document({"text": _WARMUP_TEXT})
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _analyze_document(document: Dict[str, Any]) -> RecognitionResult:
+    """Worker entry point: analyze one document dict."""
+    return _worker_loop.run_until_complete(_worker_engine.analyze(
+        document.get("text", ""),
+        filename=document.get("filename"),
+        file_type=document.get("file_type"),
+        metadata=document.get("metadata"),
+    ))
+
+
+def failed_result(text: str, message: str, engine_version: str = "") -> RecognitionResult:
+    """Result returned for a document whose analysis did not complete."""
+    result = RecognitionResult(engine_version=engine_version, original_text=text)
+    result.warnings.append(message)
+    result.confidence.overall_score = 10.0
+    return result
+
+
+class RecognitionWorkerPool:
+    """
+    ProcessPoolExecutor of warmed recognition engines.
+
+    Workers are started with the spawn method (the parent runs an event loop
+    and threads, which fork does not copy safely). A running process-pool
+    task cannot be cancelled. When a document exceeds its timeout, it gets a
+    failed result and the pool is replaced, with the old pool's processes
+    terminated. Documents that were running on the replaced or crashed pool
+    for other callers are retried once on the new pool. Waiting for a free
+    worker is bounded by queue_timeout, which defaults to the analysis
+    timeout.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, config: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 queue_timeout: Optional[float] = None):
+        self.max_workers = max_workers or default_worker_count() or 1
+        self.config = dict(config or {})
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.queue_timeout = timeout if queue_timeout is None else queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started: Optional[asyncio.Future] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.stats = {"completed": 0, "timed_out": 0, "failed": 0, "restarts": 0}
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.config,),
+        )
+
+    async def start(self) -> None:
+        """Spawn and warm every worker (idempotent; concurrent callers share one start)."""
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._start())
+        try:
+            await asyncio.shield(self._started)
+        except Exception:
+            self._started = None
+            raise
+
+    async def _start(self) -> None:
+        started = time.perf_counter()
+        self._executor = self._create_executor()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        loop = asyncio.get_running_loop()
+        # One ping per worker forces each process to spawn and run the initializer
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.max_workers)))
+        logger.info("Recognition pool ready: %d workers in %.1fs",
+                    self.max_workers, time.perf_counter() - started)
+
+    def _replace_executor(self, executor: ProcessPoolExecutor, reason: str, terminate: bool = False) -> None:
+        """Swap in a new pool, unless another caller already replaced this one."""
+        if executor is not self._executor:
+            return
+        logger.warning("Restarting recognition pool: %s", reason)
+        self.stats["restarts"] += 1
+        self._executor = self._create_executor()
+        if terminate:
+            # Fails whatever the old workers were running, which frees their slots
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def analyze(self, document: Dict[str, Any], timeout: Optional[float] = None) -> RecognitionResult:
+        """Analyze a single document dict ('text', 'filename', 'file_type', 'metadata')."""
+        await self.start()
+        timeout = self.timeout if timeout is None else timeout
+        text = document.get("text", "")
+        loop = asyncio.get_running_loop()
+        retried = False
+        while True:
+            # Wait for an idle worker first so the timeout covers analysis, not queueing.
+            # The slot is held until the worker is really free.
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                return failed_result(text, f"No analysis worker free after {self.queue_timeout:.0f}s")
+            executor = self._executor
+            try:
+                future = loop.run_in_executor(executor, _analyze_document, document)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), timeout)
+                self.stats["completed"] += 1
+                return result
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                self._replace_executor(executor, f"analysis exceeded {timeout:.0f}s", terminate=True)
+                return failed_result(text, f"Analysis timed out after {timeout:.0f}s")
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled
+                # Queued on a pool that was shut down
+            except BrokenProcessPool:
+                pass
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Worker analysis error: {e}")
+                return failed_result(text, f"Analysis error: {str(e)}")
+
+            if executor is self._executor or retried:
+                self._replace_executor(executor, "worker died")
+                self.stats["failed"] += 1
+                return failed_result(text, "Analysis worker crashed")
+            # Another document crashed or timed out on this pool; run again on the new one
+            retried = True
+
+    async def analyze_stream(self, documents: List[Dict[str, Any]], chunk_size: Optional[int] = None,
+                             timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, RecognitionResult]]:
+        """
+        Yield (position, result) as documents finish.
+
+        At most chunk_size documents are in flight at once, so a large batch
+        neither schedules every document up front nor starves
+        single-document requests waiting for a worker.
+        """
+        await self.start()
+        chunk_size = chunk_size or self.chunk_size
+        positions = iter(range(len(documents)))
+        pending: Dict[asyncio.Task, int] = {}
+
+        def submit_next() -> bool:
+            position = next(positions, None)
+            if position is None:
+                return False
+            task = asyncio.ensure_future(self.analyze(documents[position], timeout))
+            pending[task] = position
+            return True
+
+        try:
+            for _ in range(chunk_size):
+                if not submit_next():
+                    break
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    position = pending.pop(task)
+                    submit_next()
+                    yield position, task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        self._started = None
+
+
+_worker_pool: Optional[RecognitionWorkerPool] = None
+
+
+def get_worker_pool(config: Optional[Dict[str, Any]] = None) -> RecognitionWorkerPool:
+    """Get the shared recognition worker pool (processes start on first use)."""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = RecognitionWorkerPool(config=config)
+    return _worker_pool
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the shared pool's worker processes (called on application shutdown)."""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
@@ -95,6 +95,17 @@ class StorageProvider(ABC):
     async def create_folder(self, folder_path: str) -> bool:
         """Create a folder (and parent folders if needed)."""
         pass
+
+    async def upload_files(
+        self,
+        files: list[tuple[str, bytes, Optional[str]]],
+        destination_path: str,
+    ) -> list[StorageFile]:
+        """Upload several (filename, content, mime_type) files into one folder."""
+        return [
+            await self.upload_file(content, destination_path, filename, mime_type)
+            for filename, content, mime_type in files
+        ]
     
     # =========================================================================
     # Semptify Token Operations
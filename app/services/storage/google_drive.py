@@ -1,115 +1,467 @@
 """
 Semptify 5.0 - Google Drive Storage Provider
 Async Google Drive client using httpx and Google OAuth2.
+
+All providers in a worker share one pooled httpx client (HTTP/2 when the
+h2 package is installed), and folder/file IDs are cached per user in the
+app cache so later requests skip the path lookups. Metadata reads for many
+files or folders go out as Drive batch requests, and large files use
+resumable uploads.
 """
 
 from typing import Optional
 from datetime import datetime, timezone
+from urllib.parse import quote
+import asyncio
+import hashlib
 import json
+import re
 import secrets
 
 import httpx
 
+from app.core.cache import cache
 from app.services.storage.base import StorageProvider, StorageFile
 
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+ID_CACHE_TTL = 24 * 3600  # Drive IDs only change when the user moves or deletes things
+MAX_BATCH_SIZE = 100  # Drive's limit on calls per batch request
+PAGE_SIZE = 1000
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024  # must be a multiple of 256 KiB
+RESUMABLE_MAX_RETRIES = 3
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_drive_client() -> httpx.AsyncClient:
+    """Return this worker's shared Drive client, creating it on first use."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Pooled connections are bound to the loop that opened them
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=HAS_HTTP2,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_drive_client() -> None:
+    """Close the shared Drive client (app shutdown)."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def _q(value: str) -> str:
+    """Quote a value for a Drive search query."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _normalize(path: str) -> str:
+    return path.strip("/")
+
+
+def _parse_batch_response(response: httpx.Response) -> dict[int, tuple[int, Optional[dict]]]:
+    """Map batch part index -> (status, JSON body) from a multipart/mixed reply."""
+    match = re.search(r'boundary="?([^";]+)"?', response.headers.get("content-type", ""))
+    if not match:
+        return {}
+    results = {}
+    for part in response.text.replace("\r\n", "\n").split(f"--{match.group(1)}"):
+        outer, _, inner = part.strip().partition("\n\n")
+        content_id = re.search(r"content-id:\s*<?response-item(\d+)>?", outer, re.IGNORECASE)
+        if not content_id:
+            continue
+        status_line, _, rest = inner.partition("\n")
+        _, _, body = rest.partition("\n\n")
+        status = int(status_line.split()[1])
+        try:
+            payload = json.loads(body) if body.strip() else None
+        except ValueError:
+            payload = None
+        results[int(content_id.group(1))] = (status, payload)
+    return results
+
 
 class GoogleDriveProvider(StorageProvider):
     """
     Google Drive storage provider.
     Uses OAuth2 access token for API calls.
     """
-    
+
     BASE_URL = "https://www.googleapis.com/drive/v3"
     UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3"
-    
-    def __init__(self, access_token: str, refresh_token: Optional[str] = None):
+    BATCH_URL = "https://www.googleapis.com/batch/drive/v3"
+
+    def __init__(
+        self,
+        access_token: str,
+        refresh_token: Optional[str] = None,
+        user_id: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
         self.access_token = access_token
         self.refresh_token = refresh_token
+        self._client = client
+        # Without a user ID the cache is scoped to the access token's lifetime
+        self._cache_owner = user_id or hashlib.sha256(access_token.encode()).hexdigest()[:16]
         self._folder_cache: dict[str, str] = {}  # path -> folder_id
-    
+        self._listed_folders: set[str] = set()  # folder IDs whose subfolders are all cached
+
     @property
     def provider_name(self) -> str:
         return "google_drive"
-    
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_drive_client()
+
     def _headers(self) -> dict:
         return {
             "Authorization": f"Bearer {self.access_token}",
             "Accept": "application/json",
         }
-    
+
+    # =========================================================================
+    # Per-user ID cache
+    # =========================================================================
+
+    @property
+    def _cache_tag(self) -> str:
+        return f"gdrive:{self._cache_owner}"
+
+    def _cache_key(self, kind: str, path: str) -> str:
+        return f"gdrive:{self._cache_owner}:{kind}:{_normalize(path)}"
+
+    async def _cached_id(self, kind: str, path: str) -> Optional[str]:
+        if kind == "folder" and _normalize(path) in self._folder_cache:
+            return self._folder_cache[_normalize(path)]
+        return await cache.get(self._cache_key(kind, path))
+
+    async def _remember_id(self, kind: str, path: str, item_id: str) -> None:
+        if kind == "folder":
+            self._folder_cache[_normalize(path)] = item_id
+        await cache.set(self._cache_key(kind, path), item_id, ttl=ID_CACHE_TTL, tags=[self._cache_tag])
+
+    async def _forget_id(self, kind: str, path: str) -> None:
+        if kind == "folder":
+            self._folder_cache.pop(_normalize(path), None)
+        await cache.delete(self._cache_key(kind, path))
+
+    async def invalidate_cache(self) -> None:
+        """Drop every cached folder and file ID for this user."""
+        self._folder_cache.clear()
+        self._listed_folders.clear()
+        await cache.invalidate_tag(self._cache_tag)
+
+    # =========================================================================
+    # Drive API helpers
+    # =========================================================================
+
+    async def _batch_get(self, requests: list[tuple[str, dict]]) -> list[Optional[dict]]:
+        """
+        Run GET calls (API path, query params) as Drive batch requests.
+        Returns the JSON body of each call in order, None where it failed.
+        """
+        if len(requests) == 1:
+            path, params = requests[0]
+            response = await self.client.get(
+                f"{self.BASE_URL}{path}", headers=self._headers(), params=params, timeout=10.0,
+            )
+            return [response.json() if response.status_code == 200 else None]
+
+        results: list[Optional[dict]] = []
+        for start in range(0, len(requests), MAX_BATCH_SIZE):
+            chunk = requests[start:start + MAX_BATCH_SIZE]
+            boundary = "semptify_batch_" + secrets.token_hex(8)
+            body = ""
+            for i, (path, params) in enumerate(chunk):
+                url = httpx.URL(f"{self.BASE_URL}{path}", params=params)
+                body += (
+                    f"--{boundary}\r\n"
+                    f"Content-Type: application/http\r\n"
+                    f"Content-ID: <item{i}>\r\n\r\n"
+                    f"GET {url.raw_path.decode()} HTTP/1.1\r\n\r\n"
+                )
+            body += f"--{boundary}--"
+            response = await self.client.post(
+                self.BATCH_URL,
+                headers={
+                    "Authorization": f"Bearer {self.access_token}",
+                    "Content-Type": f"multipart/mixed; boundary={boundary}",
+                },
+                content=body.encode(),
+                timeout=30.0,
+            )
+            parts = _parse_batch_response(response) if response.status_code == 200 else {}
+            for i in range(len(chunk)):
+                status, payload = parts.get(i, (0, None))
+                results.append(payload if status == 200 else None)
+        return results
+
+    async def _list_children(
+        self, folder_ids: list[str], folders_only: bool = False,
+    ) -> list[Optional[list[dict]]]:
+        """List the children of several folders, one batch per page."""
+        fields = "nextPageToken,files(id,name,mimeType,size,modifiedTime)"
+
+        def params(folder_id: str, page_token: Optional[str] = None) -> dict:
+            query = f"{_q(folder_id)} in parents and trashed=false"
+            if folders_only:
+                query += f" and mimeType={_q(FOLDER_MIME_TYPE)}"
+            result = {"q": query, "fields": fields, "pageSize": PAGE_SIZE}
+            if page_token:
+                result["pageToken"] = page_token
+            return result
+
+        pages = await self._batch_get([("/files", params(folder_id)) for folder_id in folder_ids])
+        listings: list[Optional[list[dict]]] = []
+        for folder_id, page in zip(folder_ids, pages):
+            if page is None:
+                listings.append(None)
+                continue
+            items = list(page.get("files", []))
+            while page and page.get("nextPageToken"):
+                [page] = await self._batch_get([("/files", params(folder_id, page["nextPageToken"]))])
+                items.extend(page.get("files", []) if page else [])
+            listings.append(items)
+        return listings
+
+    async def _find_file_ids(self, folder_id: str, filenames: list[str]) -> list[Optional[str]]:
+        """Look up files by name in a folder, batching the searches."""
+        found = await self._batch_get([
+            ("/files", {
+                "q": f"name={_q(name)} and {_q(folder_id)} in parents and trashed=false",
+                "fields": "files(id)",
+            })
+            for name in filenames
+        ])
+        return [page["files"][0]["id"] if page and page.get("files") else None for page in found]
+
+    async def _create_drive_folder(self, name: str, parent_id: str) -> Optional[str]:
+        response = await self.client.post(
+            f"{self.BASE_URL}/files",
+            headers={**self._headers(), "Content-Type": "application/json"},
+            json={"name": name, "mimeType": FOLDER_MIME_TYPE, "parents": [parent_id]},
+            timeout=10.0,
+        )
+        if response.status_code in (200, 201):
+            return response.json()["id"]
+        return None
+
     async def is_connected(self) -> bool:
         """Check if Google Drive is accessible."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/about",
-                    headers=self._headers(),
-                    params={"fields": "user"},
-                    timeout=10.0,
-                )
-                return response.status_code == 200
+            response = await self.client.get(
+                f"{self.BASE_URL}/about",
+                headers=self._headers(),
+                params={"fields": "user"},
+                timeout=10.0,
+            )
+            return response.status_code == 200
         except Exception:
             return False
-    
-    async def _get_folder_id(self, folder_path: str) -> Optional[str]:
-        """Get folder ID by path, creating folders if needed."""
-        if folder_path in self._folder_cache:
-            return self._folder_cache[folder_path]
-        
-        # Root folder
-        if folder_path in ("/", ""):
+
+    async def _get_folder_id(self, folder_path: str, create: bool = True) -> Optional[str]:
+        """
+        Get folder ID by path, creating folders if needed.
+
+        Starts from the deepest cached ancestor. Each level that is not
+        cached costs one listing of its parent's subfolders (once per
+        provider instance), and every sibling found is cached on the way.
+        """
+        path = _normalize(folder_path)
+        if not path:
             return "root"
-        
-        # Split path and traverse/create
-        parts = folder_path.strip("/").split("/")
-        parent_id = "root"
-        current_path = ""
-        
-        async with httpx.AsyncClient() as client:
-            for part in parts:
-                current_path = f"{current_path}/{part}"
-                
-                # Check cache
-                if current_path in self._folder_cache:
-                    parent_id = self._folder_cache[current_path]
-                    continue
-                
-                # Search for folder
-                query = f"name='{part}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-                response = await client.get(
-                    f"{self.BASE_URL}/files",
-                    headers=self._headers(),
-                    params={"q": query, "fields": "files(id,name)"},
-                    timeout=10.0,
-                )
-                
-                if response.status_code == 200:
-                    files = response.json().get("files", [])
-                    if files:
-                        parent_id = files[0]["id"]
-                        self._folder_cache[current_path] = parent_id
-                    else:
-                        # Create folder
-                        create_response = await client.post(
-                            f"{self.BASE_URL}/files",
-                            headers={**self._headers(), "Content-Type": "application/json"},
-                            json={
-                                "name": part,
-                                "mimeType": "application/vnd.google-apps.folder",
-                                "parents": [parent_id],
-                            },
-                            timeout=10.0,
-                        )
-                        if create_response.status_code in (200, 201):
-                            parent_id = create_response.json()["id"]
-                            self._folder_cache[current_path] = parent_id
-                        else:
-                            return None
-                else:
+
+        cached = await self._cached_id("folder", path)
+        if cached:
+            return cached
+
+        parts = path.split("/")
+        parent_id, depth = "root", 0
+        for i in range(len(parts) - 1, 0, -1):
+            ancestor = await self._cached_id("folder", "/".join(parts[:i]))
+            if ancestor:
+                parent_id, depth = ancestor, i
+                break
+
+        for i in range(depth, len(parts)):
+            parent_path = "/".join(parts[:i])
+            folder_id = None
+            if parent_id not in self._listed_folders:
+                [children] = await self._list_children([parent_id], folders_only=True)
+                if children is None:
+                    return None
+                self._listed_folders.add(parent_id)
+                for child in children:
+                    child_path = f"{parent_path}/{child['name']}" if parent_path else child["name"]
+                    await self._remember_id("folder", child_path, child["id"])
+                    if child["name"] == parts[i] and folder_id is None:
+                        folder_id = child["id"]
+            if folder_id is None:
+                if not create:
+                    return None
+                folder_id = await self._create_drive_folder(parts[i], parent_id)
+                if folder_id is None:
                     return None
-        
+                await self._remember_id("folder", "/".join(parts[:i + 1]), folder_id)
+                # A folder created a moment ago has no children to look up
+                self._listed_folders.add(folder_id)
+            parent_id = folder_id
+
         return parent_id
-    
+
+    # =========================================================================
+    # Uploads
+    # =========================================================================
+
+    async def _write_file(
+        self,
+        file_content: bytes,
+        filename: str,
+        mime_type: str,
+        folder_id: str,
+        existing_file_id: Optional[str],
+    ) -> Optional[dict]:
+        """
+        Create or update one file. Returns the Drive file resource, or None
+        when Drive answers 404 because a cached folder or file ID is stale.
+        """
+        if len(file_content) >= RESUMABLE_THRESHOLD:
+            return await self._resumable_upload(file_content, filename, mime_type, folder_id, existing_file_id)
+
+        if existing_file_id:
+            # UPDATE existing file
+            response = await self.client.patch(
+                f"{self.UPLOAD_URL}/files/{existing_file_id}",
+                headers={
+                    "Authorization": f"Bearer {self.access_token}",
+                    "Content-Type": mime_type,
+                },
+                params={"uploadType": "media", "fields": "id"},
+                content=file_content,
+                timeout=60.0,
+            )
+        else:
+            # CREATE new file using multipart upload so name + parent are set
+            # atomically in a single request — no separate PATCH needed.
+            metadata = json.dumps({
+                "name": filename,
+                "parents": [folder_id],
+            }).encode()
+
+            boundary = "semptify_boundary_" + secrets.token_hex(8)
+            body = (
+                f"--{boundary}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+            ).encode()
+            body += metadata
+            body += f"\r\n--{boundary}\r\n".encode()
+            body += f"Content-Type: {mime_type}\r\n\r\n".encode()
+            body += file_content
+            body += f"\r\n--{boundary}--".encode()
+
+            response = await self.client.post(
+                f"{self.UPLOAD_URL}/files",
+                headers={
+                    "Authorization": f"Bearer {self.access_token}",
+                    "Content-Type": f"multipart/related; boundary={boundary}",
+                },
+                params={"uploadType": "multipart", "fields": "id,parents"},
+                content=body,
+                timeout=60.0,
+            )
+
+        if response.status_code == 404:
+            return None
+        if response.status_code not in (200, 201):
+            raise Exception(f"Upload failed: {response.status_code}")
+        return response.json()
+
+    async def _resumable_upload(
+        self,
+        file_content: bytes,
+        filename: str,
+        mime_type: str,
+        folder_id: str,
+        existing_file_id: Optional[str],
+    ) -> Optional[dict]:
+        """Upload in chunks through a resumable session, resuming after dropped chunks."""
+        total = len(file_content)
+        headers = {
+            **self._headers(),
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Type": mime_type,
+            "X-Upload-Content-Length": str(total),
+        }
+        params = {"uploadType": "resumable", "fields": "id,parents"}
+        if existing_file_id:
+            start = await self.client.patch(
+                f"{self.UPLOAD_URL}/files/{existing_file_id}",
+                headers=headers, params=params, json={}, timeout=10.0,
+            )
+        else:
+            start = await self.client.post(
+                f"{self.UPLOAD_URL}/files",
+                headers=headers, params=params,
+                json={"name": filename, "parents": [folder_id]}, timeout=10.0,
+            )
+        if start.status_code == 404:
+            return None
+        if start.status_code != 200 or "location" not in start.headers:
+            raise Exception(f"Upload failed: could not start resumable session ({start.status_code})")
+        session_url = start.headers["location"]
+
+        offset, retries = 0, 0
+        while True:
+            chunk = file_content[offset:offset + RESUMABLE_CHUNK_SIZE]
+            try:
+                response = await self.client.put(
+                    session_url,
+                    headers={"Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{total}"},
+                    content=chunk,
+                    timeout=120.0,
+                )
+            except httpx.TransportError:
+                response = None
+            if response is not None and response.status_code in (200, 201):
+                return response.json()
+            if response is not None and response.status_code not in (308,) and response.status_code < 500:
+                raise Exception(f"Upload failed: {response.status_code}")
+
+            if response is None or response.status_code >= 500:
+                retries += 1
+                if retries > RESUMABLE_MAX_RETRIES:
+                    raise Exception(f"Upload failed: resumable session for '{filename}' kept failing")
+                # Ask the session how much arrived before carrying on
+                try:
+                    response = await self.client.put(
+                        session_url, headers={"Content-Range": f"bytes */{total}"}, timeout=10.0,
+                    )
+                except httpx.TransportError:
+                    continue
+                if response.status_code in (200, 201):
+                    return response.json()
+                if response.status_code != 308:
+                    continue
+
+            received = response.headers.get("range")  # "bytes=0-N"
+            offset = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+
     async def upload_file(
         self,
         file_content: bytes,
@@ -118,212 +470,154 @@ class GoogleDriveProvider(StorageProvider):
         mime_type: Optional[str] = None,
     ) -> StorageFile:
         """Upload file to Google Drive. Updates existing file if it already exists."""
-        folder_id = await self._get_folder_id(destination_path)
-        if not folder_id:
-            raise Exception(f"Could not access folder: {destination_path}")
-        
-        mime_type = mime_type or "application/octet-stream"
-        
-        async with httpx.AsyncClient() as client:
-            # First, check if file already exists in this folder
-            query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-            search_response = await client.get(
-                f"{self.BASE_URL}/files",
-                headers=self._headers(),
-                params={"q": query, "fields": "files(id,name)"},
-                timeout=10.0,
-            )
-            
-            existing_file_id = None
-            if search_response.status_code == 200:
-                files = search_response.json().get("files", [])
-                if files:
-                    existing_file_id = files[0]["id"]
-            
-            # Simple upload for files < 5MB
-            if len(file_content) < 5 * 1024 * 1024:
-                if existing_file_id:
-                    # UPDATE existing file
-                    response = await client.patch(
-                        f"{self.UPLOAD_URL}/files/{existing_file_id}",
-                        headers={
-                            "Authorization": f"Bearer {self.access_token}",
-                            "Content-Type": mime_type,
-                        },
-                        params={"uploadType": "media"},
-                        content=file_content,
-                        timeout=60.0,
-                    )
-                    if response.status_code in (200, 201):
-                        return StorageFile(
-                            id=existing_file_id,
-                            name=filename,
-                            path=f"{destination_path}/{filename}",
-                            size=len(file_content),
-                            mime_type=mime_type,
-                            modified_at=datetime.now(timezone.utc),
-                        )
-                else:
-                    # CREATE new file using multipart upload so name + parent are set
-                    # atomically in a single request — no separate PATCH needed.
-                    metadata = json.dumps({
-                        "name": filename,
-                        "parents": [folder_id],
-                    }).encode()
-
-                    boundary = "semptify_boundary_" + secrets.token_hex(8)
-                    body = (
-                        f"--{boundary}\r\n"
-                        f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
-                    ).encode()
-                    body += metadata
-                    body += f"\r\n--{boundary}\r\n".encode()
-                    body += f"Content-Type: {mime_type}\r\n\r\n".encode()
-                    body += file_content
-                    body += f"\r\n--{boundary}--".encode()
-
-                    response = await client.post(
-                        f"{self.UPLOAD_URL}/files",
-                        headers={
-                            "Authorization": f"Bearer {self.access_token}",
-                            "Content-Type": f"multipart/related; boundary={boundary}",
-                        },
-                        params={"uploadType": "multipart"},
-                        content=body,
-                        timeout=60.0,
+        [stored] = await self.upload_files([(filename, file_content, mime_type)], destination_path)
+        return stored
+
+    async def upload_files(
+        self,
+        files: list[tuple[str, bytes, Optional[str]]],
+        destination_path: str,
+    ) -> list[StorageFile]:
+        """
+        Upload several (filename, content, mime_type) files into one folder.
+
+        Files whose IDs are not cached are looked up in one batch request;
+        the uploads then run concurrently on the shared client. The IDs
+        Drive returns are cached, so a file is resolvable by
+        download_file() as soon as this returns.
+        """
+        path = _normalize(destination_path)
+        pending = list(range(len(files)))
+        stored: dict[int, dict] = {}
+
+        for attempt in range(2):
+            folder_id = await self._get_folder_id(destination_path)
+            if not folder_id:
+                raise Exception(f"Could not access folder: {destination_path}")
+
+            file_ids = [await self._cached_id("file", f"{path}/{files[i][0]}") for i in pending]
+            missing = [n for n, file_id in enumerate(file_ids) if file_id is None]
+            if missing:
+                found = await self._find_file_ids(folder_id, [files[pending[n]][0] for n in missing])
+                for n, file_id in zip(missing, found):
+                    file_ids[n] = file_id
+
+            results = await asyncio.gather(*(
+                self._write_file(
+                    files[i][1], files[i][0], files[i][2] or "application/octet-stream", folder_id, file_id,
+                )
+                for i, file_id in zip(pending, file_ids)
+            ))
+            for i, data in zip(pending, results):
+                if data is None:
+                    continue
+                if file_ids[pending.index(i)] is None and folder_id not in data.get("parents", [folder_id]):
+                    raise Exception(
+                        f"Upload confirmed by Drive but file '{files[i][0]}' "
+                        f"is not resolvable at '{destination_path}'. "
+                        f"Vault write cannot be verified."
                     )
+                stored[i] = data
+                await self._remember_id("file", f"{path}/{files[i][0]}", data["id"])
+
+            pending = [i for i in pending if i not in stored]
+            if not pending:
+                break
+            # A cached folder or file was deleted in Drive; resolve afresh once
+            await self.invalidate_cache()
+        else:
+            raise Exception("Upload failed")
+
+        now = datetime.now(timezone.utc)
+        return [
+            StorageFile(
+                id=stored[i]["id"],
+                name=filename,
+                path=f"{destination_path}/{filename}",
+                size=len(content),
+                mime_type=mime_type or "application/octet-stream",
+                modified_at=now,
+            )
+            for i, (filename, content, mime_type) in enumerate(files)
+        ]
 
-                    if response.status_code in (200, 201):
-                        file_data = response.json()
-                        # Confirm the file is findable at the expected path before
-                        # returning success.  This makes upload_file() atomic from
-                        # the vault manager's perspective: success means the file
-                        # can immediately be resolved via download_file().
-                        confirm_query = (
-                            f"name='{filename}' and '{folder_id}' in parents"
-                            f" and trashed=false"
-                        )
-                        confirm_resp = await client.get(
-                            f"{self.BASE_URL}/files",
-                            headers=self._headers(),
-                            params={"q": confirm_query, "fields": "files(id)"},
-                            timeout=10.0,
-                        )
-                        if (
-                            confirm_resp.status_code != 200
-                            or not confirm_resp.json().get("files")
-                        ):
-                            raise Exception(
-                                f"Upload confirmed by Drive but file '{filename}' "
-                                f"is not resolvable at '{destination_path}'. "
-                                f"Vault write cannot be verified."
-                            )
-
-                        return StorageFile(
-                            id=file_data["id"],
-                            name=filename,
-                            path=f"{destination_path}/{filename}",
-                            size=len(file_content),
-                            mime_type=mime_type,
-                            modified_at=datetime.now(timezone.utc),
-                        )
-
-        raise Exception("Upload failed")
+    # =========================================================================
+    # Reads
+    # =========================================================================
+
+    async def _resolve_file_id(self, file_path: str) -> Optional[str]:
+        """Find a file's ID by searching its folder, caching the result."""
+        folder_path, _, filename = _normalize(file_path).rpartition("/")
+        folder_id = await self._get_folder_id(folder_path, create=False)
+        if not folder_id:
+            return None
+        [file_id] = await self._find_file_ids(folder_id, [filename])
+        if file_id:
+            await self._remember_id("file", file_path, file_id)
+        return file_id
 
     async def download_file(self, file_path: str) -> bytes:
         """Download file from Google Drive."""
-        # Get file ID by searching
-        folder_path = "/".join(file_path.split("/")[:-1])
-        filename = file_path.split("/")[-1]
-        
-        folder_id = await self._get_folder_id(folder_path) if folder_path else "root"
-        
-        async with httpx.AsyncClient() as client:
-            # Search for file
-            query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-            response = await client.get(
-                f"{self.BASE_URL}/files",
+        cached = await self._cached_id("file", file_path)
+        for file_id in (cached, None):
+            if file_id is None:
+                file_id = await self._resolve_file_id(file_path)
+                if file_id is None:
+                    break
+            response = await self.client.get(
+                f"{self.BASE_URL}/files/{quote(file_id)}",
                 headers=self._headers(),
-                params={"q": query, "fields": "files(id)"},
-                timeout=10.0,
+                params={"alt": "media"},
+                timeout=60.0,
             )
-            
             if response.status_code == 200:
-                files = response.json().get("files", [])
-                if files:
-                    file_id = files[0]["id"]
-                    # Download
-                    download_response = await client.get(
-                        f"{self.BASE_URL}/files/{file_id}",
-                        headers=self._headers(),
-                        params={"alt": "media"},
-                        timeout=60.0,
-                    )
-                    if download_response.status_code == 200:
-                        return download_response.content
-        
+                return response.content
+            await self._forget_id("file", file_path)
+
         raise Exception(f"File not found: {file_path}")
-    
+
     async def delete_file(self, file_path: str) -> bool:
         """Delete file from Google Drive."""
-        folder_path = "/".join(file_path.split("/")[:-1])
-        filename = file_path.split("/")[-1]
-        
-        folder_id = await self._get_folder_id(folder_path) if folder_path else "root"
-        
-        async with httpx.AsyncClient() as client:
-            query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-            response = await client.get(
-                f"{self.BASE_URL}/files",
+        cached = await self._cached_id("file", file_path)
+        for file_id in (cached, None):
+            if file_id is None:
+                file_id = await self._resolve_file_id(file_path)
+                if file_id is None:
+                    break
+            response = await self.client.delete(
+                f"{self.BASE_URL}/files/{quote(file_id)}",
                 headers=self._headers(),
-                params={"q": query, "fields": "files(id)"},
                 timeout=10.0,
             )
-            
-            if response.status_code == 200:
-                files = response.json().get("files", [])
-                if files:
-                    file_id = files[0]["id"]
-                    delete_response = await client.delete(
-                        f"{self.BASE_URL}/files/{file_id}",
-                        headers=self._headers(),
-                        timeout=10.0,
-                    )
-                    return delete_response.status_code == 204
-        
+            await self._forget_id("file", file_path)
+            if response.status_code != 404:
+                return response.status_code == 204
+
         return False
-    
+
     async def list_files(
         self,
         folder_path: str = "/",
         recursive: bool = False,
     ) -> list[StorageFile]:
-        """List files in a Google Drive folder."""
-        folder_id = await self._get_folder_id(folder_path)
+        """List files in a Google Drive folder, one batch request per tree level."""
+        folder_id = await self._get_folder_id(folder_path, create=False)
         if not folder_id:
             return []
-        
+
         files = []
-        
-        async with httpx.AsyncClient() as client:
-            query = f"'{folder_id}' in parents and trashed=false"
-            response = await client.get(
-                f"{self.BASE_URL}/files",
-                headers=self._headers(),
-                params={
-                    "q": query,
-                    "fields": "files(id,name,mimeType,size,modifiedTime)",
-                },
-                timeout=10.0,
-            )
-            
-            if response.status_code == 200:
-                for item in response.json().get("files", []):
-                    is_folder = item["mimeType"] == "application/vnd.google-apps.folder"
+        level = [(folder_path, folder_id)]
+        while level:
+            listings = await self._list_children([folder_id for _, folder_id in level])
+            next_level = []
+            for (parent_path, _), items in zip(level, listings):
+                for item in items or []:
+                    is_folder = item["mimeType"] == FOLDER_MIME_TYPE
+                    item_path = f"{parent_path}/{item['name']}"
                     files.append(StorageFile(
                         id=item["id"],
                         name=item["name"],
-                        path=f"{folder_path}/{item['name']}",
+                        path=item_path,
                         size=int(item.get("size", 0)),
                         mime_type=item["mimeType"],
                         modified_at=datetime.fromisoformat(
@@ -331,44 +625,22 @@ class GoogleDriveProvider(StorageProvider):
                         ) if item.get("modifiedTime") else datetime.now(timezone.utc),
                         is_folder=is_folder,
                     ))
+                    if is_folder:
+                        await self._remember_id("folder", item_path, item["id"])
+                        # Recursive listing
+                        if recursive:
+                            next_level.append((item_path, item["id"]))
+            level = next_level
 
-                    # Recursive listing
-                    if recursive and is_folder:
-                        sub_files = await self.list_files(
-                            f"{folder_path}/{item['name']}",
-                            recursive=True
-                        )
-                        files.extend(sub_files)
-        
         return files
-    
+
     async def file_exists(self, file_path: str) -> bool:
         """Check if file exists in Google Drive."""
         try:
-            folder_path = "/".join(file_path.split("/")[:-1])
-            filename = file_path.split("/")[-1]
-            
-            folder_id = await self._get_folder_id(folder_path) if folder_path else "root"
-            if not folder_id:
-                return False
-            
-            async with httpx.AsyncClient() as client:
-                query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-                response = await client.get(
-                    f"{self.BASE_URL}/files",
-                    headers=self._headers(),
-                    params={"q": query, "fields": "files(id)"},
-                    timeout=10.0,
-                )
-                
-                if response.status_code == 200:
-                    files = response.json().get("files", [])
-                    return len(files) > 0
+            return await self._resolve_file_id(file_path) is not None
         except Exception:
-            pass
-        
-        return False
-    
+            return False
+
     async def create_folder(self, folder_path: str) -> bool:
         """Create folder in Google Drive."""
         folder_id = await self._get_folder_id(folder_path)
@@ -118,7 +118,7 @@ class TimelineExtractor:
         # Read document content from vault path (read-only, original stays immutable)
         try:
             content_bytes = await self.overlay_manager.storage.download_file(overlay.vault_path)
-            content_text = self._extract_text_from_pdf(content_bytes)
+            content_text = await self._extract_text_from_pdf(content_bytes)
         except Exception:
             # If we can't read the document, return empty
             return []
@@ -219,35 +219,18 @@ class TimelineExtractor:
         }
         return titles.get(event_type, "Event")
     
-    def _extract_text_from_pdf(self, content_bytes: bytes) -> str:
+    async def _extract_text_from_pdf(self, content_bytes: bytes) -> str:
         """
-        Extract text from PDF bytes using pdfplumber.
+        Extract text from PDF bytes with the shared PDF extractor (cached by content hash).
         """
+        from app.services.pdf_extractor import get_pdf_extractor
+
         try:
-            import pdfplumber
-            import io
-            
-            with pdfplumber.open(io.BytesIO(content_bytes)) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-                return '\n'.join(text_parts)
-        except Exception as e:
-            # Fallback: try PyPDF2
-            try:
-                import PyPDF2
-                import io
-                
-                reader = PyPDF2.PdfReader(io.BytesIO(content_bytes))
-                text_parts = []
-                for page in reader.pages:
-                    text_parts.append(page.extract_text() or '')
-                return '\n'.join(text_parts)
-            except Exception:
-                # If all extraction fails, return empty
-                return ''
+            result = await get_pdf_extractor().extract_async(content_bytes)
+            return result.text
+        except Exception:
+            # If all extraction fails, return empty
+            return ''
 
 
 class TimelineStore:
@@ -35,6 +35,7 @@ from app.core.module_contracts import FunctionGroupContract, register_function_g
 from app.core.utc import utc_now
 from app.core.vault_paths import VAULT_DOCUMENTS
 from app.models.models import VaultItem, Incident, VaultAuditLog
+from app.services.vault_search import extract_coordinates, invalidate_search_counts
 
 VAULT_INGESTION_FUNCTION_GROUP = "vault_ingestion"
 
@@ -224,6 +225,9 @@ class VaultIngestionService:
             record_time = self._ensure_timezone(request.record_time)
             semptify_entry_time = utc_now()
             
+            # Indexed copy of the GPS fix for radius searches
+            location_lat, location_lon = extract_coordinates(request.location_data)
+            
             # Create vault item
             vault_item = VaultItem(
                 user_id=request.user_id,
@@ -246,6 +250,8 @@ class VaultIngestionService:
                 
                 # Rich metadata
                 location_data=request.location_data,
+                location_lat=location_lat,
+                location_lon=location_lon,
                 metadata=preserved_metadata,
                 
                 # Content
@@ -281,6 +287,7 @@ class VaultIngestionService:
             
             self.db.add(audit_log)
             await self.db.flush()
+            await invalidate_search_counts(request.user_id)
             
             return IngestionResult(
                 success=True,
@@ -367,6 +374,8 @@ class VaultIngestionService:
                     continue  # Skip immutable fields
                 if hasattr(item, field):
                     setattr(item, field, value)
+            if "location_data" in updates:
+                item.location_lat, item.location_lon = extract_coordinates(item.location_data)
             
             item.updated_at = utc_now()
             await self.db.flush()
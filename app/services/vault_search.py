@@ -15,24 +15,47 @@ Search Capabilities:
 - Timeline ordering (event_time, record_time, semptify_entry_time)
 - Multi-criteria filtering (type, severity, status, tags)
 - Date range queries
+
+On PostgreSQL, text search uses the generated search_vector column and
+pg_trgm indexes (migration 20250425_vault_search_trgm); SQLite falls back
+to ILIKE. Pages are fetched by keyset cursor on the timeline column, and
+total counts are capped at COUNT_CAP and cached for COUNT_CACHE_TTL seconds.
 """
 
 from __future__ import annotations
 
+import base64
+import binascii
+import dataclasses
+import hashlib
+import json
+import math
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Any, Optional
 
-from sqlalchemy import select, and_, or_, func, text, desc, asc
+from sqlalchemy import select, and_, or_, func, text, desc, asc, cast, literal_column, tuple_, type_coerce, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
 from app.core.module_contracts import FunctionGroupContract, register_function_group
 from app.models.models import VaultItem, Incident, VaultAuditLog
 
 VAULT_SEARCH_FUNCTION_GROUP = "vault_search"
 
+# Counts stop at this many rows; larger totals are reported as a lower bound
+COUNT_CAP = 10_000
+COUNT_CACHE_TTL = 30
+COUNT_CACHE_PREFIX = "vault_count"
+
+# Generated tsvector column; PostgreSQL only, so not mapped on the model
+SEARCH_VECTOR = literal_column("vault_items.search_vector")
+
+# Mean Earth radius (IUGG), used by the Haversine distance
+EARTH_RADIUS_METERS = 6_371_008.8
+
 # Register module contract
 register_function_group(
     FunctionGroupContract(
@@ -107,9 +130,11 @@ class SearchCriteria:
     date_from: Optional[datetime] = None
     date_to: Optional[datetime] = None
     
-    # Pagination
+    # Pagination: pass SearchResult.next_cursor to fetch the following page
+    # (keyset on the timeline column); offset is ignored when cursor is set.
     offset: int = 0
     limit: int = 100
+    cursor: Optional[str] = None
     
     # Sorting
     timeline_mode: TimelineMode = TimelineMode.EVENT_TIME
@@ -123,6 +148,92 @@ class SearchResult:
     total_count: int = 0
     has_more: bool = False
     timeline_sequence: list[dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    total_count_exact: bool = True  # False when the count reached COUNT_CAP
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or from another timeline mode."""
+
+
+def encode_cursor(mode: TimelineMode, timestamp: datetime, item_id: int) -> str:
+    """Opaque cursor for the row after which the next page starts."""
+    raw = json.dumps([mode.value, timestamp.isoformat(), item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, mode: TimelineMode) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; checks the cursor belongs to this timeline mode."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_mode, timestamp, item_id = json.loads(raw)
+        position = (datetime.fromisoformat(timestamp), int(item_id))
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+    if cursor_mode != mode.value:
+        raise InvalidCursorError(f"Cursor was issued for timeline mode {cursor_mode!r}")
+    return position
+
+
+def _count_tag(user_id: str) -> str:
+    return f"{COUNT_CACHE_PREFIX}:{user_id}"
+
+
+def extract_coordinates(location_data: Optional[dict]) -> tuple[Optional[float], Optional[float]]:
+    """(lat, lon) from location_data["gps"], or (None, None) if absent or out of range."""
+    gps = (location_data or {}).get("gps")
+    if not isinstance(gps, dict):
+        return None, None
+    lat, lon = gps.get("lat"), gps.get("lon")
+    if isinstance(lat, bool) or isinstance(lon, bool) or not (
+        isinstance(lat, (int, float)) and isinstance(lon, (int, float))
+    ):
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, None
+    return float(lat), float(lon)
+
+
+def bounding_box(
+    lat: float, lon: float, radius_meters: float
+) -> tuple[float, float, list[tuple[float, float]]]:
+    """
+    Latitude range and longitude ranges that contain every point within radius.
+    
+    Longitude is split into two ranges across the antimeridian, and left
+    unbounded when the circle reaches a pole.
+    """
+    lat_delta = math.degrees(radius_meters / EARTH_RADIUS_METERS)
+    lat_min, lat_max = lat - lat_delta, lat + lat_delta
+    if lat_min <= -90 or lat_max >= 90:
+        return max(lat_min, -90.0), min(lat_max, 90.0), [(-180.0, 180.0)]
+    
+    lon_delta = math.degrees(radius_meters / (EARTH_RADIUS_METERS * math.cos(math.radians(lat))))
+    if lon_delta >= 180:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    lon_min, lon_max = lon - lon_delta, lon + lon_delta
+    if lon_min < -180:
+        return lat_min, lat_max, [(lon_min + 360, 180.0), (-180.0, lon_max)]
+    if lon_max > 180:
+        return lat_min, lat_max, [(lon_min, 180.0), (-180.0, lon_max - 360)]
+    return lat_min, lat_max, [(lon_min, lon_max)]
+
+
+def haversine_distance(lat: float, lon: float):
+    """SQL expression: great-circle metres from (lat, lon) to an item's coordinates."""
+    half_dlat = (func.radians(VaultItem.location_lat) - math.radians(lat)) / 2
+    half_dlon = (func.radians(VaultItem.location_lon) - math.radians(lon)) / 2
+    a = (
+        func.sin(half_dlat) * func.sin(half_dlat)
+        + math.cos(math.radians(lat)) * func.cos(func.radians(VaultItem.location_lat))
+        * func.sin(half_dlon) * func.sin(half_dlon)
+    )
+    return 2 * EARTH_RADIUS_METERS * func.asin(func.sqrt(a))
+
+
+async def invalidate_search_counts(user_id: str) -> None:
+    """Drop cached search totals for a user (call after adding vault items)."""
+    await cache.invalidate_tag(_count_tag(user_id))
 
 
 class VaultSearchService:
@@ -137,23 +248,59 @@ class VaultSearchService:
     - Location-based search
     """
     
+    # Whether the earthdistance extension is installed (checked once per process)
+    _earthdistance: Optional[bool] = None
+    
     def __init__(self, db: AsyncSession):
         self.db = db
+        self._postgres: Optional[bool] = None
+    
+    def _is_postgres(self) -> bool:
+        """True when the session is bound to PostgreSQL (FTS/trigram indexes exist)."""
+        if self._postgres is None:
+            self._postgres = self.db.get_bind().dialect.name == "postgresql"
+        return self._postgres
+    
+    async def _has_earthdistance(self) -> bool:
+        if not self._is_postgres():
+            return False
+        if VaultSearchService._earthdistance is None:
+            result = await self.db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'earthdistance'"))
+            VaultSearchService._earthdistance = result.first() is not None
+        return VaultSearchService._earthdistance
     
     def _build_base_query(self, user_id: str) -> select:
         """Build base query with user filter."""
         return select(VaultItem).where(VaultItem.user_id == user_id)
     
     def _apply_text_search(self, query: select, criteria: SearchCriteria) -> select:
-        """Apply general text search across title and summary."""
+        """
+        Apply general text search across title and summary.
+        
+        On PostgreSQL every branch is index-backed: full-text match on the
+        generated search_vector (GIN), substring match via the pg_trgm
+        indexes on title and summary, and a fuzzy trigram match on title
+        for misspellings. The planner combines them with a BitmapOr.
+        """
         if not criteria.query:
             return query
         
         search_pattern = f"%{criteria.query}%"
+        if not self._is_postgres():
+            return query.where(
+                or_(
+                    VaultItem.title.ilike(search_pattern),
+                    VaultItem.summary.ilike(search_pattern),
+                )
+            )
+        
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), criteria.query)
         return query.where(
             or_(
+                SEARCH_VECTOR.op("@@")(tsquery),
                 VaultItem.title.ilike(search_pattern),
                 VaultItem.summary.ilike(search_pattern),
+                VaultItem.title.op("%")(criteria.query),
             )
         )
     
@@ -161,18 +308,14 @@ class VaultSearchService:
         """
         Apply deep metadata search using JSONB.
         
-        Uses PostgreSQL's JSONB text containment for efficient searching
-        through nested metadata structures.
+        Matches anywhere in the serialized metadata, keys and values alike.
+        On PostgreSQL the trigram index on item_metadata::text serves this.
         """
         if not criteria.metadata_query:
             return query
         
-        # Use PostgreSQL's JSONB text search
-        # Cast metadata to text and search
         search_term = f"%{criteria.metadata_query}%"
-        return query.where(
-            func.cast(VaultItem.metadata, JSONB).cast(JSONB).cast(str).ilike(search_term)
-        )
+        return query.where(cast(VaultItem.item_metadata, Text).ilike(search_term))
     
     def _apply_classification_filters(
         self, query: select, criteria: SearchCriteria
@@ -261,61 +404,112 @@ class VaultSearchService:
         return column_map[mode]
     
     def _apply_sorting(self, query: select, criteria: SearchCriteria) -> select:
-        """Apply sorting based on timeline mode and sort order."""
+        """
+        Apply sorting based on timeline mode and sort order.
+        
+        item_id breaks ties so the order is total, which keyset pages need.
+        """
         date_column = self._get_timeline_column(criteria.timeline_mode)
         
         if criteria.sort_order == SortOrder.ASC:
-            return query.order_by(asc(date_column))
+            return query.order_by(asc(date_column), asc(VaultItem.item_id))
         else:
-            return query.order_by(desc(date_column))
+            return query.order_by(desc(date_column), desc(VaultItem.item_id))
     
-    async def search(self, user_id: str, criteria: SearchCriteria) -> SearchResult:
+    def _apply_cursor(self, query: select, criteria: SearchCriteria) -> select:
+        """Start after the cursor row: (ts, item_id) beyond the cursor in sort order."""
+        timestamp, item_id = decode_cursor(criteria.cursor, criteria.timeline_mode)
+        position = tuple_(self._get_timeline_column(criteria.timeline_mode), VaultItem.item_id)
+        if criteria.sort_order == SortOrder.ASC:
+            return query.where(position > tuple_(timestamp, item_id))
+        return query.where(position < tuple_(timestamp, item_id))
+    
+    async def _count(self, user_id: str, query: select, filters: Any) -> tuple[int, bool]:
         """
-        Execute search with given criteria.
-        
-        Args:
-            user_id: User ID to filter by
-            criteria: SearchCriteria with all filter conditions
+        Capped, cached total for a filtered query.
         
-        Returns:
-            SearchResult with items, count, and timeline sequence
+        Counting stops after COUNT_CAP + 1 rows, so large result sets cost a
+        bounded index scan rather than a full COUNT(*). Totals are cached per
+        user and filter set (any JSON-able description of the filters), so
+        paging through results counts once.
         """
-        # Build query
-        query = self._build_base_query(user_id)
-        query = self._apply_text_search(query, criteria)
-        query = self._apply_metadata_search(query, criteria)
-        query = self._apply_classification_filters(query, criteria)
-        query = self._apply_relationship_filters(query, criteria)
-        query = self._apply_status_filters(query, criteria)
-        query = self._apply_date_range(query, criteria)
+        digest = hashlib.md5(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        
+        async def load() -> list:
+            capped = select(func.count()).select_from(query.limit(COUNT_CAP + 1).subquery())
+            count = (await self.db.execute(capped)).scalar() or 0
+            return [min(count, COUNT_CAP), count <= COUNT_CAP]
         
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await self.db.execute(count_query)
-        total_count = total_result.scalar() or 0
+        count, exact = await cache.get_or_set(
+            f"{COUNT_CACHE_PREFIX}:{user_id}:{digest}", load,
+            ttl=COUNT_CACHE_TTL, tags=[_count_tag(user_id)],
+        )
+        return count, exact
+    
+    async def _fetch_page(
+        self, user_id: str, query: select, criteria: SearchCriteria, filters: Any
+    ) -> SearchResult:
+        """Count, sort and page a filtered query into a SearchResult."""
+        total_count, exact = await self._count(user_id, query, filters)
         
-        # Apply sorting and pagination
         query = self._apply_sorting(query, criteria)
-        query = query.offset(criteria.offset).limit(criteria.limit + 1)  # +1 to check has_more
+        if criteria.cursor:
+            query = self._apply_cursor(query, criteria)
+        elif criteria.offset:
+            query = query.offset(criteria.offset)
+        query = query.limit(criteria.limit + 1)  # +1 to check has_more
         
-        # Execute
         result = await self.db.execute(query)
         items = result.scalars().all()
         
-        # Check if there are more results
         has_more = len(items) > criteria.limit
         items = items[:criteria.limit]  # Remove the extra item
         
-        # Build timeline sequence for UI
-        timeline_sequence = self._build_timeline_sequence(items, criteria.timeline_mode)
+        next_cursor = None
+        if has_more and items:
+            last = items[-1]
+            timestamp = getattr(last, criteria.timeline_mode.value)
+            if timestamp is not None:
+                next_cursor = encode_cursor(criteria.timeline_mode, timestamp, last.item_id)
         
         return SearchResult(
             items=list(items),
             total_count=total_count,
             has_more=has_more,
-            timeline_sequence=timeline_sequence,
+            timeline_sequence=self._build_timeline_sequence(items, criteria.timeline_mode),
+            next_cursor=next_cursor,
+            total_count_exact=exact,
         )
     
+    async def search(self, user_id: str, criteria: SearchCriteria) -> SearchResult:
+        """
+        Execute search with given criteria.
+        
+        Args:
+            user_id: User ID to filter by
+            criteria: SearchCriteria with all filter conditions
+        
+        Returns:
+            SearchResult with items, count, timeline sequence and next_cursor
+        
+        Raises:
+            InvalidCursorError: criteria.cursor is malformed
+        """
+        # Build query
+        query = self._build_base_query(user_id)
+        query = self._apply_text_search(query, criteria)
+        query = self._apply_metadata_search(query, criteria)
+        query = self._apply_classification_filters(query, criteria)
+        query = self._apply_relationship_filters(query, criteria)
+        query = self._apply_status_filters(query, criteria)
+        query = self._apply_date_range(query, criteria)
+        
+        filters = {
+            key: value for key, value in dataclasses.asdict(criteria).items()
+            if key not in ("offset", "limit", "cursor", "sort_order")
+        }
+        return await self._fetch_page(user_id, query, criteria, filters)
+    
     def _build_timeline_sequence(
         self, items: list[VaultItem], timeline_mode: TimelineMode
     ) -> list[dict[str, Any]]:
@@ -386,10 +580,16 @@ class VaultSearchService:
         user_id: str,
         metadata_field: str,
         value: Any,
+        limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> SearchResult:
         """
         Search for items with specific metadata field value.
         
+        On PostgreSQL this is JSONB containment (item_metadata @> {...}),
+        served by the jsonb_path_ops GIN index. Results are paged newest
+        first by event_time; pass next_cursor back as cursor.
+        
         Example:
             # Find all items with metadata.landlord = "ABC Management"
             results = await service.deep_metadata_search(
@@ -398,25 +598,16 @@ class VaultSearchService:
                 value="ABC Management"
             )
         """
-        # Use JSONB containment for exact match
-        metadata_filter = {metadata_field: value}
-        
-        query = (
-            select(VaultItem)
-            .where(VaultItem.user_id == user_id)
-            .where(VaultItem.metadata.contains(metadata_filter))
-            .order_by(desc(VaultItem.event_time))
-        )
-        
-        result = await self.db.execute(query)
-        items = result.scalars().all()
+        if self._is_postgres():
+            metadata_match = type_coerce(VaultItem.item_metadata, JSONB).contains({metadata_field: value})
+        else:
+            path = "$." + json.dumps(metadata_field)
+            metadata_match = func.json_extract(VaultItem.item_metadata, path) == value
         
-        return SearchResult(
-            items=list(items),
-            total_count=len(items),
-            has_more=False,
-            timeline_sequence=self._build_timeline_sequence(items, TimelineMode.EVENT_TIME),
-        )
+        query = self._build_base_query(user_id).where(metadata_match)
+        criteria = SearchCriteria(limit=limit, cursor=cursor)
+        filters = ["deep_metadata", metadata_field, value]
+        return await self._fetch_page(user_id, query, criteria, filters)
     
     async def location_search(
         self,
@@ -424,52 +615,58 @@ class VaultSearchService:
         lat: float,
         lon: float,
         radius_meters: float = 1000,
+        limit: int = 100,
     ) -> SearchResult:
         """
-        Search for items near a geographic location.
+        Search for items within radius_meters of a point, nearest first.
         
-        Assumes location_data contains {"gps": {"lat": X, "lon": Y}}.
+        Filtering and ordering run in the database on the indexed
+        location_lat/location_lon columns (filled from location_data.gps):
         
-        Note: For production, consider using PostGIS for proper geo queries.
-        This implementation uses a simple bounding box approximation.
+        - PostgreSQL with earthdistance: earth_box() on the GiST index, then
+          earth_distance()
+        - Otherwise: a bounding box on (user_id, location_lat, location_lon),
+          then the Haversine distance
+        
+        Each timeline_sequence entry carries its distance_meters.
         """
-        # Approximate degrees per meter (varies by latitude)
-        # At equator: 1 degree ≈ 111km
-        degrees_per_meter = 1.0 / 111000.0
-        lat_delta = radius_meters * degrees_per_meter
-        lon_delta = radius_meters * degrees_per_meter / max(abs(lat) * 0.01745, 0.001)
-        
-        # Build query for location data within bounding box
-        # This is a simplified approach - PostGIS would be better for production
+        if await self._has_earthdistance():
+            origin = func.ll_to_earth(lat, lon)
+            point = func.ll_to_earth(VaultItem.location_lat, VaultItem.location_lon)
+            distance = func.earth_distance(origin, point)
+            nearby = func.earth_box(origin, radius_meters).op("@>")(point)
+        else:
+            lat_min, lat_max, lon_ranges = bounding_box(lat, lon, radius_meters)
+            distance = haversine_distance(lat, lon)
+            nearby = and_(
+                VaultItem.location_lat.between(lat_min, lat_max),
+                or_(*(VaultItem.location_lon.between(low, high) for low, high in lon_ranges)),
+            )
+        
         query = (
-            select(VaultItem)
+            select(VaultItem, distance.label("distance_meters"))
             .where(VaultItem.user_id == user_id)
-            .where(VaultItem.location_data.isnot(None))
-            .order_by(desc(VaultItem.event_time))
+            .where(VaultItem.location_lat.isnot(None))
+            .where(nearby)
+            .where(distance <= radius_meters)
+            .order_by(distance, VaultItem.item_id)
+            .limit(limit + 1)
         )
+        rows = (await self.db.execute(query)).all()
         
-        result = await self.db.execute(query)
-        items = result.scalars().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [row[0] for row in rows]
         
-        # Filter items by actual distance (in Python for simplicity)
-        # Production: Use PostGIS ST_DWithin
-        nearby_items = []
-        for item in items:
-            if item.location_data:
-                gps = item.location_data.get("gps", {})
-                item_lat = gps.get("lat")
-                item_lon = gps.get("lon")
-                if item_lat and item_lon:
-                    # Simple distance check (would use Haversine for production)
-                    if (abs(item_lat - lat) < lat_delta and 
-                        abs(item_lon - lon) < lon_delta):
-                        nearby_items.append(item)
+        timeline_sequence = self._build_timeline_sequence(items, TimelineMode.EVENT_TIME)
+        for entry, row in zip(timeline_sequence, rows):
+            entry["distance_meters"] = round(row.distance_meters, 1)
         
         return SearchResult(
-            items=nearby_items,
-            total_count=len(nearby_items),
-            has_more=False,
-            timeline_sequence=self._build_timeline_sequence(nearby_items, TimelineMode.EVENT_TIME),
+            items=items,
+            total_count=len(items),
+            has_more=has_more,
+            timeline_sequence=timeline_sequence,
         )
 
 
@@ -20,8 +20,11 @@ This ensures:
 import hashlib
 import json
 import logging
+import os
+import struct
+import threading
 from datetime import datetime, timezone
-from typing import Optional
+from typing import BinaryIO, Optional
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
@@ -110,7 +113,24 @@ class VaultDocument:
 # =============================================================================
 
 class VaultDocumentIndex:
-    """Local index of vault documents for fast queries without hitting cloud storage."""
+    """
+    Local index of vault documents for fast queries without hitting cloud storage.
+
+    Storage is a snapshot plus an append-only write-ahead log:
+
+        snapshot.jsonl  documents grouped by user, one JSON object per line,
+                        then a trailer line (per-user byte ranges, vault_id ->
+                        user_id, sha256 -> vault_id) and a fixed-width footer
+                        pointing at the trailer
+        wal.jsonl       one fsync'd JSON line per add/update/delete since the
+                        snapshot was written
+
+    Opening the index reads the trailer and replays the WAL; a user's
+    documents are parsed the first time that user is looked up. Once the WAL
+    outgrows compact_ratio x live documents it is folded into a new snapshot
+    (temp file + fsync + rename), so each mutation is O(1) amortized. A legacy
+    vault_index.json is migrated on first open and left untouched.
+    """
 
     IMMUTABLE_FIELDS = {
         "vault_id",
@@ -125,96 +145,295 @@ class VaultDocumentIndex:
         "certificate_id",
         "uploaded_at",
     }
+
+    SNAPSHOT_FILE = "snapshot.jsonl"
+    WAL_FILE = "wal.jsonl"
+    LEGACY_FILE = "vault_index.json"
+    _FOOTER = struct.Struct("<Q4s")
+    _FOOTER_MAGIC = b"VIX1"
     
-    def __init__(self, data_dir: str = "data/vault_index"):
+    def __init__(self, data_dir: str = "data/vault_index", compact_ratio: float = 0.5,
+                 compact_min_entries: int = 1000):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._documents: dict[str, VaultDocument] = {}
-        self._user_index: dict[str, list[str]] = {}  # user_id -> [vault_ids]
+        self.compact_ratio = compact_ratio
+        self.compact_min_entries = compact_min_entries
+        self._lock = threading.RLock()
+
+        self._documents: dict[str, VaultDocument] = {}  # loaded documents only
+        self._user_index: dict[str, list[str]] = {}  # user_id -> [vault_ids] (complete once loaded)
         self._hash_index: dict[str, str] = {}  # sha256 -> vault_id (dedup)
+        self._vault_users: dict[str, str] = {}  # vault_id -> user_id, for every live document
+        self._user_ranges: dict[str, list[int]] = {}  # user_id -> [offset, length] in snapshot
+        self._loaded_users: set[str] = set()
+        self._dirty_users: set[str] = set()  # touched since the snapshot
+        self._tombstones: set[str] = set()  # deleted since the snapshot
+
+        self._snapshot: Optional[BinaryIO] = None
+        self._wal: Optional[BinaryIO] = None
+        self._wal_entries = 0
         self._load()
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.data_dir / self.SNAPSHOT_FILE
+
+    @property
+    def wal_path(self) -> Path:
+        return self.data_dir / self.WAL_FILE
     
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
     def _load(self):
-        """Load index from disk."""
-        index_file = self.data_dir / "vault_index.json"
-        if index_file.exists():
+        """Open the snapshot, replay the WAL (or migrate the legacy JSON index)."""
+        if self.snapshot_path.exists():
             try:
-                with open(index_file, encoding="utf-8") as f:
-                    data = json.load(f)
-                for vault_id, doc_data in data.get("documents", {}).items():
-                    doc = VaultDocument.from_dict(doc_data)
-                    self._documents[vault_id] = doc
-                    # Build user index
-                    if doc.user_id not in self._user_index:
-                        self._user_index[doc.user_id] = []
-                    self._user_index[doc.user_id].append(vault_id)
-                    # Build hash index
-                    self._hash_index[doc.sha256_hash] = vault_id
+                self._open_snapshot()
             except Exception as e:
-                logger.error("Failed to load vault index: %s", e)
-    
-    def _save(self):
-        """Save index to disk."""
-        index_file = self.data_dir / "vault_index.json"
-        data = {
-            "documents": {vid: doc.to_dict() for vid, doc in self._documents.items()},
-            "updated_at": datetime.now(timezone.utc).isoformat(),
-        }
-        with open(index_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+                logger.error("Failed to load vault index snapshot: %s", e)
+                self._close_snapshot()
+                self._user_ranges, self._vault_users, self._hash_index = {}, {}, {}
+        elif (self.data_dir / self.LEGACY_FILE).exists():
+            self._migrate_legacy()
+
+        self._replay_wal()
+        self._wal = open(self.wal_path, "ab")
+
+    def _open_snapshot(self):
+        self._snapshot = open(self.snapshot_path, "rb")
+        size = os.fstat(self._snapshot.fileno()).st_size
+        self._snapshot.seek(size - self._FOOTER.size)
+        trailer_offset, magic = self._FOOTER.unpack(self._snapshot.read(self._FOOTER.size))
+        if magic != self._FOOTER_MAGIC:
+            raise ValueError(f"Not a vault index snapshot: {self.snapshot_path}")
+        self._snapshot.seek(trailer_offset)
+        trailer = json.loads(self._snapshot.read(size - self._FOOTER.size - trailer_offset))
+        self._user_ranges = trailer["users"]
+        self._vault_users = trailer["vault_users"]
+        self._hash_index = trailer["hashes"]
+
+    def _close_snapshot(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def _migrate_legacy(self):
+        """Convert the old single-file JSON index into a snapshot."""
+        index_file = self.data_dir / self.LEGACY_FILE
+        try:
+            with open(index_file, encoding="utf-8") as f:
+                data = json.load(f)
+            for doc_data in data.get("documents", {}).values():
+                self._apply_put(VaultDocument.from_dict(doc_data))
+            self._loaded_users.update(self._user_index)
+            self.compact()
+            logger.info("Migrated %d documents from %s", len(self._vault_users), index_file)
+        except Exception as e:
+            logger.error("Failed to load vault index: %s", e)
+
+    def _replay_wal(self):
+        """Apply logged mutations; a torn final record (crash mid-append) is truncated."""
+        if not self.wal_path.exists():
+            return
+        with open(self.wal_path, "rb") as f:
+            data = f.read()
+        good = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+                if record["op"] == "put":
+                    self._apply_put(VaultDocument.from_dict(record["doc"]))
+                else:
+                    self._apply_delete(record["vault_id"], record["user_id"], record["sha256_hash"])
+            except (ValueError, KeyError, TypeError):
+                break
+            good += len(line)
+            self._wal_entries += 1
+        if good < len(data):
+            logger.warning("Truncating %d bytes of incomplete vault index WAL", len(data) - good)
+            with open(self.wal_path, "r+b") as f:
+                f.truncate(good)
+                os.fsync(f.fileno())
+
+    def _load_user(self, user_id: str):
+        """Parse a user's snapshot documents on first access."""
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        byte_range = self._user_ranges.get(user_id)
+        if byte_range is None or self._snapshot is None:
+            return
+        self._snapshot.seek(byte_range[0])
+        ordered = []
+        for line in self._snapshot.read(byte_range[1]).splitlines():
+            doc = VaultDocument.from_dict(json.loads(line))
+            if doc.vault_id in self._tombstones:
+                continue
+            # A WAL update replayed at open is newer than the snapshot copy
+            self._documents.setdefault(doc.vault_id, doc)
+            ordered.append(doc.vault_id)
+        seen = set(ordered)
+        self._user_index[user_id] = ordered + [
+            vid for vid in self._user_index.get(user_id, []) if vid not in seen
+        ]
+
+    # -------------------------------------------------------------------------
+    # Mutations
+    # -------------------------------------------------------------------------
+
+    def _apply_put(self, doc: VaultDocument):
+        vault_ids = self._user_index.setdefault(doc.user_id, [])
+        if doc.vault_id not in self._vault_users:
+            vault_ids.append(doc.vault_id)
+        self._documents[doc.vault_id] = doc
+        self._vault_users[doc.vault_id] = doc.user_id
+        self._hash_index[doc.sha256_hash] = doc.vault_id
+        self._tombstones.discard(doc.vault_id)
+        self._dirty_users.add(doc.user_id)
+
+    def _apply_delete(self, vault_id: str, user_id: str, sha256_hash: str):
+        self._documents.pop(vault_id, None)
+        self._vault_users.pop(vault_id, None)
+        if user_id in self._user_index:
+            self._user_index[user_id] = [vid for vid in self._user_index[user_id] if vid != vault_id]
+        if self._hash_index.get(sha256_hash) == vault_id:
+            del self._hash_index[sha256_hash]
+        self._tombstones.add(vault_id)
+        self._dirty_users.add(user_id)
+
+    def _append(self, record: dict):
+        """Durably log one mutation, compacting when the WAL gets long."""
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        self._wal.write(line.encode("utf-8"))
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self._wal_entries += 1
+        if self._wal_entries >= max(self.compact_min_entries, self.compact_ratio * len(self._vault_users)):
+            self.compact()
+
+    def compact(self):
+        """Fold the WAL into a new snapshot and truncate it."""
+        with self._lock:
+            for user_id in list(self._dirty_users):
+                self._load_user(user_id)
+
+            users = list(self._user_ranges)
+            users += [user_id for user_id in self._user_index if user_id not in self._user_ranges]
+            tmp_path = self.snapshot_path.with_suffix(".tmp")
+            ranges: dict[str, list[int]] = {}
+            with open(tmp_path, "wb") as out:
+                for user_id in users:
+                    start = out.tell()
+                    if user_id in self._loaded_users:
+                        for vid in self._user_index.get(user_id, []):
+                            out.write(json.dumps(self._documents[vid].to_dict(), default=str).encode("utf-8"))
+                            out.write(b"\n")
+                    else:
+                        # Untouched and never read: copy the bytes as-is
+                        offset, length = self._user_ranges[user_id]
+                        self._snapshot.seek(offset)
+                        out.write(self._snapshot.read(length))
+                    if out.tell() > start:
+                        ranges[user_id] = [start, out.tell() - start]
+                trailer_offset = out.tell()
+                trailer = {
+                    "users": ranges,
+                    "vault_users": self._vault_users,
+                    "hashes": self._hash_index,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                }
+                out.write(json.dumps(trailer, separators=(",", ":")).encode("utf-8"))
+                out.write(b"\n")
+                out.write(self._FOOTER.pack(trailer_offset, self._FOOTER_MAGIC))
+                out.flush()
+                os.fsync(out.fileno())
+
+            self._close_snapshot()
+            os.replace(tmp_path, self.snapshot_path)
+            self._snapshot = open(self.snapshot_path, "rb")
+            self._user_ranges = ranges
+
+            # Replaying these records over the new snapshot would be harmless,
+            # so a crash before the truncate loses nothing
+            if self._wal is not None:
+                self._wal.truncate(0)
+                os.fsync(self._wal.fileno())
+            self._wal_entries = 0
+            self._dirty_users.clear()
+            self._tombstones.clear()
+
+    def close(self):
+        """Release file handles."""
+        with self._lock:
+            self._close_snapshot()
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
     
     def add(self, doc: VaultDocument) -> None:
         """Add document to index."""
-        self._documents[doc.vault_id] = doc
-        if doc.user_id not in self._user_index:
-            self._user_index[doc.user_id] = []
-        self._user_index[doc.user_id].append(doc.vault_id)
-        self._hash_index[doc.sha256_hash] = doc.vault_id
-        self._save()
+        with self._lock:
+            self._apply_put(doc)
+            self._append({"op": "put", "doc": doc.to_dict()})
     
     def get(self, vault_id: str) -> Optional[VaultDocument]:
         """Get document by vault ID."""
-        return self._documents.get(vault_id)
+        with self._lock:
+            doc = self._documents.get(vault_id)
+            if doc is None and vault_id in self._vault_users:
+                self._load_user(self._vault_users[vault_id])
+                doc = self._documents.get(vault_id)
+            return doc
     
     def get_by_hash(self, sha256_hash: str) -> Optional[VaultDocument]:
         """Find document by hash (deduplication)."""
         vault_id = self._hash_index.get(sha256_hash)
-        return self._documents.get(vault_id) if vault_id else None
+        return self.get(vault_id) if vault_id else None
     
     def get_user_documents(self, user_id: str, document_type: Optional[str] = None) -> list[VaultDocument]:
         """Get all documents for a user, optionally filtered by type."""
-        vault_ids = self._user_index.get(user_id, [])
-        docs = [self._documents[vid] for vid in vault_ids if vid in self._documents]
+        with self._lock:
+            self._load_user(user_id)
+            vault_ids = self._user_index.get(user_id, [])
+            docs = [self._documents[vid] for vid in vault_ids if vid in self._documents]
         if document_type:
             docs = [d for d in docs if d.document_type == document_type]
         return docs
     
     def update(self, vault_id: str, **kwargs) -> Optional[VaultDocument]:
         """Update document metadata."""
-        doc = self._documents.get(vault_id)
-        if doc:
-            attempted_immutable = set(kwargs.keys()) & self.IMMUTABLE_FIELDS
-            if attempted_immutable:
-                fields = ", ".join(sorted(attempted_immutable))
-                raise ValueError(f"Immutable vault fields cannot be modified: {fields}")
-            for key, value in kwargs.items():
-                if hasattr(doc, key):
-                    setattr(doc, key, value)
-            self._save()
-        return doc
+        with self._lock:
+            doc = self.get(vault_id)
+            if doc:
+                attempted_immutable = set(kwargs.keys()) & self.IMMUTABLE_FIELDS
+                if attempted_immutable:
+                    fields = ", ".join(sorted(attempted_immutable))
+                    raise ValueError(f"Immutable vault fields cannot be modified: {fields}")
+                for key, value in kwargs.items():
+                    if hasattr(doc, key):
+                        setattr(doc, key, value)
+                self._dirty_users.add(doc.user_id)
+                self._append({"op": "put", "doc": doc.to_dict()})
+            return doc
     
     def delete(self, vault_id: str) -> bool:
         """Remove document from index (does not delete from storage)."""
-        doc = self._documents.pop(vault_id, None)
-        if doc:
-            if doc.user_id in self._user_index:
-                self._user_index[doc.user_id] = [
-                    vid for vid in self._user_index[doc.user_id] if vid != vault_id
-                ]
-            self._hash_index.pop(doc.sha256_hash, None)
-            self._save()
-            return True
-        return False
+        with self._lock:
+            doc = self.get(vault_id)
+            if doc:
+                self._apply_delete(vault_id, doc.user_id, doc.sha256_hash)
+                self._append({
+                    "op": "delete",
+                    "vault_id": vault_id,
+                    "user_id": doc.user_id,
+                    "sha256_hash": doc.sha256_hash,
+                })
+                return True
+            return False
 
 
 # =============================================================================
@@ -231,8 +450,19 @@ class VaultUploadService:
     VAULT_FOLDER = VAULT_DOCUMENTS
     CERTS_FOLDER = VAULT_CERTIFICATES
     
-    def __init__(self):
-        self.index = VaultDocumentIndex()
+    def __init__(self, index: Optional[VaultDocumentIndex] = None):
+        self._index = index
+
+    @property
+    def index(self) -> VaultDocumentIndex:
+        """The document index, opened on first use (data/vault_index unless injected)."""
+        if self._index is None:
+            self._index = VaultDocumentIndex()
+        return self._index
+
+    @index.setter
+    def index(self, index: VaultDocumentIndex) -> None:
+        self._index = index
     
     def _compute_sha256(self, content: bytes) -> str:
         """Compute SHA-256 hash of file content."""
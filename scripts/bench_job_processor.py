@@ -0,0 +1,124 @@
+"""
+Benchmark background job throughput.
+
+Runs 10k no-op jobs and 1k simulated document_analysis jobs (awaits with
+progress updates, like the default handler but with a shorter sleep)
+through the persistent JobProcessor. For comparison it also runs the
+previous execution model: worker threads that call asyncio.run() for every
+job.
+
+Usage:
+    python scripts/bench_job_processor.py --noop 10000 --analysis 1000 --analysis-ms 20
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Empty, Queue
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.job_processor import JobProcessor, JobStore  # noqa: E402
+
+
+def make_handlers(processor, analysis_seconds: float):
+    async def noop(payload):
+        return {}
+
+    async def document_analysis(payload):
+        step = analysis_seconds / 4
+        for progress in (25, 50, 75, 100):
+            await asyncio.sleep(step)
+            processor.update_job_progress(payload.get("job_id"), progress)
+        return {"document_id": payload["document_id"], "pages": 10}
+
+    return noop, document_analysis
+
+
+def run_processor(job_type: str, count: int, workers: int, analysis_seconds: float):
+    """Returns (submissions/sec, end-to-end jobs/sec) with the processor running throughout."""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = JobProcessor(max_workers=workers, store=JobStore(str(Path(tmp) / "jobs.db")))
+        noop, analysis = make_handlers(processor, analysis_seconds)
+        processor.register_handler("noop", noop)
+        processor.register_handler("document_analysis", analysis)
+        processor.max_completed_jobs = count
+        processor.start()
+
+        start = time.perf_counter()
+        for i in range(count):
+            processor.submit_job(job_type, {"document_id": f"doc_{i}", "job_id": None})
+        submitted = time.perf_counter() - start
+        while processor.stats["jobs_processed"] < count:
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        processor.stop()
+        return count / submitted, count / elapsed
+
+
+def run_legacy(job_type: str, count: int, workers: int, analysis_seconds: float) -> float:
+    """Previous model: threads pulling from a queue, asyncio.run() per job."""
+    queue: Queue = Queue()
+
+    async def noop(payload):
+        return {}
+
+    async def document_analysis(payload):
+        for _ in range(4):
+            await asyncio.sleep(analysis_seconds / 4)
+        return {}
+
+    handler = noop if job_type == "noop" else document_analysis
+    done = []
+
+    def worker():
+        while True:
+            try:
+                payload = queue.get(timeout=0.5)
+            except Empty:
+                return
+            asyncio.run(asyncio.wait_for(handler(payload), timeout=300))
+            done.append(1)
+
+    start = time.perf_counter()
+    for i in range(count):
+        queue.put({"document_id": f"doc_{i}"})
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(done) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--noop", type=int, default=10000)
+    parser.add_argument("--analysis", type=int, default=1000)
+    parser.add_argument("--analysis-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 32])
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    analysis_seconds = args.analysis_ms / 1000
+    cases = [("noop", args.noop), ("document_analysis", args.analysis)]
+    for workers in args.workers:
+        print(f"{workers} workers")
+        for job_type, count in cases:
+            submit_rate, rate = run_processor(job_type, count, workers, analysis_seconds)
+            line = f"  {job_type:<18} {count:>6} jobs: {rate:8.0f} jobs/sec (submit {submit_rate:6.0f}/sec)"
+            if not args.skip_legacy:
+                legacy = run_legacy(job_type, count, workers, analysis_seconds)
+                line += f" | thread + asyncio.run per job {legacy:8.0f} jobs/sec"
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""
+Benchmark request throughput through the full middleware stack.
+
+Builds the application with create_app() and drives it in-process over
+ASGI (no network, no server) with concurrent clients, reporting
+requests/sec for a small JSON endpoint, the HTML welcome page and a 404.
+Run it before and after a middleware change to compare per-request
+overhead.
+
+Usage:
+    python scripts/bench_middleware.py --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+
+from app.main import create_app  # noqa: E402
+
+ENDPOINTS = {
+    "json": "/api/version",
+    "html": "/",
+    "404": "/api/no-such-endpoint",
+}
+
+
+async def run(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> float:
+    remaining = total
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await client.get(path)
+            await response.aread()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def bench(args) -> None:
+    app = create_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        for name in args.endpoints:
+            path = ENDPOINTS[name]
+            await run(client, path, args.warmup, args.concurrency)
+            rps = await run(client, path, args.requests, args.concurrency)
+            print(f"  {name:<5} {path:<24} {rps:8.0f} req/sec")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS))
+    args = parser.parse_args()
+
+    # Request logging would dominate the measurement
+    logging.disable(logging.CRITICAL)
+    print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}")
+    asyncio.run(bench(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
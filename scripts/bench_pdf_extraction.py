@@ -0,0 +1,143 @@
+"""
+Benchmark PDF text extraction on synthetic mixed text/scanned court packets.
+
+Builds --pages page packets where every --scan-every-th page is an image
+only (a rasterized page, like a scanned exhibit) and the rest carry a text
+layer. It then times:
+
+- legacy: how PDFExtractor.extract() used to run, pdfplumber over the whole
+  file (scanned pages come back empty because the result is accepted as a
+  whole)
+- legacy OCR: the old _local_ocr pass, every page in order on the calling
+  thread with Tesseract for image-only pages
+- per-page on one thread (PDF_EXTRACT_WORKERS=0)
+- per-page on the process pool, with time to the first streamed page
+
+OCR timings need the tesseract binary and pytesseract; without them
+image-only pages are reported as needing OCR.
+
+Usage:
+    python scripts/bench_pdf_extraction.py --pages 100 --scan-every 3 --workers 4 --repeat 3
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import fitz  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.services import pdf_extractor  # noqa: E402
+from app.services.pdf_extractor import PDFExtractor, shutdown_page_executor  # noqa: E402
+
+LINE = "The tenant, {name}, is summoned to appear at the hearing on eviction case 27-CV-{case} re: unpaid rent."
+
+
+def build_packet(pages: int, scan_every: int) -> bytes:
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        text = "\n".join(LINE.format(name=f"Tenant {number}", case=f"{number:05d}-{line}") for line in range(45))
+        page = doc.new_page()
+        if scan_every and number % scan_every == 0:
+            scratch = fitz.open()
+            scratch.new_page().insert_textbox(fitz.Rect(36, 36, 576, 756), text, fontsize=9)
+            page.insert_image(page.rect, pixmap=scratch[0].get_pixmap(dpi=150, colorspace=fitz.csGRAY))
+        else:
+            page.insert_textbox(fitz.Rect(36, 36, 576, 756), text, fontsize=9)
+    content = doc.tobytes(deflate=True)
+    doc.close()
+    return content
+
+
+def legacy_extract(extractor: PDFExtractor, content: bytes) -> int:
+    result = extractor._extract_pdfplumber(content)
+    return sum(1 for page_text in result.text.split("\n\n") if page_text.strip())
+
+
+def legacy_local_ocr(content: bytes) -> int:
+    has_tesseract = pdf_extractor._tesseract_available()
+    doc = fitz.open(stream=content, filetype="pdf")
+    pages_with_text = 0
+    for page in doc:
+        text = page.get_text("text").strip()
+        if not text and has_tesseract:
+            import pytesseract
+            from PIL import Image
+            pix = page.get_pixmap(dpi=200)
+            text = pytesseract.image_to_string(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+        pages_with_text += bool(text.strip())
+    doc.close()
+    return pages_with_text
+
+
+async def per_page(extractor: PDFExtractor, content: bytes) -> tuple[int, float]:
+    """Pages with text and seconds until the first page arrived."""
+    start = time.perf_counter()
+    first = None
+    pages_with_text = 0
+    async for page in extractor.extract_pages(content):
+        if first is None:
+            first = time.perf_counter() - start
+        pages_with_text += bool(page.text.strip())
+    return pages_with_text, first
+
+
+def timed(run, repeat: int):
+    samples, outcome = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outcome = run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), outcome
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--scan-every", type=int, default=3, help="every Nth page is image only (0 = none)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    content = build_packet(args.pages, args.scan_every)
+    scanned = args.pages // args.scan_every if args.scan_every else 0
+    print(f"{args.pages}-page packet, {scanned} scanned pages, {len(content) / 1e6:.1f} MB; "
+          f"tesseract {'available' if pdf_extractor._tesseract_available() else 'NOT installed (OCR skipped)'}")
+
+    extractor = PDFExtractor()
+    settings = get_settings()
+    rows = []
+
+    seconds, pages = timed(lambda: legacy_extract(extractor, content), args.repeat)
+    rows.append(("legacy (pdfplumber, whole file)", seconds, None, pages))
+    seconds, pages = timed(lambda: legacy_local_ocr(content), args.repeat)
+    rows.append(("legacy OCR pass (serial)", seconds, None, pages))
+
+    settings.pdf_extract_workers = 0
+    seconds, (pages, first) = timed(lambda: asyncio.run(per_page(extractor, content)), args.repeat)
+    rows.append(("per-page, one thread", seconds, first, pages))
+
+    settings.pdf_extract_workers = args.workers
+    asyncio.run(per_page(extractor, build_packet(pdf_extractor.PARALLEL_MIN_PAGES, 0)))  # spawn workers first
+    seconds, (pages, first) = timed(lambda: asyncio.run(per_page(extractor, content)), args.repeat)
+    rows.append((f"per-page, {args.workers} processes", seconds, first, pages))
+    shutdown_page_executor()
+
+    print(f"\n{'method':34} {'total s':>8} {'first page s':>13} {'pages with text':>16}")
+    for name, seconds, first, pages in rows:
+        first_text = f"{first:.3f}" if first is not None else "-"
+        print(f"  {name:32} {seconds:>8.3f} {first_text:>13} {pages:>10}/{args.pages}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+"""
+Microbenchmark AdvancedRateLimiter.is_allowed().
+
+Spreads calls over --keys distinct clients (user/IP pairs, half reads and
+half writes) and reports is_allowed() calls per second, single-threaded and
+with --threads threads, plus the memory held per tracked key.
+
+For comparison it runs the same limiter on the previous model's state: one
+RLock around everything and a deque of request timestamps per key.
+
+Usage:
+    python scripts/bench_rate_limiter.py --keys 100000 --calls 500000 --threads 8
+    python scripts/bench_rate_limiter.py --redis redis://localhost:6379/0
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.advanced_rate_limiter import (  # noqa: E402
+    AdvancedRateLimiter,
+    RateLimitDecision,
+    RedisRateLimitBackend,
+)
+
+
+class DequeBackend:
+    """The previous model: one RLock for everything, a timestamp deque per key."""
+    name = "deque"
+
+    def __init__(self):
+        self.windows = defaultdict(deque)
+        self.lock = threading.RLock()
+
+    def check(self, client_key, strategy, limit, window):
+        with self.lock:
+            now = time.time()
+            history = self.windows[client_key]
+            cutoff = now - window
+            while history and history[0] < cutoff:
+                history.popleft()
+            if len(history) < limit:
+                history.append(now)
+                return RateLimitDecision(allowed=True, remaining=limit - len(history))
+            return RateLimitDecision(allowed=False, retry_after=history[0] + window - now)
+
+
+def deque_limiter() -> AdvancedRateLimiter:
+    return AdvancedRateLimiter(backend=DequeBackend())
+
+
+def iter_requests(keys: int, calls: int):
+    for i in range(calls):
+        key = i % keys
+        yield f"user{key}", f"10.0.{key // 256 % 256}.{key % 256}", "GET" if key % 2 else "POST", "/api/documents"
+
+
+def requests_for(keys: int, calls: int) -> list:
+    return list(iter_requests(keys, calls))
+
+
+def run(limiter, requests, threads: int) -> float:
+    def work(chunk):
+        check = limiter.is_allowed
+        for request in chunk:
+            check(*request)
+
+    chunks = [requests[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=work, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(requests) / (time.perf_counter() - start)
+
+
+def bytes_per_key(factory, keys: int, per_key: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    limiter = factory()
+    for request in iter_requests(keys, keys * per_key):
+        limiter.is_allowed(*request)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / keys
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=500_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--memory-keys", type=int, default=20_000)
+    parser.add_argument("--redis", default="", help="also run the Redis backend against this URL")
+    args = parser.parse_args()
+    logging.getLogger("app.core.advanced_rate_limiter").setLevel(logging.ERROR)
+
+    requests = requests_for(args.keys, args.calls)
+    print(f"{args.calls} is_allowed() calls over {args.keys} keys")
+    for name, factory in (("striped state", AdvancedRateLimiter), ("deque + RLock", deque_limiter)):
+        single = run(factory(), requests, 1)
+        threaded = run(factory(), requests, args.threads)
+        print(f"  {name:17} {single:>10,.0f} calls/s   {args.threads} threads {threaded:>10,.0f} calls/s")
+
+    print(f"memory per key after 200 requests each ({args.memory_keys} keys)")
+    for name, factory in (("striped state", AdvancedRateLimiter), ("deque + RLock", deque_limiter)):
+        print(f"  {name:17} {bytes_per_key(factory, args.memory_keys, 200):>10,.0f} bytes")
+
+    if args.redis:
+        limiter = AdvancedRateLimiter()
+        limiter.backend = RedisRateLimitBackend(args.redis, idle_ttl=limiter.idle_ttl)
+        sample = requests[:min(len(requests), 50_000)]
+        print(f"  redis backend     {run(limiter, sample, 1):>10,.0f} calls/s   "
+              f"{args.threads} threads {run(limiter, sample, args.threads):>10,.0f} calls/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark the persistent search index.
+
+Indexes synthetic vault documents, flushes them to on-disk segments, reopens
+the index and reports insert throughput, RSS, and p50/p99 query latency.
+
+Usage:
+    python scripts/bench_search_index.py --docs 100000 --queries 500
+"""
+
+import argparse
+import logging
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.search_engine import SearchEngine, SearchOperator  # noqa: E402
+
+VOCABULARY = (
+    "lease rent tenant landlord eviction notice court hearing deposit repair mold heat water "
+    "payment receipt late fee summons complaint answer judge housing inspection violation "
+    "apartment unit building utilities maintenance agreement termination retaliation habitability "
+    "escrow writ sheriff appeal mediation settlement ledger balance invoice photo evidence"
+).split()
+DOC_TYPES = ("lease", "notice", "receipt", "photo", "court_filing", "letter")
+QUERIES = (
+    "eviction notice", "rent receipt", "mold repair", "court hearing summons",
+    "security deposit", "late fee ledger", "heat water violation", "writ sheriff",
+)
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource
+        # ru_maxrss is KB on Linux (peak, not current)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_document(rng: random.Random, n: int) -> dict:
+    words = rng.choices(VOCABULARY, k=rng.randint(80, 400))
+    return {
+        "document_id": f"doc-{n:07d}",
+        "user_id": f"user-{n % 2000:05d}",
+        "title": " ".join(rng.sample(VOCABULARY, 3)).title(),
+        "content": " ".join(words),
+        "metadata": {"doc_type": rng.choice(DOC_TYPES)},
+        "file_type": rng.choice(("pdf", "png", "docx", "txt")),
+        "tags": rng.sample(DOC_TYPES, 2),
+    }
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_queries(engine: SearchEngine, rng: random.Random, count: int, users: int) -> list:
+    latencies = []
+    for _ in range(count):
+        query = rng.choice(QUERIES)
+        operator = rng.choice((SearchOperator.AND, SearchOperator.OR))
+        user_id = f"user-{rng.randrange(users):05d}" if rng.random() < 0.5 else None
+        start = time.perf_counter()
+        engine.search(query, user_id=user_id, operator=operator, limit=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list) -> None:
+    print(f"  {label}: p50={statistics.median(latencies):.2f}ms "
+          f"p99={percentile(latencies, 0.99):.2f}ms  rss={rss_mb():.0f}MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--flush-threshold", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--index-dir", help="Keep the index here instead of a temp dir")
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    index_dir = Path(args.index_dir) if args.index_dir else Path(tempfile.mkdtemp(prefix="semptify_bench_"))
+
+    try:
+        print(f"Indexing {args.docs:,} documents into {index_dir}")
+        baseline_rss = rss_mb()
+        engine = SearchEngine(index_dir=str(index_dir))
+        engine.index.flush_threshold = args.flush_threshold
+        documents = (synthetic_document(rng, n) for n in range(args.docs))
+
+        start = time.perf_counter()
+        for doc in documents:
+            engine.index_document(doc["document_id"], doc["user_id"], doc["title"], doc["content"],
+                                  doc["metadata"], doc["file_type"], doc["tags"])
+        engine.index.flush()
+        elapsed = time.perf_counter() - start
+        print(f"  insert: {args.docs / elapsed:,.0f} docs/sec ({elapsed:.1f}s), "
+              f"segments={len(engine.index.segments)}, rss_delta={rss_mb() - baseline_rss:.0f}MB")
+
+        report("query (warm)", run_queries(engine, rng, args.queries, 2000))
+        engine.index.close()
+
+        start = time.perf_counter()
+        reopened = SearchEngine(index_dir=str(index_dir))
+        print(f"  reopen: {(time.perf_counter() - start) * 1000:.0f}ms "
+              f"({reopened.index.total_documents:,} documents)")
+        report("query (reopened)", run_queries(reopened, rng, args.queries, 2000))
+        reopened.index.close()
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
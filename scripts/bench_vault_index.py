@@ -0,0 +1,109 @@
+"""
+Benchmark the vault document index.
+
+Seeds the index with N documents, then measures upload (add) throughput,
+reopen time and a first per-user lookup, next to the cost of the old
+full-JSON rewrite that every add used to pay.
+
+Usage:
+    python scripts/bench_vault_index.py --sizes 1000 10000 100000 --uploads 200
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.vault_upload_service import VaultDocument, VaultDocumentIndex  # noqa: E402
+
+
+def synthetic_document(n: int) -> VaultDocument:
+    return VaultDocument(
+        vault_id=f"doc-{n:07d}",
+        user_id=f"user-{n % 2000:05d}",
+        filename=f"upload_{n}.pdf",
+        safe_filename=f"doc-{n:07d}.pdf",
+        sha256_hash=f"{n:064x}",
+        file_size=50_000 + n,
+        mime_type="application/pdf",
+        document_type="lease",
+        description="Synthetic benchmark document",
+        tags=["benchmark"],
+        storage_path=f"Semptify5.0/Vault/documents/doc-{n:07d}.pdf",
+        storage_provider="google_drive",
+        certificate_id=f"cert-{n:07d}",
+        uploaded_at="2026-01-01T00:00:00+00:00",
+        extracted_data={"parties": ["tenant", "landlord"], "amounts": [1200, 50]},
+    )
+
+
+def seed(index_dir: Path, size: int) -> None:
+    """Write a legacy vault_index.json; the index migrates it on first open."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    documents = {f"doc-{n:07d}": synthetic_document(n).to_dict() for n in range(size)}
+    with open(index_dir / "vault_index.json", "w", encoding="utf-8") as f:
+        json.dump({"documents": documents}, f)
+    VaultDocumentIndex(data_dir=str(index_dir)).close()
+
+
+def legacy_save_seconds(index_dir: Path, size: int, samples: int = 3) -> float:
+    """Time of one old-style _save() (every document, indent=2) at this size."""
+    documents = {f"doc-{n:07d}": synthetic_document(n).to_dict() for n in range(size)}
+    start = time.perf_counter()
+    for _ in range(samples):
+        with open(index_dir / "legacy_rewrite.json", "w", encoding="utf-8") as f:
+            json.dump({"documents": documents}, f, indent=2)
+    return (time.perf_counter() - start) / samples
+
+
+def run(size: int, uploads: int, base: Path) -> None:
+    index_dir = base / f"index_{size}"
+    seed(index_dir, size)
+
+    start = time.perf_counter()
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    open_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index.get_user_documents("user-00042")
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for n in range(size, size + uploads):
+        index.add(synthetic_document(n))
+    elapsed = time.perf_counter() - start
+    index.close()
+
+    legacy = legacy_save_seconds(index_dir, size)
+    print(f"  {size:>7,} docs: {uploads / elapsed:8,.0f} adds/sec ({elapsed / uploads * 1000:.2f}ms each) | "
+          f"legacy rewrite {legacy * 1000:8.1f}ms each | open {open_ms:.0f}ms | "
+          f"first user lookup {lookup_ms:.2f}ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--uploads", type=int, default=200)
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    base = Path(tempfile.mkdtemp(prefix="semptify_vault_bench_"))
+    try:
+        print(f"Vault index benchmark ({args.uploads} uploads per size)")
+        for size in args.sizes:
+            run(size, args.uploads, base)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+"""
+Benchmark VaultSearchService on a synthetic 1M-row vault_items table.
+
+Seeds --rows vault items spread over --users users in a PostgreSQL database,
+then times four queries per user, first the way search() used to run them
+(ILIKE without trigram indexes, exact COUNT(*) on every page, OFFSET paging,
+unindexed metadata containment) and again after applying the
+20250425_vault_search_trgm migration, using the current service. Count
+caching is disabled for the timed runs, so every call pays for its count.
+
+The users, incidents, vault_items and vault_audit_logs tables in the target
+database are dropped and recreated: point it at a scratch database.
+
+Usage:
+    python scripts/bench_vault_search.py \\
+        --database-url postgresql+asyncpg://postgres@localhost/semptify_bench \\
+        --rows 1000000 --users 50 --repeat 5
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import desc, func, or_, select, text, type_coerce  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+from app.models.models import Incident, User, VaultAuditLog, VaultItem  # noqa: E402
+from app.services import vault_search  # noqa: E402
+from app.services.vault_search import SearchCriteria, VaultSearchService  # noqa: E402
+
+MIGRATION = ROOT / "alembic" / "versions" / "20250425_vault_search_trgm.py"
+TABLES = [User.__table__, Incident.__table__, VaultItem.__table__, VaultAuditLog.__table__]
+PAGE_SIZE = 50
+DEEP_PAGE = 100
+
+SEED_USERS = """
+INSERT INTO users (id, primary_provider, storage_user_id, default_role, intensity_level, created_at, updated_at)
+SELECT 'bench' || lpad(u::text, 6, '0'), 'google_drive', 'bench' || u, 'user', 'low', now(), now()
+FROM generate_series(1, :users) AS u
+"""
+
+SEED_ITEMS = """
+INSERT INTO vault_items (
+    user_id, event_time, record_time, semptify_entry_time, item_type, tags, source,
+    severity, status, item_metadata, title, summary, created_at, updated_at
+)
+SELECT
+    'bench' || lpad((1 + i % :users)::text, 6, '0'),
+    ts, ts, ts + interval '1 day',
+    (ARRAY['notice', 'lease', 'photo', 'email', 'receipt'])[1 + i % 5],
+    '[]'::jsonb, 'upload',
+    (ARRAY['low', 'normal', 'high', 'critical'])[1 + i % 4],
+    'pending',
+    jsonb_build_object(
+        'landlord', (ARRAY['ABC Management', 'XYZ Rentals', 'Lakeside Properties', 'North Star Housing'])[1 + i % 4],
+        'unit', (i % 400)::text || 'B',
+        'amount', i % 3000
+    ),
+    (ARRAY['Rent', 'Repair', 'Eviction', 'Mold', 'Deposit', 'Heat', 'Lease', 'Noise'])[1 + (i * 7) % 8]
+        || ' ' || (ARRAY['notice', 'request', 'photo', 'letter', 'receipt', 'complaint'])[1 + (i * 13) % 6]
+        || ' ' || i,
+    'Tenant reports ' || (ARRAY['a leaking pipe', 'no heat', 'a rent increase', 'mold', 'pests'])[1 + (i * 3) % 5]
+        || ' in unit ' || (i % 400),
+    ts, ts
+FROM (
+    SELECT i, timestamptz '2023-01-01' + i * interval '97 seconds' AS ts
+    FROM generate_series(:start, :stop - 1) AS i
+) AS rows
+"""
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("vault_search_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def apply_migration(sync_conn) -> None:
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    context = MigrationContext.configure(sync_conn)
+    with Operations.context(context):
+        load_migration().upgrade()
+
+
+def reset_schema(sync_conn) -> None:
+    Base.metadata.drop_all(sync_conn, tables=TABLES)
+    Base.metadata.create_all(sync_conn, tables=TABLES)
+
+
+async def seed(engine, rows: int, users: int, batch: int = 100_000) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(reset_schema)
+        # The models declare generic JSON; the real migrations create jsonb
+        for column in ("tags", "location_data", "item_metadata"):
+            await conn.execute(text(
+                f"ALTER TABLE vault_items ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb"
+            ))
+        await conn.execute(text(SEED_USERS), {"users": users})
+    for start in range(0, rows, batch):
+        async with engine.begin() as conn:
+            await conn.execute(text(SEED_ITEMS), {"users": users, "start": start, "stop": min(rows, start + batch)})
+        print(f"  seeded {min(rows, start + batch):,} rows", end="\r", flush=True)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE vault_items"))
+    print()
+
+
+# -- the previous search() query shapes ----------------------------------------
+
+async def legacy_page(db, query, offset: int) -> tuple[int, int]:
+    total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
+    page = query.order_by(desc(VaultItem.event_time)).offset(offset).limit(PAGE_SIZE + 1)
+    items = (await db.execute(page)).scalars().all()
+    return total, len(items)
+
+
+def legacy_queries(user_id: str) -> dict:
+    base = select(VaultItem).where(VaultItem.user_id == user_id)
+    return {
+        "text 'rent'": lambda db: legacy_page(db, base.where(or_(
+            VaultItem.title.ilike("%rent%"), VaultItem.summary.ilike("%rent%"))), 0),
+        "fuzzy 'evction'": lambda db: legacy_page(db, base.where(or_(
+            VaultItem.title.ilike("%evction%"), VaultItem.summary.ilike("%evction%"))), 0),
+        "metadata landlord": lambda db: legacy_page(db, base.where(
+            type_coerce(VaultItem.item_metadata, JSONB).contains({"landlord": "XYZ Rentals"})), 0),
+        f"timeline page {DEEP_PAGE}": lambda db: legacy_page(db, base, DEEP_PAGE * PAGE_SIZE),
+    }
+
+
+# -- the current service --------------------------------------------------------
+
+async def service_page(db, user_id: str, criteria: SearchCriteria) -> tuple[int, int]:
+    result = await VaultSearchService(db).search(user_id, criteria)
+    return result.total_count, len(result.items)
+
+
+async def deep_cursor(db, user_id: str) -> str:
+    """Walk the timeline once to find the cursor that starts page DEEP_PAGE."""
+    criteria = SearchCriteria(limit=PAGE_SIZE)
+    for _ in range(DEEP_PAGE):
+        criteria.cursor = (await VaultSearchService(db).search(user_id, criteria)).next_cursor
+    return criteria.cursor
+
+
+def service_queries(user_id: str, cursor: str) -> dict:
+    async def metadata(db):
+        result = await VaultSearchService(db).deep_metadata_search(user_id, "landlord", "XYZ Rentals", limit=PAGE_SIZE)
+        return result.total_count, len(result.items)
+
+    return {
+        "text 'rent'": lambda db: service_page(db, user_id, SearchCriteria(query="rent", limit=PAGE_SIZE)),
+        "fuzzy 'evction'": lambda db: service_page(db, user_id, SearchCriteria(query="evction", limit=PAGE_SIZE)),
+        "metadata landlord": metadata,
+        f"timeline page {DEEP_PAGE}": lambda db: service_page(db, user_id, SearchCriteria(limit=PAGE_SIZE, cursor=cursor)),
+    }
+
+
+async def measure(session_factory, build, user_ids, repeat: int) -> dict:
+    """Median/p95 milliseconds and (total, page size) of the last run, per query name."""
+    timings, outcomes = {}, {}
+    for user_id in user_ids:
+        async with session_factory() as db:
+            for name, run in (await build(db, user_id)).items():
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    outcomes[name] = await run(db)
+                    timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+    return {
+        name: (
+            statistics.median(samples),
+            statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0],
+            outcomes[name],
+        )
+        for name, samples in timings.items()
+    }
+
+
+async def main_async(args) -> int:
+    engine = create_async_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        print("This benchmark needs a PostgreSQL database URL")
+        return 2
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user_ids = [f"bench{n:06d}" for n in range(1, min(args.users, args.sample_users) + 1)]
+
+    if not args.skip_seed:
+        print(f"seeding {args.rows:,} vault items for {args.users} users")
+        start = time.perf_counter()
+        await seed(engine, args.rows, args.users)
+        print(f"  {time.perf_counter() - start:.1f}s")
+
+    async def build_legacy(db, user_id):
+        return legacy_queries(user_id)
+
+    print(f"before: {len(user_ids)} users x {args.repeat} runs each")
+    before = await measure(session_factory, build_legacy, user_ids, args.repeat)
+
+    print("applying 20250425_vault_search_trgm")
+    start = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.run_sync(apply_migration)
+    print(f"  {time.perf_counter() - start:.1f}s")
+
+    # Every timed call pays for its count; cached totals would make later pages free
+    async def uncached(key, loader, ttl=None, tags=None):
+        return await loader()
+    vault_search.cache.get_or_set = uncached
+
+    async def build_current(db, user_id):
+        return service_queries(user_id, await deep_cursor(db, user_id))
+
+    after = await measure(session_factory, build_current, user_ids, args.repeat)
+
+    print(f"\n{'query':22} {'before p50/p95 ms':>20} {'after p50/p95 ms':>20}   rows before -> after")
+    for name in before:
+        b50, b95, (b_total, _) = before[name]
+        a50, a95, (a_total, _) = after[name]
+        print(f"  {name:20} {b50:>9.1f} / {b95:<9.1f} {a50:>9.1f} / {a95:<9.1f}   {b_total} -> {a_total}")
+    await engine.dispose()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True, help="postgresql+asyncpg:// URL of a scratch database")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sample-users", type=int, default=5, help="users to run the queries for")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse rows from a previous run (pre-migration)")
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.ERROR)
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+"""
+Load-test WebSocket broadcast fan-out.
+
+Connects 5k simulated local clients to a WebSocketManager. Each client's
+send_text yields to the event loop like a socket write; a small share of
+them are slow (every frame takes --slow-ms) and a few never accept a frame
+at all. It then broadcasts messages and job progress updates and reports
+how long the healthy clients took to receive each broadcast, plus queue
+depth, drops and coalesced messages.
+
+For comparison it runs the previous model: await send_text on every
+connection in turn, re-encoding per publish (stalled clients are left out
+there, since one would block the loop forever).
+
+Usage:
+    python scripts/bench_websocket_fanout.py --connections 5000 --messages 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.websocket_manager import WebSocketManager, WebSocketMessage  # noqa: E402
+
+
+class SimulatedSocket:
+    def __init__(self, delay: float = 0.0, stalled: bool = False):
+        self.delay = delay
+        self.stalled = stalled
+        self.received = 0
+        self.last_at = 0.0
+
+    async def send_text(self, text):
+        if self.stalled:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last_at = time.perf_counter()
+
+    async def close(self, code=1000):
+        pass
+
+
+def build_sockets(count: int, slow_share: float, slow_ms: float, stalled: int):
+    slow = int(count * slow_share)
+    sockets = [SimulatedSocket(stalled=True) for _ in range(stalled)]
+    sockets += [SimulatedSocket(delay=slow_ms / 1000) for _ in range(slow)]
+    sockets += [SimulatedSocket() for _ in range(count - len(sockets))]
+    healthy = sockets[stalled + slow:]
+    return sockets, healthy
+
+
+def note(n: int) -> WebSocketMessage:
+    return WebSocketMessage(type="system_alert", data={"message": f"note {n}", "severity": "info"},
+                            timestamp=datetime.now(timezone.utc))
+
+
+async def run_queued(args) -> dict:
+    manager = WebSocketManager(max_queue_size=args.queue_size)
+    sockets, healthy = build_sockets(args.connections, args.slow_share, args.slow_ms, args.stalled)
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, f"user{i % 1000}")
+    expected = 1
+    while any(ws.received < expected for ws in healthy):
+        await asyncio.sleep(0.001)
+
+    latencies, enqueue = [], []
+    for n in range(args.messages):
+        start = time.perf_counter()
+        await manager.broadcast_to_all(note(n))
+        enqueue.append(time.perf_counter() - start)
+        expected += 1
+        while any(ws.received < expected for ws in healthy):
+            await asyncio.sleep(0.0005)
+        latencies.append(max(ws.last_at for ws in healthy) - start)
+
+    # Progress bursts: 20 updates per job for 100 users; slow clients keep only the latest
+    for step in range(20):
+        for user in range(100):
+            await manager.send_job_status_update(f"user{user}", f"job{user}", "running", step * 5)
+    await asyncio.sleep(args.slow_ms / 1000 * 3)
+
+    stats = manager.get_connection_stats()
+    await manager.shutdown()
+    return {"latencies": latencies, "enqueue": enqueue, "stats": stats}
+
+
+async def run_serial(args) -> list:
+    sockets, healthy = build_sockets(args.connections, args.slow_share, args.slow_ms, 0)
+    latencies = []
+    for n in range(args.messages):
+        start = time.perf_counter()
+        message = note(n)
+        for ws in sockets:
+            await ws.send_text(json.dumps(message.to_dict()))
+        latencies.append(max(ws.last_at for ws in healthy) - start)
+    return latencies
+
+
+def summary(latencies: list) -> str:
+    ms = sorted(value * 1000 for value in latencies)
+    return (f"p50 {statistics.median(ms):8.1f} ms  p99 {ms[int(0.99 * (len(ms) - 1))]:8.1f} ms  "
+            f"total {sum(ms) / 1000:6.2f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--slow-share", type=float, default=0.01)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    parser.add_argument("--stalled", type=int, default=5)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+    logging.getLogger("app.core.websocket_manager").setLevel(logging.WARNING)
+
+    result = asyncio.run(run_queued(args))
+    stats = result["stats"]
+    print(f"{args.connections} connections, {args.messages} broadcasts, "
+          f"{int(args.connections * args.slow_share)} slow ({args.slow_ms:.0f} ms/frame), {args.stalled} stalled")
+    print(f"  queued fan-out    {summary(result['latencies'])}  "
+          f"(broadcast call p50 {statistics.median(result['enqueue']) * 1000:.1f} ms)")
+    print(f"    queued now {stats['queued_messages']}, max depth {stats['max_queue_depth']}, "
+          f"dropped {stats['messages_dropped']}, coalesced {stats['messages_coalesced']}")
+    if not args.skip_serial:
+        print(f"  serial send_text  {summary(asyncio.run(run_serial(args)))}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
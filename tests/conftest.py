@@ -15,6 +15,8 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test_semptify.db"
 os.environ["TESTING"] = "true"
 os.environ["INVITE_CODES"] = "TEST-INVITE-CODE"
 os.environ["ADMIN_PIN"] = "TEST-PIN"
+# Extraction results must not carry over between runs; tests that need the cache build their own
+os.environ["EXTRACTION_CACHE_MAX_MB"] = "0"
 
 from app.main import app
 from app.core.config import get_settings
@@ -47,6 +49,10 @@ async def setup_test_database():
 
     yield
 
+    # Write buffered audit events before their table goes away
+    from app.core.audit_store import stop_audit_store
+    await stop_audit_store()
+
     # Cleanup after test
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
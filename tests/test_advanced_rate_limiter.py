@@ -0,0 +1,179 @@
+"""
+Tests for AdvancedRateLimiter.
+
+Tests cover:
+- Sliding-window counter and GCRA token bucket limits
+- Violation blocking without per-request history
+- Idle key expiry
+- Redis backend: limits shared by two limiters, local fallback
+"""
+
+import threading
+
+import pytest
+
+from app.core.advanced_rate_limiter import (
+    AdvancedRateLimiter,
+    LocalRateLimitBackend,
+    RateLimitState,
+    RateLimitStrategy,
+    RedisRateLimitBackend,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_020.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limiter(clock):
+    return AdvancedRateLimiter(clock=clock)
+
+
+def test_sliding_window_allows_limit_then_blocks(limiter):
+    # BASIC auth: 10 per 60s
+    results = [limiter.is_allowed("u1", "1.1.1.1", "POST", "/api/auth/login")[0] for _ in range(11)]
+    assert results == [True] * 10 + [False]
+    allowed, details = limiter.is_allowed("u1", "1.1.1.1", "POST", "/api/auth/login")
+    assert not allowed
+    assert details["reason"] == "rate_limit_exceeded"
+    assert details["retry_after"] >= 1
+
+
+def test_sliding_window_weights_previous_window(limiter, clock):
+    for _ in range(10):
+        assert limiter.is_allowed("u1", "ip", "POST", "/auth")[0]
+    # Halfway through the next window half of the previous count still applies
+    clock.now = (clock.now // 60 + 1) * 60 + 30
+    results = [limiter.is_allowed("u1", "ip", "POST", "/auth")[0] for _ in range(6)]
+    assert results == [True] * 5 + [False]
+    # Two windows later everything has aged out
+    clock.now += 120
+    assert limiter.is_allowed("u1", "ip", "POST", "/auth")[0]
+
+
+def test_token_bucket_refills_at_rate(limiter, clock):
+    # BASIC upload: 50 per 60s, one token every 1.2s
+    for _ in range(50):
+        assert limiter.is_allowed("u1", "ip", "POST", "/upload")[0]
+    allowed, details = limiter.is_allowed("u1", "ip", "POST", "/upload")
+    assert not allowed
+    assert details["retry_after"] == 2  # ceil(1.2)
+    clock.now += 1.2
+    assert limiter.is_allowed("u1", "ip", "POST", "/upload")[0]
+    assert not limiter.is_allowed("u1", "ip", "POST", "/upload")[0]
+
+
+def test_state_is_fixed_size():
+    backend = LocalRateLimitBackend(idle_ttl=3600, clock=FakeClock())
+    for _ in range(5000):
+        backend.check("k", RateLimitStrategy.SLIDING_WINDOW, 10000, 60)
+    state = backend.get_state("k")
+    assert isinstance(state, RateLimitState)
+    assert not hasattr(state, "__dict__")
+    assert state.curr_count == 5000
+
+
+def test_repeated_violations_block_client(limiter, clock):
+    for _ in range(10):
+        limiter.is_allowed("u1", "ip", "POST", "/auth")
+    for _ in range(10):
+        limiter.is_allowed("u1", "ip", "POST", "/auth")
+    allowed, details = limiter.is_allowed("u1", "ip", "POST", "/auth")
+    assert not allowed
+    assert details["reason"] == "client_blocked"
+    assert details["retry_after"] == 300
+    status = limiter.get_client_status("u1", "ip")
+    assert status["auth"]["blocked"] is True
+    assert status["auth"]["violations"] == 10
+    stats = limiter.get_stats()
+    assert stats["blocked_clients"] == 1
+    assert stats["violations_by_endpoint"] == {"auth": 10}
+
+    limiter.reset_client("u1", "ip")
+    assert limiter.is_allowed("u1", "ip", "POST", "/auth")[0]
+
+
+def test_idle_keys_expire(clock):
+    backend = LocalRateLimitBackend(idle_ttl=3600, stripes=1, clock=clock)
+    for i in range(100):
+        backend.check(f"key{i}", RateLimitStrategy.SLIDING_WINDOW, 10, 60)
+    assert backend.key_counts() == (100, 0)
+    clock.now += 3601
+    # The first check after the sweep interval drops the stripe's idle keys
+    backend.check("fresh", RateLimitStrategy.SLIDING_WINDOW, 100, 60)
+    assert backend.key_counts() == (1, 0)
+
+
+def test_load_factor_applies_to_token_buckets(limiter):
+    # BASIC upload: 50 per 60s, halved under load
+    limiter.update_load_factors(global_load=0.5)
+    results = [limiter.is_allowed("u1", "ip", "POST", "/upload")[0] for _ in range(26)]
+    assert results == [True] * 25 + [False]
+
+
+def test_concurrent_checks_respect_limit(limiter):
+    results = []
+
+    def worker():
+        for _ in range(50):
+            results.append(limiter.is_allowed("shared", "ip", "POST", "/auth")[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(results) == 10
+    assert limiter.get_stats()["total_requests"] == 400
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeServer()
+
+
+def redis_limiter(server):
+    import fakeredis
+    limiter = AdvancedRateLimiter()
+    limiter.backend = RedisRateLimitBackend(client=fakeredis.FakeRedis(server=server), idle_ttl=limiter.idle_ttl)
+    return limiter
+
+
+def test_redis_backend_shares_limits_across_workers(redis_server):
+    worker_a = redis_limiter(redis_server)
+    worker_b = redis_limiter(redis_server)
+    results = []
+    for i in range(12):
+        worker = worker_a if i % 2 else worker_b
+        results.append(worker.is_allowed("u1", "ip", "POST", "/auth")[0])
+    assert results == [True] * 10 + [False] * 2
+
+    for _ in range(50):
+        assert worker_a.is_allowed("u2", "ip", "POST", "/upload")[0]
+    assert not worker_b.is_allowed("u2", "ip", "POST", "/upload")[0]
+    assert worker_b.get_client_status("u2", "ip")["upload"]["violations"] == 1
+
+
+def test_redis_backend_falls_back_to_local_state():
+    class BrokenRedis:
+        def register_script(self, script):
+            def run(**kwargs):
+                raise ConnectionError("redis down")
+            return run
+
+    limiter = AdvancedRateLimiter()
+    limiter.backend = RedisRateLimitBackend(client=BrokenRedis(), idle_ttl=limiter.idle_ttl)
+    results = [limiter.is_allowed("u1", "ip", "POST", "/auth")[0] for _ in range(11)]
+    assert results == [True] * 10 + [False]
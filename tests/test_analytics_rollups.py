@@ -0,0 +1,150 @@
+"""
+Tests for incremental analytics rollups.
+
+Tests cover:
+- Bucket plans that tile a range with few, coarse buckets
+- HyperLogLog and latency sketch accuracy
+- aggregate_metrics past the raw event cap, merged across workers
+- Reports over ranges whose minute buckets have expired
+- Concurrent flushes from the writer and readers
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.analytics_engine import AnalyticsEngine, AnalyticsEvent, AnalyticsEventType, TimePeriod
+from app.core.analytics_rollups import (
+    AnalyticsRollups,
+    HyperLogLog,
+    LatencySketch,
+    bucket_end,
+    bucket_start,
+    plan_buckets,
+)
+
+
+def test_plan_tiles_range_with_coarse_buckets():
+    now = datetime(2026, 10, 16, 12, 34, 56, tzinfo=timezone.utc)
+    start = now - timedelta(days=30)
+    plan = plan_buckets(start, now, now=now)
+
+    assert len(plan) < 200
+    assert {"minute", "hour", "day", "week"} <= {resolution for resolution, _ in plan}
+    # Contiguous and non-overlapping to past the end; minutes that old have
+    # expired, so the plan starts on the hour
+    assert plan[0] == ("hour", start.replace(minute=0, second=0, microsecond=0))
+    for (resolution, begin), (_, following) in zip(plan, plan[1:]):
+        assert bucket_end(resolution, begin) == following
+    assert bucket_end(*plan[-1]) > now
+
+    # Minute buckets from last month are gone; the enclosing hours stand in
+    old = plan_buckets(now - timedelta(days=20, minutes=30), now - timedelta(days=20), now=now)
+    assert [resolution for resolution, _ in old] == ["hour"]
+
+
+def test_sketch_accuracy():
+    users = HyperLogLog()
+    for i in range(20000):
+        users.add_hash(HyperLogLog.hash(f"user-{i}"))
+    assert users.count() == pytest.approx(20000, rel=0.05)
+
+    few = HyperLogLog()
+    for i in range(50):
+        few.add_hash(HyperLogLog.hash(f"user-{i}"))
+    assert few.count() == pytest.approx(50, abs=1)
+
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(10000)]
+    latency = LatencySketch()
+    for value in values:
+        latency.add(value)
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        assert latency.quantile(q) == pytest.approx(values[int(q * (len(values) - 1))], rel=0.02)
+    assert latency.mean == pytest.approx(sum(values) / len(values))
+
+
+async def test_metrics_past_event_cap_and_across_workers():
+    first = AnalyticsEngine(max_events=1000, rollups=AnalyticsRollups("worker-a"))
+    for i in range(3000):
+        first.track_api_request(
+            endpoint=f"/api/documents/{i % 3}", method="GET", user_id=f"GU{i % 40:08d}",
+            status_code=500 if i % 10 == 0 else 200, duration_ms=float(i % 100),
+        )
+    first.track_event(AnalyticsEventType.FEATURE_USED, user_id="GU00000001", metadata={"feature": "timeline"})
+    first.track_document_event(AnalyticsEventType.DOCUMENT_UPLOAD, "GU00000002", doc_type="lease")
+
+    second = AnalyticsEngine(rollups=AnalyticsRollups("worker-b"))
+    for i in range(500):
+        second.track_api_request(endpoint="/api/health", method="GET", user_id=f"GUb{i % 10:07d}", duration_ms=1.0)
+    await second.rollups.flush()
+
+    metrics = await first.aggregate_metrics(TimePeriod.DAY)
+    assert len(first.events) <= 1000
+    assert metrics.total_requests == 3500
+    assert metrics.error_count == 300
+    assert metrics.error_rate == pytest.approx(300 / 3500)
+    assert metrics.unique_users == pytest.approx(50, abs=1)
+    assert metrics.top_endpoints[0] == {"endpoint": "/api/documents/0", "count": 1000}
+    assert metrics.feature_usage == {"timeline": 1}
+    assert metrics.document_metrics == {"lease": 1}
+    assert metrics.avg_response_time == pytest.approx((3000 * 49.5 + 500) / 3500)
+    assert metrics.response_time_percentiles["p99"] == pytest.approx(98, rel=0.02)
+
+    # Reads cost buckets, not events
+    assert first.rollups.stats["buckets_read"] < 200
+
+
+async def test_report_over_expired_minutes():
+    rollups = AnalyticsRollups("worker-old")
+    when = (datetime.now(timezone.utc) - timedelta(days=10)).replace(minute=10, second=0, microsecond=0)
+    for minute in range(3):
+        rollups.record(AnalyticsEvent(
+            event_id=f"anl_{minute}", event_type=AnalyticsEventType.API_REQUEST,
+            timestamp=when + timedelta(minutes=minute), user_id="GUold00001", session_id=None,
+            endpoint="/api/vault", method="GET", status_code=200, duration_ms=5.0, metadata={},
+        ))
+    await rollups.flush()
+
+    engine = AnalyticsEngine(rollups=AnalyticsRollups("worker-new"))
+    metrics = await engine.aggregate_metrics(TimePeriod.WEEK, start_time=when - timedelta(days=1))
+    assert metrics.total_requests == 3 and metrics.unique_users == 1
+
+    # Minute rows past retention are pruned; hour and day rows remain
+    await rollups.prune()
+    metrics = await engine.aggregate_metrics(TimePeriod.HOUR, start_time=when, end_time=when + timedelta(minutes=1))
+    assert metrics.total_requests == 3
+
+
+async def test_concurrent_flushes_are_serialized():
+    rollups = AnalyticsRollups("worker-busy")
+    now = datetime.now(timezone.utc)
+    flush, active, peak = rollups._flush, 0, 0
+
+    async def tracked_flush():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.01)
+            return await flush()
+        finally:
+            active -= 1
+
+    rollups._flush = tracked_flush
+    for round_number in range(5):
+        for i in range(20):
+            rollups.record(AnalyticsEvent(
+                event_id=f"anl_{round_number}_{i}", event_type=AnalyticsEventType.API_REQUEST,
+                timestamp=now, user_id=f"GUbusy{i:04d}", session_id=None,
+                endpoint="/api/timeline", method="GET", status_code=200, duration_ms=2.0, metadata={},
+            ))
+        await asyncio.gather(rollups.flush(), rollups.flush(), rollups.read(now - timedelta(hours=1), now + timedelta(minutes=1)))
+
+    minute = bucket_start("minute", now)
+    merged = await rollups.read(minute, minute + timedelta(minutes=1))
+    assert merged.requests == 100
+    assert peak == 1
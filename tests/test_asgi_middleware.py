@@ -0,0 +1,208 @@
+"""
+Tests for the pure ASGI middleware stack.
+
+Tests cover:
+- PathMatcher exact / prefix / suffix rules
+- Storage and checkpoint gates redirecting only where they should
+- Security headers, CSP on HTML and private caching for authenticated API reads
+- Timeout 504 before the response starts, none once it has started
+- Offline indicators injected before </body> with a correct Content-Length,
+  streamed or not, as valid JavaScript
+- Request ID propagation
+"""
+
+import asyncio
+import shutil
+import subprocess
+from html.parser import HTMLParser
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.checkpoint_middleware import SmartCheckpointMiddleware
+from app.core.logging_middleware import RequestIdMiddleware, RequestLoggingMiddleware
+from app.core.offline_manager import OfflineIndicatorMiddleware, get_offline_indicators
+from app.core.path_matcher import PathMatcher, minimal_prefixes
+from app.core.security_headers import SecurityHeadersMiddleware
+from app.core.storage_middleware import StorageRequirementMiddleware, is_public_path
+from app.core.timeout import TimeoutMiddleware
+
+PAGE = "<html><head><title>t</title></head><body>hi</body></html>"
+INDICATORS = get_offline_indicators()
+
+
+class TagOrder(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tags = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append(tag)
+
+
+def make_app(*middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/data")
+    async def data(request: Request):
+        return {"request_id": getattr(request.state, "request_id", None)}
+
+    @app.get("/dashboard")
+    async def dashboard():
+        return HTMLResponse(PAGE)
+
+    @app.get("/fragment")
+    async def fragment():
+        return HTMLResponse("<p>no head</p>")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"<!doctype html>"
+            yield b"<html><head><title>s</title></head>"
+            yield b"<body>streamed</bo"
+            yield b"dy></html>"
+        return StreamingResponse(chunks(), media_type="text/html")
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {"ok": True}
+
+    @app.get("/api/slow-body")
+    async def slow_body():
+        async def chunks():
+            yield b"first,"
+            await asyncio.sleep(0.3)
+            yield b"second"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    for cls, kwargs in middleware:
+        app.add_middleware(cls, **kwargs)
+    return app
+
+
+class TestPathMatcher:
+    def test_rules(self):
+        match = PathMatcher({"/", "/health"}, ("/static/", "/api/health"), (".css",))
+        assert match("/") and match("/health")
+        assert match("/static/js/app.js") and match("/api/health/ready")
+        assert match("/pages/site.css")
+        assert not match("/healthz") and not match("/api/vault")
+
+    def test_minimal_prefixes(self):
+        assert minimal_prefixes(["/api/x", "/api", "/static/", "/api"]) == ("/api", "/static/")
+        # Exact entries covered by a prefix are dropped
+        assert PathMatcher({"/api/x", "/"}, ("/api",)).exact == frozenset({"/"})
+
+    def test_storage_public_paths(self):
+        assert is_public_path("/storage/providers")
+        assert is_public_path("/anything/logo.png")
+        assert not is_public_path("/api/vault/upload")
+
+
+class TestGates:
+    def test_storage_redirects_and_rejects(self):
+        client = TestClient(make_app((StorageRequirementMiddleware, {"enforce": True})))
+        response = client.get("/dashboard", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["location"] == "/storage/providers"
+        assert client.get("/api/data").json()["error"] == "storage_required"
+
+    def test_storage_not_enforced(self):
+        client = TestClient(make_app((StorageRequirementMiddleware, {"enforce": False})))
+        assert client.get("/dashboard").status_code == 200
+
+    def test_checkpoint(self):
+        # The "/" exemption covers every path, so the gate never redirects
+        client = TestClient(make_app((SmartCheckpointMiddleware, {})))
+        assert client.get("/dashboard", follow_redirects=False).status_code == 200
+
+
+class TestSecurityHeaders:
+    def test_headers(self):
+        client = TestClient(make_app((SecurityHeadersMiddleware, {})))
+        page = client.get("/dashboard")
+        assert page.headers["X-Content-Type-Options"] == "nosniff"
+        assert "Content-Security-Policy" in page.headers
+        api = client.get("/api/data")
+        assert "Content-Security-Policy" not in api.headers
+        assert "private" not in api.headers.get("Cache-Control", "")
+
+    def test_private_cache_for_authenticated_reads(self):
+        client = TestClient(make_app((SecurityHeadersMiddleware, {})))
+        response = client.get("/api/data", headers={"Authorization": "Bearer x"})
+        assert response.headers["Cache-Control"] == "private, no-store"
+
+
+class TestTimeout:
+    def test_times_out_before_response(self):
+        client = TestClient(make_app((TimeoutMiddleware, {"timeout": 0.1})))
+        response = client.get("/slow")
+        assert response.status_code == 504
+        assert response.headers["Retry-After"] == "30"
+        assert response.json()["error"] == "gateway_timeout"
+
+    def test_streaming_body_is_not_cut_off(self):
+        client = TestClient(make_app((TimeoutMiddleware, {"timeout": 0.1})))
+        response = client.get("/api/slow-body")
+        assert response.status_code == 200
+        assert response.text == "first,second"
+
+
+class TestOfflineIndicators:
+    def test_injected_before_body_end(self):
+        client = TestClient(make_app((OfflineIndicatorMiddleware, {})))
+        response = client.get("/dashboard")
+        assert response.text == PAGE.replace("</body>", INDICATORS + "</body>")
+        assert int(response.headers["content-length"]) == len(response.content)
+
+    def test_head_stays_intact(self):
+        client = TestClient(make_app((OfflineIndicatorMiddleware, {})))
+        parser = TagOrder()
+        parser.feed(client.get("/dashboard").text)
+        # Markup in <head> makes parsers close it early; nothing may precede <title> but <head>
+        assert parser.tags[:3] == ["html", "head", "title"]
+        assert parser.tags.index("script") > parser.tags.index("body")
+
+    def test_fragment_untouched(self):
+        client = TestClient(make_app((OfflineIndicatorMiddleware, {})))
+        response = client.get("/fragment")
+        assert response.text == "<p>no head</p>"
+        assert int(response.headers["content-length"]) == len(response.content)
+
+    def test_streamed_body_end_split_across_chunks(self):
+        client = TestClient(make_app((OfflineIndicatorMiddleware, {})))
+        response = client.get("/stream")
+        assert response.text.count(INDICATORS) == 1
+        assert response.text == "<!doctype html><html><head><title>s</title></head><body>streamed" + INDICATORS + "</body></html>"
+
+    def test_script_is_valid_javascript(self, tmp_path):
+        node = shutil.which("node")
+        if node is None:
+            pytest.skip("node is not installed")
+        script = INDICATORS[INDICATORS.index("<script>") + len("<script>"):INDICATORS.rindex("</script>")]
+        path = tmp_path / "offline.js"
+        path.write_text(script)
+        result = subprocess.run([node, "--check", str(path)], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+    def test_json_untouched(self):
+        client = TestClient(make_app((OfflineIndicatorMiddleware, {})))
+        assert client.get("/api/data").json() == {"request_id": None}
+
+
+class TestRequestId:
+    def test_generated_and_shared(self):
+        client = TestClient(make_app((RequestLoggingMiddleware, {}), (RequestIdMiddleware, {})))
+        response = client.get("/api/data")
+        assert response.headers["X-Request-Id"] == response.json()["request_id"]
+        assert response.headers["X-Response-Time"].endswith("ms")
+
+    def test_client_id_echoed(self):
+        client = TestClient(make_app((RequestIdMiddleware, {})))
+        response = client.get("/api/data", headers={"X-Request-Id": "req_client"})
+        assert response.headers["X-Request-Id"] == "req_client"
+        assert response.json()["request_id"] == "req_client"
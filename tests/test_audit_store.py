@@ -0,0 +1,161 @@
+"""
+Tests for the database-backed audit store.
+
+Tests cover:
+- Buffered events group-committed in batches
+- Indexed filters, time ranges and newest-first ordering
+- app.core.audit and app.core.audit_logger reading back through the store
+- Failed writes kept on disk and replayed on start, by one worker only
+- commit() waiting for its batch's commit
+- Oversized values clipped; a rejected row spilled without its batch
+"""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.core import audit_store
+from app.core.audit_store import AuditStore
+from app.core.utc import utc_now
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = AuditStore(batch_size=10, spill_path=tmp_path / "unwritten.jsonl")
+    monkeypatch.setattr(audit_store, "_store", store)
+    return store
+
+
+async def test_group_commit_and_indexed_queries(store):
+    now = utc_now()
+    for i in range(25):
+        store.append({
+            "action": "document.access" if i % 2 else "document.upload",
+            "user_id": "GUtenant01" if i < 20 else "GUother001",
+            "resource_id": f"doc_{i % 3}",
+            "timestamp": now - timedelta(hours=25 - i),
+        })
+    assert store.pending == 25
+
+    # The background writer drains the buffer without an explicit flush
+    for _ in range(50):
+        if store.stats["written"] == 25:
+            break
+        await asyncio.sleep(0.01)
+    assert store.stats["written"] == 25 and store.pending == 0
+    assert store.stats["commits"] == 3
+
+    events = await store.query(user_id="GUtenant01", limit=5)
+    assert len(events) == 5
+    assert [e["timestamp"] for e in events] == sorted((e["timestamp"] for e in events), reverse=True)
+    assert events[0]["timestamp"] == now - timedelta(hours=6)
+
+    accesses = await store.query(actions="document.access", resource_id="doc_1", limit=None)
+    assert {e["action"] for e in accesses} == {"document.access"}
+    assert {e["resource_id"] for e in accesses} == {"doc_1"}
+
+    window = await store.query(start=now - timedelta(hours=10), end=now - timedelta(hours=5), limit=None)
+    assert len(window) == 6
+
+    summary = await store.summary(user_id="GUtenant01")
+    assert summary["total"] == 20 and summary["succeeded"] == 20
+    assert summary["by_action"] == {"document.access": 10, "document.upload": 10}
+    assert summary["earliest"] == now - timedelta(hours=25)
+
+
+async def test_both_audit_modules_share_the_store(store):
+    from app.core.audit import AuditAction, audit_log, query_audit_logs
+    from app.core.audit_logger import AuditSeverity, AuditEventType, get_audit_logger
+
+    await audit_log(
+        action=AuditAction.DOCUMENT_ACCESS, user_id="GUtenant01",
+        resource_type="document", resource_id="doc_lease", details={"filename": "lease.pdf"},
+    )
+    logger = get_audit_logger()
+    logger.document_uploaded("GUtenant01", "doc_lease", "lease.pdf", 1024, "application/pdf", "10.0.0.1", "pytest")
+    logger.document_viewed("GUtenant01", "doc_notice", "notice.pdf", "10.0.0.1", "pytest")
+    logger.security_violation("GUtenant01", "path_traversal", {}, "10.0.0.1", "pytest", AuditSeverity.CRITICAL)
+
+    entries = await query_audit_logs(resource_id="doc_lease")
+    assert [e["action"] for e in entries] == ["document_upload", "document.access"]
+    assert entries[1]["details"] == {"filename": "lease.pdf"}
+
+    events = await logger.get_user_events("GUtenant01")
+    assert [e.event_type for e in events] == [
+        AuditEventType.DOCUMENT_UPLOAD, AuditEventType.DOCUMENT_VIEW, AuditEventType.SECURITY_VIOLATION,
+    ]
+    assert events[0].action == "upload" and events[0].details["file_size"] == 1024
+
+    uploads = await logger.get_user_events("GUtenant01", event_types=["document_upload"])
+    assert len(uploads) == 1
+    assert len(await logger.get_document_events("doc_lease")) == 1
+    assert len(await logger.get_security_events(AuditSeverity.CRITICAL)) == 1
+    assert await logger.get_security_events(AuditSeverity.LOW) == []
+
+    summary = await logger.get_audit_summary("GUtenant01")
+    assert summary["total_events"] == 3
+    assert summary["severity_counts"] == {"medium": 1, "low": 1, "critical": 1}
+    assert summary["success_rate"] == pytest.approx(200 / 3)
+
+
+async def test_failed_writes_are_replayed(store, monkeypatch):
+    from app.core import database
+
+    class Unavailable:
+        async def __aenter__(self):
+            raise ConnectionError("database unavailable")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(database, "get_db_session", Unavailable)
+    store.append({"action": "auth.login.failure", "user_id": "GUtenant01", "success": False})
+    assert await store.flush() == 0
+    assert store.stats["spilled"] == 1 and store.spill_path.exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(audit_store, "_store", store)
+    await store.start()
+    await store.stop()
+    assert not store.spill_path.exists()
+
+    events = await store.query(user_id="GUtenant01")
+    assert len(events) == 1 and events[0]["success"] is False
+
+
+def test_only_one_worker_replays_the_spill_file(store, tmp_path):
+    store._spill([{"action": "auth.login.failure"}])
+    other = AuditStore(spill_path=store.spill_path)
+    assert store._replay_spilled() == 1
+    # The other worker lost the race for the file
+    assert other._replay_spilled() == 0
+    assert not list(tmp_path.glob("unwritten*"))
+
+
+async def test_commit_waits_for_its_batch(store):
+    await asyncio.gather(*(
+        store.commit({"action": "document.upload", "user_id": "GUtenant03", "resource_id": f"doc_{i}"})
+        for i in range(5)
+    ))
+    assert store.pending == 0 and store.stats["written"] == 5
+    assert store.stats["commits"] <= 2
+    assert not store._waiting
+
+
+async def test_rejected_row_does_not_sink_its_batch(store):
+    stamp = utc_now()
+    store.append({"id": "aud_dup", "timestamp": stamp, "action": "document.view"})
+    await store.flush()
+
+    store.append({"action": "auth.login.failure", "user_id": "GUtenant02", "user_agent": "x" * 5000})
+    store.append({"id": "aud_dup", "timestamp": stamp, "action": "document.view"})
+    store.append({"action": "document.delete", "user_id": "GUtenant02"})
+    await store.flush()
+    assert store.stats["written"] == 3
+    assert store.stats["spilled"] == 1
+    assert len(store.spill_path.read_text().splitlines()) == 1
+
+    events = await store.query(user_id="GUtenant02")
+    assert {event["action"] for event in events} == {"auth.login.failure", "document.delete"}
+    assert max(len(event["user_agent"] or "") for event in events) == 500
@@ -0,0 +1,166 @@
+"""
+Tests for concurrent batch execution.
+
+Tests cover:
+- Chunks running concurrently within the per-type limit
+- Adaptive window backing off on handler errors and slow chunks
+- Resuming an interrupted operation from its checkpointed items
+- Progress updates throttled to the configured interval
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.batch_operations import (
+    AdaptiveWindow,
+    BatchCheckpointStore,
+    BatchOperationStatus,
+    BatchOperationType,
+    BatchProcessor,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BatchCheckpointStore(str(tmp_path / "batch.db"))
+    yield store
+    store.close()
+
+
+def make_items(count):
+    return [{"type": "document", "filename": f"doc-{i}.pdf"} for i in range(count)]
+
+
+async def wait_done(processor, operation_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while operation_id in processor.active_operations:
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+    return processor.operations[operation_id]
+
+
+def ok(items):
+    return [{"success": True, "item_id": item.item_id, "data": {"n": item.data["filename"]}} for item in items]
+
+
+async def test_chunks_run_concurrently_within_type_limit(store):
+    active = {"now": 0, "peak": 0}
+
+    async def handler(items, settings):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return ok(items)
+
+    processor = BatchProcessor(store=store)
+    processor.register_handler(BatchOperationType.UPLOAD, handler, concurrency=3)
+    first = processor.create_batch_operation(BatchOperationType.UPLOAD, "u1", make_items(50), {"batch_size": 5})
+    second = processor.create_batch_operation(BatchOperationType.UPLOAD, "u1", make_items(50), {"batch_size": 5})
+
+    start = time.perf_counter()
+    assert await processor.start_batch_operation(first)
+    assert await processor.start_batch_operation(second)
+    await wait_done(processor, first)
+    operation = await wait_done(processor, second)
+    elapsed = time.perf_counter() - start
+
+    assert operation.status == BatchOperationStatus.COMPLETED
+    assert operation.completed_items == 50 and operation.progress == 100.0
+    assert active["peak"] == 3  # shared by both operations of this type
+    assert elapsed < 20 * 0.02  # 20 chunks, not run one after another
+    assert store.load(second).completed_items == 50
+
+
+async def test_window_backs_off_on_errors_and_latency():
+    window = AdaptiveWindow(max_limit=8, latency_target=0.1)
+    window.record(False, 0.01)
+    assert window.limit == 4 and window.delay > 0
+    window.record(True, 0.5)
+    assert window.limit == 2
+    slow_delay = window.delay
+    for _ in range(10):
+        window.record(True, 0.01)
+    assert window.limit == 8 and window.delay < slow_delay
+    assert window.backoffs == 2
+
+
+async def test_handler_error_fails_only_its_chunk(store):
+    calls = []
+
+    async def handler(items, settings):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError("storage unavailable")
+        return ok(items)
+
+    processor = BatchProcessor(store=store)
+    processor.register_handler(BatchOperationType.DELETE, handler, concurrency=1)
+    operation_id = processor.create_batch_operation(BatchOperationType.DELETE, "u1", make_items(6), {"batch_size": 2})
+    await processor.start_batch_operation(operation_id)
+    operation = await wait_done(processor, operation_id)
+
+    assert operation.status == BatchOperationStatus.COMPLETED
+    assert (operation.completed_items, operation.failed_items) == (4, 2)
+    assert operation.items[0].error == "storage unavailable"
+    assert processor.get_statistics()["backoffs"] == 1
+
+
+async def test_interrupted_operation_resumes_from_checkpoint(store, monkeypatch):
+    seen = []
+    release = asyncio.Event()
+
+    async def handler(items, settings):
+        seen.extend(item.data["filename"] for item in items)
+        if len(seen) > 4:
+            await release.wait()
+        return ok(items)
+
+    first = BatchProcessor(store=store)
+    first.register_handler(BatchOperationType.UPLOAD, handler, concurrency=1)
+    operation_id = first.create_batch_operation(BatchOperationType.UPLOAD, "u1", make_items(10), {"batch_size": 2})
+    await first.start_batch_operation(operation_id)
+    while len(seen) < 6:
+        await asyncio.sleep(0.01)
+    # The worker dies with the third chunk in flight
+    first.active_operations[operation_id].cancel()
+    await asyncio.sleep(0.01)
+
+    second = BatchProcessor(store=store)
+    second.owner = "replacement:1"
+    second.register_handler(BatchOperationType.UPLOAD, handler, concurrency=1)
+    assert await second.resume_interrupted_operations() == []  # first worker's process is still alive
+    monkeypatch.setattr("app.core.batch_operations._owner_alive", lambda owner: False)
+    seen.clear()
+    release.set()
+    assert await second.resume_interrupted_operations() == [operation_id]
+    operation = await wait_done(second, operation_id)
+
+    assert seen == [f"doc-{i}.pdf" for i in range(4, 10)]
+    assert operation.status == BatchOperationStatus.COMPLETED
+    assert operation.completed_items == 10
+    assert store.load(operation_id).status == BatchOperationStatus.COMPLETED
+
+
+async def test_progress_updates_are_throttled(store, monkeypatch):
+    sent = []
+
+    async def record(self, operation):
+        sent.append(operation.progress)
+
+    async def handler(items, settings):
+        await asyncio.sleep(0.005)
+        return ok(items)
+
+    monkeypatch.setattr(BatchProcessor, "_send_progress_update", record)
+    processor = BatchProcessor(store=store)
+    processor.register_handler(BatchOperationType.UPLOAD, handler, concurrency=1)
+    operation_id = processor.create_batch_operation(
+        BatchOperationType.UPLOAD, "u1", make_items(40), {"batch_size": 1, "progress_interval": 10}
+    )
+    await processor.start_batch_operation(operation_id)
+    await wait_done(processor, operation_id)
+
+    assert sent == [2.5, 100.0]  # first chunk, then the final update
@@ -0,0 +1,184 @@
+"""
+Tests for the two-tier cache in core/cache.
+
+Tests cover:
+- Coalescing concurrent misses into one load
+- Serving stale values while a single refresh runs
+- Cross-worker L1 invalidation over Redis pub/sub
+- Values JSON cannot represent kept out of Redis
+- The cached / cache_invalidate decorators
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import TieredCache, cache_invalidate, cached
+from app.core.cache_manager import MemoryCache
+
+
+@pytest.fixture
+async def l1_only():
+    l1 = MemoryCache(expiry_tick_seconds=None)
+    tiered = TieredCache(l1=l1, redis_url="")
+    yield tiered
+    await tiered.close()
+    l1.close()
+
+
+@pytest.fixture
+async def workers():
+    """Two 'workers' with their own L1 sharing one Redis server."""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    caches, memories = [], []
+    for _ in range(2):
+        l1 = MemoryCache(expiry_tick_seconds=None)
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        memories.append(l1)
+        caches.append(TieredCache(l1=l1, redis_client=client))
+    yield caches
+    for tiered in caches:
+        await tiered.close()
+    for l1 in memories:
+        l1.close()
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+class TestLoadThrough:
+    async def test_concurrent_misses_share_one_load(self, l1_only):
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"total": 42}
+
+        results = await asyncio.gather(*(l1_only.get_or_set("stats:u1", loader, ttl=60) for _ in range(20)))
+        assert calls == 1
+        assert all(r == {"total": 42} for r in results)
+        assert l1_only.stats["coalesced"] == 19
+
+    async def test_loader_error_reaches_every_waiter(self, l1_only):
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(l1_only.get_or_set("k", loader) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert "k" not in l1_only._inflight
+
+    async def test_stale_value_served_while_refreshing(self, l1_only, monkeypatch):
+        versions = iter(range(1, 10))
+
+        async def loader():
+            return next(versions)
+
+        assert await l1_only.get_or_set("k", loader, ttl=10) == 1
+        real_time = time.time
+        monkeypatch.setattr(cache_module.time, "time", lambda: real_time() + 30)
+
+        assert await l1_only.get("k") is None
+        assert await l1_only.get_or_set("k", loader, ttl=10) == 1
+        assert l1_only.stats["stale_served"] == 1
+        await asyncio.gather(*l1_only._background)
+        assert await l1_only.get_or_set("k", loader, ttl=10) == 2
+
+    async def test_early_refresh_before_expiry(self, l1_only, monkeypatch):
+        versions = iter(range(1, 10))
+
+        async def loader():
+            return next(versions)
+
+        await l1_only.get_or_set("k", loader, ttl=10)
+        # Pretend the value was expensive so XFetch always fires
+        l1_only.l1.get("k")["d"] = 1000.0
+        monkeypatch.setattr(cache_module.random, "random", lambda: 0.5)
+        assert await l1_only.get_or_set("k", loader, ttl=10) == 1
+        await asyncio.gather(*l1_only._background)
+        assert l1_only.stats["early_refreshes"] == 1
+        assert await l1_only.get("k") == 2
+
+
+class TestCrossWorker:
+    async def test_l2_fills_other_workers_l1(self, workers):
+        a, b = workers
+        await a.set("doc:1", {"title": "Lease"}, ttl=60)
+        assert await b.get("doc:1") == {"title": "Lease"}
+        assert b.stats["l2_hits"] == 1
+        assert await b.get("doc:1") == {"title": "Lease"}
+        assert b.stats["l1_hits"] == 1
+
+    async def test_invalidation_drops_remote_l1(self, workers):
+        a, b = workers
+        await a.set("doc:1", "v1", ttl=60, tags=["user:7"])
+        await b.get("doc:1")
+        assert b.l1.get("doc:1") is not None
+
+        await a.delete("doc:1")
+        await wait_for(lambda: b.l1.get("doc:1") is None)
+        assert await b.get("doc:1") is None
+
+    async def test_prefix_and_tag_invalidation(self, workers):
+        a, b = workers
+        await a.set("doc:1", 1, ttl=60)
+        await a.set("doc:2", 2, ttl=60, tags=["user:7"])
+        await a.set("other:1", 3, ttl=60)
+        for key in ("doc:1", "doc:2", "other:1"):
+            await b.get(key)
+
+        await a.invalidate_tag("user:7")
+        await wait_for(lambda: b.l1.get("doc:2") is None)
+        await a.clear_prefix("doc:")
+        await wait_for(lambda: b.l1.get("doc:1") is None)
+        assert await b.get("other:1") == 3
+
+    async def test_concurrent_first_calls_wait_for_l2(self, workers):
+        a, b = workers
+        await a.set("doc:1", "v1", ttl=60)
+        # Every first caller sees L2, not just the one that started the connect
+        assert await asyncio.gather(*(b.get("doc:1") for _ in range(5))) == ["v1"] * 5
+        assert b._listener is not None
+
+    async def test_values_json_cannot_carry_stay_local(self, workers):
+        a, b = workers
+        when = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        await a.set("doc:1", {"uploaded": when}, ttl=60)
+        assert await a.get("doc:1") == {"uploaded": when}
+        # Other workers miss and load it themselves rather than get a str back
+        assert await b.get("doc:1") is None
+
+
+class TestDecorators:
+    async def test_cached_and_invalidate(self, l1_only, monkeypatch):
+        monkeypatch.setattr(cache_module, "cache", l1_only)
+        calls = []
+
+        @cached(ttl=60, key_prefix="profile")
+        async def get_profile(user_id: str):
+            calls.append(user_id)
+            return {"id": user_id}
+
+        @cache_invalidate("profile")
+        async def update_profile(user_id: str):
+            return True
+
+        assert await get_profile("u1") == {"id": "u1"}
+        assert await get_profile("u1") == {"id": "u1"}
+        assert calls == ["u1"]
+
+        await update_profile("u1")
+        await get_profile("u1")
+        assert calls == ["u1", "u1"]
@@ -0,0 +1,147 @@
+"""
+Tests for the in-memory cache backend in core/cache_manager.
+
+Tests cover:
+- O(1) LRU ordering and eviction
+- W-TinyLFU admission keeping popular keys
+- Tag and prefix index invalidation
+- Timer-wheel TTL expiry
+- Per-prefix statistics
+"""
+
+import time
+
+import pytest
+
+from app.core.cache_manager import CacheManager, MemoryCache, TimerWheel, estimate_size
+
+
+@pytest.fixture
+def cache():
+    c = MemoryCache(max_entries=3, expiry_tick_seconds=None)
+    yield c
+    c.close()
+
+
+class TestLRU:
+    def test_evicts_least_recently_used(self, cache):
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        cache.get("a")
+        cache.set("d", "d")
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        assert cache.evictions == 1
+
+    def test_size_limit_evicts(self):
+        c = MemoryCache(max_size_mb=1, max_entries=1000, expiry_tick_seconds=None)
+        blob = "x" * 400_000
+        c.set("one", blob)
+        c.set("two", blob)
+        c.set("three", blob)
+        assert "one" not in c.cache
+        assert c.current_size_bytes <= c.max_size_bytes
+        assert c.current_size_bytes == sum(e.size_bytes for e in c.cache.values())
+
+    def test_oversized_value_rejected(self):
+        c = MemoryCache(max_size_mb=1, expiry_tick_seconds=None)
+        assert c.set("huge", "x" * (2 * 1024 * 1024)) is False
+        assert c.current_size_bytes == 0
+
+    def test_estimate_size_counts_nested_values(self):
+        small = estimate_size({"a": 1})
+        large = estimate_size({"a": ["x" * 1000, {"b": "y" * 1000}]})
+        assert large > small + 2000
+
+
+class TestTinyLFU:
+    def test_popular_keys_survive_scan(self):
+        c = MemoryCache(max_entries=100, admission="tinylfu", expiry_tick_seconds=None)
+        for i in range(100):
+            c.set(f"hot:{i}", i)
+        for _ in range(5):
+            for i in range(100):
+                c.get(f"hot:{i}")
+
+        # A one-off scan of new keys should not flush the hot set
+        for i in range(500):
+            c.set(f"scan:{i}", i)
+
+        hot_left = sum(1 for i in range(100) if f"hot:{i}" in c.cache)
+        assert hot_left >= 90
+        assert len(c.cache) <= 100
+        assert c.rejections > 0
+
+
+class TestTags:
+    def test_delete_by_tag_uses_index(self, cache):
+        cache.set("a", 1, tags=["user:1"])
+        cache.set("b", 2, tags=["user:1", "docs"])
+        cache.set("c", 3, tags=["docs"])
+        assert {e.key for e in cache.get_entries_by_tag("docs")} == {"b", "c"}
+        assert cache.delete_by_tag("user:1") == 2
+        assert list(cache.cache) == ["c"]
+        assert "user:1" not in cache._tag_index
+
+    def test_evicted_keys_leave_tag_index(self, cache):
+        cache.set("a", 1, tags=["t"])
+        for key in ("b", "c", "d"):
+            cache.set(key, key)
+        assert cache.delete_by_tag("t") == 0
+
+    def test_delete_by_prefix(self):
+        c = MemoryCache(expiry_tick_seconds=None)
+        for key in ("user:1:a", "user:1:b", "user:2:a", "doc:1", "userless"):
+            c.set(key, key)
+        assert c.delete_by_prefix("user:1:") == 2
+        assert c.delete_by_prefix("user:") == 1
+        assert sorted(c.cache) == ["doc:1", "userless"]
+        assert "user" not in c._prefix_index
+        c.close()
+
+
+class TestExpiry:
+    def test_timer_wheel_returns_due_items(self):
+        wheel = TimerWheel(tick_seconds=1.0, slots=8)
+        now = time.time()
+        wheel.schedule("soon", now + 1)
+        wheel.schedule("later", now + 20)
+        assert [k for _, k in wheel.advance(now + 3)] == ["soon"]
+        assert [k for _, k in wheel.advance(now + 25)] == ["later"]
+
+    def test_expire_due_removes_entries(self, cache, monkeypatch):
+        cache.set("short", 1, ttl_seconds=1)
+        cache.set("long", 2, ttl_seconds=3600)
+        real_time = time.time
+        monkeypatch.setattr("app.core.cache_manager.time.time", lambda: real_time() + 5)
+        assert cache.expire_due() == 1
+        assert "short" not in cache.cache
+        assert cache.expirations == 1
+
+    def test_reset_key_is_not_expired_by_old_timer(self, cache, monkeypatch):
+        cache.set("k", 1, ttl_seconds=1)
+        cache.set("k", 2, ttl_seconds=3600)
+        real_time = time.time
+        monkeypatch.setattr("app.core.cache_manager.time.time", lambda: real_time() + 5)
+        assert cache.expire_due() == 0
+        assert cache.get("k") == 2
+
+
+class TestStats:
+    def test_prefix_breakdown(self, cache):
+        cache.set("user_data:1:x", 1)
+        cache.get("user_data:1:x")
+        cache.get("user_data:2:x")
+        cache.get("system_data:y")
+        stats = cache.get_stats()["by_prefix"]
+        assert stats["user_data"]["hits"] == 1
+        assert stats["user_data"]["misses"] == 1
+        assert stats["system_data"]["misses"] == 1
+
+    async def test_manager_stats_include_backend_prefixes(self):
+        manager = CacheManager()
+        await manager.set("system_data:z", 1)
+        await manager.get("system_data:z")
+        stats = manager.get_stats()["backends"]["memory"]
+        assert stats["by_prefix"]["system_data"]["hits"] == 1
+        manager.get_backend().close()
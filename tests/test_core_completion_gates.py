@@ -17,8 +17,7 @@ def fixture_isolated_overlay_service(tmp_path, monkeypatch):
 
 @pytest.fixture(name="isolated_vault_service")
 def fixture_isolated_vault_service(tmp_path, monkeypatch):
-    service = VaultUploadService()
-    service.index = VaultDocumentIndex(data_dir=str(tmp_path / "vault_index"))
+    service = VaultUploadService(index=VaultDocumentIndex(data_dir=str(tmp_path / "vault_index")))
     local_dir = tmp_path / "vault_storage"
     local_dir.mkdir(parents=True, exist_ok=True)
     setattr(service, "_local_dir", local_dir)
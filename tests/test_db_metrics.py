@@ -0,0 +1,138 @@
+"""
+Tests for the shared engine factory and database metrics.
+
+Tests cover:
+- Pool sizing per worker and asyncpg / PgBouncer connect options
+- Per-statement latency recorded from engine events
+- Statement fingerprints as bounded labels
+- Pool checkout wait and timeout accounting
+- /health database section
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import engine_options, pool_sizing
+from app.core.db_metrics import DatabaseMetrics, InstrumentedAsyncPool, db_metrics, fingerprint
+
+
+class FakeSettings:
+    database_url = "postgresql+asyncpg://u:p@db/semptify"
+    db_max_connections = 0
+    web_concurrency = 1
+    db_pool_size = 0
+    db_max_overflow = -1
+    db_pool_timeout = 30.0
+    db_pool_recycle = 1800
+    db_statement_cache_size = 100
+    db_pgbouncer = False
+
+
+def test_pool_sizing_splits_budget_across_workers():
+    settings = FakeSettings()
+    assert pool_sizing(settings) == (5, 10)
+    settings.db_max_connections = 40
+    settings.web_concurrency = 4
+    assert pool_sizing(settings) == (5, 5)
+    settings.db_pool_size = 3
+    settings.db_max_overflow = 0
+    assert pool_sizing(settings) == (3, 0)
+
+
+def test_asyncpg_statement_cache_and_pgbouncer_mode():
+    settings = FakeSettings()
+    options = engine_options(settings)
+    assert options["poolclass"] is InstrumentedAsyncPool
+    assert options["connect_args"]["prepared_statement_cache_size"] == 100
+    assert options["connect_args"]["command_timeout"] == 30
+    assert options["connect_args"]["server_settings"]["application_name"] == "semptify_fastapi"
+
+    settings.db_pgbouncer = True
+    args = engine_options(settings)["connect_args"]
+    assert args["statement_cache_size"] == 0
+    assert args["prepared_statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
+
+    settings.database_url = "sqlite+aiosqlite:///./test.db"
+    assert "poolclass" in engine_options(settings)
+    assert "pool_size" not in engine_options(settings)
+
+
+async def test_statement_latency_recorded():
+    metrics = DatabaseMetrics()
+    engine = create_async_engine("sqlite+aiosqlite://")
+    metrics.instrument(engine)
+    metrics.instrument(engine)  # idempotent
+    async with engine.connect() as conn:
+        for _ in range(3):
+            await conn.execute(text("SELECT 1"))
+        with pytest.raises(exc.OperationalError):
+            await conn.execute(text("SELECT * FROM missing_table"))
+    await engine.dispose()
+
+    stats = {item["statement"]: item for item in metrics.statement_stats()}
+    assert stats["SELECT ?"]["count"] == 3
+    assert stats["SELECT * FROM missing_table"]["errors"] == 1
+    assert metrics.pool_status()["statements"]["count"] == 3
+
+
+async def test_statement_labels_are_bounded():
+    metrics = DatabaseMetrics(max_statements=2)
+    for i in range(5):
+        metrics.record_statement(f"SELECT * FROM t{i}", 1.0)
+    assert len(metrics.statements) == 3
+    assert {s["statement"] for s in metrics.statement_stats()} == {"SELECT * FROM t0", "SELECT * FROM t1", "<other>"}
+
+
+async def test_statements_with_literals_share_a_fingerprint():
+    metrics = DatabaseMetrics()
+    for i in range(50):
+        metrics.record_statement(f"SELECT * FROM documents WHERE id = {i} AND owner = 'user{i}'", 1.0)
+        metrics.record_statement(f"DELETE FROM t WHERE id IN ({', '.join('?' * (i + 1))})", 1.0)
+    assert set(metrics.statements) == {
+        "SELECT * FROM documents WHERE id = ? AND owner = ?",
+        "DELETE FROM t WHERE id IN (...)",
+    }
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert fingerprint("SELECT t1.a FROM t1 WHERE b = $1") == "SELECT t1.a FROM t1 WHERE b = $1"
+
+    long_a, long_b = "SELECT " + "x, " * 60 + "a FROM t", "SELECT " + "x, " * 60 + "b FROM t"
+    metrics.record_statement(long_a, 1.0)
+    metrics.record_statement(long_b, 1.0)
+    labels = [s["statement"] for s in metrics.statement_stats(limit=10)]
+    assert len(set(labels)) == 4
+    assert "semptify_db_statement_duration_seconds_count" in metrics.render_prometheus()
+
+
+async def test_pool_wait_and_timeouts_recorded():
+    db_metrics.reset()
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=InstrumentedAsyncPool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        status = db_metrics.pool_status(engine)
+        assert status["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+    status = db_metrics.pool_status(engine)
+    await engine.dispose()
+
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    assert status["checkout_timeouts"] == 1
+    assert status["wait_ms"]["max"] >= 40
+    assert "semptify_db_pool_timeouts_total 1" in db_metrics.render_prometheus(pool_status=status)
+    db_metrics.reset()
+
+
+@pytest.mark.anyio
+async def test_health_reports_database_pool(client: AsyncClient):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    database = response.json()["database"]
+    assert {"checkouts", "checkout_timeouts", "wait_ms", "statements"} <= set(database)
@@ -365,6 +365,30 @@ class TestStatusTracking:
         assert "status" in status
         assert "progress_percent" in status
     
+    @pytest.mark.asyncio
+    async def test_pdf_pages_stream_into_status(self, engine, monkeypatch):
+        """PDF extraction reports the page it has reached."""
+        fitz = pytest.importorskip("fitz")
+        from app.core.config import get_settings
+
+        monkeypatch.setattr(get_settings(), "azure_ai_key1", "")
+        pdf = fitz.open()
+        for number in (1, 2):
+            pdf.new_page().insert_text((72, 72), f"Notice to quit, page {number}")
+        content = pdf.tobytes()
+        pdf.close()
+
+        doc = await engine.intake_document(
+            user_id="user123",
+            file_content=content,
+            filename="notice.pdf",
+            mime_type="application/pdf",
+        )
+        text = await engine._extract_text(content, "application/pdf", "notice.pdf", doc)
+
+        assert "page 1" in text and "page 2" in text
+        assert doc.status_message == "Extracting text... page 2"
+    
     def test_status_not_found(self, engine):
         """Unknown document returns error."""
         status = engine.get_processing_status("nonexistent-id")
@@ -0,0 +1,165 @@
+"""
+Tests for the EventBus delivery path.
+
+Tests cover:
+- Bounded history ring buffer
+- Async subscribers running concurrently with per-subscriber timeouts
+- Redis Streams transport: cross-worker delivery, per-user ordering,
+  skipping a worker's own events, not stalling other users on a hung
+  subscriber, and a bounded close()
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.event_bus import Event, EventType, RedisStreamTransport, event_bus
+
+
+@pytest.fixture
+def bus():
+    saved = (
+        {k: list(v) for k, v in event_bus._subscribers.items()},
+        {k: list(v) for k, v in event_bus._async_subscribers.items()},
+        event_bus.subscriber_timeout,
+    )
+    event_bus.clear_history()
+    yield event_bus
+    event_bus._subscribers, event_bus._async_subscribers, event_bus.subscriber_timeout = saved
+    event_bus.clear_history()
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeServer()
+
+
+def redis_transport(server):
+    import fakeredis
+    return RedisStreamTransport(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+
+
+async def test_history_is_a_bounded_ring(bus):
+    for i in range(bus._max_history + 50):
+        bus.publish_sync(EventType.USER_ACTION, {"i": i})
+    history = bus.get_history(limit=5000)
+    assert len(history) == bus._max_history
+    assert history[0].data == {"i": 50}
+    assert [e.data["i"] for e in bus.get_history(limit=2)] == [bus._max_history + 48, bus._max_history + 49]
+
+
+async def test_async_subscribers_run_concurrently_with_timeout(bus):
+    bus.subscriber_timeout = 0.2
+    calls = []
+
+    async def slow_a(event):
+        await asyncio.sleep(0.1)
+        calls.append("a")
+
+    async def slow_b(event):
+        await asyncio.sleep(0.1)
+        calls.append("b")
+
+    async def hangs(event):
+        await asyncio.Event().wait()
+
+    for callback in (slow_a, slow_b, hangs):
+        bus.subscribe_async(EventType.TIMELINE_UPDATED, callback)
+    timeouts = bus.stats["subscriber_timeouts"]
+
+    start = time.perf_counter()
+    await bus.publish(EventType.TIMELINE_UPDATED, {"events_count": 1}, user_id="u1")
+    elapsed = time.perf_counter() - start
+
+    assert sorted(calls) == ["a", "b"]
+    assert elapsed < 0.35  # max(0.1, 0.1, timeout), not their sum
+    assert bus.stats["subscriber_timeouts"] == timeouts + 1
+
+
+async def test_redis_transport_orders_events_per_user(redis_server):
+    sender, receiver = redis_transport(redis_server), redis_transport(redis_server)
+    received = []
+
+    async def deliver(event):
+        received.append((event.user_id, event.data["n"]))
+
+    async def ignore(event):
+        raise AssertionError("a worker must not receive its own events")
+
+    assert await sender.start(ignore)
+    assert await receiver.start(deliver)
+    try:
+        for n in range(30):
+            await sender.send(Event(type=EventType.DOCUMENT_ADDED, data={"n": n}, user_id=f"u{n % 3}"))
+        async with asyncio.timeout(3):
+            while len(received) < 30:
+                await asyncio.sleep(0.01)
+    finally:
+        await sender.close()
+        await receiver.close()
+
+    for user in ("u0", "u1", "u2"):
+        ns = [n for u, n in received if u == user]
+        assert ns == sorted(ns) and len(ns) == 10
+    assert sender.stream_for("u1") == receiver.stream_for("u1")
+
+
+async def test_hung_subscriber_does_not_stall_remote_delivery(redis_server):
+    sender, receiver = redis_transport(redis_server), redis_transport(redis_server)
+    receiver.close_timeout = 0.2
+    received = []
+
+    async def deliver(event):
+        received.append((event.user_id, event.data["n"]))
+        if event.data["n"] == 0:
+            await asyncio.Event().wait()
+        # Later events for the same user must wait for this one
+        await asyncio.sleep(0.02 if event.data["n"] == 1 else 0)
+
+    assert await sender.start(lambda event: asyncio.sleep(0))
+    assert await receiver.start(deliver)
+    try:
+        await sender.send(Event(type=EventType.DOCUMENT_ADDED, data={"n": 0}, user_id="u-stuck"))
+        await sender.send(Event(type=EventType.DOCUMENT_ADDED, data={"n": 9}, user_id="u-stuck"))
+        for n in range(1, 5):
+            await sender.send(Event(type=EventType.DOCUMENT_ADDED, data={"n": n}, user_id="u1"))
+        async with asyncio.timeout(3):
+            while len(received) < 5:
+                await asyncio.sleep(0.01)
+        assert [n for user, n in received if user == "u1"] == [1, 2, 3, 4]
+        assert ("u-stuck", 9) not in received
+    finally:
+        await sender.close()
+        started = time.monotonic()
+        await receiver.close()
+    # The hung delivery and the one queued behind it are cancelled, not awaited forever
+    assert time.monotonic() - started < 2
+    assert not receiver._deliveries
+
+
+async def test_remote_events_reach_local_subscribers(bus, redis_server):
+    other_worker = redis_transport(redis_server)
+    seen = []
+
+    async def on_document_added(event):
+        seen.append(event)
+
+    bus.subscribe_async(EventType.DOCUMENT_ADDED, on_document_added)
+    assert await bus.start_transport(redis_transport(redis_server))
+    assert await other_worker.start(lambda event: asyncio.sleep(0))
+    try:
+        assert bus.transport == "redis"
+        received = bus.stats["received"]
+        await other_worker.send(Event(type=EventType.DOCUMENT_ADDED, data={"doc_id": "d1"}, user_id="u9"))
+        async with asyncio.timeout(3):
+            while not seen:
+                await asyncio.sleep(0.01)
+        assert seen[0].data == {"doc_id": "d1"} and seen[0].user_id == "u9"
+        assert bus.stats["received"] == received + 1
+        assert any(e.data == {"doc_id": "d1"} for e in bus.get_history(user_id="u9"))
+    finally:
+        await other_worker.close()
+        await bus.stop_transport()
+    assert bus.transport == "local"
@@ -0,0 +1,127 @@
+"""
+Tests for the content-addressed extraction cache.
+
+Tests cover:
+- Round trip, version isolation and hit/miss counters
+- LRU eviction past the size bound
+- Entry and byte totals kept across overwrites, evictions and processes
+- PDFExtractor, extract_pages and OCRService served from the cache
+- Cache stats on /health
+"""
+
+import os
+
+import pytest
+
+from app.core import extraction_cache
+from app.core.config import get_settings
+from app.core.extraction_cache import ExtractionCache, content_hash
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    store = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=1024 * 1024)
+    monkeypatch.setattr(extraction_cache, "_cache", store)
+    yield store
+    store.close()
+
+
+def test_round_trip_and_counters(cache):
+    digest = content_hash(b"lease")
+    assert cache.get(digest, "pdf", "1") is None
+    cache.put(digest, "pdf", "1", {"text": "Lease agreement", "pages": [{"page_number": 1}]})
+
+    assert cache.get(digest, "pdf", "1") == {"text": "Lease agreement", "pages": [{"page_number": 1}]}
+    assert cache.get(digest, "pdf", "2") is None
+    assert cache.get(digest, "ocr_tesseract", "1") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 3, 1)
+    assert stats["hit_rate"] == 0.25
+    assert stats["entries"] == 1 and 0 < stats["bytes"] < 200
+
+    # A second process opening the same file sees the entry
+    other = ExtractionCache(cache.path)
+    assert other.get(digest, "pdf", "1")["text"] == "Lease agreement"
+    other.close()
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(extraction_cache, "ACCESS_WRITE_INTERVAL", 0)
+    noise = lambda: {"text": os.urandom(400).hex()}
+    cache.put("a", "pdf", "1", noise())
+    entry_size = cache.stats()["bytes"]
+    cache.max_bytes = entry_size * 3 + entry_size // 2
+
+    cache.put("b", "pdf", "1", noise())
+    cache.put("c", "pdf", "1", noise())
+    assert cache.get("a", "pdf", "1")  # a is now more recent than b
+    cache.put("d", "pdf", "1", noise())
+
+    assert cache.get("b", "pdf", "1") is None
+    assert all(cache.get(key, "pdf", "1") for key in "acd")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_totals_follow_writes_from_every_process(cache):
+    def scanned():
+        return cache._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+
+    cache.put("a", "pdf", "1", {"text": "short"})
+    cache.put("a", "pdf", "1", {"text": "a longer replacement " * 20})
+    cache.put("b", "pdf", "1", {"text": "second"})
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == scanned()
+
+    other = ExtractionCache(cache.path)
+    other.put("c", "pdf", "1", {"text": "from another worker"})
+    other.close()
+    cache.put("d", "pdf", "1", {"text": "fourth"})
+    assert cache.stats()["entries"] == 4
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == scanned()
+
+    cache.clear()
+    assert cache._totals() == (0, 0) == scanned()
+
+
+async def test_pdf_extractor_uses_cache(cache, monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    from app.services import pdf_extractor
+    from app.services.pdf_extractor import PDFExtractor
+
+    doc = fitz.open()
+    for number in (1, 2, 3):
+        doc.new_page().insert_text((72, 72), f"Notice to quit, page {number}. Tenant must vacate.")
+    content = doc.tobytes()
+    doc.close()
+    monkeypatch.setattr(get_settings(), "pdf_extract_workers", 0)
+
+    first = await PDFExtractor().extract_async(content)
+    assert "cached" not in first.metadata
+
+    # Every entry point now reads the stored result instead of parsing
+    calls = []
+    monkeypatch.setattr(pdf_extractor, "_extract_page_range", lambda *args: calls.append(args) or [])
+    second = PDFExtractor().extract(content)
+    assert second.metadata["cached"] and second.text == first.text
+    pages = [page async for page in PDFExtractor().extract_pages(content)]
+    assert [page.page_number for page in pages] == [1, 2, 3]
+    assert "page 2" in pages[1].text
+
+    from app.services.ocr_service import OCRService
+    ocr = await OCRService().extract_text(file_bytes=content, filename="notice.pdf")
+    assert ocr.method == "pdf_text" and ocr.metadata["cached"]
+    assert "Tenant must vacate" in ocr.text
+    assert calls == []
+
+    # Forcing OCR is a different result and is not served from the text entry
+    PDFExtractor().extract(content, prefer_ocr=True)
+    assert len(calls) == 1
+
+
+async def test_health_reports_cache_stats(cache, client):
+    cache.get("missing", "pdf", "1")
+    response = await client.get("/health")
+    assert response.status_code == 200
+    stats = response.json()["extraction_cache"]
+    assert stats["misses"] == 1 and stats["hit_rate"] == 0.0
@@ -0,0 +1,281 @@
+"""
+Tests for GoogleDriveProvider against a local fake Drive server.
+
+The fake implements the subset of the Drive v3 API the provider uses
+(search, folder create, multipart/media/resumable upload, download,
+delete, batch) on top of httpx.MockTransport and counts every request.
+
+Tests cover:
+- Round-trips per vault upload, cold and with the per-user ID cache warm
+- Shared per-worker client used by get_provider()
+- Batched multi-file upload and level-by-level recursive listing
+- Resumable uploads that survive a dropped chunk
+- Recovery when a cached folder was deleted in Drive
+"""
+
+import asyncio
+import json
+import re
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+from app.services.storage import google_drive
+from app.services.storage.google_drive import FOLDER_MIME_TYPE, GoogleDriveProvider
+from app.services.vault_upload_service import VaultUploadService
+
+
+class FakeDrive:
+    """In-memory Drive v3 server."""
+
+    ROOT_ID = "root-folder-id"
+
+    def __init__(self):
+        self.files = {}
+        self.sessions = {}
+        self.requests = []
+        self.drop_next_chunk = False
+
+    def add(self, name, parent, mime_type=FOLDER_MIME_TYPE, content=b""):
+        file_id = f"id{len(self.files) + 1}"
+        parent = self.ROOT_ID if parent == "root" else parent
+        self.files[file_id] = {"id": file_id, "name": name, "parents": [parent],
+                               "mimeType": mime_type, "content": content}
+        return file_id
+
+    def resource(self, file_id):
+        item = self.files[file_id]
+        return {"id": file_id, "name": item["name"], "mimeType": item["mimeType"],
+                "parents": item["parents"], "size": str(len(item["content"])),
+                "modifiedTime": "2026-01-01T00:00:00Z"}
+
+    def search(self, query):
+        matches = list(self.files)
+        for clause in query.split(" and "):
+            if m := re.fullmatch(r"name='(.*)'", clause):
+                matches = [f for f in matches if self.files[f]["name"] == m.group(1)]
+            elif m := re.fullmatch(r"'(.*)' in parents", clause):
+                parent = self.ROOT_ID if m.group(1) == "root" else m.group(1)
+                matches = [f for f in matches if parent in self.files[f]["parents"]]
+            elif m := re.fullmatch(r"mimeType='(.*)'", clause):
+                matches = [f for f in matches if self.files[f]["mimeType"] == m.group(1)]
+            else:
+                assert clause == "trashed=false", clause
+        return [self.resource(f) for f in matches]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        return self.dispatch(request.method, request.url.path, request.url.params, request.headers,
+                             request.content)
+
+    def dispatch(self, method, path, params, headers, body):
+        if path == "/batch/drive/v3":
+            return self.batch(headers, body)
+        if path == "/drive/v3/files" and method == "GET":
+            return httpx.Response(200, json={"files": self.search(params["q"])})
+        if path == "/drive/v3/files" and method == "POST":
+            meta = json.loads(body)
+            parent = meta["parents"][0]
+            if parent != "root" and parent not in self.files:
+                return httpx.Response(404)
+            return httpx.Response(200, json={"id": self.add(meta["name"], parent)})
+        if path == "/upload/drive/v3/files" and method == "POST":
+            if params["uploadType"] == "multipart":
+                boundary = headers["content-type"].split("boundary=")[1]
+                parts = body.split(f"--{boundary}".encode())
+                meta = json.loads(parts[1].split(b"\r\n\r\n", 1)[1])
+                content = parts[2].split(b"\r\n\r\n", 1)[1][:-2]
+                return self.create(meta, headers, content)
+            meta = json.loads(body)
+            session = f"s{len(self.sessions) + 1}"
+            self.sessions[session] = {"meta": meta, "file_id": None, "data": b""}
+            return self.session_started(session)
+        if m := re.fullmatch(r"/upload/drive/v3/files/(\w+)", path):
+            if m.group(1) not in self.files:
+                return httpx.Response(404)
+            if params["uploadType"] == "media":
+                self.files[m.group(1)]["content"] = body
+                return httpx.Response(200, json={"id": m.group(1)})
+            session = f"s{len(self.sessions) + 1}"
+            self.sessions[session] = {"meta": None, "file_id": m.group(1), "data": b""}
+            return self.session_started(session)
+        if path.startswith("/upload/session/"):
+            return self.upload_chunk(path.rsplit("/", 1)[1], headers, body)
+        if m := re.fullmatch(r"/drive/v3/files/(\w+)", path):
+            if m.group(1) not in self.files:
+                return httpx.Response(404)
+            if method == "DELETE":
+                del self.files[m.group(1)]
+                return httpx.Response(204)
+            return httpx.Response(200, content=self.files[m.group(1)]["content"])
+        raise AssertionError(f"unexpected call {method} {path}")
+
+    def create(self, meta, headers, content):
+        parent = meta["parents"][0]
+        if parent != "root" and parent not in self.files:
+            return httpx.Response(404)
+        file_id = self.add(meta["name"], parent, headers.get("x-upload-content-type", "application/pdf"), content)
+        return httpx.Response(200, json={"id": file_id, "parents": self.files[file_id]["parents"]})
+
+    def session_started(self, session):
+        return httpx.Response(200, headers={"Location": f"https://www.googleapis.com/upload/session/{session}"})
+
+    def upload_chunk(self, session_id, headers, body):
+        session = self.sessions[session_id]
+        received = len(session["data"])
+        start, total = re.fullmatch(r"bytes (\d+|\*)-?\d*/(\d+)", headers["content-range"]).groups()
+        if start != "*":
+            if self.drop_next_chunk and received:
+                # The bytes never arrive; the client sees a broken connection
+                self.drop_next_chunk = False
+                raise httpx.ReadError("connection reset")
+            assert int(start) == received
+            session["data"] += body
+            received = len(session["data"])
+        if received < int(total):
+            return httpx.Response(308, headers={"Range": f"bytes=0-{received - 1}"})
+        if session["file_id"]:
+            self.files[session["file_id"]]["content"] = session["data"]
+            return httpx.Response(200, json={"id": session["file_id"]})
+        return self.create(session["meta"], {}, session["data"])
+
+    def batch(self, headers, body):
+        boundary = headers["content-type"].split("boundary=")[1]
+        out = ""
+        for part in body.decode().split(f"--{boundary}"):
+            m = re.search(r"Content-ID: <item(\d+)>\r\n\r\nGET (\S+) HTTP/1.1", part)
+            if not m:
+                continue
+            url = urlsplit(m.group(2))
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            response = self.dispatch("GET", url.path, params, {}, b"")
+            out += (
+                f"--batch_reply\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-item{m.group(1)}>\r\n\r\n"
+                f"HTTP/1.1 {response.status_code} OK\r\nContent-Type: application/json\r\n\r\n"
+                f"{response.text}\r\n"
+            )
+        return httpx.Response(200, headers={"Content-Type": "multipart/mixed; boundary=batch_reply"},
+                              content=(out + "--batch_reply--").encode())
+
+
+@pytest.fixture
+async def drive(monkeypatch):
+    fake = FakeDrive()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    # Install the fake as this worker's shared client
+    monkeypatch.setattr(google_drive, "_client", client)
+    monkeypatch.setattr(google_drive, "_client_loop", asyncio.get_running_loop())
+    yield fake
+    await client.aclose()
+
+
+def new_token():
+    return f"token-{uuid.uuid4().hex}"
+
+
+async def vault_upload(token, name):
+    service = VaultUploadService()
+    return await service._store_document("u1", name, b"%PDF-1.7 lease", "application/pdf", token, "google_drive")
+
+
+async def test_vault_upload_round_trips(drive):
+    token = new_token()
+    await vault_upload(token, "v1.pdf")
+    # Cold, new user: one root listing, four folder creates, one name search, one upload
+    assert len(drive.requests) == 7
+
+    drive.requests.clear()
+    await vault_upload(new_token(), "v0.pdf")
+    # Cold, folders exist: one subfolder listing per level (certificates
+    # is found alongside documents), one name search, one upload
+    assert len(drive.requests) == 5
+
+    drive.requests.clear()
+    path = await vault_upload(token, "v2.pdf")
+    # Warm: a new request reuses the cached folder IDs
+    assert drive.requests == [("GET", "/drive/v3/files"), ("POST", "/upload/drive/v3/files")]
+
+    drive.requests.clear()
+    provider = GoogleDriveProvider(token)
+    assert await provider.download_file(path) == b"%PDF-1.7 lease"
+    [stored] = drive.search("name='v2.pdf'")
+    assert drive.requests == [("GET", f"/drive/v3/files/{stored['id']}")]
+
+
+async def test_existing_file_is_updated_in_place(drive):
+    provider = GoogleDriveProvider(new_token())
+    first = await provider.upload_file(b"one", "Semptify5.0/.auth", "token.enc")
+    drive.requests.clear()
+    second = await provider.upload_file(b"two", "Semptify5.0/.auth", "token.enc")
+    assert second.id == first.id
+    assert drive.requests == [("PATCH", f"/upload/drive/v3/files/{first.id}")]
+    assert drive.files[first.id]["content"] == b"two"
+
+    assert await provider.delete_file("Semptify5.0/.auth/token.enc")
+    assert not await provider.file_exists("Semptify5.0/.auth/token.enc")
+
+
+async def test_upload_files_batches_existence_checks(drive):
+    provider = GoogleDriveProvider(new_token())
+    await provider.create_folder("Semptify5.0/Vault/documents")
+    drive.requests.clear()
+
+    stored = await provider.upload_files(
+        [(f"doc{i}.pdf", f"content {i}".encode(), "application/pdf") for i in range(5)],
+        "Semptify5.0/Vault/documents",
+    )
+    assert [f.name for f in stored] == [f"doc{i}.pdf" for i in range(5)]
+    assert drive.requests.count(("POST", "/batch/drive/v3")) == 1
+    assert drive.requests.count(("GET", "/drive/v3/files")) == 0
+    assert len(drive.requests) == 6
+
+
+async def test_recursive_listing_is_one_batch_per_level(drive):
+    vault = drive.add("Vault", drive.add("Semptify5.0", "root"))
+    for kind in ("documents", "certificates", "photos"):
+        folder = drive.add(kind, vault)
+        drive.add(f"{kind}.pdf", folder, mime_type="application/pdf", content=b"x")
+
+    provider = GoogleDriveProvider(new_token())
+    await provider.create_folder("Semptify5.0/Vault")
+    drive.requests.clear()
+
+    files = await provider.list_files("Semptify5.0/Vault", recursive=True)
+    assert sorted(f.path for f in files if not f.is_folder) == [
+        "Semptify5.0/Vault/certificates/certificates.pdf",
+        "Semptify5.0/Vault/documents/documents.pdf",
+        "Semptify5.0/Vault/photos/photos.pdf",
+    ]
+    # Level 1 is a single call, level 2 batches the three subfolders
+    assert drive.requests == [("GET", "/drive/v3/files"), ("POST", "/batch/drive/v3")]
+
+
+async def test_large_upload_is_resumable(drive, monkeypatch):
+    monkeypatch.setattr(google_drive, "RESUMABLE_THRESHOLD", 1024)
+    monkeypatch.setattr(google_drive, "RESUMABLE_CHUNK_SIZE", 256)
+    content = bytes(range(256)) * 5
+    drive.drop_next_chunk = True
+
+    provider = GoogleDriveProvider(new_token())
+    stored = await provider.upload_file(content, "Semptify5.0", "big.bin")
+    assert drive.files[stored.id]["content"] == content
+    assert drive.requests.count(("PUT", "/upload/session/s1")) == 7  # 5 chunks, 1 dropped, 1 status query
+
+    updated = await provider.upload_file(content[::-1], "Semptify5.0", "big.bin")
+    assert updated.id == stored.id
+    assert drive.files[stored.id]["content"] == content[::-1]
+
+
+async def test_stale_cached_folder_is_resolved_again(drive):
+    token = new_token()
+    await GoogleDriveProvider(token).create_folder("Semptify5.0/Vault")
+    # The user deletes the folder in Drive; the cached ID now 404s
+    [vault] = drive.search("name='Vault'")
+    del drive.files[vault["id"]]
+
+    stored = await GoogleDriveProvider(token).upload_file(b"data", "Semptify5.0/Vault", "a.txt")
+    [recreated] = drive.search("name='Vault'")
+    assert drive.files[stored.id]["parents"] == [recreated["id"]]
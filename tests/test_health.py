@@ -145,6 +145,24 @@ async def test_metrics_contains_expected_fields(client: AsyncClient):
                 assert metric in content, f"Missing metric: {metric}"
 
 
+@pytest.mark.anyio
+async def test_metrics_off_by_default_and_token_protected(client: AsyncClient, monkeypatch):
+    """Metrics are opt-in, and METRICS_TOKEN restricts them to scrapers holding it."""
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_metrics", False)
+    assert (await client.get("/metrics")).status_code == 404
+
+    monkeypatch.setattr(settings, "enable_metrics", True)
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    assert (await client.get("/metrics")).status_code == 401
+    assert (await client.get("/metrics/json")).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer wrong"})).status_code == 401
+    response = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200 and "semptify_uptime_seconds" in response.text
+
+
 # =============================================================================
 # Error Response Tests
 # =============================================================================
@@ -0,0 +1,170 @@
+"""
+Tests for the persistent job processor.
+
+Tests cover:
+- Async and sync handlers running on the processor loop
+- Retries with backoff through the delay queue, then failure
+- Jobs surviving a restart, and expired leases being taken over
+- Per-job-type concurrency limits
+- Delayed submission, cancellation and queue statistics
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.job_processor import JobPriority, JobProcessor, JobStatus, JobStore
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def finished(processor, job_id):
+    status = processor.get_job_status(job_id)
+    return status is not None and status["status"] in ("completed", "failed")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+@pytest.fixture
+def processor(db_path):
+    processor = JobProcessor(max_workers=4, store=JobStore(db_path))
+    processor.retry_base_seconds = 0.01
+    yield processor
+    processor.stop()
+
+
+def test_async_and_sync_handlers(processor):
+    loops = set()
+
+    async def double(payload):
+        loops.add(id(asyncio.get_running_loop()))
+        return {"value": payload["n"] * 2}
+
+    def triple(payload):
+        return {"value": payload["n"] * 3}
+
+    processor.register_handler("double", double)
+    processor.register_handler("triple", triple)
+    processor.start()
+    ids = [processor.submit_job("double", {"n": i}) for i in range(20)]
+    sync_id = processor.submit_job("triple", {"n": 5}, user_id="u1")
+
+    assert wait_for(lambda: all(finished(processor, i) for i in ids + [sync_id]))
+    assert processor.get_job_status(ids[3])["result"] == {"value": 6}
+    assert processor.get_job_status(sync_id)["result"] == {"value": 15}
+    assert len(loops) == 1  # one long-lived loop, not one per job
+    assert [job["id"] for job in processor.get_user_jobs("u1")] == [sync_id]
+
+
+def test_retry_then_fail(processor):
+    attempts = []
+
+    async def flaky(payload):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise RuntimeError("transient")
+        return {"attempts": len(attempts)}
+
+    async def broken(payload):
+        raise RuntimeError("permanent")
+
+    processor.register_handler("flaky", flaky)
+    processor.register_handler("broken", broken)
+    processor.start()
+    flaky_id = processor.submit_job("flaky", {})
+    broken_id = processor.submit_job("broken", {}, max_retries=1)
+
+    assert wait_for(lambda: finished(processor, flaky_id) and finished(processor, broken_id))
+    status = processor.get_job_status(flaky_id)
+    assert status["status"] == "completed" and status["retry_count"] == 2
+    # Backoff doubles: 0.01s then 0.02s
+    assert attempts[2] - attempts[1] >= 0.02
+    failed = processor.get_job_status(broken_id)
+    assert failed["status"] == "failed" and failed["error_message"] == "permanent"
+
+
+def test_jobs_survive_restart(db_path):
+    first = JobProcessor(store=JobStore(db_path))
+    job_id = first.submit_job("echo", {"text": "hi"}, priority=JobPriority.HIGH)
+    first.stop()
+
+    async def echo(payload):
+        return payload
+
+    second = JobProcessor(store=JobStore(db_path))
+    second.register_handler("echo", echo)
+    second.start()
+    try:
+        assert wait_for(lambda: finished(second, job_id))
+        assert second.get_job_status(job_id)["result"] == {"text": "hi"}
+    finally:
+        second.stop()
+
+
+def test_expired_lease_is_redelivered(db_path):
+    store = JobStore(db_path)
+    processor = JobProcessor(store=store)
+    job_id = processor.submit_job("echo", {}, timeout_seconds=1)
+    # A worker that died mid-job: leased, then never finished
+    [leased] = store.lease("dead-worker", ["echo"], 1)
+    assert store.lease("other", ["echo"], 1) == []
+    assert store.lease("other", ["echo"], 1, now=time.time() + 60)[0].id == leased.id == job_id
+
+
+def test_per_type_concurrency(processor):
+    active = {"slow": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def slow(payload):
+        with lock:
+            active["slow"] += 1
+            active["peak"] = max(active["peak"], active["slow"])
+        await asyncio.sleep(0.05)
+        with lock:
+            active["slow"] -= 1
+        return {}
+
+    async def fast(payload):
+        return {}
+
+    processor.register_handler("slow", slow, concurrency=2)
+    processor.register_handler("fast", fast)
+    processor.start()
+    slow_ids = [processor.submit_job("slow", {}) for _ in range(6)]
+    fast_ids = [processor.submit_job("fast", {}) for _ in range(10)]
+
+    assert wait_for(lambda: all(finished(processor, i) for i in fast_ids))
+    assert wait_for(lambda: all(finished(processor, i) for i in slow_ids))
+    assert active["peak"] == 2
+
+
+def test_delay_and_cancel(processor):
+    async def noop(payload):
+        return {}
+
+    processor.register_handler("noop", noop)
+    processor.start()
+    delayed = processor.submit_job("noop", {}, delay_seconds=0.2)
+    cancelled = processor.submit_job("noop", {}, delay_seconds=5)
+    assert processor.get_queue_stats()["delayed"] == 2
+    assert processor.cancel_job(cancelled)
+    assert not processor.cancel_job(cancelled)
+
+    time.sleep(0.05)
+    assert processor.get_job_status(delayed)["status"] == JobStatus.PENDING.value
+    assert wait_for(lambda: finished(processor, delayed), timeout=2)
+    stats = processor.get_queue_stats()
+    assert stats["total_pending"] == 0 and stats["completed"] == 2
+    assert stats["stats"]["jobs_cancelled"] == 1
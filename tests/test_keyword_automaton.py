@@ -0,0 +1,68 @@
+"""
+Tests for the single-pass keyword automaton used by document recognition.
+
+Tests cover:
+- Hits and positions identical to per-keyword substring scans
+- Overlapping and nested keywords
+- Native and pure-Python backends agreeing
+"""
+
+import random
+
+import pytest
+
+from app.services.document_recognition import get_recognition_engine
+from app.services.keyword_automaton import HAS_AHOCORASICK, KeywordAutomaton
+
+BACKENDS = [False] + ([True] if HAS_AHOCORASICK else [])
+
+
+def substring_hits(keywords, text):
+    hits = {}
+    for keyword in keywords:
+        start = text.find(keyword)
+        while start != -1:
+            hits.setdefault(keyword, []).append(start)
+            start = text.find(keyword, start + 1)
+    return hits
+
+
+@pytest.mark.parametrize("native", BACKENDS)
+def test_nested_and_overlapping(native):
+    automaton = KeywordAutomaton(["eviction", "eviction action", "action", "tion", "aa"], use_native=native)
+    hits = automaton.find_all("an eviction action aaa")
+    assert hits == {
+        "eviction": [3],
+        "eviction action": [3],
+        "tion": [7, 14],
+        "action": [12],
+        "aa": [19, 20],
+    }
+
+
+@pytest.mark.parametrize("native", BACKENDS)
+def test_matches_substring_scan(native):
+    keywords = sorted(get_recognition_engine().keyword_automaton.keywords)
+    automaton = KeywordAutomaton(keywords, use_native=native)
+    rng = random.Random(11)
+    for _ in range(50):
+        text = " ".join(rng.choice(keywords + ["rent", "the", "x"]) for _ in range(rng.randint(0, 60)))
+        assert automaton.find_all(text) == substring_hits(keywords, text)
+
+
+def test_empty_inputs():
+    assert KeywordAutomaton([]).find_all("anything") == {}
+    assert KeywordAutomaton(["rent"]).find_all("") == {}
+
+
+def test_recognition_uses_single_pass():
+    engine = get_recognition_engine()
+    result = engine.recognize(
+        "SUMMONS. You are hereby summoned to appear in court and respond. "
+        "This unlawful detainer concerns a security deposit under Minn. Stat. 504B.178."
+    )
+    assert result.doc_type.value == "summons"
+    assert "Unlawful Detainer" in result.key_terms
+    assert "MN Stat. 504B.178" in result.key_terms
+    evidence = [s.evidence for s in result.signals if s.indicator == "primary:you are hereby summoned"]
+    assert evidence and "you are hereby summoned" in evidence[0]
@@ -0,0 +1,98 @@
+"""
+Tests for the per-page PDF extraction engine.
+
+Tests cover:
+- Text-layer pages use PyMuPDF; only image-only pages go to OCR
+- prefer_ocr forces OCR on every page
+- A page PyMuPDF cannot parse falls back to PyPDF2
+- Pages stream back in order from the process pool
+"""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app.core.config import get_settings
+from app.services import pdf_extractor
+from app.services.pdf_extractor import PDFExtractor, shutdown_page_executor
+
+
+def make_packet(kinds):
+    """Build a PDF from page kinds: "text", "scan" (image only) or "blank"."""
+    doc = fitz.open()
+    for number, kind in enumerate(kinds, start=1):
+        page = doc.new_page()
+        if kind == "text":
+            page.insert_text((72, 72), f"EVICTION SUMMONS page {number}. Tenant must appear in court.")
+        elif kind == "scan":
+            source = fitz.open()
+            source.new_page().insert_text((72, 72), f"Scanned exhibit {number}")
+            pix = source[0].get_pixmap(dpi=50)
+            page.insert_image(page.rect, pixmap=pix)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    calls = []
+
+    def ocr_page(page, dpi):
+        calls.append(page.number + 1)
+        return f"OCR text of page {page.number + 1}"
+
+    monkeypatch.setattr(pdf_extractor, "_tesseract_available", lambda: True)
+    monkeypatch.setattr(pdf_extractor, "_ocr_page", ocr_page)
+    monkeypatch.setattr(get_settings(), "pdf_extract_workers", 0)
+    return calls
+
+
+def test_ocr_only_for_image_only_pages(fake_ocr):
+    result = PDFExtractor().extract(make_packet(["text", "scan", "blank", "text"]))
+    assert fake_ocr == [2]
+    assert result.page_count == 4
+    assert result.method_used == "ocr+pymupdf"
+    assert result.metadata["ocr_pages"] == [2]
+    assert "OCR text of page 2" in result.text and "EVICTION SUMMONS page 4" in result.text
+
+    PDFExtractor().extract(make_packet(["text", "scan"]), prefer_ocr=True)
+    assert fake_ocr[1:] == [1, 2]
+
+
+def test_scanned_pages_without_tesseract_are_flagged(monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "_tesseract_available", lambda: False)
+    monkeypatch.setattr(get_settings(), "pdf_extract_workers", 0)
+    result = PDFExtractor().extract(make_packet(["text", "scan", "text", "scan"]))
+    assert result.method_used == "pymupdf"
+    assert result.metadata["needs_ocr_pages"] == [2, 4]
+    assert result.confidence == pytest.approx(0.45)
+
+
+def test_unparseable_page_falls_back_to_pypdf2():
+    content = make_packet(["text", "text"])
+
+    class BrokenDoc:
+        def __getitem__(self, index):
+            raise RuntimeError("bad page object")
+
+    page = pdf_extractor._extract_page(BrokenDoc(), 1, content, ocr=True, ocr_dpi=200, force_ocr=False)
+    assert page.method == "pypdf2"
+    assert "page 2" in page.text
+
+
+async def test_pages_stream_in_order_from_process_pool(monkeypatch):
+    monkeypatch.setattr(get_settings(), "pdf_extract_workers", 2)
+    kinds = ["text", "blank"] * 10
+    try:
+        pages = [page async for page in PDFExtractor().extract_pages(make_packet(kinds))]
+        assert pdf_extractor._page_executor is not None
+    finally:
+        shutdown_page_executor()
+
+    assert [page.page_number for page in pages] == list(range(1, 21))
+    assert all(f"page {page.page_number}." in page.text for page in pages[::2])
+    assert {page.method for page in pages[1::2]} == {"none"}
+
+    result = await PDFExtractor().extract_async(make_packet(["text"] * 3))
+    assert result.page_count == 3 and result.method_used == "pymupdf"
@@ -0,0 +1,94 @@
+"""
+Tests for PostgresFTSService hybrid search and SearchVectorReindexer.
+
+PostgreSQL is not available in the test environment, so these check the
+statements sent and how results are handled, using a recording session.
+
+Tests cover:
+- Hybrid search is one UNION ALL statement with reciprocal-rank fusion
+- Reindexer sweeps stale rows batch by batch until none are left
+- Reindexer only starts on PostgreSQL
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import postgres_fts
+from app.core.postgres_fts import PostgresFTSService, SearchVectorReindexer
+
+
+class RecordingSession:
+    def __init__(self, rows=(), rowcounts=()):
+        self.rows = list(rows)
+        self.rowcounts = list(rowcounts)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        rowcount = self.rowcounts.pop(0) if self.rowcounts else 0
+        return SimpleNamespace(fetchall=lambda: self.rows, rowcount=rowcount)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def test_hybrid_search_is_one_fused_statement():
+    rows = [
+        SimpleNamespace(id="42", type="vault_item", title="Mold photo", source_rank=1, score=1 / 61, headline="<b>mold</b>"),
+        SimpleNamespace(id="doc-1", type="document", title="lease.pdf", source_rank=1, score=1 / 61, headline=""),
+    ]
+    session = RecordingSession(rows=rows)
+    results = await PostgresFTSService(session).hybrid_search("mold repair", user_id="u1", limit=10)
+
+    assert len(session.statements) == 1
+    sql, params = session.statements[0]
+    assert "UNION ALL" in sql
+    assert "row_number() OVER" in sql
+    assert "/ (:rrf_k + hits.source_rank)" in sql
+    assert "d.user_id = :user_id" in sql and "v.user_id = :user_id" in sql
+    assert params["tsquery"] == "mold & repair"
+    assert (params["rrf_k"], params["document_weight"], params["vault_weight"]) == (60, 1.0, 1.0)
+
+    assert [(r["id"], r["type"]) for r in results] == [("42", "vault_item"), ("doc-1", "document")]
+    assert results[0]["title"] == "<b>mold</b>"
+    assert results[1]["title"] == "lease.pdf"  # falls back when there is no headline
+    assert results[0]["rank"] == pytest.approx(1 / 61)
+
+
+async def test_hybrid_search_weights_and_empty_query():
+    session = RecordingSession()
+    await PostgresFTSService(session).hybrid_search("rent", weights={"vault_item": 0.5}, rrf_k=10)
+    sql, params = session.statements[0]
+    assert "user_id" not in sql
+    assert (params["rrf_k"], params["document_weight"], params["vault_weight"]) == (10, 1.0, 0.5)
+
+    assert await PostgresFTSService(session).hybrid_search("   ") == []
+    assert len(session.statements) == 1
+
+
+async def test_reindexer_sweeps_until_no_stale_rows():
+    session = RecordingSession(rowcounts=[100, 100, 7])
+    reindexer = SearchVectorReindexer(lambda: session, batch_size=100)
+    assert await reindexer.run_once() == 207
+    assert reindexer.rows_reindexed == 207
+    assert session.commits == 3
+
+    sql, params = session.statements[0]
+    assert "WHERE search_vector IS NULL" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "COALESCE(d.extracted_text, '')" in sql
+    assert params == {"batch_size": 100}
+
+
+async def test_reindexer_not_started_on_sqlite():
+    assert await postgres_fts.start_search_reindexer() is False
+    assert postgres_fts.get_search_reindexer() is None
+    await postgres_fts.stop_search_reindexer()
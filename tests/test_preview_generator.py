@@ -0,0 +1,184 @@
+"""
+Tests for the disk-backed preview generator and preview routes.
+
+Tests cover:
+- PDF pages rendered at the target size into content-addressed files
+- Rendered files reused without rendering again
+- Paged manifests with lazily rendered page images
+- Serving to the document's owner with ETag, 304 and Range
+- Concurrent requests writing the same files
+- Rendering on the process pool
+- Pruning PREVIEW_DIR to its size bound, least recently used first
+- Cache clearing restricted to the document's own previews, or admins
+"""
+
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app.core import preview_generator
+from app.core.config import get_settings
+from app.core.preview_generator import PreviewGenerator, PreviewType, shutdown_render_executor
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        doc.new_page(width=612, height=792).insert_text((72, 72), f"Notice to quit, page {number}")
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "preview_workers", 0)
+    gen = PreviewGenerator(root=tmp_path / "previews", max_bytes=0)
+    monkeypatch.setattr(preview_generator, "_preview_generator", gen)
+    return gen
+
+
+async def test_pdf_page_rendered_at_target_size(generator, tmp_path, monkeypatch):
+    source = make_pdf(tmp_path / "notice.pdf", 3)
+    digest = hashlib.sha256(open(source, "rb").read()).hexdigest()
+
+    result = await generator.generate_thumbnail("doc1", source, page_number=2)
+    # Letter page scaled to fit 200x300: width bound
+    assert (result.metadata["width"], result.metadata["height"]) == (200, 259)
+    assert result.cache_key == f"{digest}/thumbnail-200x300-p2.{generator.image_extension}"
+    assert generator.rendered_path(result.cache_key) is not None
+
+    def no_render(*args):
+        raise AssertionError("rendered again")
+
+    monkeypatch.setattr(preview_generator, "_render_pdf_page", no_render)
+    again = await generator.generate_thumbnail("doc2", source, page_number=2)
+    assert again.cache_key == result.cache_key and again.metadata["cached"]
+    assert generator.get_preview(digest, PreviewType.THUMBNAIL, 2) is not None
+
+    assert await generator.generate_thumbnail("doc1", source, page_number=9) is None
+    assert generator.rendered_path(f"../{digest}/thumbnail-200x300-p2.webp") is None
+
+
+async def test_manifest_pages_and_lazy_images(generator, tmp_path, authenticated_client, client, test_user_id):
+    from app.core.database import get_db_session
+    from app.models.models import Document
+
+    source = make_pdf(tmp_path / "packet.pdf", 5)
+    content = open(source, "rb").read()
+    async with get_db_session() as session:
+        session.add(Document(
+            id="doc-preview", user_id=test_user_id, filename="packet.pdf", original_filename="packet.pdf",
+            file_path=source, file_size=len(content), mime_type="application/pdf",
+            sha256_hash=hashlib.sha256(content).hexdigest(),
+        ))
+        await session.commit()
+
+    response = await authenticated_client.get("/api/preview/doc-preview/manifest?offset=0&limit=2")
+    assert response.status_code == 200
+    manifest = response.json()
+    assert manifest["metadata"]["page_count"] == 5
+    assert [page["page_number"] for page in manifest["pages"]] == [1, 2]
+    assert "page 2" in manifest["pages"][1]["text"]
+    assert manifest["next_url"] == "/api/preview/doc-preview/manifest?offset=2&limit=2"
+    # Nothing is rendered until a page image is requested
+    assert generator.stats["pages_rendered"] == 0
+
+    last = (await authenticated_client.get("/api/preview/doc-preview/manifest?offset=4&limit=2")).json()
+    assert [page["page_number"] for page in last["pages"]] == [5] and last["next_url"] is None
+
+    page = await authenticated_client.get(manifest["pages"][1]["image_url"])
+    assert page.status_code == 200
+    assert page.headers["content-type"] == f"image/{generator.image_extension}"
+    assert generator.stats["pages_rendered"] == 1
+
+    generated = await authenticated_client.post("/api/preview/generate", json={
+        "document_id": "doc-preview", "preview_type": "thumbnail",
+    })
+    url = generated.json()["preview_url"]
+    assert url.startswith("/api/preview/doc-preview/files/")
+
+    served = await authenticated_client.get(url)
+    assert served.status_code == 200 and served.content[:4] in (b"RIFF", b"\xff\xd8\xff\xe0")
+    etag = served.headers["etag"]
+    assert served.headers["cache-control"].startswith("private")
+    assert (await client.get(url)).status_code in (401, 403)
+
+    not_modified = await authenticated_client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    partial = await authenticated_client.get(url, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == served.content[:10]
+
+    missing = await authenticated_client.get(manifest["pages"][0]["image_url"].replace("/1", "/9"))
+    assert missing.status_code == 404
+
+
+async def test_concurrent_requests_for_the_same_file(generator, tmp_path):
+    source = make_pdf(tmp_path / "notice.pdf", 2)
+    previews = await asyncio.gather(*(generator.generate_preview(f"doc{i}", source) for i in range(4)))
+    pages = await asyncio.gather(*(generator.render_page(source, 1, PreviewType.PREVIEW) for _ in range(4)))
+    assert all(previews) and len({page.content for page in pages}) == 1
+    assert not list((tmp_path / "previews").rglob("*.tmp"))
+
+
+async def test_pages_render_on_process_pool(generator, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "preview_workers", 1)
+    source = make_pdf(tmp_path / "lease.pdf", 1)
+    try:
+        result = await generator.render_page(source, 1, PreviewType.PREVIEW)
+        assert preview_generator._render_executor is not None
+    finally:
+        shutdown_render_executor()
+    assert result.metadata["width"] == 800 and result.metadata["height"] == pytest.approx(1035, abs=1)
+
+
+async def test_least_recently_used_documents_are_pruned(generator, tmp_path):
+    sources = [make_pdf(tmp_path / f"doc{index}.pdf", 1) for index in range(3)]
+    results = [await generator.render_page(source, 1, PreviewType.THUMBNAIL) for source in sources]
+    dirs = [os.path.dirname(result.content) for result in results]
+    for age, directory in zip((300, 200, 100), dirs):
+        os.utime(directory, (os.path.getmtime(directory) - age,) * 2)
+
+    # A lookup marks the oldest document as used
+    assert generator.rendered_path(results[0].cache_key) is not None
+    assert generator.prune() == 0
+    assert generator.get_statistics()["cache_files"] == 3
+
+    generator.max_bytes = generator.disk_bytes - 1
+    assert generator.prune() == 1
+    assert not os.path.exists(dirs[1])
+    assert os.path.exists(dirs[0]) and os.path.exists(dirs[2])
+    stats = generator.get_statistics()
+    assert stats["cache_files"] == 2 and stats["cache_bytes"] <= generator.max_bytes
+
+    # A render past the bound prunes in the background
+    generator.max_bytes = generator.disk_bytes
+    await generator.render_page(sources[1], 1, PreviewType.THUMBNAIL)
+    await generator._prune_task
+    assert generator.get_statistics()["cache_files"] < 3
+
+
+async def test_clearing_previews(generator, tmp_path, authenticated_client, test_user_id):
+    from app.core.database import get_db_session
+    from app.models.models import Document
+
+    source = make_pdf(tmp_path / "unhashed.pdf", 1)
+    kept = await generator.render_page(source, 1, PreviewType.THUMBNAIL)
+    async with get_db_session() as session:
+        session.add(Document(
+            id="doc-unhashed", user_id=test_user_id, filename="unhashed.pdf", original_filename="unhashed.pdf",
+            file_path=source, file_size=os.path.getsize(source), mime_type="application/pdf", sha256_hash="",
+        ))
+        await session.commit()
+
+    response = await authenticated_client.delete("/api/preview/cache/doc-unhashed")
+    assert response.status_code == 404
+    response = await authenticated_client.delete("/api/preview/cache")
+    assert response.status_code == 403
+    assert os.path.exists(kept.content)
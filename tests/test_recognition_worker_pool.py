@@ -0,0 +1,120 @@
+"""
+Tests for running the recognition engine off the event loop.
+
+Tests cover:
+- Batch results from worker processes matching inline analysis
+- Streaming results as they complete
+- Per-document timeouts, bounded waits for a worker and pool restarts
+- Thread offload when no worker processes are configured
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.recognition import DocumentRecognitionEngine
+from app.services.recognition.worker_pool import RecognitionWorkerPool
+
+NOTICE = (
+    "14-DAY NOTICE TO PAY RENT OR QUIT. To tenant Jane Doe at 42 Elm Street, Apt 3, "
+    "Minneapolis, MN 55401. You owe $1,450.00 in unpaid rent for March 2026. "
+    "Pay within 14 days or your landlord, Lakeview Properties LLC, may file an eviction action "
+    "under Minn. Stat. 504B.135."
+)
+RECEIPT = "RENT RECEIPT. Received from John Smith the sum of $900.00 for rent at 7 Oak Ave on 01/05/2026."
+DOCUMENTS = [{"text": NOTICE, "filename": "notice.pdf"}, {"text": RECEIPT}, {"text": NOTICE + " Final notice."}]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = DocumentRecognitionEngine({"worker_processes": 2, "batch_chunk_size": 2})
+    yield engine
+    engine.close()
+
+
+@pytest.fixture(scope="module")
+def inline_engine():
+    return DocumentRecognitionEngine({"offload": False})
+
+
+async def test_batch_matches_inline(engine, inline_engine):
+    results = await engine.analyze_batch(DOCUMENTS)
+    expected = [await inline_engine.analyze(doc["text"], filename=doc.get("filename")) for doc in DOCUMENTS]
+
+    assert [r.document_type for r in results] == [r.document_type for r in expected]
+    assert [r.confidence.overall_score for r in results] == [r.confidence.overall_score for r in expected]
+    assert [len(r.entities) for r in results] == [len(r.entities) for r in expected]
+
+
+async def test_stream_yields_every_position(engine):
+    positions = [position async for position, _ in engine.analyze_stream(DOCUMENTS * 3)]
+    assert sorted(positions) == list(range(9))
+
+
+async def test_single_analysis_leaves_loop_responsive(engine):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    result = await engine.analyze(NOTICE * 20)
+    task.cancel()
+    assert result.document_type.value != "unknown"
+    assert ticks > 1
+
+
+async def test_timeout_returns_failed_result():
+    pool = RecognitionWorkerPool(max_workers=1)
+    try:
+        result = await pool.analyze({"text": NOTICE * 200}, timeout=0.001)
+        assert any("timed out" in w for w in result.warnings)
+        assert pool.stats["timed_out"] == 1
+        # The stuck worker was replaced rather than left holding its slot
+        assert pool.stats["restarts"] == 1
+        assert (await pool.analyze({"text": RECEIPT})).warnings == []
+    finally:
+        pool.shutdown()
+
+
+async def test_waiting_for_a_worker_is_bounded():
+    pool = RecognitionWorkerPool(max_workers=1, queue_timeout=0.01)
+    try:
+        await pool.start()
+        busy = asyncio.ensure_future(pool.analyze({"text": NOTICE * 200}))
+        await asyncio.sleep(0)
+        result = await pool.analyze({"text": RECEIPT})
+        assert any("No analysis worker free" in w for w in result.warnings)
+        await busy
+    finally:
+        pool.shutdown()
+
+
+async def test_one_restart_per_broken_pool():
+    pool = RecognitionWorkerPool(max_workers=2)
+    try:
+        await pool.start()
+        broken = pool._executor
+        running = [asyncio.ensure_future(pool.analyze({"text": NOTICE * 200})) for _ in range(2)]
+        await asyncio.sleep(0.2)
+        for process in list(broken._processes.values()):
+            process.kill()
+        results = await asyncio.gather(*running)
+
+        # The first caller to see the crash restarts the pool; the other is
+        # retried on the new pool instead of tearing it down again
+        assert pool.stats["restarts"] == 1
+        assert sorted(r.warnings == [] for r in results) == [False, True]
+        assert (await pool.analyze({"text": RECEIPT})).warnings == []
+    finally:
+        pool.shutdown()
+
+
+async def test_thread_offload_without_processes(inline_engine):
+    engine = DocumentRecognitionEngine({"worker_processes": 0})
+    result = await engine.analyze(RECEIPT)
+    expected = await inline_engine.analyze(RECEIPT)
+    assert result.document_type == expected.document_type
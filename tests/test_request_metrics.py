@@ -0,0 +1,149 @@
+"""
+Tests for the fixed-memory request metrics.
+
+Tests cover:
+- Latency sketch quantiles within the relative accuracy bound
+- Bounded memory: bucket and route caps, ring buffer of slow samples
+- Route templates as labels
+- Merging worker snapshots and reading sibling snapshot files
+- Prometheus text output and the PerformanceMonitor summaries
+"""
+
+import json
+import os
+import random
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import request_metrics
+from app.core.request_metrics import (
+    OTHER_ROUTE,
+    UNMATCHED_ROUTE,
+    LatencySketch,
+    MetricsRegistry,
+    RequestMetricsMiddleware,
+    aggregated_metrics,
+)
+
+
+class TestLatencySketch:
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(3, 1.5) for _ in range(20000))
+        sketch = LatencySketch()
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.9, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= exact * 0.011
+        assert sketch.count == len(values)
+        assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+    def test_bins_are_bounded(self):
+        sketch = LatencySketch()
+        for i in range(1, 100000):
+            sketch.add(i * 0.37)
+        assert len(sketch.bins) <= LatencySketch.MAX_BINS
+        assert len(sketch.bins) < 1200
+
+    def test_merge_equals_combined(self):
+        left, right, combined = LatencySketch(), LatencySketch(), LatencySketch()
+        for i in range(1, 500):
+            (left if i % 2 else right).add(float(i))
+            combined.add(float(i))
+        left.merge(LatencySketch.from_dict(json.loads(json.dumps(right.to_dict()))))
+        assert left.bins == combined.bins
+        assert left.quantile(0.95) == combined.quantile(0.95)
+
+
+class TestRegistry:
+    def test_route_cap_and_slow_ring(self):
+        registry = MetricsRegistry(max_routes=3, slow_samples=5, slow_request_ms=100)
+        for i in range(10):
+            registry.record("GET", f"/r{i}", 200, 150.0)
+        assert len(registry.routes) == 4
+        assert registry.routes[("GET", OTHER_ROUTE)].latency.count == 7
+        assert len(registry.slow) == 5
+        assert registry.recent(60)["slow"] == 10
+
+    def test_window_drops_old_minutes(self):
+        registry = MetricsRegistry()
+        now = 1_000_000.0
+        registry.record("GET", "/a", 500, 10.0, now=now - 3600 * 2)
+        registry.record("GET", "/a", 200, 10.0, now=now)
+        assert registry.recent(60, now=now) == {"requests": 1, "errors": 0, "slow": 0, "duration_ms": 10.0}
+
+    def test_merged_snapshots(self):
+        first, second = MetricsRegistry(), MetricsRegistry()
+        first.record("GET", "/a", 200, 10.0)
+        second.record("GET", "/a", 404, 30.0)
+        second.record("POST", "/b", 201, 5.0)
+        merged = MetricsRegistry.merged([first.snapshot(), second.snapshot()])
+        assert merged.workers == 2
+        assert merged.total_requests == 3
+        assert merged.route_stats("/a").statuses == {200: 1, 404: 1}
+        assert merged.recent(60)["errors"] == 1
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.record("GET", '/api/"x"', 200, 20.0)
+        text = registry.render_prometheus()
+        assert '# TYPE semptify_http_request_duration_seconds histogram' in text
+        assert 'semptify_http_requests_total{method="GET",route="/api/\\"x\\"",status="200"} 1' in text
+        assert 'route="/api/\\"x\\"",le="0.025"} 1' in text
+        assert 'route="/api/\\"x\\"",le="0.01"} 0' in text
+
+
+def test_aggregates_fresh_sibling_snapshots(tmp_path):
+    sibling = MetricsRegistry()
+    sibling.record("GET", "/sibling", 200, 10.0)
+    data = sibling.snapshot()
+    (tmp_path / "worker-1.json").write_text(json.dumps(data))
+    stale = tmp_path / "worker-2.json"
+    stale.write_text(json.dumps(data))
+    old = time.time() - request_metrics.STALE_AFTER - 5
+    os.utime(stale, (old, old))
+
+    merged = aggregated_metrics(str(tmp_path))
+    assert merged.workers == 2
+    assert merged.route_stats("/sibling").latency.count == 1
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    registry = MetricsRegistry()
+    app.add_middleware(RequestMetricsMiddleware, registry=registry)
+    client = TestClient(app)
+    for i in range(5):
+        client.get(f"/api/items/{i}")
+    client.get("/no/such/page")
+
+    assert registry.routes[("GET", "/api/items/{item_id}")].statuses == {200: 5}
+    assert registry.routes[("GET", UNMATCHED_ROUTE)].statuses == {404: 1}
+
+
+def test_performance_monitor_reads_registry(monkeypatch, tmp_path):
+    from app.core import performance_monitor
+
+    registry = MetricsRegistry()
+    monkeypatch.setattr(request_metrics, "_registry", registry)
+    monkeypatch.setattr(request_metrics, "METRICS_DIR", str(tmp_path))
+    for i in range(20):
+        performance_monitor.record_request_performance("/api/x", "GET", 500 if i < 2 else 200, 10.0 + i)
+
+    monitor = performance_monitor.PerformanceMonitor()
+    summary = monitor.get_performance_summary()["requests"]
+    assert summary["total_last_hour"] == 20
+    assert summary["error_rate_percent"] == 10.0
+    endpoint = monitor.get_endpoint_performance("/api/x")
+    assert endpoint["total_requests"] == 20
+    assert endpoint["status_code_distribution"] == {"200": 18, "500": 2}
+    assert monitor.get_endpoint_performance("/api/missing") == {"error": "No data found for endpoint"}
@@ -0,0 +1,179 @@
+"""
+Tests for lazy router loading and the startup profiler.
+
+Tests cover:
+- Router modules imported only on the first request to their prefix
+- Loaded routes keeping registration order ahead of later catch-alls
+- Preload allowlist, failed imports and the OpenAPI schema
+- LAZY_ROUTERS prefixes in app.main covering every route they serve
+- Per-module import timing
+"""
+
+import importlib
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.router_registry import LazyRouter, RouterRegistry
+from app.core.startup_profiler import StartupProfiler, subsystem_of
+
+ROUTER_SOURCE = '''
+from fastapi import APIRouter
+
+router = APIRouter(prefix="{prefix}")
+
+
+@router.get("/ping")
+async def ping():
+    return {{"module": __name__}}
+'''
+
+
+@pytest.fixture
+def router_modules(tmp_path, monkeypatch):
+    """Write throwaway router modules and forget them afterwards."""
+    names = []
+
+    def make(name: str, prefix: str) -> str:
+        (tmp_path / f"{name}.py").write_text(ROUTER_SOURCE.format(prefix=prefix))
+        names.append(name)
+        return name
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+    yield make
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+def build_app(routers, **install_kwargs):
+    app = FastAPI()
+    registry = RouterRegistry(routers)
+    registry.install(app, **install_kwargs)
+
+    @app.get("/{page}/{rest:path}")
+    async def catch_all(page: str, rest: str):
+        return {"module": "catch_all"}
+
+    return app, registry
+
+
+class TestLazyLoading:
+    def test_imported_on_first_request(self, router_modules):
+        alpha = router_modules("lazy_alpha", "/api/alpha")
+        beta = router_modules("lazy_beta", "/api/beta")
+        app, registry = build_app([
+            LazyRouter(alpha, ("/api/alpha",)),
+            LazyRouter(beta, ("/api/beta",)),
+        ])
+        assert alpha not in sys.modules
+        assert registry.pending == 2
+
+        client = TestClient(app)
+        # The catch-all is registered later, so loaded routes must still win
+        assert client.get("/api/alpha/ping").json() == {"module": alpha}
+        assert alpha in sys.modules
+        assert beta not in sys.modules
+        assert registry.pending == 1
+        assert registry.load_stats[alpha]["loaded"] is True
+
+    def test_prefix_matches_whole_segments(self, router_modules):
+        name = router_modules("lazy_segment", "/api/vault")
+        app, registry = build_app([LazyRouter(name, ("/api/vault",))])
+        TestClient(app).get("/api/vault-engine/ping")
+        assert registry.pending == 1
+
+    def test_include_prefix_and_order(self, router_modules):
+        first = router_modules("lazy_first", "")
+        second = router_modules("lazy_second", "")
+        app, _ = build_app([
+            LazyRouter(first, ("/api/shared",), prefix="/api/shared"),
+            LazyRouter(second, ("/api/shared",), prefix="/api/shared"),
+        ])
+        # Both routers serve the same path; registration order decides
+        assert TestClient(app).get("/api/shared/ping").json() == {"module": first}
+
+    def test_preload_and_lazy_off(self, router_modules):
+        alpha = router_modules("lazy_pre_alpha", "/a")
+        beta = router_modules("lazy_pre_beta", "/b")
+        routers = [LazyRouter(alpha, ("/a",)), LazyRouter(beta, ("/b",))]
+
+        _, registry = build_app(routers, preload=["lazy_pre_alpha", ""])
+        assert registry.pending == 1 and alpha in sys.modules
+
+        _, registry = build_app(routers, lazy=False)
+        assert registry.pending == 0
+
+    def test_failed_import_is_skipped(self):
+        app, registry = build_app([LazyRouter("lazy_missing_module", ("/gone",))])
+        response = TestClient(app).get("/gone/ping")
+        assert response.json() == {"module": "catch_all"}
+        assert registry.pending == 0
+        assert registry.load_stats["lazy_missing_module"]["loaded"] is False
+
+    def test_openapi_loads_everything(self, router_modules):
+        name = router_modules("lazy_docs", "/api/docs-demo")
+        app, registry = build_app([LazyRouter(name, ("/api/docs-demo",))])
+        schema = TestClient(app).get("/openapi.json").json()
+        assert "/api/docs-demo/ping" in schema["paths"]
+        assert registry.pending == 0
+
+
+def route_paths(router, prefix=""):
+    for route in router.routes:
+        nested = getattr(route, "original_router", None)  # newer FastAPI keeps includes as one node
+        if nested is not None:
+            yield from route_paths(nested, prefix + route.include_context.prefix)
+        elif getattr(route, "path", None):
+            yield prefix + route.path
+
+
+def test_app_router_prefixes_cover_their_routes():
+    """Every route a registered router serves must be reachable through its prefixes."""
+    from app.main import LAZY_ROUTERS
+
+    checked = 0
+    for entry in LAZY_ROUTERS:
+        try:
+            router = getattr(importlib.import_module(entry.module), entry.attr)
+        except ImportError:
+            continue  # optional dependency missing in this environment
+        for path in route_paths(router, entry.prefix):
+            checked += 1
+            assert any(path == p or path.startswith(p + "/") for p in entry.prefixes), \
+                f"{entry.name}: {path} is outside {entry.prefixes}"
+    assert checked > 100
+
+
+class TestStartupProfiler:
+    def test_records_nested_imports(self, tmp_path, monkeypatch):
+        (tmp_path / "prof_child.py").write_text("VALUE = sum(range(1000))\n")
+        (tmp_path / "prof_parent.py").write_text(textwrap.dedent("""
+            import prof_child
+            DATA = [0] * 100000
+        """))
+        monkeypatch.syspath_prepend(str(tmp_path))
+        importlib.invalidate_caches()
+
+        profiler = StartupProfiler().start()
+        try:
+            import prof_parent  # noqa: F401
+        finally:
+            profiler.stop()
+            sys.modules.pop("prof_parent", None)
+            sys.modules.pop("prof_child", None)
+
+        parent = profiler.modules["prof_parent"]
+        child = profiler.modules["prof_child"]
+        assert parent.seconds >= child.seconds
+        assert parent.self_seconds == pytest.approx(parent.seconds - child.seconds)
+        assert "prof_parent" in profiler.report()
+        assert profiler._finder not in sys.meta_path
+
+    def test_subsystem_grouping(self):
+        assert subsystem_of("app.routers.vault") == "app.routers.vault"
+        assert subsystem_of("app.services.recognition.engine") == "app.services.recognition"
+        assert subsystem_of("sqlalchemy.engine.base") == "sqlalchemy"
@@ -0,0 +1,339 @@
+"""
+Tests for the search engine's inverted index and on-disk segments.
+
+Tests cover:
+- Incremental document length statistics
+- Removal without re-tokenizing
+- Flushing to segments and reopening without reindexing
+- Tombstoned deletes and segment merging
+- Workers sharing one index directory, and crash recovery of buffered documents
+- Top-k evaluation matching exhaustive BM25 scoring, with facet filters
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.search_engine import (
+    DocumentIndex,
+    InvertedIndex,
+    SearchEngine,
+    SearchOperator,
+    SearchQuery,
+)
+from app.core.search_segment import IndexSegment, SegmentDocument, SegmentWriter
+
+
+def make_doc(doc_id: str, title: str, content: str, user_id: str = "user-1", **kwargs) -> DocumentIndex:
+    now = kwargs.get("created_at", datetime.now(timezone.utc))
+    return DocumentIndex(
+        document_id=doc_id,
+        user_id=user_id,
+        title=title,
+        content=content,
+        metadata=kwargs.get("metadata", {}),
+        created_at=now,
+        updated_at=now,
+        file_type=kwargs.get("file_type", "pdf"),
+        tags=kwargs.get("tags", []),
+    )
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return tmp_path / "search_index"
+
+
+class TestInvertedIndexMemory:
+    """In-memory behaviour (no index_dir)."""
+
+    def test_running_average_length(self):
+        index = InvertedIndex()
+        index.add_document(make_doc("d1", "Lease", "rent eviction notice"))
+        index.add_document(make_doc("d2", "Notice", "landlord repair"))
+        assert index.total_documents == 2
+        assert index.total_length == 7
+        assert index.avg_document_length == 3.5
+
+        index.remove_document("d1")
+        assert index.total_documents == 1
+        assert index.avg_document_length == 3
+        assert "eviction" not in index.index
+        assert "d1" not in index
+
+    def test_re_adding_replaces_document(self):
+        index = InvertedIndex()
+        index.add_document(make_doc("d1", "Lease", "rent"))
+        index.add_document(make_doc("d1", "Lease", "eviction"))
+        assert index.total_documents == 1
+        assert index.get_postings("rent") == {}
+        assert index.get_postings("eviction") == {"d1": 1}
+
+    def test_search_and_or(self):
+        index = InvertedIndex()
+        index.add_document(make_doc("d1", "Eviction notice", "rent is late"))
+        index.add_document(make_doc("d2", "Repair request", "rent receipt"))
+
+        and_results = index.search(SearchQuery(query="eviction rent"))
+        assert [r.document.document_id for r in and_results] == ["d1"]
+
+        or_results = index.search(SearchQuery(query="eviction repair", operator=SearchOperator.OR))
+        assert {r.document.document_id for r in or_results} == {"d1", "d2"}
+
+
+class TestSegments:
+    """Segment file format."""
+
+    def test_round_trip(self, tmp_path):
+        rows = [
+            SegmentDocument("a", 3, 1700000000.0, {"rent": 2, "lease": 1}, {"title": "A"}),
+            SegmentDocument("b", 1, 1700000500.0, {"rent": 1}, {"title": "B"}),
+        ]
+        path = tmp_path / "test.seg"
+        SegmentWriter.write(path, rows)
+
+        segment = IndexSegment(path)
+        try:
+            assert segment.doc_count == 2
+            assert segment.total_length == 4
+            assert segment.postings("rent") == [(0, 2), (1, 1)]
+            assert segment.postings("lease") == [(0, 1)]
+            assert segment.postings("missing") == []
+            assert segment.docnums() == {"a": 0, "b": 1}
+            assert segment.stored_fields(1) == {"title": "B"}
+            assert segment.doc_created_at(1) == 1700000500.0
+            assert segment.bitmap("rent") == 0b11
+        finally:
+            segment.close()
+
+
+class TestPersistentIndex:
+    """Flush, reopen, delete and merge."""
+
+    def test_reopen_without_reindexing(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir))
+        index.add_document(make_doc("d1", "Eviction notice", "rent is late", tags=["urgent"]))
+        index.add_document(make_doc("d2", "Repair request", "heat broken"))
+        index.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert reopened.total_documents == 2
+        assert len(reopened.segments) == 1
+        results = reopened.search(SearchQuery(query="eviction"))
+        assert results[0].document.document_id == "d1"
+        assert results[0].document.tags == ["urgent"]
+        reopened.close()
+
+    def test_flush_threshold_creates_segments(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir), flush_threshold=2)
+        for i in range(5):
+            index.add_document(make_doc(f"d{i}", "Notice", f"rent payment {i}"))
+        assert len(index.segments) == 2
+        assert len(index.document_index) == 1
+        assert len(index.get_postings("rent")) == 5
+        index.close()
+
+    def test_delete_persists_as_tombstone(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir))
+        index.add_document(make_doc("d1", "Notice", "rent"))
+        index.add_document(make_doc("d2", "Notice", "rent"))
+        index.flush()
+        index.remove_document("d1")
+        assert index.get_postings("rent") == {"d2": 1}
+        index.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert reopened.total_documents == 1
+        assert "d1" not in reopened
+        assert reopened.get_document("d1") is None
+        reopened.close()
+
+    def test_merge_drops_deleted_documents(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir), flush_threshold=1, max_segments=100)
+        for i in range(4):
+            index.add_document(make_doc(f"d{i}", "Notice", f"rent lease{i}"))
+        index.remove_document("d2")
+        assert len(index.segments) == 4
+
+        index.merge_segments()
+        assert len(index.segments) == 1
+        assert index.segments[0].doc_count == 3
+        assert set(index.get_postings("rent")) == {"d0", "d1", "d3"}
+        assert index.get_postings("lease3") == {"d3": 1}
+        assert sorted(p.name for p in index_dir.glob("*.seg")) == [index.segments[0].name]
+        index.close()
+
+    def test_workers_sharing_a_directory(self, index_dir):
+        a = InvertedIndex(index_dir=str(index_dir), flush_threshold=2, max_segments=3)
+        b = InvertedIndex(index_dir=str(index_dir), flush_threshold=2, max_segments=3)
+        for i in range(6):
+            a.add_document(make_doc(f"a{i}", "Notice", "rent"))
+            b.add_document(make_doc(f"b{i}", "Notice", "rent"))
+        b.remove_document("a0")
+
+        # Neither worker overwrote the other's segments or tombstones
+        found = {r.document.document_id for r in a.search(SearchQuery(query="rent", limit=20))}
+        assert found == {f"a{i}" for i in range(1, 6)} | {f"b{i}" for i in range(6)}
+        assert len({s.name for s in a.segments}) == len(a.segments)
+        a.close()
+        b.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert reopened.total_documents == 11
+        reopened.close()
+        assert not list(index_dir.glob("buffer-*.jsonl"))
+
+    def test_unflushed_documents_survive_a_crash(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir))
+        index.add_document(make_doc("d1", "Eviction notice", "rent is late"))
+        index.add_document(make_doc("d2", "Repair request", "heat broken"))
+        index.remove_document("d2")
+        # The process dies: nothing flushed, its journal lock released
+        index._journal.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert "d1" in reopened and "d2" not in reopened
+        assert reopened.search(SearchQuery(query="eviction"))[0].document.document_id == "d1"
+        reopened.close()
+
+    def test_reindex_all_clears_segments(self, index_dir):
+        engine = SearchEngine(index_dir=str(index_dir))
+        engine.index_document("old", "u1", "Old", "stale content", {}, "pdf")
+        engine.index.flush()
+
+        engine.reindex_all_documents([
+            {"document_id": "new", "user_id": "u1", "title": "New", "content": "fresh", "file_type": "pdf"},
+        ])
+        assert "old" not in engine.index
+        assert engine.search("fresh", user_id="u1")["total"] == 1
+        engine.index.close()
+
+    def test_reindex_syncs_the_journal_once(self, index_dir, monkeypatch):
+        import app.core.search_engine as search_engine
+
+        engine = SearchEngine(index_dir=str(index_dir))
+        engine.index.flush_threshold = 1000
+        syncs = []
+        real_fsync = search_engine.os.fsync
+        monkeypatch.setattr(search_engine.os, "fsync", lambda fd: (syncs.append(fd), real_fsync(fd)))
+
+        engine.reindex_all_documents([
+            {"document_id": f"d{i}", "user_id": "u1", "title": "Notice", "content": f"rent {i}", "file_type": "pdf"}
+            for i in range(50)
+        ])
+        assert len(syncs) < 10
+        engine.index.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert reopened.total_documents == 50
+        reopened.close()
+
+    def test_batched_documents_survive_a_crash_after_the_batch(self, index_dir):
+        index = InvertedIndex(index_dir=str(index_dir))
+        with index.batch():
+            for i in range(5):
+                index.add_document(make_doc(f"d{i}", "Notice", "rent"))
+            index.remove_document("d4")
+        # The process dies right after the batch
+        index._journal.close()
+
+        reopened = InvertedIndex(index_dir=str(index_dir))
+        assert reopened.total_documents == 4 and "d4" not in reopened
+        reopened.close()
+
+
+WORDS = "lease rent tenant eviction notice court deposit repair mold heat late fee summons".split()
+
+
+def exhaustive_search(index: InvertedIndex, query: SearchQuery):
+    """Reference: score every matching document, sort, then paginate."""
+    tokens = index.processor.tokenize(query.query)
+    postings = {t: index.get_postings(t) for t in set(tokens)}
+    present = [t for t in tokens if postings[t]]
+    if not present:
+        return []
+    if query.operator == SearchOperator.AND:
+        matches = set.intersection(*(set(postings[t]) for t in present))
+    else:
+        matches = set().union(*(postings[t] for t in present))
+
+    scored = []
+    now = datetime.now(timezone.utc)
+    for doc_id in matches:
+        doc = index.get_document(doc_id)
+        if query.user_id and doc.user_id != query.user_id:
+            continue
+        if query.file_types and doc.file_type not in query.file_types:
+            continue
+        if query.tags and not any(tag in doc.tags for tag in query.tags):
+            continue
+        length = index.get_document_length(doc_id)
+        score = 0.0
+        for t in tokens:
+            tf = postings[t].get(doc_id, 0)
+            if not tf:
+                continue
+            df = len(postings[t])
+            idf = math.log((index.total_documents - df + 0.5) / (df + 0.5))
+            score += idf * (tf * 2.2) / (tf + 1.2 * (0.25 + 0.75 * length / index.avg_document_length))
+        score += 2.0 * len(set(tokens) & set(index.processor.tokenize(doc.title)))
+        score += max(0, 1 - (now - doc.created_at).days / 365) * 0.5
+        scored.append((score, doc_id))
+    scored.sort(key=lambda x: -x[0])
+    return scored[query.offset:query.offset + query.limit]
+
+
+class TestTopKSearch:
+    """Pruned top-k evaluation returns the same page as exhaustive scoring."""
+
+    @pytest.fixture
+    def corpus_index(self, index_dir):
+        rng = random.Random(7)
+        index = InvertedIndex(index_dir=str(index_dir), flush_threshold=60, max_segments=100)
+        base = datetime.now(timezone.utc)
+        for i in range(200):
+            index.add_document(make_doc(
+                f"d{i:03d}",
+                " ".join(rng.sample(WORDS, 2)),
+                " ".join(rng.choices(WORDS, k=rng.randint(5, 40))),
+                user_id=f"user-{i % 5}",
+                file_type=rng.choice(["pdf", "png"]),
+                tags=rng.sample(["urgent", "court", "lease"], 1),
+                created_at=base - timedelta(days=rng.randint(0, 500)),
+            ))
+        for i in range(0, 200, 17):
+            index.remove_document(f"d{i:03d}")
+        assert index.segments and index.document_index
+        yield index
+        index.close()
+
+    @pytest.mark.parametrize("operator", [SearchOperator.AND, SearchOperator.OR])
+    @pytest.mark.parametrize("text", ["eviction notice", "rent late fee", "mold", "court summons rent"])
+    @pytest.mark.parametrize("filters", [
+        {}, {"user_id": "user-2"}, {"file_types": ["png"]}, {"tags": ["urgent", "court"], "user_id": "user-1"},
+    ])
+    def test_matches_exhaustive(self, corpus_index, operator, text, filters):
+        for offset, limit in ((0, 5), (3, 7), (0, 500)):
+            query = SearchQuery(query=text, operator=operator, limit=limit, offset=offset, **filters)
+            expected = exhaustive_search(corpus_index, query)
+            actual = corpus_index.search(query)
+            assert [round(r.score, 9) for r in actual] == [round(s, 9) for s, _ in expected]
+
+    def test_only_final_page_is_highlighted(self, corpus_index, monkeypatch):
+        calls = []
+        original = corpus_index._generate_highlights
+        monkeypatch.setattr(corpus_index, "_generate_highlights",
+                            lambda doc, tokens: calls.append(doc.document_id) or original(doc, tokens))
+        results = corpus_index.search(SearchQuery(query="rent", operator=SearchOperator.OR, limit=3, offset=2))
+        assert len(results) == 3
+        assert calls == [r.document.document_id for r in results]
+
+    def test_date_range_filter(self, corpus_index):
+        now = datetime.now(timezone.utc)
+        query = SearchQuery(query="rent", operator=SearchOperator.OR, limit=500,
+                            date_range=(now - timedelta(days=30), now))
+        results = corpus_index.search(query)
+        assert results
+        assert all(r.document.created_at >= now - timedelta(days=30) for r in results)
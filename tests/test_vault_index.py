@@ -0,0 +1,134 @@
+"""
+Tests for the vault document index's snapshot + write-ahead log storage.
+
+Tests cover:
+- Reopening from the WAL alone and after compaction
+- Lazy per-user loading
+- Updates and deletes surviving compaction
+- Recovery from a torn WAL record
+- Migration of the legacy single-file JSON index
+"""
+
+import json
+
+import pytest
+
+from app.services.vault_upload_service import VaultDocument, VaultDocumentIndex
+
+
+def make_doc(n: int, user_id: str = "user-1", **kwargs) -> VaultDocument:
+    return VaultDocument(
+        vault_id=f"doc-{n}",
+        user_id=user_id,
+        filename=f"file{n}.pdf",
+        safe_filename=f"doc-{n}.pdf",
+        sha256_hash=f"{n:064x}",
+        file_size=100 + n,
+        mime_type="application/pdf",
+        document_type=kwargs.get("document_type", "lease"),
+        description=None,
+        tags=[],
+        storage_path=f"Semptify5.0/Vault/documents/doc-{n}.pdf",
+        storage_provider="google_drive",
+        certificate_id=f"cert-{n}",
+        uploaded_at="2026-01-01T00:00:00+00:00",
+    )
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return tmp_path / "vault_index"
+
+
+def reopen(index: VaultDocumentIndex, **kwargs) -> VaultDocumentIndex:
+    index.close()
+    return VaultDocumentIndex(data_dir=str(index.data_dir), **kwargs)
+
+
+def test_reopen_replays_wal(index_dir):
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    index.add(make_doc(1))
+    index.add(make_doc(2, user_id="user-2"))
+    index.update("doc-1", document_type="notice")
+    index.delete("doc-2")
+    assert not index.snapshot_path.exists()
+
+    index = reopen(index)
+    assert index.get("doc-1").document_type == "notice"
+    assert index.get("doc-2") is None
+    assert index.get_by_hash(make_doc(2).sha256_hash) is None
+    assert index.get_user_documents("user-2") == []
+    index.close()
+
+
+def test_compaction_keeps_updates_and_deletes(index_dir):
+    index = VaultDocumentIndex(data_dir=str(index_dir), compact_min_entries=4, compact_ratio=0)
+    for n in range(6):
+        index.add(make_doc(n, user_id=f"user-{n % 2}"))
+    assert index.snapshot_path.exists()
+    index.update("doc-3", document_type="receipt")
+    index.delete("doc-0")
+    index.compact()
+    assert index.wal_path.stat().st_size == 0
+
+    index = reopen(index)
+    assert [d.vault_id for d in index.get_user_documents("user-0")] == ["doc-2", "doc-4"]
+    assert [d.vault_id for d in index.get_user_documents("user-1", "receipt")] == ["doc-3"]
+    assert index.get_by_hash(make_doc(5).sha256_hash).vault_id == "doc-5"
+    index.close()
+
+
+def test_users_load_lazily(index_dir):
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    for n in range(4):
+        index.add(make_doc(n, user_id=f"user-{n}"))
+    index.compact()
+
+    index = reopen(index)
+    assert index._documents == {}
+    assert index.get("doc-2").user_id == "user-2"
+    assert set(index._documents) == {"doc-2"}
+    index.close()
+
+
+def test_wal_update_overrides_snapshot_copy(index_dir):
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    index.add(make_doc(1))
+    index.add(make_doc(2))
+    index.compact()
+    index.update("doc-1", processed=True)
+    index.add(make_doc(3))
+
+    index = reopen(index)
+    docs = index.get_user_documents("user-1")
+    assert [d.vault_id for d in docs] == ["doc-1", "doc-2", "doc-3"]
+    assert docs[0].processed is True
+    index.close()
+
+
+def test_torn_wal_record_is_dropped(index_dir):
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    index.add(make_doc(1))
+    index.close()
+    with open(index.wal_path, "ab") as f:
+        f.write(b'{"op":"put","doc":{"vault_id":"doc-')
+
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    assert [d.vault_id for d in index.get_user_documents("user-1")] == ["doc-1"]
+    index.add(make_doc(2))
+
+    index = reopen(index)
+    assert [d.vault_id for d in index.get_user_documents("user-1")] == ["doc-1", "doc-2"]
+    index.close()
+
+
+def test_legacy_json_index_is_migrated(index_dir):
+    index_dir.mkdir(parents=True)
+    legacy = {"documents": {f"doc-{n}": make_doc(n).to_dict() for n in range(3)}}
+    (index_dir / "vault_index.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    index = VaultDocumentIndex(data_dir=str(index_dir))
+    assert index.snapshot_path.exists()
+    index = reopen(index)
+    assert len(index.get_user_documents("user-1")) == 3
+    index.close()
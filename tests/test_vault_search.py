@@ -0,0 +1,219 @@
+"""
+Tests for VaultSearchService.
+
+Tests cover:
+- Keyset (cursor) pagination over the timeline column
+- Capped, cached total counts and their invalidation on ingest
+- Metadata text and containment search
+- PostgreSQL full-text / trigram SQL generation
+- Radius search: indexed coordinates, Haversine distance, antimeridian
+"""
+
+import math
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import _register_sqlite_math
+from app.models.models import User, VaultItem
+from app.services import vault_search
+from app.services.vault_ingestion import IngestionRequest, VaultIngestionService
+from app.services.vault_search import (
+    EARTH_RADIUS_METERS,
+    InvalidCursorError,
+    SearchCriteria,
+    SortOrder,
+    TimelineMode,
+    VaultSearchService,
+    bounding_box,
+    encode_cursor,
+    extract_coordinates,
+    invalidate_search_counts,
+)
+
+USER_ID = "GUsearch01"
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def db():
+    from app.core.database import get_engine
+
+    await invalidate_search_counts(USER_ID)
+    session_factory = async_sessionmaker(get_engine(), expire_on_commit=False)
+    async with session_factory() as session:
+        session.add(User(id=USER_ID, primary_provider="google_drive", storage_user_id=USER_ID))
+        for i in range(25):
+            # Pairs of items share an event_time so item_id has to break ties
+            event_time = BASE_TIME + timedelta(hours=i // 2)
+            session.add(VaultItem(
+                user_id=USER_ID,
+                event_time=event_time,
+                record_time=event_time,
+                semptify_entry_time=event_time,
+                created_at=event_time,
+                item_type="notice" if i % 5 == 0 else "photo",
+                title=f"Rent increase notice {i}" if i % 5 == 0 else f"Kitchen photo {i}",
+                summary="Landlord raised rent" if i % 5 == 0 else "Mold under sink",
+                item_metadata={"landlord": "ABC Management" if i % 2 else "XYZ Rentals", "unit": f"{i}B"},
+            ))
+        await session.commit()
+        yield session
+    await invalidate_search_counts(USER_ID)
+
+
+async def collect_pages(service, criteria):
+    pages = []
+    while True:
+        result = await service.search(USER_ID, criteria)
+        pages.append(result)
+        if not result.next_cursor:
+            return pages
+        criteria.cursor = result.next_cursor
+
+
+async def test_cursor_pages_cover_every_item_once(db):
+    service = VaultSearchService(db)
+    pages = await collect_pages(service, SearchCriteria(limit=10))
+    assert [len(page.items) for page in pages] == [10, 10, 5]
+    assert [page.has_more for page in pages] == [True, True, False]
+
+    keys = [(item.event_time, item.item_id) for page in pages for item in page.items]
+    assert len(set(keys)) == 25
+    assert keys == sorted(keys, reverse=True)
+
+    ascending = await collect_pages(service, SearchCriteria(limit=7, sort_order=SortOrder.ASC))
+    ids = [item.item_id for page in ascending for item in page.items]
+    assert ids == sorted(ids)
+    assert len(ids) == 25
+
+
+async def test_cursor_must_match_timeline_mode(db):
+    service = VaultSearchService(db)
+    cursor = encode_cursor(TimelineMode.RECORD_TIME, BASE_TIME, 1)
+    with pytest.raises(InvalidCursorError):
+        await service.search(USER_ID, SearchCriteria(cursor=cursor))
+    with pytest.raises(InvalidCursorError):
+        await service.search(USER_ID, SearchCriteria(cursor="not-a-cursor"))
+
+
+async def test_total_count_is_capped_and_cached(db, monkeypatch):
+    monkeypatch.setattr(vault_search, "COUNT_CAP", 20)
+    service = VaultSearchService(db)
+
+    result = await service.search(USER_ID, SearchCriteria(limit=5))
+    assert (result.total_count, result.total_count_exact) == (20, False)
+
+    result = await service.search(USER_ID, SearchCriteria(query="rent", limit=2))
+    assert (result.total_count, result.total_count_exact) == (5, True)
+
+    # Later pages reuse the cached total until an ingest invalidates it
+    ingest = await VaultIngestionService(db).ingest(IngestionRequest(
+        user_id=USER_ID,
+        item_type="notice",
+        event_time=BASE_TIME,
+        record_time=BASE_TIME,
+        metadata={},
+        title="Second rent notice",
+    ))
+    assert ingest.success
+    second = await service.search(USER_ID, SearchCriteria(query="rent", limit=2, cursor=result.next_cursor))
+    assert second.total_count == 6
+
+
+async def test_metadata_search(db):
+    service = VaultSearchService(db)
+    result = await service.search(USER_ID, SearchCriteria(metadata_query="XYZ Rent"))
+    assert result.total_count == 13
+
+    result = await service.deep_metadata_search(USER_ID, "landlord", "ABC Management", limit=5)
+    assert result.total_count == 12
+    assert len(result.items) == 5
+    assert all(item.item_metadata["landlord"] == "ABC Management" for item in result.items)
+    rest = await service.deep_metadata_search(USER_ID, "landlord", "ABC Management", limit=20, cursor=result.next_cursor)
+    assert len(rest.items) == 7
+    assert not rest.has_more
+
+
+def test_postgres_text_search_uses_indexed_operators():
+    class PostgresSession:
+        def get_bind(self):
+            return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+    service = VaultSearchService(PostgresSession())
+    query = service._apply_text_search(select(VaultItem), SearchCriteria(query="rent notice"))
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "vault_items.search_vector @@ websearch_to_tsquery('english'" in sql
+    assert "vault_items.title %% " in sql  # trigram similarity, % escaped for pyformat
+    assert "vault_items.summary ILIKE" in sql
+
+
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_METERS
+
+
+def offset(lat, lon, north_m, east_m):
+    return lat + north_m / METERS_PER_DEGREE, lon + east_m / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+
+
+async def ingest_at(db, title, lat, lon):
+    result = await VaultIngestionService(db).ingest(IngestionRequest(
+        user_id=USER_ID,
+        item_type="photo",
+        event_time=BASE_TIME,
+        record_time=BASE_TIME,
+        metadata={},
+        title=title,
+        location_data={"gps": {"lat": lat, "lon": lon}},
+    ))
+    assert result.success
+    return result.item
+
+
+async def test_location_search_uses_true_radius(db):
+    origin = (44.9778, -93.2650)
+    diagonal = 900 / math.sqrt(2)
+    await ingest_at(db, "far corner", *offset(*origin, 1000, 1000))  # inside the bounding box, ~1414 m away
+    await ingest_at(db, "diagonal", *offset(*origin, diagonal, -diagonal))
+    near = await ingest_at(db, "north", *offset(*origin, 500, 0))
+    await ingest_at(db, "across town", *offset(*origin, 8000, 3000))
+    assert (near.location_lat, near.location_lon) == pytest.approx(offset(*origin, 500, 0))
+
+    service = VaultSearchService(db)
+    result = await service.location_search(USER_ID, *origin, radius_meters=1000)
+    assert [item.title for item in result.items] == ["north", "diagonal"]
+    assert [entry["distance_meters"] for entry in result.timeline_sequence] == pytest.approx([500, 900], abs=1)
+    assert not result.has_more
+
+    first = await service.location_search(USER_ID, *origin, radius_meters=1000, limit=1)
+    assert [item.title for item in first.items] == ["north"]
+    assert first.has_more
+
+
+async def test_location_search_across_antimeridian(db):
+    await ingest_at(db, "east of the line", 0.0, -179.999)
+    await ingest_at(db, "equator origin side", 0.0, 0.0)
+    result = await VaultSearchService(db).location_search(USER_ID, 0.0, 179.999, radius_meters=500)
+    assert [item.title for item in result.items] == ["east of the line"]
+    assert result.timeline_sequence[0]["distance_meters"] == pytest.approx(222.4, abs=0.5)
+
+
+def test_coordinate_helpers():
+    assert extract_coordinates({"gps": {"lat": 0, "lon": 10.5}}) == (0.0, 10.5)
+    assert extract_coordinates({"gps": {"lat": 91, "lon": 0}}) == (None, None)
+    assert extract_coordinates({"gps": {"lat": "45", "lon": 0}}) == (None, None)
+    assert extract_coordinates({"address": "123 Main St"}) == (None, None)
+
+    assert bounding_box(89.999, 0, 1000)[2] == [(-180.0, 180.0)]
+    lat_min, lat_max, lon_ranges = bounding_box(0, -179.999, 500)
+    assert len(lon_ranges) == 2
+
+
+def test_sqlite_math_fallback_functions():
+    conn = sqlite3.connect(":memory:")
+    _register_sqlite_math(conn, None)
+    row = conn.execute("SELECT asin(sqrt(1.0000000001)), cos(radians(NULL)), sin(radians(90))").fetchone()
+    assert row == (pytest.approx(math.pi / 2), None, pytest.approx(1.0))
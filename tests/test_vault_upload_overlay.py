@@ -6,13 +6,20 @@ from app.services.vault_upload_service import VaultDocumentIndex, VaultUploadSer
 
 
 def _isolated_vault_service(tmp_path) -> VaultUploadService:
-    service = VaultUploadService()
-    service.index = VaultDocumentIndex(data_dir=str(tmp_path / "vault_index"))
+    service = VaultUploadService(index=VaultDocumentIndex(data_dir=str(tmp_path / "vault_index")))
     service._local_dir = tmp_path / "vault_storage"
     service._local_dir.mkdir(parents=True, exist_ok=True)
     return service
 
 
+def test_index_opens_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = VaultUploadService()
+    assert not (tmp_path / "data").exists()
+    assert service.index.data_dir == Path("data/vault_index")
+    assert (tmp_path / "data" / "vault_index").is_dir()
+
+
 @pytest.mark.anyio
 async def test_upload_creates_overlay_manifest(tmp_path, monkeypatch):
     service = _isolated_vault_service(tmp_path)
@@ -0,0 +1,133 @@
+"""
+Tests for per-connection WebSocket send queues.
+
+Tests cover:
+- A stalled client not delaying delivery to other connections
+- Messages encoded once and shared between queues
+- Coalescing job progress and dropping the oldest message when full
+- Slow consumers being disconnected after the send timeout
+- EventBus pushes going through the manager's queues
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from app.core import websocket_manager as ws_module
+from app.core.event_bus import EventBus, EventType
+from app.core.websocket_manager import (
+    ConnectionQueue,
+    OutboundMessage,
+    WebSocketManager,
+    WebSocketMessage,
+)
+
+
+class FakeSocket:
+    def __init__(self, stall: asyncio.Event = None):
+        self.received = []
+        self.stall = stall
+        self.closed_with = None
+
+    async def send_text(self, text):
+        if self.stall is not None:
+            await self.stall.wait()
+        self.received.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def message(n, **kwargs):
+    return WebSocketMessage(type="note", data={"n": n}, timestamp=datetime.now(timezone.utc), **kwargs)
+
+
+async def drain(*sockets, count, timeout=2.0):
+    async with asyncio.timeout(timeout):
+        while any(len(ws.received) < count for ws in sockets):
+            await asyncio.sleep(0.001)
+
+
+async def test_stalled_client_does_not_delay_others():
+    manager = WebSocketManager()
+    stalled = FakeSocket(stall=asyncio.Event())
+    fast = [FakeSocket() for _ in range(20)]
+    await manager.connect(stalled, "slow")
+    for i, ws in enumerate(fast):
+        await manager.connect(ws, f"user{i}")
+
+    for n in range(5):
+        assert await manager.broadcast_to_all(message(n))
+    await drain(*fast, count=6)  # welcome + 5
+
+    assert stalled.received == []
+    assert json.loads(fast[0].received[-1])["data"] == {"n": 4}
+    # Every queue holds the same encoded string, not a copy per connection
+    assert fast[0].received[-1] is fast[-1].received[-1]
+    stalled.stall.set()
+    await drain(stalled, count=6)
+    await manager.shutdown()
+
+
+async def test_coalesces_progress_and_drops_oldest():
+    queue = ConnectionQueue(FakeSocket(), maxsize=3)
+    for progress in (10, 20, 30):
+        queue.put(OutboundMessage(json.dumps({"progress": progress}), "job_status:j1"))
+    for n in range(4):
+        queue.put(OutboundMessage(str(n)))
+
+    assert queue.stats() == {"depth": 3, "peak_depth": 3, "sent": 0, "dropped": 2, "coalesced": 2}
+    # The coalesced progress slot was oldest and went first; it no longer absorbs updates
+    queue.put(OutboundMessage(json.dumps({"progress": 40}), "job_status:j1"))
+    assert [slot[1] for slot in queue._slots] == ["2", "3", '{"progress": 40}']
+
+
+async def test_job_updates_keep_latest_per_job():
+    manager = WebSocketManager()
+    ws = FakeSocket(stall=asyncio.Event())
+    await manager.connect(ws, "u1")
+    await asyncio.sleep(0)  # writer picks up the welcome message and stalls on it
+    for progress in range(0, 101, 10):
+        await manager.send_job_status_update("u1", "job1", "running", progress)
+    await manager.send_job_status_update("u1", "job2", "running", 50)
+    ws.stall.set()
+    await drain(ws, count=3)
+
+    updates = [json.loads(text)["data"] for text in ws.received[1:]]
+    assert [(u["job_id"], u["progress"]) for u in updates] == [("job1", 100), ("job2", 50)]
+    stats = manager.get_connection_stats()
+    assert stats["messages_coalesced"] == 10 and stats["messages_dropped"] == 0
+    await manager.shutdown()
+
+
+async def test_stalled_send_closes_slow_consumer():
+    manager = WebSocketManager(send_timeout=0.05)
+    ws = FakeSocket(stall=asyncio.Event())
+    connection_id = await manager.connect(ws, "u1")
+
+    async with asyncio.timeout(2):
+        while connection_id in manager.connections:
+            await asyncio.sleep(0.01)
+    assert ws.closed_with == ws_module.SLOW_CONSUMER_CLOSE_CODE
+    assert manager.get_connection_stats()["slow_consumers_closed"] == 1
+    assert not await manager.send_to_user("u1", message(1))
+
+
+async def test_event_bus_pushes_through_manager_queues(monkeypatch):
+    manager = WebSocketManager()
+    monkeypatch.setattr(ws_module, "_websocket_manager", manager)
+    bus = EventBus()
+    managed, unmanaged = FakeSocket(), FakeSocket()
+    await manager.connect(managed, "u1")
+    bus.register_websocket(managed, "u1")
+    bus.register_websocket(unmanaged, "broadcast")
+    try:
+        await bus.publish(EventType.NOTIFICATION, {"title": "hi"}, user_id="u1")
+        await drain(managed, count=2)
+        assert json.loads(managed.received[1])["type"] == "notification"
+        assert managed.received[1] == unmanaged.received[0]
+        assert manager.connections[manager.websocket_connections[id(managed)]].queue.sent == 2
+    finally:
+        bus.unregister_websocket(managed, "u1")
+        bus.unregister_websocket(unmanaged, "broadcast")
+        await manager.shutdown()